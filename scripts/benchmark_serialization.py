@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Serialization benchmark for MCP response encodings.
+
+Measures encode time and payload size of format_success_response for each
+response format over synthetic K-bar and snapshot payloads.
+
+Usage:
+    python scripts/benchmark_serialization.py
+    python scripts/benchmark_serialization.py --rows 1000 8000 --json
+"""
+
+import argparse
+import json
+import time
+
+from shioaji_mcp.utils.formatters import RESPONSE_FORMATS, format_success_response
+
+
+def make_kbars(rows: int) -> list[dict]:
+    """Synthetic 1-minute K-bar rows."""
+    return [
+        {
+            "date": f"2026-01-05 {9 + i // 60 % 5:02d}:{i % 60:02d}:00",
+            "open": 600.0 + i % 7,
+            "high": 601.5 + i % 7,
+            "low": 599.5 + i % 7,
+            "close": 600.5 + i % 7,
+            "volume": 100 + i % 13,
+        }
+        for i in range(rows)
+    ]
+
+
+def make_snapshots(rows: int) -> list[dict]:
+    """Synthetic snapshot rows."""
+    return [
+        {
+            "code": str(1000 + i),
+            "name": f"股票{i}",
+            "close": 50.0 + i % 50,
+            "open": 49.5 + i % 50,
+            "high": 51.0 + i % 50,
+            "low": 49.0 + i % 50,
+            "volume": 1000 + i,
+            "bid_price": 49.9 + i % 50,
+            "ask_price": 50.1 + i % 50,
+            "timestamp": "2026-01-05T13:30:00",
+        }
+        for i in range(rows)
+    ]
+
+
+def bench(data: list[dict], response_format: str, repeat: int) -> dict:
+    """Time format_success_response and report the encoded size."""
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        response = format_success_response(data, "benchmark", response_format)
+        best = min(best, time.perf_counter() - started)
+    payload = response[-1]["text"].encode()
+    return {"ms": round(best * 1000, 3), "bytes": len(payload)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, nargs="+", default=[100, 1000, 8000])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--json", action="store_true", help="Print a JSON report")
+    args = parser.parse_args()
+
+    results = []
+    for name, factory in (("kbars", make_kbars), ("snapshots", make_snapshots)):
+        for rows in args.rows:
+            data = factory(rows)
+            for response_format in RESPONSE_FORMATS:
+                result = bench(data, response_format, args.repeat)
+                results.append({
+                    "payload": name, "rows": rows, "format": response_format, **result
+                })
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    print(f"{'payload':<10} {'rows':>6} {'format':<9} {'ms':>9} {'bytes':>10}")
+    for r in results:
+        print(f"{r['payload']:<10} {r['rows']:>6} {r['format']:<9} {r['ms']:>9.3f} {r['bytes']:>10}")
+
+
+if __name__ == "__main__":
+    main()
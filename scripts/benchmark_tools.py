@@ -0,0 +1,370 @@
+#!/usr/bin/env python3
+"""
+End-to-end latency and throughput benchmark for MCP tool calls.
+
+Runs the server against the local broker simulator (SHIOAJI_BACKEND=simulator)
+and sweeps payload sizes and concurrency for each tool, either in process
+through ``handle_call_tool`` or over a real stdio session with a server
+subprocess. Reports per-call p50/p90/p99 latency, throughput and response
+size, and compares a run against a saved baseline report.
+
+Usage:
+    python scripts/benchmark_tools.py
+    python scripts/benchmark_tools.py --mode stdio --tools get_snapshots --concurrency 1 8
+    python scripts/benchmark_tools.py --output before.json
+    python scripts/benchmark_tools.py --compare before.json --threshold 0.2
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from collections.abc import Awaitable, Callable
+from datetime import date, timedelta
+from typing import Any
+
+import numpy as np
+
+# Report layout version; bump when fields change meaning
+REPORT_VERSION = 1
+
+# tool -> (swept parameter, default sizes)
+SCENARIOS = {
+    "get_snapshots": ("watchlist", [1, 10, 100, 500]),
+    "get_kbars": ("days", [1, 5, 20, 60]),
+    "get_ticks": ("limit", [100, 1000, 10000]),
+    "search_contracts": ("limit", [10, 100, 500]),
+    "scan_market": ("limit", [20, 100, 500]),
+    "get_positions": ("calls", [1]),
+    "place_order": ("calls", [1]),
+}
+
+# Server-side pacing high enough that the benchmark measures the server,
+# not the token buckets; --broker-limits restores the broker's own limits
+UNPACED_RATES = {
+    "SHIOAJI_QUOTE_RATE_LIMIT": "10000",
+    "SHIOAJI_DATA_RATE_LIMIT": "10000",
+    "SHIOAJI_ORDER_RATE_LIMIT": "10000",
+    "SHIOAJI_ACCOUNT_RATE_LIMIT": "10000",
+}
+
+
+def _weekdays_back(end: date, days: int) -> date:
+    """The date ``days`` weekdays before and including ``end``."""
+    start = end
+    remaining = days - 1
+    while remaining > 0:
+        start -= timedelta(days=1)
+        if start.weekday() < 5:
+            remaining -= 1
+    return start
+
+
+def _last_weekday(today: date) -> date:
+    day = today - timedelta(days=1)
+    while day.weekday() >= 5:
+        day -= timedelta(days=1)
+    return day
+
+
+def build_arguments(tool: str, size: int, codes: list[str], request: int) -> dict[str, Any]:
+    """Tool arguments for one request of a scenario."""
+    end = _last_weekday(date.today())
+    if tool == "get_snapshots":
+        return {"contracts": codes[:size]}
+    if tool == "get_kbars":
+        return {
+            "contract": codes[request % len(codes)],
+            "start_date": _weekdays_back(end, size).isoformat(),
+            "end_date": end.isoformat(),
+        }
+    if tool == "get_ticks":
+        return {"contract": "2330", "date": end.isoformat(), "mode": "raw", "limit": size}
+    if tool == "search_contracts":
+        return {"keyword": "模擬", "limit": size}
+    if tool == "scan_market":
+        return {"limit": size, "sort": "-change_pct"}
+    if tool == "get_positions":
+        return {}
+    if tool == "place_order":
+        return {"contract": "2330", "action": "Buy", "quantity": 1, "price": 900}
+    raise ValueError(f"No scenario for {tool}")
+
+
+def configure_environment(args: argparse.Namespace, cache_dir: str) -> dict[str, str]:
+    """Environment shared by the in-process server and the stdio subprocess."""
+    env = {
+        "SHIOAJI_BACKEND": "simulator",
+        "SHIOAJI_SIM_SEED": str(args.seed),
+        "SHIOAJI_SIM_STOCKS": str(args.stocks),
+        "SHIOAJI_SIM_LATENCY_MS": str(args.latency_ms),
+        "SHIOAJI_SIM_JITTER_MS": str(args.jitter_ms),
+        "SHIOAJI_SIM_QUOTE_INTERVAL_MS": "0",
+        "SHIOAJI_TRADING_ENABLED": "true",
+        "SHIOAJI_CACHE_DIR": cache_dir,
+        "SHIOAJI_MCP_CLIENT_CONCURRENCY": str(max(args.concurrency)),
+    }
+    if not args.broker_limits:
+        env["SHIOAJI_SIM_RATE_LIMITS"] = "off"
+        env.update(UNPACED_RATES)
+    if not args.warm_cache:
+        env["SHIOAJI_SNAPSHOT_TTL_MS"] = "0"
+        env["SHIOAJI_SNAPSHOT_CLOSED_TTL_MS"] = "0"
+    os.environ.update(env)
+    return env
+
+
+def stock_codes(seed: int, stocks: int) -> list[str]:
+    """Stock codes the simulator will list; the same seed gives the same codes."""
+    from shioaji_mcp.utils.simulator import build_contracts
+
+    tree = build_contracts(seed, stocks)
+    return [contract.code for group in tree.Stocks for contract in group]
+
+
+def _response_stats(texts: list[str]) -> tuple[int, bool]:
+    return sum(len(text.encode()) for text in texts), bool(texts) and texts[0].startswith("Error")
+
+
+async def measure(
+    call: Callable[[str, dict[str, Any]], Awaitable[list[str]]],
+    tool: str,
+    size: int,
+    concurrency: int,
+    requests: int,
+    codes: list[str],
+) -> dict[str, Any]:
+    """Run ``requests`` calls with ``concurrency`` in flight and summarize them."""
+    latencies: list[float] = []
+    sizes: list[int] = []
+    errors: list[str] = []
+    counter = iter(range(requests))
+
+    async def worker() -> None:
+        for request in counter:
+            arguments = build_arguments(tool, size, codes, request)
+            started = time.perf_counter()
+            texts = await call(tool, arguments)
+            latencies.append(time.perf_counter() - started)
+            nbytes, failed = _response_stats(texts)
+            sizes.append(nbytes)
+            if failed:
+                errors.append(texts[0])
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    ms = np.array(latencies) * 1000
+    return {
+        "tool": tool,
+        "param": SCENARIOS[tool][0],
+        "size": size,
+        "concurrency": concurrency,
+        "requests": requests,
+        "errors": len(errors),
+        "first_error": errors[0][:200] if errors else None,
+        "p50_ms": round(float(np.percentile(ms, 50)), 3),
+        "p90_ms": round(float(np.percentile(ms, 90)), 3),
+        "p99_ms": round(float(np.percentile(ms, 99)), 3),
+        "mean_ms": round(float(ms.mean()), 3),
+        "max_ms": round(float(ms.max()), 3),
+        "throughput_rps": round(requests / elapsed, 2),
+        "bytes": int(np.median(sizes)),
+    }
+
+
+async def sweep(
+    call: Callable[[str, dict[str, Any]], Awaitable[list[str]]],
+    args: argparse.Namespace,
+    codes: list[str],
+) -> list[dict[str, Any]]:
+    results = []
+    for tool in args.tools:
+        for size in args.sizes.get(tool, SCENARIOS[tool][1]):
+            # One unmeasured call builds catalogs and tables the tool needs
+            await call(tool, build_arguments(tool, size, codes, 0))
+            for concurrency in args.concurrency:
+                result = await measure(call, tool, size, concurrency, args.requests, codes)
+                result["mode"] = args.mode
+                results.append(result)
+                print(_format_row(result), file=sys.stderr)
+    return results
+
+
+async def run_in_process(args: argparse.Namespace, codes: list[str]) -> list[dict[str, Any]]:
+    """Drive ``handle_call_tool`` directly, without any transport."""
+    from shioaji_mcp.server import handle_call_tool
+    from shioaji_mcp.utils.auth import auth_manager
+
+    logging.getLogger().setLevel(logging.INFO if args.verbose else logging.ERROR)
+
+    async def call(tool: str, arguments: dict[str, Any]) -> list[str]:
+        return [item["text"] for item in await handle_call_tool(tool, arguments)]
+
+    auth_manager.start()
+    try:
+        if not await auth_manager.ensure_connected():
+            raise RuntimeError(f"Simulator login failed: {auth_manager.status()}")
+        return await sweep(call, args, codes)
+    finally:
+        await auth_manager.stop()
+
+
+async def run_stdio(args: argparse.Namespace, env: dict[str, str], codes: list[str]) -> list[dict[str, Any]]:
+    """Drive a server subprocess through a real MCP stdio session."""
+    from mcp import ClientSession
+    from mcp.client.stdio import StdioServerParameters, stdio_client
+
+    params = StdioServerParameters(
+        command=sys.executable,
+        args=["-m", "shioaji_mcp.server"],
+        env={**os.environ, **env, "LOG_LEVEL": "WARNING"},
+    )
+    with open(os.devnull, "w") as devnull:
+        async with stdio_client(params, errlog=sys.stderr if args.verbose else devnull) as (read, write):
+            async with ClientSession(read, write) as session:
+                await session.initialize()
+
+                async def call(tool: str, arguments: dict[str, Any]) -> list[str]:
+                    result = await session.call_tool(tool, arguments)
+                    return [getattr(item, "text", "") for item in result.content]
+
+                return await sweep(call, args, codes)
+
+
+def _git_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _key(result: dict[str, Any]) -> tuple:
+    return result["mode"], result["tool"], result["size"], result["concurrency"]
+
+
+def compare(baseline: dict[str, Any], report: dict[str, Any], threshold: float) -> list[str]:
+    """Print deltas against a baseline report and return the regressions."""
+    before = {_key(result): result for result in baseline["results"]}
+    regressions = []
+    print(f"\nCompared with {baseline.get('commit') or 'baseline'} (threshold {threshold:.0%})")
+    print(f"{'tool':<17} {'size':>6} {'conc':>5} {'p50 Δ':>8} {'p99 Δ':>8} {'rps Δ':>8}")
+    for result in report["results"]:
+        old = before.get(_key(result))
+        if old is None:
+            continue
+        p50 = result["p50_ms"] / old["p50_ms"] - 1 if old["p50_ms"] else 0.0
+        p99 = result["p99_ms"] / old["p99_ms"] - 1 if old["p99_ms"] else 0.0
+        rps = result["throughput_rps"] / old["throughput_rps"] - 1 if old["throughput_rps"] else 0.0
+        flag = ""
+        if p99 > threshold or rps < -threshold:
+            flag = "  REGRESSION"
+            regressions.append(f"{result['tool']} size={result['size']} concurrency={result['concurrency']}")
+        print(
+            f"{result['tool']:<17} {result['size']:>6} {result['concurrency']:>5} "
+            f"{p50:>+8.1%} {p99:>+8.1%} {rps:>+8.1%}{flag}"
+        )
+    return regressions
+
+
+def _format_row(r: dict[str, Any]) -> str:
+    return (
+        f"{r['tool']:<17} {r['param']:<9} {r['size']:>6} {r['concurrency']:>5} "
+        f"{r['p50_ms']:>9.2f} {r['p99_ms']:>9.2f} {r['throughput_rps']:>9.1f} "
+        f"{r['bytes']:>10} {r['errors']:>6}"
+    )
+
+
+def _parse_sizes(values: list[str]) -> dict[str, list[int]]:
+    """``tool=1,10,100`` overrides of the swept sizes."""
+    sizes = {}
+    for value in values:
+        tool, _, spec = value.partition("=")
+        if tool not in SCENARIOS:
+            raise argparse.ArgumentTypeError(f"Unknown tool in --sizes: {tool}")
+        sizes[tool] = [int(size) for size in spec.split(",") if size]
+    return sizes
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--mode", choices=["inprocess", "stdio"], default="inprocess")
+    parser.add_argument("--tools", nargs="+", choices=list(SCENARIOS), default=list(SCENARIOS))
+    parser.add_argument("--sizes", nargs="*", default=[], metavar="TOOL=N,N",
+                        help="Override swept sizes, e.g. get_snapshots=1,50")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16])
+    parser.add_argument("--requests", type=int, default=50, help="Measured calls per data point")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--stocks", type=int, default=1000, help="Simulated stock listings")
+    parser.add_argument("--latency-ms", type=int, default=20, help="Simulated broker latency")
+    parser.add_argument("--jitter-ms", type=int, default=0)
+    parser.add_argument("--broker-limits", action="store_true",
+                        help="Keep the simulated broker limits and the server's rate pacing")
+    parser.add_argument("--warm-cache", action="store_true",
+                        help="Let the snapshot cache answer repeated requests")
+    parser.add_argument("--output", help="Write the JSON report to this file")
+    parser.add_argument("--json", action="store_true", help="Print the JSON report")
+    parser.add_argument("--compare", help="Baseline JSON report to compare against")
+    parser.add_argument("--threshold", type=float, default=0.2,
+                        help="Relative p99 or throughput change reported as a regression")
+    parser.add_argument("--verbose", action="store_true", help="Show server logs")
+    args = parser.parse_args()
+    args.sizes = _parse_sizes(args.sizes)
+
+    with tempfile.TemporaryDirectory(prefix="shioaji-bench-") as cache_dir:
+        env = configure_environment(args, cache_dir)
+        codes = stock_codes(args.seed, args.stocks)
+        print(
+            f"{'tool':<17} {'param':<9} {'size':>6} {'conc':>5} {'p50 ms':>9} {'p99 ms':>9} "
+            f"{'req/s':>9} {'bytes':>10} {'errors':>6}",
+            file=sys.stderr,
+        )
+        if args.mode == "stdio":
+            results = asyncio.run(run_stdio(args, env, codes))
+        else:
+            results = asyncio.run(run_in_process(args, codes))
+
+    report = {
+        "version": REPORT_VERSION,
+        "commit": _git_commit(),
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "settings": {
+            "mode": args.mode,
+            "requests": args.requests,
+            "seed": args.seed,
+            "stocks": args.stocks,
+            "latency_ms": args.latency_ms,
+            "jitter_ms": args.jitter_ms,
+            "broker_limits": args.broker_limits,
+            "warm_cache": args.warm_cache,
+        },
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    if args.json:
+        print(json.dumps(report, indent=2))
+
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(json.load(f), report, args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} regressions: {'; '.join(regressions)}", file=sys.stderr)
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
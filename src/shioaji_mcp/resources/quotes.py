@@ -0,0 +1,211 @@
+"""Quote resources with throttled update notifications."""
+
+import asyncio
+import logging
+import os
+import threading
+from collections.abc import Callable
+from typing import Any
+from urllib.parse import urlparse
+
+from ..utils.auth import auth_manager
+from ..utils.contract_catalog import contract_catalog
+from ..utils.quote_engine import QuoteEngine, normalize_quote_types, quote_engine
+
+logger = logging.getLogger(__name__)
+
+QUOTE_URI_SCHEME = "quote"
+QUOTE_URI_TEMPLATE = "quote://{exchange}/{code}"
+
+# Minimum time between two updates for the same resource
+DEFAULT_NOTIFY_INTERVAL_MS = 250
+
+
+def quote_uri(exchange: Any, code: str) -> str:
+    """Build the resource URI of a contract, e.g. ``quote://TSE/2330``."""
+    exchange = str(getattr(exchange, "value", exchange) or "").upper()
+    return f"{QUOTE_URI_SCHEME}://{exchange}/{code}"
+
+
+def parse_quote_uri(uri: Any) -> tuple[str, str]:
+    """Split a quote URI into (exchange, code)."""
+    parsed = urlparse(str(uri))
+    code = parsed.path.strip("/")
+    if parsed.scheme != QUOTE_URI_SCHEME or not parsed.netloc or not code:
+        raise ValueError(f"Invalid quote resource URI: {uri}")
+    return parsed.netloc.upper(), code
+
+
+def _notify_interval() -> float:
+    try:
+        interval_ms = int(os.getenv("SHIOAJI_QUOTE_NOTIFY_INTERVAL_MS", DEFAULT_NOTIFY_INTERVAL_MS))
+    except ValueError:
+        interval_ms = DEFAULT_NOTIFY_INTERVAL_MS
+    return max(interval_ms, 10) / 1000
+
+
+class QuoteResourceHub:
+    """Track resource subscriptions and push coalesced ``resources/updated``.
+
+    Quote callbacks only mark a contract dirty. A flusher task on the event
+    loop wakes at most once per interval and sends one notification per dirty
+    resource to each subscribed session, so bursts of ticks collapse into a
+    single update.
+
+    The hub holds one reference on a contract's feeds in the quote engine
+    while any session is subscribed, and releases it when the last one
+    leaves; the engine keeps feeds that ``subscribe_quotes`` callers still
+    hold open.
+    """
+
+    def __init__(
+        self,
+        engine: QuoteEngine,
+        interval: float | None = None,
+        get_api: Callable[[], Any] | None = None,
+    ):
+        self.engine = engine
+        self.get_api = get_api
+        self.interval = interval if interval is not None else _notify_interval()
+        self._subscribers: dict[str, set[Any]] = {}
+        self._uris: dict[str, str] = {}
+        self._dirty: set[str] = set()
+        self._feeds: dict[str, list[str]] = {}
+        self._lock = threading.Lock()
+        self._wakeup: asyncio.Event | None = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._task: asyncio.Task | None = None
+        self.sent = 0
+        engine.add_listener(self.mark_dirty)
+
+    def subscribe(self, uri: Any, session: Any) -> None:
+        """Register ``session`` for updates of ``uri``."""
+        _, code = parse_quote_uri(uri)
+        with self._lock:
+            self._subscribers.setdefault(code, set()).add(session)
+            self._uris[code] = str(uri)
+        self._ensure_flusher()
+
+    def unsubscribe(self, uri: Any, session: Any | None = None) -> bool:
+        """Remove ``session`` (or every session) from ``uri``.
+
+        Returns True when no session is left on ``uri``.
+        """
+        _, code = parse_quote_uri(uri)
+        with self._lock:
+            sessions = self._subscribers.get(code, set())
+            if session is None:
+                sessions.clear()
+            else:
+                sessions.discard(session)
+            if sessions:
+                return False
+            self._subscribers.pop(code, None)
+            self._uris.pop(code, None)
+            return True
+
+    async def acquire(self, api: Any, uri: Any, session: Any) -> None:
+        """Subscribe ``session`` to ``uri``, opening the broker feed if needed.
+
+        Raises if the contract is unknown or the broker rejects the feed, in
+        which case nothing is registered.
+        """
+        _, code = parse_quote_uri(uri)
+        if code not in self._feeds:
+            contract = self.engine.subscription(code)
+            if contract is None:
+                await contract_catalog.refresh(api)
+                contract = contract_catalog.resolve(api, code)
+            if contract is None:
+                raise LookupError(f"Contract {code} not found")
+            quote_types = normalize_quote_types(None)
+            self.engine.attach(api)
+            try:
+                await self.engine.subscribe(api, contract, quote_types, owner=self)
+            except BaseException:
+                # Drop any quote type that went through before the failure
+                try:
+                    await self.engine.unsubscribe(api, code, quote_types, owner=self)
+                except Exception as e:
+                    logger.warning(f"Failed to roll back quote feed for {code}: {e}")
+                raise
+            with self._lock:
+                self._feeds[code] = quote_types
+        self.subscribe(uri, session)
+
+    async def release(self, uri: Any, session: Any | None = None) -> None:
+        """Unsubscribe ``session`` and close the feed once nobody is left."""
+        if self.unsubscribe(uri, session):
+            await self._close_feed(parse_quote_uri(uri)[1])
+
+    async def _close_feed(self, code: str) -> None:
+        with self._lock:
+            if code in self._subscribers:
+                return
+            quote_types = self._feeds.pop(code, None)
+        if quote_types is None or self.get_api is None:
+            return
+        try:
+            await self.engine.unsubscribe(self.get_api(), code, quote_types, owner=self)
+        except Exception as e:
+            logger.warning(f"Failed to close quote feed for {code}: {e}")
+
+    def subscriber_count(self, uri: Any) -> int:
+        _, code = parse_quote_uri(uri)
+        return len(self._subscribers.get(code, ()))
+
+    def mark_dirty(self, code: str) -> None:
+        """Quote engine listener; may run on the SDK callback thread."""
+        if code not in self._subscribers:
+            return
+        with self._lock:
+            self._dirty.add(code)
+        loop, wakeup = self._loop, self._wakeup
+        if loop is not None and wakeup is not None and not loop.is_closed():
+            loop.call_soon_threadsafe(wakeup.set)
+
+    def _ensure_flusher(self) -> None:
+        loop = asyncio.get_running_loop()
+        if self._task is not None and not self._task.done() and self._loop is loop:
+            return
+        self._loop = loop
+        self._wakeup = asyncio.Event()
+        self._task = self._loop.create_task(self._run())
+
+    async def flush(self) -> int:
+        """Send one notification per dirty resource; returns the number sent."""
+        with self._lock:
+            dirty, self._dirty = self._dirty, set()
+            targets = [
+                (self._uris[code], list(self._subscribers.get(code, ())))
+                for code in dirty
+                if code in self._uris
+            ]
+
+        sent = 0
+        for uri, sessions in targets:
+            for session in sessions:
+                try:
+                    await session.send_resource_updated(uri)
+                    sent += 1
+                except Exception as e:
+                    logger.info(f"Dropping quote subscriber for {uri}: {e}")
+                    await self.release(uri, session)
+        self.sent += sent
+        return sent
+
+    async def _run(self) -> None:
+        wakeup = self._wakeup
+        if wakeup is None:
+            return
+        while self._subscribers:
+            await wakeup.wait()
+            wakeup.clear()
+            await self.flush()
+            # Throttle: coalesce everything that arrives during the interval
+            await asyncio.sleep(self.interval)
+        self._task = None
+
+
+# Global quote resource hub
+quote_resources = QuoteResourceHub(quote_engine, get_api=auth_manager.get_api)
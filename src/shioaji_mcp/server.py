@@ -1,257 +1,222 @@
 """Main MCP server implementation for Shioaji."""
 
+import argparse
 import asyncio
 import logging
 from typing import Any
 
 from mcp.server import Server
+from mcp.server.lowlevel.helper_types import ReadResourceContents
 from mcp.server.models import InitializationOptions
 from mcp.server.stdio import stdio_server
 from mcp.types import (
-    ServerCapabilities,
+    Resource,
+    ResourcesCapability,
+    ResourceTemplate,
     Tool,
 )
+from pydantic import AnyUrl
 
-from .tools.contracts import search_contracts
-from .tools.market_data import get_kbars, get_snapshots
-from .tools.orders import cancel_order, list_orders, place_order
-from .tools.positions import get_account_balance, get_positions
-from .tools.terms import check_terms_status, run_api_test
+from .resources.quotes import (
+    QUOTE_URI_TEMPLATE,
+    parse_quote_uri,
+    quote_resources,
+    quote_uri,
+)
+
+# Importing the tool modules registers their tools
+from .tools import (  # noqa: F401
+    accounts,
+    contracts,
+    indicators,
+    market_data,
+    orders,
+    positions,
+    quotes,
+    scanner,
+    terms,
+)
+from .tools import metrics as metrics_tools  # noqa: F401
+from .tools.middleware import (
+    instrument,
+    limit_per_client,
+    response_cache,
+    validate_arguments,
+)
+from .tools.registry import NOT_CONNECTED, registry
+from .transport import (
+    TRANSPORTS,
+    auth_token_for,
+    host_from_env,
+    port_from_env,
+    serve_http,
+    transport_from_env,
+)
 from .utils.auth import auth_manager
-from .utils.formatters import format_error_response, format_success_response
+from .utils.client_limits import client_limiter
+from .utils.contract_cache import contract_cache
+from .utils.contract_catalog import contract_catalog
+from .utils.executor import broker_executor
+from .utils.formatters import encode_json
+from .utils.indicators import indicator_cache
+from .utils.metrics import metrics
+from .utils.quote_engine import quote_engine
+from .utils.rate_limit import rate_governor
+from .utils.snapshot_cache import snapshot_cache
+from .utils.ticks import tick_cache
+from .utils.tracing import tracer
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Component counters scraped alongside the latency histograms
+metrics.register_stats("broker_executor", broker_executor.stats, label="category")
+metrics.register_stats("rate_limit", rate_governor.stats, label="category")
+metrics.register_stats("snapshot_cache", snapshot_cache.stats)
+metrics.register_stats("indicator_cache", indicator_cache.stats)
+metrics.register_stats("tick_cache", tick_cache.stats)
+metrics.register_stats("response_cache", response_cache.stats)
+metrics.register_stats("clients", client_limiter.stats)
+metrics.register_stats("session", auth_manager.status, label="session")
+
+
+class ShioajiServer(Server):
+    """MCP server advertising subscribable quote resources on every transport."""
+
+    def create_initialization_options(self, *args: Any, **kwargs: Any) -> InitializationOptions:
+        options = super().create_initialization_options(*args, **kwargs)
+        options.capabilities.resources = ResourcesCapability(subscribe=True, listChanged=False)
+        return options
+
+
 # Create MCP server instance
-server = Server("shioaji-mcp")
+server = ShioajiServer("shioaji-mcp", version="0.1.0")
+
+
+# Every call passes the per-client limit, then instrumentation, argument
+# validation and the response cache before reaching the tool
+registry.use(limit_per_client)
+registry.use(instrument)
+registry.use(validate_arguments)
+registry.use(response_cache)
+
+# Cached account lists belong to the session that produced them
+auth_manager.add_listener(response_cache.invalidate)
 
 
 @server.list_tools()
 async def handle_list_tools() -> list[Tool]:
-    """List available tools."""
-    return [
-
-        Tool(
-            name="get_account_info",
-            description="Get account information",
-            inputSchema={
-                "type": "object",
-                "properties": {},
-            },
-        ),
-
-        Tool(
-            name="search_contracts",
-            description="Search for trading contracts",
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "keyword": {
-                        "type": "string",
-                        "description": "Search keyword for contract name or code",
-                    },
-                    "exchange": {
-                        "type": "string",
-                        "description": "Exchange filter (TSE, OTC, etc.)",
-                    },
-                    "category": {
-                        "type": "string",
-                        "description": "Category filter (Stock, Future, Option, etc.)",
-                    },
-                },
-            },
-        ),
-        Tool(
-            name="get_snapshots",
-            description="Get real-time market snapshots",
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "contracts": {
-                        "type": "array",
-                        "items": {"type": "string"},
-                        "description": "List of contract codes",
-                    },
-                },
-                "required": ["contracts"],
-            },
-        ),
-        Tool(
-            name="get_kbars",
-            description="Get historical K-bar data",
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "contract": {"type": "string", "description": "Contract code"},
-                    "start_date": {
-                        "type": "string",
-                        "description": "Start date (YYYY-MM-DD)",
-                    },
-                    "end_date": {
-                        "type": "string",
-                        "description": "End date (YYYY-MM-DD)",
-                    },
-                    "timeframe": {
-                        "type": "string",
-                        "description": "Timeframe (1D, 1H, 5M, etc.)",
-                    },
-                },
-                "required": ["contract"],
-            },
-        ),
-        Tool(
-            name="place_order",
-            description="Place a trading order (requires SHIOAJI_TRADING_ENABLED=true)",
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "contract": {"type": "string", "description": "Contract code"},
-                    "action": {"type": "string", "description": "Buy or Sell"},
-                    "quantity": {"type": "integer", "description": "Order quantity"},
-                    "price": {"type": "number", "description": "Order price (optional for market orders)"},
-                    "order_type": {"type": "string", "description": "Order type (ROD, IOC, FOK)"},
-                },
-                "required": ["contract", "action", "quantity"],
-            },
-        ),
-        Tool(
-            name="cancel_order",
-            description="Cancel an existing order (requires SHIOAJI_TRADING_ENABLED=true)",
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "order_id": {"type": "string", "description": "Order ID to cancel"},
-                },
-                "required": ["order_id"],
-            },
-        ),
-        Tool(
-            name="list_orders",
-            description="List all orders",
-            inputSchema={
-                "type": "object",
-                "properties": {},
-            },
-        ),
-        Tool(
-            name="get_positions",
-            description="Get current positions",
-            inputSchema={
-                "type": "object",
-                "properties": {},
-            },
-        ),
-        Tool(
-            name="get_account_balance",
-            description="Get account balance information",
-            inputSchema={
-                "type": "object",
-                "properties": {},
-            },
-        ),
-        Tool(
-            name="check_terms_status",
-            description="Check service terms signing status and API testing completion",
-            inputSchema={
-                "type": "object",
-                "properties": {},
-            },
-        ),
-        Tool(
-            name="run_api_test",
-            description="Run API test for service terms compliance (login and order tests)",
-            inputSchema={
-                "type": "object",
-                "properties": {},
-            },
-        ),
-    ]
+    """List available tools; their definitions are built once at import."""
+    return registry.tools()
 
 
 @server.call_tool()
 async def handle_call_tool(name: str, arguments: dict[str, Any] | None) -> list[Any]:
-    """Handle tool calls."""
-    if name == "get_account_info":
-        return await handle_get_account_info()
-    elif name == "search_contracts":
-        return await search_contracts(arguments or {})
-    elif name == "get_snapshots":
-        return await get_snapshots(arguments or {})
-    elif name == "get_kbars":
-        return await get_kbars(arguments or {})
-    elif name == "place_order":
-        return await place_order(arguments or {})
-    elif name == "cancel_order":
-        return await cancel_order(arguments or {})
-    elif name == "list_orders":
-        return await list_orders(arguments or {})
-    elif name == "get_positions":
-        return await get_positions(arguments or {})
-    elif name == "get_account_balance":
-        return await get_account_balance(arguments or {})
-    elif name == "check_terms_status":
-        return await check_terms_status(arguments or {})
-    elif name == "run_api_test":
-        return await run_api_test(arguments or {})
-    else:
-        raise ValueError(f"Unknown tool: {name}")
-
-
-async def handle_get_account_info() -> list[Any]:
-    """Handle get account info."""
+    """Dispatch a tool call through the registry's middleware chain."""
     try:
-        if not auth_manager.is_connected():
-            return format_error_response(
-                Exception("Not connected. Please set SHIOAJI_API_KEY and SHIOAJI_SECRET_KEY environment variables.")
+        client = server.request_context.session
+    except LookupError:
+        client = None
+    return await registry.call(name, arguments, client)
+
+
+@server.list_resources()  # type: ignore[untyped-decorator]
+async def handle_list_resources() -> list[Resource]:
+    """List one quote resource per subscribed contract."""
+    resources = []
+    for code in quote_engine.subscribed_codes():
+        contract = quote_engine.subscription(code)
+        resources.append(
+            Resource(
+                uri=AnyUrl(quote_uri(getattr(contract, "exchange", ""), code)),
+                name=f"{code} {getattr(contract, 'name', '')}".strip(),
+                description=f"Latest tick and order book for {code}",
+                mimeType="application/json",
             )
+        )
+    return resources
 
-        api = auth_manager.get_api()
-        accounts = api.list_accounts()
-
-        account_info = []
-        for account in accounts:
-            account_info.append(
-                {
-                    "account_id": account.account_id,
-                    "broker_id": account.broker_id,
-                    "account_type": account.account_type,
-                    "signed": account.signed,
-                }
-            )
 
-        return format_success_response(
-            account_info, "Account information retrieved successfully"
+@server.list_resource_templates()  # type: ignore[untyped-decorator]
+async def handle_list_resource_templates() -> list[ResourceTemplate]:
+    """List the quote resource URI template."""
+    return [
+        ResourceTemplate(
+            uriTemplate=QUOTE_URI_TEMPLATE,
+            name="quote",
+            description="Latest tick and order book of a contract, e.g. quote://TSE/2330",
+            mimeType="application/json",
         )
+    ]
 
-    except Exception as e:
-        logger.error(f"Get account info error: {e}")
-        return format_error_response(e)
+
+@server.read_resource()  # type: ignore[untyped-decorator]
+async def handle_read_resource(uri: AnyUrl) -> list[ReadResourceContents]:
+    """Read the latest quote state of a contract."""
+    _, code = parse_quote_uri(uri)
+    return [
+        ReadResourceContents(
+            content=encode_json(quote_engine.get(code)), mime_type="application/json"
+        )
+    ]
+
+
+@server.subscribe_resource()  # type: ignore[untyped-decorator]
+async def handle_subscribe_resource(uri: AnyUrl) -> None:
+    """Push updates of a quote resource, subscribing to the feed if needed."""
+    if not await auth_manager.ensure_connected():
+        raise ValueError(NOT_CONNECTED)
+    await quote_resources.acquire(auth_manager.get_api(), uri, server.request_context.session)
 
 
-async def main():
+@server.unsubscribe_resource()  # type: ignore[untyped-decorator]
+async def handle_unsubscribe_resource(uri: AnyUrl) -> None:
+    """Stop pushing updates of a quote resource to this session."""
+    await quote_resources.release(uri, server.request_context.session)
+
+
+async def main(transport: str = "stdio", host: str | None = None, port: int | None = None):
     """Main entry point for the MCP server."""
-    logger.info("Starting Shioaji MCP Server")
-
-    async with stdio_server() as (read_stream, write_stream):
-        await server.run(
-            read_stream,
-            write_stream,
-            InitializationOptions(
-                server_name="shioaji-mcp",
-                server_version="0.1.0",
-                capabilities=ServerCapabilities(
-                    tools={}
-                )
-            )
-        )
+    logger.info(f"Starting Shioaji MCP Server ({transport})")
+    # Refuse an unauthenticated non-loopback bind before logging in
+    host = host or host_from_env()
+    token = auth_token_for(host) if transport == "http" else None
+
+    # Answer contract lookups from the local snapshot before the first login
+    contract_cache.load_into(contract_catalog)
+
+    # Log in while the client initializes; tool calls wait for the session
+    auth_manager.start()
+    loop_monitor = asyncio.create_task(metrics.monitor_event_loop())
+
+    try:
+        if transport == "http":
+            await serve_http(server, host, port or port_from_env(), token)
+        else:
+            async with stdio_server() as (read_stream, write_stream):
+                await server.run(read_stream, write_stream, server.create_initialization_options())
+    finally:
+        loop_monitor.cancel()
+        await auth_manager.stop()
+        tracer.close()
 
 
 def cli_main():
     """CLI entry point."""
+    parser = argparse.ArgumentParser(prog="shioaji-mcp", description="Shioaji MCP server")
+    parser.add_argument(
+        "--transport",
+        choices=TRANSPORTS,
+        default=transport_from_env(),
+        help="stdio for one client (default), or http to serve many clients over streamable HTTP and SSE",
+    )
+    parser.add_argument("--host", default=None, help="HTTP bind address (default SHIOAJI_MCP_HOST or 127.0.0.1)")
+    parser.add_argument("--port", type=int, default=None, help="HTTP port (default SHIOAJI_MCP_PORT or 8000)")
+    args = parser.parse_args()
+
     try:
-        asyncio.run(main())
+        asyncio.run(main(args.transport, args.host, args.port))
     except KeyboardInterrupt:
         logger.info("Server stopped by user")
     except Exception as e:
@@ -0,0 +1,44 @@
+"""Account information tool for Shioaji MCP server."""
+
+import logging
+from typing import Any
+
+from ..utils.auth import auth_manager
+from ..utils.formatters import format_success_response
+from .registry import registry
+from .schemas import FORMAT_PROPERTY
+
+logger = logging.getLogger(__name__)
+
+# Seconds an account list is reused; accounts only change with a new login
+ACCOUNTS_CACHE_TTL = 30.0
+
+
+@registry.tool(
+    "get_account_info",
+    "Get account information",
+    {
+        "format": FORMAT_PROPERTY,
+    },
+    connected=True,
+    cache_ttl=ACCOUNTS_CACHE_TTL,
+)
+async def get_account_info(arguments: dict[str, Any]) -> list[Any]:
+    """Get the accounts of every configured session."""
+    # Accounts of every configured session, listed in parallel
+    account_info = []
+    for target in await auth_manager.list_accounts():
+        account = target.account
+        account_info.append(
+            {
+                "account_id": account.account_id,
+                "broker_id": account.broker_id,
+                "account_type": account.account_type,
+                "signed": account.signed,
+                "session": target.session.name,
+            }
+        )
+
+    return format_success_response(
+        account_info, "Account information retrieved successfully", arguments.get("format")
+    )
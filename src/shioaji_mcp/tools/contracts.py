@@ -4,69 +4,63 @@ import logging
 from typing import Any
 
 from ..utils.auth import auth_manager
+from ..utils.contract_catalog import DEFAULT_LIMIT, contract_catalog
+from ..utils.executor import run_sdk
 from ..utils.formatters import format_error_response, format_success_response
+from .registry import NOT_CONNECTED, registry
+from .schemas import FORMAT_PROPERTY
 
 logger = logging.getLogger(__name__)
 
 
+@registry.tool(
+    "search_contracts",
+    "Search for trading contracts",
+    {
+        "format": FORMAT_PROPERTY,
+        "keyword": {
+            "type": "string",
+            "description": "Search keyword for contract name or code",
+        },
+        "exchange": {
+            "type": "string",
+            "description": "Exchange filter (TSE, OTC, OES, TAIFEX)",
+        },
+        "category": {
+            "type": "string",
+            "description": "Category filter (Stock, Future, Option, Index)",
+        },
+        "limit": {
+            "type": "integer",
+            "description": "Maximum number of results (default 50, max 500)",
+        },
+        "offset": {
+            "type": "integer",
+            "description": "Number of ranked results to skip for pagination",
+        },
+    },
+)
 async def search_contracts(arguments: dict[str, Any]) -> list[Any]:
     """Search for trading contracts."""
-    try:
-        if not auth_manager.is_connected():
-            return format_error_response(
-                Exception("Not connected. Please set SHIOAJI_API_KEY and SHIOAJI_SECRET_KEY environment variables.")
-            )
+    # A catalog loaded from the on-disk cache answers before login completes
+    if not contract_catalog.is_built or auth_manager.is_logged_in():
+        if not await auth_manager.ensure_connected():
+            return format_error_response(Exception(NOT_CONNECTED))
+        # Rebuilds only after login or a contract redownload
+        await run_sdk("data", contract_catalog.ensure_current, auth_manager.get_api())
 
-        # Get search parameters
-        keyword = arguments.get("keyword", "")
-        exchange = arguments.get("exchange", "")
-        category = arguments.get("category", "")
+    # Get search parameters
+    keyword = arguments.get("keyword", "")
+    exchange = arguments.get("exchange", "")
+    category = arguments.get("category", "")
+    limit = int(arguments.get("limit") or DEFAULT_LIMIT)
+    offset = max(0, int(arguments.get("offset") or 0))
 
-        api = auth_manager.get_api()
-        contracts = []
+    contracts, total = contract_catalog.search(
+        keyword, exchange=exchange, category=category, limit=limit, offset=offset
+    )
 
-        # Search in different contract types
-        contract_sources = [
-            ("Stock", "TSE", api.Contracts.Stocks),
-        ]
-
-        for cat, exch, source in contract_sources:
-            if category and category.lower() != cat.lower():
-                continue
-            if exchange and exchange.upper() != exch:
-                continue
-
-            try:
-                for code, contract in source.items():
-                    if keyword:
-                        if (keyword.lower() not in contract.name.lower() and
-                            keyword not in code):
-                            continue
-
-                    contracts.append({
-                        "code": code,
-                        "symbol": getattr(contract, "symbol", code),
-                        "name": contract.name,
-                        "category": cat,
-                        "exchange": exch,
-                        "currency": getattr(contract, "currency", "TWD")
-                    })
-
-                    # Limit results
-                    if len(contracts) >= 50:
-                        break
-            except Exception as e:
-                logger.warning(f"Error searching {cat} contracts: {e}")
-                continue
-
-            if len(contracts) >= 50:
-                break
-
-        return format_success_response(
-            contracts,
-            f"Found {len(contracts)} contracts"
-        )
-
-    except Exception as e:
-        logger.error(f"Contract search error: {e}")
-        return format_error_response(e)
+    message = f"Found {total} contracts"
+    if total > len(contracts):
+        message += f" (showing {offset + 1}-{offset + len(contracts)})"
+    return format_success_response(contracts, message, arguments.get("format"))
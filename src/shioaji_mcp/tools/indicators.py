@@ -0,0 +1,188 @@
+"""Technical indicator tools for Shioaji MCP server."""
+
+import asyncio
+import functools
+import logging
+import math
+from datetime import date, datetime, timedelta
+from typing import Any
+
+from ..utils.auth import auth_manager
+from ..utils.contract_catalog import contract_catalog
+from ..utils.formatters import format_error_response, format_success_response
+from ..utils.indicators import (
+    INDICATORS,
+    compute,
+    indicator_cache,
+    indicator_label,
+    normalize_indicator,
+    tail_values,
+    warmup_bars,
+)
+from ..utils.kbar_store import kbar_store
+from ..utils.resample import INTERVALS, format_timestamps, normalize_interval, resample
+from .market_data import kbar_fetcher
+from .registry import registry
+from .schemas import FORMAT_PROPERTY
+
+logger = logging.getLogger(__name__)
+
+MAX_TAIL = 250
+MAX_CONTRACTS = 50
+
+# Minutes of the TWSE day session, used to estimate bars per day
+_SESSION_MINUTES = 270
+
+
+def default_start(end: date, interval: str, bars: int) -> date:
+    """Earliest date that yields roughly ``bars`` bars of ``interval``."""
+    minutes = INTERVALS[interval]
+    if interval == "1W":
+        days = bars * 7 + 7
+    elif minutes is None:
+        days = math.ceil(bars * 7 / 5) + 10
+    else:
+        trading_days = math.ceil(bars / max(1, _SESSION_MINUTES // minutes))
+        days = math.ceil(trading_days * 7 / 5) + 3
+    return end - timedelta(days=days)
+
+
+async def _compute_for_contract(
+    api: Any,
+    contract_code: str,
+    indicators: list[tuple[str, dict[str, float]]],
+    interval: str,
+    start: date | None,
+    end: date,
+    tail: int,
+) -> dict[str, Any]:
+    await contract_catalog.refresh(api)
+    contract = contract_catalog.resolve(api, contract_code)
+    if not contract:
+        raise LookupError(f"Contract {contract_code} not found")
+
+    if start is None:
+        needed = max(warmup_bars(name, params) for name, params in indicators) + tail
+        start = default_start(end, interval, needed)
+
+    columns = await kbar_store.get(contract.code, start, end, kbar_fetcher(api, contract))
+    bars = resample(columns, interval)
+    count = len(bars["ts"])
+    if count == 0:
+        raise LookupError(f"No K-bars for {contract_code} between {start} and {end}")
+
+    first_ts, last_ts = int(bars["ts"][0]), int(bars["ts"][-1])
+    values: dict[str, Any] = {}
+    for name, params in indicators:
+        key = (contract.code, interval, name, tuple(params.items()), count, first_ts, last_ts)
+        result = indicator_cache.get_or_compute(key, functools.partial(compute, name, params, bars))
+        outputs = {output: tail_values(series, tail) for output, series in result.items()}
+        values[indicator_label(name, params)] = outputs.get("value", outputs)
+
+    dates = format_timestamps(bars["ts"][-tail:], interval)
+    return {
+        "contract": contract_code,
+        "interval": interval,
+        "bars": count,
+        "date": dates[-1] if tail == 1 else dates,
+        "indicators": values,
+    }
+
+
+@registry.tool(
+    "compute_indicators",
+    (
+        "Compute technical indicators (SMA, EMA, RSI, ATR, Bollinger bands) "
+        "server-side over K-bars for one or many contracts, returning only "
+        "the latest values or a short tail"
+    ),
+    {
+        "format": FORMAT_PROPERTY,
+        "contracts": {
+            "type": "array",
+            "items": {"type": "string"},
+            "maxItems": MAX_CONTRACTS,
+            "description": "Contract codes",
+        },
+        "indicators": {
+            "type": "array",
+            "items": {
+                "anyOf": [
+                    {"type": "string", "enum": list(INDICATORS)},
+                    {
+                        "type": "object",
+                        "properties": {
+                            "name": {"type": "string", "enum": list(INDICATORS)},
+                            "period": {"type": "integer", "minimum": 1},
+                            "stddev": {"type": "number", "description": "Bollinger band width"},
+                        },
+                        "required": ["name"],
+                    },
+                ]
+            },
+            "description": 'Indicators, e.g. ["rsi", {"name": "sma", "period": 60}]',
+        },
+        "interval": {
+            "type": "string",
+            "enum": ["1m", "5m", "15m", "30m", "60m", "1D", "1W"],
+            "description": "Bar interval (default 1D)",
+        },
+        "start_date": {
+            "type": "string",
+            "description": "Start date (YYYY-MM-DD, default: enough history for the indicators)",
+        },
+        "end_date": {"type": "string", "description": "End date (YYYY-MM-DD, default today)"},
+        "tail": {
+            "type": "integer",
+            "minimum": 1,
+            "maximum": MAX_TAIL,
+            "description": "Number of most recent values to return (default 1)",
+        },
+    },
+    ["contracts", "indicators"],
+    connected=True,
+)
+async def compute_indicators(arguments: dict[str, Any]) -> list[Any]:
+    """Compute technical indicators over cached K-bars."""
+    contracts = list(dict.fromkeys(arguments.get("contracts") or []))
+    if not contracts:
+        return format_error_response(Exception("No contracts specified"))
+    if len(contracts) > MAX_CONTRACTS:
+        return format_error_response(
+            Exception(f"Too many contracts: {len(contracts)} (maximum {MAX_CONTRACTS})")
+        )
+
+    specs = arguments.get("indicators") or []
+    if not specs:
+        return format_error_response(
+            Exception(f"No indicators specified. Use any of {', '.join(INDICATORS)}")
+        )
+    indicators = [normalize_indicator(spec) for spec in specs]
+    interval = normalize_interval(arguments.get("interval") or "1D")
+    tail = int(arguments.get("tail") or 1)
+    if not 1 <= tail <= MAX_TAIL:
+        raise ValueError(f"tail must be between 1 and {MAX_TAIL}")
+
+    end_date = arguments.get("end_date")
+    end = date.fromisoformat(end_date) if end_date else datetime.now().date()
+    start_date = arguments.get("start_date")
+    start = date.fromisoformat(start_date) if start_date else None
+
+    api = auth_manager.get_api()
+
+    async def run(contract_code: str) -> dict[str, Any]:
+        try:
+            return await _compute_for_contract(
+                api, contract_code, indicators, interval, start, end, tail
+            )
+        except Exception as e:
+            logger.warning(f"Failed to compute indicators for {contract_code}: {e}")
+            return {"contract": contract_code, "error": str(e)}
+
+    results = await asyncio.gather(*(run(contract_code) for contract_code in contracts))
+
+    failed = sum(1 for result in results if "error" in result)
+    message = f"Computed {len(indicators)} indicators for {len(results) - failed} contracts"
+    if failed:
+        message += f" ({failed} failed)"
+    return format_success_response(results, message, arguments.get("format"))
@@ -1,126 +1,472 @@
 """Market data tools for Shioaji MCP server."""
 
+import asyncio
 import logging
-from datetime import datetime, timedelta
+import os
+from array import array
+from collections.abc import AsyncGenerator, Awaitable, Callable
+from datetime import date, datetime, time, timedelta
 from typing import Any
 
 from ..utils.auth import auth_manager
-from ..utils.formatters import format_error_response, format_success_response
+from ..utils.contract_catalog import contract_catalog
+from ..utils.executor import run_sdk
+from ..utils.formatters import (
+    format_error_response,
+    format_success_response,
+    ns_to_datetime,
+)
+from ..utils.kbar_store import KBAR_COLUMNS, empty_columns, kbar_store
+from ..utils.pagination import decode_cursor, encode_cursor, next_page_content
+from ..utils.resample import normalize_fields, normalize_interval, resample, to_rows
+from ..utils.shioaji_wrapper import get_shioaji
+from ..utils.snapshot_cache import snapshot_cache
+from ..utils.ticks import (
+    TICK_MODES,
+    iter_rows,
+    select,
+    summarize,
+    tick_cache,
+    to_arrays,
+    volume_profile,
+)
+from .registry import registry
+from .schemas import FORMAT_PROPERTY
 
 logger = logging.getLogger(__name__)
 
+# Maximum number of contracts the broker accepts per snapshots call
+SNAPSHOT_BATCH_SIZE = 500
 
+# Raw ticks returned per page
+TICK_PAGE_SIZE = 1_000
+MAX_TICK_PAGE_SIZE = 10_000
+
+# K-bars returned per page; longer ranges continue through a cursor
+KBAR_PAGE_SIZE = 10_000
+MAX_KBAR_PAGE_SIZE = 50_000
+
+
+def snapshot_batch_size() -> int:
+    """Maximum number of contracts sent in one snapshots request."""
+    try:
+        return max(1, int(os.getenv("SHIOAJI_SNAPSHOT_BATCH_SIZE", SNAPSHOT_BATCH_SIZE)))
+    except ValueError:
+        return SNAPSHOT_BATCH_SIZE
+
+
+def _format_snapshot(code: str, contract: Any, snapshot: Any) -> dict[str, Any]:
+    """Format a Shioaji snapshot for MCP response."""
+    ts = ns_to_datetime(getattr(snapshot, "ts", None))
+    return {
+        "code": code,
+        "name": contract.name,
+        "close": snapshot.close,
+        "open": snapshot.open,
+        "high": snapshot.high,
+        "low": snapshot.low,
+        "volume": snapshot.volume,
+        "bid_price": snapshot.buy_price,
+        "ask_price": snapshot.sell_price,
+        "timestamp": ts.isoformat() if ts else datetime.now().isoformat(),
+    }
+
+
+async def fetch_snapshot_chunk(api: Any, chunk: list[tuple[str, Any]]) -> dict[str, Any]:
+    """Fetch one chunk of snapshots and map the results back to codes."""
+    try:
+        results = await run_sdk("quote", api.snapshots, [contract for _, contract in chunk])
+    except Exception as e:
+        logger.warning(f"Snapshot batch of {len(chunk)} contracts failed: {e}")
+        return {code: e for code, _ in chunk}
+
+    by_code = {snapshot.code: snapshot for snapshot in results or []}
+    return {
+        code: by_code.get(contract.code, LookupError(f"No snapshot returned for {code}"))
+        for code, contract in chunk
+    }
+
+
+async def _fetch_snapshots(api: Any, codes: list[str]) -> dict[str, Any]:
+    """Fetch formatted snapshots for ``codes``; failures map to exceptions."""
+    # Resolve every contract before touching the network
+    await contract_catalog.refresh(api)
+    resolved = []
+    results: dict[str, Any] = {}
+    for contract_code in codes:
+        try:
+            contract = contract_catalog.resolve(api, contract_code)
+        except Exception:
+            contract = None
+        if contract:
+            resolved.append((contract_code, contract))
+        else:
+            results[contract_code] = LookupError(f"Contract {contract_code} not found")
+
+    # Send chunks concurrently; the quote executor bounds in-flight requests
+    batch_size = snapshot_batch_size()
+    chunks = [resolved[i:i + batch_size] for i in range(0, len(resolved), batch_size)]
+    contract_map = dict(resolved)
+    for chunk_result in await asyncio.gather(
+        *(fetch_snapshot_chunk(api, chunk) for chunk in chunks)
+    ):
+        for contract_code, result in chunk_result.items():
+            if not isinstance(result, Exception):
+                result = _format_snapshot(contract_code, contract_map[contract_code], result)
+            results[contract_code] = result
+    return results
+
+
+@registry.tool(
+    "get_snapshots",
+    "Get real-time market snapshots",
+    {
+        "format": FORMAT_PROPERTY,
+        "contracts": {
+            "type": "array",
+            "items": {"type": "string"},
+            "description": "List of contract codes",
+        },
+    },
+    ["contracts"],
+    connected=True,
+)
 async def get_snapshots(arguments: dict[str, Any]) -> list[Any]:
     """Get real-time market snapshots."""
-    try:
-        if not auth_manager.is_connected():
-            return format_error_response(
-                Exception("Not connected. Please set SHIOAJI_API_KEY and SHIOAJI_SECRET_KEY environment variables.")
-            )
-
-        # Get contract codes
-        contracts = arguments.get("contracts", [])
-        if not contracts:
-            return format_error_response(Exception("No contracts specified"))
-
-        api = auth_manager.get_api()
-        snapshots = []
-
-        for contract_code in contracts:
-            try:
-                # Get contract object
-                contract = api.Contracts.Stocks[contract_code]
-                if not contract:
-                    continue
-
-                # Get snapshot data
-                snapshot = api.snapshots([contract])[0]
-
-                snapshots.append({
-                    "code": contract_code,
-                    "name": contract.name,
-                    "close": snapshot.close,
-                    "open": snapshot.open,
-                    "high": snapshot.high,
-                    "low": snapshot.low,
-                    "volume": snapshot.volume,
-                    "bid_price": snapshot.bid_price,
-                    "ask_price": snapshot.ask_price,
-                    "timestamp": snapshot.ts.isoformat() if snapshot.ts else datetime.now().isoformat(),
-                })
-            except Exception as e:
-                logger.warning(f"Failed to get snapshot for {contract_code}: {e}")
-                continue
-
-        return format_success_response(
-            snapshots, f"Retrieved snapshots for {len(snapshots)} contracts"
+    # Get contract codes
+    contracts = arguments.get("contracts", [])
+    if not contracts:
+        return format_error_response(Exception("No contracts specified"))
+
+    api = auth_manager.get_api()
+    codes = list(dict.fromkeys(contracts))
+    cached = sum(1 for code in codes if snapshot_cache.peek(code) is not None)
+
+    # Identical requests from other tools or sessions share cached and in-flight results
+    results = await snapshot_cache.get_many(
+        codes, lambda missing: _fetch_snapshots(api, missing)
+    )
+
+    snapshots = []
+    failed = 0
+    for contract_code in codes:
+        result = results[contract_code]
+        if isinstance(result, Exception):
+            logger.warning(f"Failed to get snapshot for {contract_code}: {result}")
+            snapshots.append({"code": contract_code, "error": str(result)})
+            failed += 1
+            continue
+        snapshots.append(result)
+
+    message = f"Retrieved snapshots for {len(codes) - failed} contracts"
+    if cached:
+        message += f" ({cached} cached)"
+    if failed:
+        message += f" ({failed} failed)"
+    return format_success_response(snapshots, message, arguments.get("format"))
+
+
+def kbar_fetcher(api: Any, contract: Any) -> Callable[[date, date], Awaitable[dict[str, Any]]]:
+    """Return a ``fetch(first, last)`` loading broker K-bar columns for ``kbar_store``."""
+
+    async def fetch(first: date, last: date) -> dict[str, Any]:
+        kbars = await run_sdk(
+            "data",
+            api.kbars,
+            contract=contract,
+            start=first.isoformat(),
+            end=last.isoformat(),
+            timeout=30000
         )
+        return {name: getattr(kbars, name) for name, _ in KBAR_COLUMNS}
+
+    return fetch
+
+
+def _kbar_page_size(value: Any) -> int:
+    """Validate the requested page size."""
+    if value is None:
+        return KBAR_PAGE_SIZE
+    page_size = int(value)
+    if not 1 <= page_size <= MAX_KBAR_PAGE_SIZE:
+        raise ValueError(f"page_size must be between 1 and {MAX_KBAR_PAGE_SIZE}")
+    return page_size
 
-    except Exception as e:
-        logger.error(f"Get snapshots error: {e}")
-        return format_error_response(e)
 
+async def _iter_kbar_windows(
+    code: str, start: date, end: date, interval: str, fetch: Any
+) -> AsyncGenerator[tuple[date, dict[str, array]], None]:
+    """Yield (last day, columns) per resampling window: a day, or a week for 1W."""
+    window = empty_columns()
+    async for day, columns in kbar_store.iter_days(code, start, end, fetch):
+        for name, _ in KBAR_COLUMNS:
+            window[name].extend(columns[name])
+        # Weekly bars need the whole Monday..Sunday window
+        if interval != "1W" or day.weekday() == 6 or day == end:
+            yield day, window
+            window = empty_columns()
 
+
+@registry.tool(
+    "get_kbars",
+    "Get historical K-bar data, paged for long ranges",
+    {
+        "format": FORMAT_PROPERTY,
+        "contract": {"type": "string", "description": "Contract code"},
+        "start_date": {
+            "type": "string",
+            "description": "Start date (YYYY-MM-DD)",
+        },
+        "end_date": {
+            "type": "string",
+            "description": "End date (YYYY-MM-DD)",
+        },
+        "interval": {
+            "type": "string",
+            "enum": ["1m", "5m", "15m", "30m", "60m", "1D", "1W"],
+            "description": "Bar interval, aggregated server-side (default 1m)",
+        },
+        "timeframe": {
+            "type": "string",
+            "description": "Deprecated alias for interval",
+        },
+        "fields": {
+            "type": "array",
+            "items": {
+                "type": "string",
+                "enum": ["open", "high", "low", "close", "volume", "amount"],
+            },
+            "description": "Fields to return besides date (default OHLCV)",
+        },
+        "page_size": {
+            "type": "integer",
+            "minimum": 1,
+            "maximum": MAX_KBAR_PAGE_SIZE,
+            "description": (
+                f"Approximate bars per page (default {KBAR_PAGE_SIZE}); pages end "
+                "on a day (or week for 1W) boundary"
+            ),
+        },
+        "cursor": {
+            "type": "string",
+            "description": "next_page token from a previous response; replaces the date, interval and field arguments",
+        },
+    },
+    ["contract"],
+    connected=True,
+)
 async def get_kbars(arguments: dict[str, Any]) -> list[Any]:
     """Get historical K-bar data."""
+    # Get parameters
+    contract_code = arguments.get("contract")
+
+    if not contract_code:
+        return format_error_response(Exception("Contract code is required"))
+
+    api = auth_manager.get_api()
+
+    # Get contract object
+    await contract_catalog.refresh(api)
+    contract = contract_catalog.resolve(api, contract_code)
+    if not contract:
+        return format_error_response(Exception(f"Contract {contract_code} not found"))
+
+    # A cursor carries the query of the previous page
+    cursor = arguments.get("cursor")
+    if cursor:
+        state = decode_cursor(cursor, "kbars")
+        if state["contract"] != contract_code:
+            raise ValueError("Cursor belongs to a different contract")
+        start_date, end_date = state["start"], state["end"]
+        interval, fields = state["interval"], state["fields"]
+    else:
+        start_date = arguments.get("start_date")
+        end_date = arguments.get("end_date")
+        interval = normalize_interval(
+            arguments.get("interval") or arguments.get("timeframe")
+        )
+        fields = normalize_fields(arguments.get("fields"))
+    page_size = _kbar_page_size(arguments.get("page_size"))
+
+    # Set default date range if not provided
+    if not start_date:
+        start_date = (datetime.now() - timedelta(days=30)).strftime("%Y-%m-%d")
+    if not end_date:
+        end_date = datetime.now().strftime("%Y-%m-%d")
+    start, end = date.fromisoformat(start_date), date.fromisoformat(end_date)
+
+    fetch = kbar_fetcher(api, contract)
+
+    # Walk the range window by window, serving closed sessions from the
+    # local store and aggregating server-side; stop once the page is
+    # full so memory stays bounded regardless of the range
+    formatted_kbars: list[dict[str, Any]] = []
+    next_page = None
+    windows = _iter_kbar_windows(contract.code, start, end, interval, fetch)
+    async for last_day, columns in windows:
+        formatted_kbars.extend(to_rows(resample(columns, interval), interval, fields))
+        if len(formatted_kbars) >= page_size and last_day < end:
+            next_page = encode_cursor({
+                "kind": "kbars",
+                "contract": contract_code,
+                "start": (last_day + timedelta(days=1)).isoformat(),
+                "end": end.isoformat(),
+                "interval": interval,
+                "fields": fields,
+            })
+            break
+    await windows.aclose()
+
+    message = f"Retrieved {len(formatted_kbars)} {interval} K-bars for {contract_code}"
+    if next_page:
+        message += f" through {last_day.isoformat()}; pass next_page as cursor for more"
+    return format_success_response(
+        formatted_kbars, message, arguments.get("format")
+    ) + next_page_content(next_page)
+
+
+def _parse_time(value: str | None) -> time | None:
+    """Parse HH:MM or HH:MM:SS."""
+    if not value:
+        return None
     try:
-        if not auth_manager.is_connected():
-            return format_error_response(
-                Exception("Not connected. Please set SHIOAJI_API_KEY and SHIOAJI_SECRET_KEY environment variables.")
-            )
+        return time.fromisoformat(value)
+    except ValueError:
+        raise ValueError(f"Invalid time: {value}. Use HH:MM or HH:MM:SS") from None
 
-        # Get parameters
-        contract_code = arguments.get("contract")
 
-        if not contract_code:
-            return format_error_response(Exception("Contract code is required"))
+@registry.tool(
+    "get_ticks",
+    (
+        "Get tick history for one trading day: a summary (VWAP, volume, trade "
+        "count, optionally per time bucket), a volume profile, or raw ticks"
+    ),
+    {
+        "format": FORMAT_PROPERTY,
+        "contract": {"type": "string", "description": "Contract code"},
+        "date": {"type": "string", "description": "Trading date (YYYY-MM-DD, default today)"},
+        "time_start": {"type": "string", "description": "Start time of day (HH:MM[:SS])"},
+        "time_end": {
+            "type": "string",
+            "description": "End time of day (HH:MM[:SS]); earlier than time_start spans midnight",
+        },
+        "min_volume": {"type": "integer", "description": "Only ticks with at least this volume"},
+        "min_price": {"type": "number", "description": "Only ticks at or above this price"},
+        "max_price": {"type": "number", "description": "Only ticks at or below this price"},
+        "mode": {
+            "type": "string",
+            "enum": TICK_MODES,
+            "description": "summary (default), volume_profile or raw",
+        },
+        "bucket": {
+            "type": "string",
+            "enum": ["1m", "5m", "15m", "30m", "60m"],
+            "description": "Summarize per time bucket instead of the whole range",
+        },
+        "limit": {
+            "type": "integer",
+            "minimum": 1,
+            "maximum": MAX_TICK_PAGE_SIZE,
+            "description": f"Raw ticks per page (default {TICK_PAGE_SIZE})",
+        },
+        "cursor": {
+            "type": "string",
+            "description": "next_page token from a previous raw response",
+        },
+    },
+    ["contract"],
+    connected=True,
+)
+async def get_ticks(arguments: dict[str, Any]) -> list[Any]:
+    """Get tick history for one trading day, summarized server-side."""
+    contract_code = arguments.get("contract")
+    if not contract_code:
+        return format_error_response(Exception("Contract code is required"))
 
-        api = auth_manager.get_api()
+    api = auth_manager.get_api()
 
-        try:
-            # Get contract object
-            contract = api.Contracts.Stocks[contract_code]
-            if not contract:
-                return format_error_response(Exception(f"Contract {contract_code} not found"))
-
-            # Get parameters with defaults
-            start_date = arguments.get("start_date")
-            end_date = arguments.get("end_date")
-
-            # Set default date range if not provided
-            if not start_date:
-                start_date = (datetime.now() - timedelta(days=30)).strftime("%Y-%m-%d")
-            if not end_date:
-                end_date = datetime.now().strftime("%Y-%m-%d")
-
-            # Get K-bar data
-            kbars = api.kbars(
-                contract=contract,
-                start=start_date,
-                end=end_date,
-                timeout=30000
-            )
-
-            # Format K-bar data
-            formatted_kbars = []
-            for kbar in kbars:
-                formatted_kbars.append({
-                    "date": kbar.ts.strftime("%Y-%m-%d %H:%M:%S"),
-                    "open": kbar.Open,
-                    "high": kbar.High,
-                    "low": kbar.Low,
-                    "close": kbar.Close,
-                    "volume": kbar.Volume,
-                })
-
-            return format_success_response(
-                formatted_kbars, f"Retrieved {len(formatted_kbars)} K-bars for {contract_code}"
-            )
-
-        except Exception as e:
-            logger.error(f"Failed to get K-bars for {contract_code}: {e}")
-            return format_error_response(e)
+    await contract_catalog.refresh(api)
+    contract = contract_catalog.resolve(api, contract_code)
+    if not contract:
+        return format_error_response(Exception(f"Contract {contract_code} not found"))
 
-    except Exception as e:
-        logger.error(f"Get K-bars error: {e}")
-        return format_error_response(e)
+    # A cursor carries the query of the previous page of raw ticks
+    cursor = arguments.get("cursor")
+    if cursor:
+        query = decode_cursor(cursor, "ticks")
+        if query["contract"] != contract_code:
+            raise ValueError("Cursor belongs to a different contract")
+    else:
+        query = {
+            "kind": "ticks",
+            "contract": contract_code,
+            "date": arguments.get("date") or datetime.now().strftime("%Y-%m-%d"),
+            "time_start": arguments.get("time_start"),
+            "time_end": arguments.get("time_end"),
+            "min_volume": arguments.get("min_volume"),
+            "min_price": arguments.get("min_price"),
+            "max_price": arguments.get("max_price"),
+            "mode": arguments.get("mode") or "summary",
+            "bucket": arguments.get("bucket"),
+            "offset": 0,
+        }
+
+    mode = query["mode"]
+    if mode not in TICK_MODES:
+        raise ValueError(f"Unsupported mode: {mode}. Use one of {', '.join(TICK_MODES)}")
+    bucket = normalize_interval(query["bucket"]) if query["bucket"] else None
+    time_start = _parse_time(query["time_start"])
+    time_end = _parse_time(query["time_end"])
+    limit = int(arguments.get("limit") or TICK_PAGE_SIZE)
+    if not 1 <= limit <= MAX_TICK_PAGE_SIZE:
+        raise ValueError(f"limit must be between 1 and {MAX_TICK_PAGE_SIZE}")
+
+    # Let the broker slice by time when it can; the local filter also
+    # handles ranges across midnight
+    sj = get_shioaji()
+    kwargs: dict[str, Any] = {"contract": contract, "date": query["date"]}
+    if time_start and time_end and time_start <= time_end:
+        kwargs.update(
+            query_type=sj.constant.TicksQueryType.RangeTime,
+            time_start=time_start.isoformat(),
+            time_end=time_end.isoformat(),
+        )
+    # Cursor pages and repeated queries of a day reuse the downloaded arrays
+    cache_key = (contract.code, query["date"], kwargs.get("time_start"), kwargs.get("time_end"))
+    day = tick_cache.get(cache_key)
+    if day is None:
+        # Columnar arrays end to end; no per-tick Python objects
+        day = to_arrays(await run_sdk("data", api.ticks, **kwargs))
+        tick_cache.put(cache_key, day)
+
+    columns = select(
+        day,
+        time_start=time_start,
+        time_end=time_end,
+        min_volume=query["min_volume"],
+        min_price=query["min_price"],
+        max_price=query["max_price"],
+    )
+    count = len(columns["ts"])
+
+    next_page = None
+    if mode == "summary":
+        data = summarize(columns, bucket)
+        message = f"Summarized {count} ticks for {contract_code} on {query['date']}"
+    elif mode == "volume_profile":
+        data = volume_profile(columns)
+        message = f"Volume profile of {count} ticks for {contract_code} on {query['date']}"
+    else:
+        offset = query["offset"]
+        data = list(iter_rows(columns, offset, limit))
+        message = (
+            f"Retrieved ticks {offset + 1}-{offset + len(data)} of {count} "
+            f"for {contract_code} on {query['date']}"
+        )
+        if offset + len(data) < count:
+            next_page = encode_cursor({**query, "offset": offset + len(data)})
+            message += "; pass next_page as cursor for more"
+
+    return format_success_response(
+        data, message, arguments.get("format")
+    ) + next_page_content(next_page)
@@ -0,0 +1,40 @@
+"""Server metrics tool for Shioaji MCP server."""
+
+import logging
+from typing import Any
+
+from ..utils.formatters import format_success_response
+from ..utils.metrics import metrics
+from .registry import registry
+from .schemas import FORMAT_PROPERTY
+
+logger = logging.getLogger(__name__)
+
+
+@registry.tool(
+    "get_server_metrics",
+    (
+        "Report server latency percentiles per tool and broker call, time spent "
+        "waiting for rate limits and executor workers, encoding time and payload "
+        "sizes, event loop lag, and cache, queue and session counters"
+    ),
+    {
+        "reset": {
+            "type": "boolean",
+            "description": "Clear the latency histograms after reading them",
+            "default": False,
+        },
+        "format": FORMAT_PROPERTY,
+    },
+)
+async def get_server_metrics(arguments: dict[str, Any]) -> list[Any]:
+    """Report tool, broker and encoding latency percentiles plus component stats."""
+    summary = metrics.summary()
+    if arguments.get("reset"):
+        metrics.reset()
+    calls = sum(row["count"] for row in summary["tool_duration"])
+    return format_success_response(
+        summary,
+        f"Server metrics over {summary['uptime_s']}s ({calls} tool calls)",
+        arguments.get("format"),
+    )
@@ -0,0 +1,163 @@
+"""Middleware run around every tool call dispatched through the registry.
+
+Each middleware is ``async (call, call_next) -> response``; the server
+installs them outermost first with ``registry.use``.
+"""
+
+import json
+import time
+from collections import OrderedDict
+from typing import Any
+
+from ..utils.client_limits import client_limiter
+from ..utils.formatters import format_error_response
+from ..utils.metrics import metrics
+from ..utils.tracing import tracer
+from .registry import Next, ToolCall, ToolSpec
+
+# Responses kept by ``ResponseCache`` across all cached tools
+RESPONSE_CACHE_SIZE = 256
+
+_JSON_TYPES: dict[str, tuple[type, ...]] = {
+    "string": (str,),
+    "integer": (int,),
+    "number": (int, float),
+    "boolean": (bool,),
+    "array": (list, tuple),
+    "object": (dict,),
+}
+
+
+def _is_error(result: list[Any]) -> bool:
+    return bool(result) and str(result[0].get("text", "")).startswith("Error:")
+
+
+async def limit_per_client(call: ToolCall, call_next: Next) -> list[Any]:
+    """Run at most SHIOAJI_MCP_CLIENT_CONCURRENCY calls at once per client."""
+    async with client_limiter.slot(call.client):
+        return await call_next(call)
+
+
+async def instrument(call: ToolCall, call_next: Next) -> list[Any]:
+    """Record latency, outcome and response size, and trace sampled calls."""
+    started = time.perf_counter()
+    status = "exception"
+    with tracer.request(call.name, call.arguments) as span:
+        try:
+            result = await call_next(call)
+            status = "error" if _is_error(result) else "ok"
+            size = sum(len(str(item.get("text", "")).encode()) for item in result)
+            metrics.observe("tool_response_bytes", size, tool=call.name)
+            if span is not None:
+                span.attrs["response_bytes"] = size
+            return result
+        finally:
+            if span is not None:
+                span.attrs["status"] = status
+            metrics.observe(
+                "tool_duration_seconds", time.perf_counter() - started, tool=call.name, status=status
+            )
+
+
+def _type_error(value: Any, schema: dict[str, Any]) -> str | None:
+    expected = schema.get("type")
+    types = _JSON_TYPES.get(expected) if isinstance(expected, str) else None
+    if types is None:
+        return None
+    if not isinstance(value, types) or (expected in ("integer", "number") and isinstance(value, bool)):
+        return f"expected {expected}, got {type(value).__name__}"
+    return None
+
+
+def _check(value: Any, schema: dict[str, Any]) -> str | None:
+    """First violation of the subset of JSON schema the tool schemas use."""
+    problem = _type_error(value, schema)
+    if problem:
+        return problem
+    if "enum" in schema and value not in schema["enum"]:
+        return f"must be one of {', '.join(map(str, schema['enum']))}"
+    if "minimum" in schema and value < schema["minimum"]:
+        return f"must be at least {schema['minimum']}"
+    if "maximum" in schema and value > schema["maximum"]:
+        return f"must be at most {schema['maximum']}"
+    if isinstance(value, list | tuple):
+        if "maxItems" in schema and len(value) > schema["maxItems"]:
+            return f"at most {schema['maxItems']} items allowed"
+        items = schema.get("items")
+        if items and "type" in items:
+            for i, item in enumerate(value):
+                problem = _check(item, items)
+                if problem:
+                    return f"item {i} {problem}"
+    return None
+
+
+def validate(spec: ToolSpec, arguments: dict[str, Any]) -> str | None:
+    """Check ``arguments`` against the tool's input schema."""
+    missing = [name for name in spec.schema.get("required", []) if arguments.get(name) is None]
+    if missing:
+        return f"missing required argument {', '.join(missing)}"
+    properties = spec.schema["properties"]
+    for name, value in arguments.items():
+        schema = properties.get(name)
+        if schema is None or value is None:
+            continue
+        problem = _check(value, schema)
+        if problem:
+            return f"{name} {problem}"
+    return None
+
+
+async def validate_arguments(call: ToolCall, call_next: Next) -> list[Any]:
+    """Reject arguments that do not match the tool's input schema."""
+    problem = validate(call.spec, call.arguments)
+    if problem:
+        return format_error_response(ValueError(f"Invalid arguments for {call.name}: {problem}"))
+    return await call_next(call)
+
+
+class ResponseCache:
+    """Reuse successful responses of tools registered with a ``cache_ttl``."""
+
+    def __init__(self, size: int = RESPONSE_CACHE_SIZE):
+        self.size = size
+        self._entries: OrderedDict[tuple[str, str], tuple[float, list[Any]]] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    async def __call__(self, call: ToolCall, call_next: Next) -> list[Any]:
+        ttl = call.spec.cache_ttl
+        if ttl <= 0:
+            return await call_next(call)
+        key = (call.name, json.dumps(call.arguments, sort_keys=True, default=str))
+        entry = self._entries.get(key)
+        now = time.monotonic()
+        if entry is not None and entry[0] > now:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+        self.misses += 1
+        result = await call_next(call)
+        if not _is_error(result):
+            self._entries[key] = (now + ttl, result)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.size:
+                self._entries.popitem(last=False)
+        return result
+
+    def invalidate(self, *_: Any) -> None:
+        """Drop every cached response."""
+        self._entries.clear()
+
+    def stats(self) -> dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 3) if total else 0.0,
+        }
+
+
+# Global response cache middleware
+response_cache = ResponseCache()
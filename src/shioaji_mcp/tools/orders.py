@@ -1,172 +1,487 @@
 """Order management tools for Shioaji MCP server."""
 
+import asyncio
 import logging
 from typing import Any
 
-from ..utils.auth import auth_manager
+from ..utils.auth import AccountTarget, account_kind, auth_manager
+from ..utils.contract_catalog import contract_catalog
+from ..utils.executor import run_sdk
 from ..utils.formatters import format_error_response, format_success_response
-from ..utils.permissions import check_trading_permission
+from ..utils.order_index import OrderIndex, format_trade
+from ..utils.shioaji_wrapper import get_shioaji
+from .registry import registry
+from .schemas import ACCOUNT_PROPERTY, FORMAT_PROPERTY, ORDER_ACCOUNT_PROPERTY
 
 logger = logging.getLogger(__name__)
 
-
+ORDER_STATUSES = [
+    "PendingSubmit", "PreSubmitted", "Submitted", "PartFilled",
+    "Filled", "Cancelled", "Failed", "Inactive",
+]
+
+# Orders that can still be cancelled
+OPEN_ORDER_STATUSES = ["PendingSubmit", "PreSubmitted", "Submitted", "PartFilled"]
+
+ORDER_ACTIONS = ["Buy", "Sell"]
+ORDER_TYPES = ["ROD", "IOC", "FOK"]
+
+# Upper bound on orders accepted by one batch tool call
+MAX_BATCH_ORDERS = 200
+
+
+def normalize_statuses(status: str | list[str] | None) -> list[str] | None:
+    """Map status filters to broker status names, case-insensitively."""
+    if not status:
+        return None
+    requested = [status] if isinstance(status, str) else status
+    known = {name.lower(): name for name in ORDER_STATUSES}
+    unknown = [value for value in requested if value.lower() not in known]
+    if unknown:
+        raise ValueError(
+            f"Unknown order status: {', '.join(unknown)}. Use any of {', '.join(ORDER_STATUSES)}"
+        )
+    return [known[value.lower()] for value in requested]
+
+
+def _create_order(
+    api: Any,
+    contract: Any,
+    action: str,
+    quantity: int,
+    price: float | None,
+    order_type: str,
+    account: Any = None,
+) -> Any:
+    """Build an SDK order object for an explicit account.
+
+    Without ``account`` the session's default stock or futures account is
+    resolved here, so the order never falls back to whatever the SDK default
+    is at send time. Futures and options contracts get the futures price types.
+    """
+    constant = get_shioaji().constant
+    security_type = getattr(contract, "security_type", "")
+    futures = getattr(security_type, "value", security_type) in ("FUT", "OPT")
+    kind = "futures" if futures else "stock"
+    if account is None:
+        account = api.futopt_account if futures else api.stock_account
+    if account is None:
+        raise ValueError(f"No {kind} account is available for {getattr(contract, 'code', contract)}")
+    if account_kind(account) != kind:
+        raise ValueError(
+            f"Account {getattr(account, 'account_id', account)} cannot trade "
+            f"{getattr(contract, 'code', contract)}: a {kind} account is required"
+        )
+    price_types = constant.FuturesPriceType if futures else constant.StockPriceType
+    options: dict[str, Any] = {"account": account}
+    if futures:
+        options["octype"] = constant.FuturesOCType.Auto
+    return api.Order(
+        price=price or 0,
+        quantity=quantity,
+        action=getattr(constant.Action, action.title()),
+        price_type=price_types.LMT if price else price_types.MKT,
+        order_type=getattr(constant.OrderType, order_type, constant.OrderType.ROD),
+        **options,
+    )
+
+
+def _placed_result(
+    orders: OrderIndex,
+    trade: Any,
+    contract_code: str,
+    action: str,
+    quantity: int,
+    price: float | None,
+    order_type: str,
+) -> dict[str, Any]:
+    """Describe a placed order for the MCP response."""
+    return {
+        "order_id": trade.order.id,
+        "contract": contract_code,
+        "action": action.upper(),
+        "quantity": quantity,
+        "price": price or "Market",
+        "order_type": order_type,
+        "status": getattr(trade.status.status, "value", trade.status.status),
+        "timestamp": (orders.get(trade.order.id) or {}).get("timestamp"),
+    }
+
+
+def _by_session(targets: list[AccountTarget]) -> list[tuple[AccountTarget, list[str] | None]]:
+    """Group targets per session with the account IDs to filter orders by.
+
+    None means every order of the session.
+    """
+    grouped: dict[str, tuple[AccountTarget, list[str] | None]] = {}
+    for target in targets:
+        name = target.session.name
+        first, account_ids = grouped.get(name, (target, []))
+        if target.account is None or account_ids is None:
+            account_ids = None
+        else:
+            account_ids = account_ids + [target.account.account_id]
+        grouped[name] = (first, account_ids)
+    return list(grouped.values())
+
+
+@registry.tool(
+    "place_order",
+    "Place a trading order (requires SHIOAJI_TRADING_ENABLED=true)",
+    {
+        "format": FORMAT_PROPERTY,
+        "account": ORDER_ACCOUNT_PROPERTY,
+        "contract": {"type": "string", "description": "Contract code"},
+        "action": {"type": "string", "description": "Buy or Sell"},
+        "quantity": {"type": "integer", "description": "Order quantity"},
+        "price": {"type": "number", "description": "Order price (optional for market orders)"},
+        "order_type": {"type": "string", "description": "Order type (ROD, IOC, FOK)"},
+    },
+    ["contract", "action", "quantity"],
+    connected=True,
+    trading=True,
+)
 async def place_order(arguments: dict[str, Any]) -> list[Any]:
     """Place a trading order."""
-    try:
-        # Check trading permission first
-        is_allowed, error_msg = check_trading_permission("place_order")
-        if not is_allowed:
-            return format_error_response(Exception(error_msg))
-
-        if not auth_manager.is_connected():
-            return format_error_response(
-                Exception("Not connected. Please set SHIOAJI_API_KEY and SHIOAJI_SECRET_KEY environment variables.")
-            )
-
-        # Get order parameters
-        contract_code = arguments.get("contract")
-        action = arguments.get("action")  # Buy/Sell
-        quantity = arguments.get("quantity")
-        price = arguments.get("price")
-        order_type = arguments.get("order_type", "ROD")  # ROD, IOC, FOK
-
-        if not all([contract_code, action, quantity]):
-            return format_error_response(
-                Exception("Missing required parameters: contract, action, quantity")
-            )
-
-        api = auth_manager.get_api()
-
-        try:
-            # Get contract object
-            contract = api.Contracts.Stocks[contract_code]
-            if not contract:
-                return format_error_response(Exception(f"Contract {contract_code} not found"))
-
-            # Create order object
-            order = api.Order(
-                price=price or 0,
-                quantity=quantity,
-                action=getattr(api.constant.Action, action.title()),
-                price_type=api.constant.StockPriceType.LMT if price else api.constant.StockPriceType.MKT,
-                order_type=getattr(api.constant.OrderType, order_type, api.constant.OrderType.ROD)
-            )
-
-            # Place order
-            trade = api.place_order(contract, order)
-
-            result = {
-                "order_id": trade.order.id,
-                "contract": contract_code,
-                "action": action.upper(),
-                "quantity": quantity,
-                "price": price or "Market",
-                "order_type": order_type,
-                "status": trade.status.status,
-                "timestamp": trade.order.order_datetime.isoformat() if trade.order.order_datetime else None,
-            }
-
-            return format_success_response(
-                result, f"Order placed successfully: {result['order_id']}"
-            )
-
-        except Exception as e:
-            logger.error(f"Failed to place order: {e}")
-            return format_error_response(e)
-
-    except Exception as e:
-        logger.error(f"Place order error: {e}")
-        return format_error_response(e)
-
-
+    error = _validate_order_spec(arguments)
+    if error:
+        return format_error_response(Exception(error))
+
+    # Get order parameters
+    contract_code: str = arguments["contract"]
+    action: str = arguments["action"]  # Buy/Sell
+    quantity: int = arguments["quantity"]
+    price = arguments.get("price")
+    order_type = arguments.get("order_type", "ROD")  # ROD, IOC, FOK
+
+    target = await auth_manager.resolve_account(arguments.get("account"))
+    api, orders = target.api, target.session.orders
+
+    # Get contract object
+    await contract_catalog.refresh(api)
+    contract = contract_catalog.resolve(api, contract_code)
+    if not contract:
+        return format_error_response(Exception(f"Contract {contract_code} not found"))
+
+    # Create order object
+    order = _create_order(api, contract, action, quantity, price, order_type, target.account)
+
+    # Place order
+    await orders.ensure_seeded(api)
+    trade = await run_sdk("order", api.place_order, contract, order)
+    orders.track(trade)
+
+    result = {
+        **_placed_result(orders, trade, contract_code, action, quantity, price, order_type),
+        **target.describe(),
+    }
+
+    return format_success_response(
+        result, f"Order placed successfully: {result['order_id']}", arguments.get("format")
+    )
+
+
+@registry.tool(
+    "cancel_order",
+    "Cancel an existing order (requires SHIOAJI_TRADING_ENABLED=true)",
+    {
+        "format": FORMAT_PROPERTY,
+        "account": ORDER_ACCOUNT_PROPERTY,
+        "order_id": {"type": "string", "description": "Order ID to cancel"},
+    },
+    ["order_id"],
+    connected=True,
+    trading=True,
+)
 async def cancel_order(arguments: dict[str, Any]) -> list[Any]:
     """Cancel an existing order."""
-    try:
-        # Check trading permission first
-        is_allowed, error_msg = check_trading_permission("cancel_order")
-        if not is_allowed:
-            return format_error_response(Exception(error_msg))
-
-        if not auth_manager.is_connected():
-            return format_error_response(
-                Exception("Not connected. Please set SHIOAJI_API_KEY and SHIOAJI_SECRET_KEY environment variables.")
-            )
-
-        order_id = arguments.get("order_id")
-        if not order_id:
-            return format_error_response(Exception("Order ID is required"))
-
-        api = auth_manager.get_api()
-
+    order_id = arguments.get("order_id")
+    if not order_id:
+        return format_error_response(Exception("Order ID is required"))
+
+    target = await auth_manager.resolve_account(arguments.get("account"))
+    api, orders = target.api, target.session.orders
+
+    # Look the trade up in the order index, refreshing once for unknown ids
+    await orders.ensure_seeded(api)
+    target_trade = orders.get_trade(order_id)
+    if not target_trade:
+        await orders.ensure_seeded(api, refresh=True)
+        target_trade = orders.get_trade(order_id)
+
+    if not target_trade:
+        return format_error_response(Exception(f"Order {order_id} not found"))
+
+    # Cancel the order
+    cancel_result = await run_sdk("order", api.cancel_order, target_trade)
+    cancelled = (
+        format_trade(cancel_result) if hasattr(cancel_result, "order")
+        else orders.get(order_id) or {}
+    )
+
+    result = {
+        "order_id": order_id,
+        "status": "Cancelled",
+        "timestamp": cancelled.get("timestamp"),
+    }
+
+    return format_success_response(
+        result, f"Order {order_id} cancelled successfully", arguments.get("format")
+    )
+
+
+@registry.tool(
+    "list_orders",
+    "List orders from the server's order index, optionally filtered by status or contract",
+    {
+        "status": {
+            "type": "array",
+            "items": {"type": "string", "enum": ORDER_STATUSES},
+            "description": "Only return orders in these statuses",
+        },
+        "contract": {
+            "type": "string",
+            "description": "Only return orders for this contract code",
+        },
+        "refresh": {
+            "type": "boolean",
+            "description": "Reload all orders from the broker first",
+            "default": False,
+        },
+        "format": FORMAT_PROPERTY,
+        "account": ACCOUNT_PROPERTY,
+    },
+    connected=True,
+)
+async def list_orders(arguments: dict[str, Any]) -> list[Any]:
+    """List all orders."""
+    statuses = normalize_statuses(arguments.get("status"))
+    targets = await auth_manager.resolve_accounts(arguments.get("account"))
+    groups = _by_session(targets)
+
+    # Answer from each session's order index kept current by order callbacks
+    async def orders_of(target: AccountTarget, account_ids: list[str] | None) -> list[dict]:
+        orders = target.session.orders
+        await orders.ensure_seeded(target.api, refresh=bool(arguments.get("refresh")))
+        found = orders.find(statuses=statuses, contract=arguments.get("contract"))
+        if account_ids is not None:
+            found = [record for record in found if record.get("account") in account_ids]
+        if len(groups) > 1:
+            found = [{**record, "session": target.session.name} for record in found]
+        return found
+
+    per_session = await asyncio.gather(*(orders_of(*group) for group in groups))
+    order_list = [record for records in per_session for record in records]
+
+    return format_success_response(
+        order_list, f"Retrieved {len(order_list)} orders", arguments.get("format")
+    )
+
+
+def _validate_order_spec(spec: Any) -> str | None:
+    """Return why an order in a batch is invalid, or None."""
+    if not isinstance(spec, dict):
+        return "Order must be an object"
+    if not all([spec.get("contract"), spec.get("action"), spec.get("quantity")]):
+        return "Missing required parameters: contract, action, quantity"
+    if str(spec["action"]).title() not in ORDER_ACTIONS:
+        return f"Invalid action: {spec['action']}"
+    quantity = spec["quantity"]
+    if not isinstance(quantity, int) or isinstance(quantity, bool) or quantity <= 0:
+        return f"Invalid quantity: {quantity}"
+    price = spec.get("price")
+    if price is not None and (
+        not isinstance(price, int | float) or isinstance(price, bool) or not price >= 0
+    ):
+        return f"Invalid price: {price}"
+    if spec.get("order_type", "ROD") not in ORDER_TYPES:
+        return f"Invalid order type: {spec['order_type']}"
+    return None
+
+
+@registry.tool(
+    "place_orders",
+    (
+        "Place a batch of orders concurrently; the whole batch is validated "
+        "before anything is sent (requires SHIOAJI_TRADING_ENABLED=true)"
+    ),
+    {
+        "format": FORMAT_PROPERTY,
+        "account": ORDER_ACCOUNT_PROPERTY,
+        "orders": {
+            "type": "array",
+            "maxItems": MAX_BATCH_ORDERS,
+            "items": {
+                "type": "object",
+                "properties": {
+                    "contract": {"type": "string", "description": "Contract code"},
+                    "action": {"type": "string", "description": "Buy or Sell"},
+                    "quantity": {"type": "integer", "description": "Order quantity"},
+                    "price": {"type": "number", "description": "Order price (optional for market orders)"},
+                    "order_type": {"type": "string", "description": "Order type (ROD, IOC, FOK)"},
+                },
+                "required": ["contract", "action", "quantity"],
+            },
+            "description": "Orders to place",
+        },
+    },
+    ["orders"],
+    connected=True,
+    trading=True,
+)
+async def place_orders(arguments: dict[str, Any]) -> list[Any]:
+    """Place a batch of orders concurrently under the order rate limit."""
+    orders = arguments.get("orders") or []
+    if not orders:
+        return format_error_response(Exception("No orders specified"))
+    if len(orders) > MAX_BATCH_ORDERS:
+        return format_error_response(
+            Exception(f"Too many orders: {len(orders)} (maximum {MAX_BATCH_ORDERS})")
+        )
+
+    target = await auth_manager.resolve_account(arguments.get("account"))
+    api, tracker = target.api, target.session.orders
+
+    # Validate the whole batch and resolve each contract once; reject the
+    # batch before anything is sent if any order is invalid
+    await contract_catalog.refresh(api)
+    contracts: dict[str, Any] = {}
+    problems = []
+    for i, spec in enumerate(orders):
+        error = _validate_order_spec(spec)
+        if not error:
+            code = spec["contract"]
+            if code not in contracts:
+                contracts[code] = contract_catalog.resolve(api, code)
+            if not contracts[code]:
+                error = f"Contract {code} not found"
+        if error:
+            problems.append(f"order {i}: {error}")
+    if problems:
+        return format_error_response(Exception(f"Invalid orders: {'; '.join(problems)}"))
+
+    await tracker.ensure_seeded(api)
+
+    async def submit(i: int, spec: dict[str, Any]) -> dict[str, Any]:
+        action = spec["action"]
+        order_type = spec.get("order_type", "ROD")
         try:
-            # Get order by ID and cancel it
-            orders = api.list_orders()
-            target_order = None
-            for order in orders:
-                if order.id == order_id:
-                    target_order = order
-                    break
-
-            if not target_order:
-                return format_error_response(Exception(f"Order {order_id} not found"))
-
-            # Cancel the order
-            cancel_result = api.cancel_order(target_order)
-
-            result = {
-                "order_id": order_id,
-                "status": "Cancelled",
-                "timestamp": cancel_result.order_datetime.isoformat() if hasattr(cancel_result, 'order_datetime') and cancel_result.order_datetime else None,
-            }
-
-            return format_success_response(
-                result, f"Order {order_id} cancelled successfully"
+            contract = contracts[spec["contract"]]
+            order = _create_order(
+                api, contract, action, spec["quantity"], spec.get("price"), order_type,
+                target.account,
             )
-
+            trade = await run_sdk("order", api.place_order, contract, order)
+            tracker.track(trade)
+            return {"index": i, **_placed_result(
+                tracker, trade, spec["contract"], action, spec["quantity"],
+                spec.get("price"), order_type,
+            )}
         except Exception as e:
-            logger.error(f"Failed to cancel order: {e}")
-            return format_error_response(e)
+            logger.warning(f"Failed to place order {i} for {spec['contract']}: {e}")
+            return {"index": i, "contract": spec["contract"], "error": str(e)}
 
-    except Exception as e:
-        logger.error(f"Cancel order error: {e}")
-        return format_error_response(e)
+    results = await asyncio.gather(*(submit(i, spec) for i, spec in enumerate(orders)))
 
+    failed = sum(1 for result in results if "error" in result)
+    message = f"Placed {len(results) - failed} of {len(results)} orders"
+    if failed:
+        message += f" ({failed} failed)"
+    return format_success_response(results, message, arguments.get("format"))
 
-async def list_orders(arguments: dict[str, Any]) -> list[Any]:
-    """List all orders."""
-    try:
-        if not auth_manager.is_connected():
-            return format_error_response(
-                Exception("Not connected. Please set SHIOAJI_API_KEY and SHIOAJI_SECRET_KEY environment variables.")
-            )
 
-        api = auth_manager.get_api()
+async def _cancel_many(
+    api: Any, orders: OrderIndex, order_ids: list[str]
+) -> list[dict[str, Any]]:
+    """Cancel orders of one session concurrently under the order rate limit."""
+    if any(orders.get_trade(order_id) is None for order_id in order_ids):
+        await orders.ensure_seeded(api, refresh=True)
 
+    async def cancel(order_id: str) -> dict[str, Any]:
+        trade = orders.get_trade(order_id)
+        if trade is None:
+            return {"order_id": order_id, "error": f"Order {order_id} not found"}
         try:
-            # Get real orders from API
-            orders = api.list_orders()
-
-            order_list = []
-            for order in orders:
-                order_data = {
-                    "order_id": order.id,
-                    "contract": order.contract.code if hasattr(order.contract, 'code') else str(order.contract),
-                    "action": order.action.value if hasattr(order.action, 'value') else str(order.action),
-                    "quantity": order.quantity,
-                    "price": order.price,
-                    "status": order.status.value if hasattr(order.status, 'value') else str(order.status),
-                    "timestamp": order.order_datetime.isoformat() if hasattr(order, 'order_datetime') and order.order_datetime else None,
-                }
-                order_list.append(order_data)
-
-            return format_success_response(
-                order_list, f"Retrieved {len(order_list)} orders"
-            )
-
+            await run_sdk("order", api.cancel_order, trade)
+            return {"order_id": order_id, "status": "Cancelled"}
         except Exception as e:
-            logger.error(f"Failed to list orders: {e}")
-            return format_error_response(e)
-
-    except Exception as e:
-        logger.error(f"List orders error: {e}")
-        return format_error_response(e)
+            logger.warning(f"Failed to cancel order {order_id}: {e}")
+            return {"order_id": order_id, "error": str(e)}
+
+    return list(await asyncio.gather(*(cancel(order_id) for order_id in order_ids)))
+
+
+def _cancel_message(results: list[dict[str, Any]]) -> str:
+    failed = sum(1 for result in results if "error" in result)
+    message = f"Cancelled {len(results) - failed} of {len(results)} orders"
+    if failed:
+        message += f" ({failed} failed)"
+    return message
+
+
+@registry.tool(
+    "cancel_orders",
+    "Cancel a batch of orders by ID (requires SHIOAJI_TRADING_ENABLED=true)",
+    {
+        "format": FORMAT_PROPERTY,
+        "account": ORDER_ACCOUNT_PROPERTY,
+        "order_ids": {
+            "type": "array",
+            "items": {"type": "string"},
+            "description": "Order IDs to cancel",
+        },
+    },
+    ["order_ids"],
+    connected=True,
+    trading=True,
+)
+async def cancel_orders(arguments: dict[str, Any]) -> list[Any]:
+    """Cancel a batch of orders by ID."""
+    order_ids = list(dict.fromkeys(arguments.get("order_ids") or []))
+    if not order_ids:
+        return format_error_response(Exception("No order IDs specified"))
+
+    target = await auth_manager.resolve_account(arguments.get("account"))
+    await target.session.orders.ensure_seeded(target.api)
+    results = await _cancel_many(target.api, target.session.orders, order_ids)
+
+    return format_success_response(results, _cancel_message(results), arguments.get("format"))
+
+
+@registry.tool(
+    "cancel_all",
+    "Cancel all open orders, optionally for one contract (requires SHIOAJI_TRADING_ENABLED=true)",
+    {
+        "format": FORMAT_PROPERTY,
+        "account": ACCOUNT_PROPERTY,
+        "contract": {
+            "type": "string",
+            "description": "Only cancel orders for this contract code",
+        },
+    },
+    connected=True,
+    trading=True,
+)
+async def cancel_all(arguments: dict[str, Any]) -> list[Any]:
+    """Cancel every open order, optionally for one contract."""
+    targets = await auth_manager.resolve_accounts(arguments.get("account"))
+
+    async def cancel_session(target: AccountTarget, account_ids: list[str] | None) -> list[dict]:
+        # Work from a fresh view so no open order is missed
+        orders = target.session.orders
+        await orders.ensure_seeded(target.api, refresh=True)
+        order_ids = [
+            record["order_id"]
+            for record in orders.find(OPEN_ORDER_STATUSES, arguments.get("contract"))
+            if account_ids is None or record.get("account") in account_ids
+        ]
+        return await _cancel_many(target.api, orders, order_ids) if order_ids else []
+
+    per_session = await asyncio.gather(
+        *(cancel_session(*group) for group in _by_session(targets))
+    )
+    results = [result for session_results in per_session for result in session_results]
+    if not results:
+        return format_success_response([], "No open orders to cancel", arguments.get("format"))
+
+    return format_success_response(results, _cancel_message(results), arguments.get("format"))
@@ -1,112 +1,167 @@
 """Position management tools for Shioaji MCP server."""
 
+import asyncio
 import logging
 from typing import Any
 
-from ..utils.auth import auth_manager
+from ..utils.auth import AccountTarget, account_kind, auth_manager
+from ..utils.executor import run_sdk
 from ..utils.formatters import format_error_response, format_success_response
+from ..utils.shioaji_wrapper import get_shioaji
+from .registry import registry
+from .schemas import ACCOUNT_PROPERTY, FORMAT_PROPERTY
 
 logger = logging.getLogger(__name__)
 
 
+def _format_position(i: int, position: Any, stock: bool = True) -> dict[str, Any]:
+    position_data = {
+        "index": i,
+        "type": type(position).__name__,
+        "raw_data": str(position)[:200],
+    }
+
+    # Extract position attributes
+    for attr in ['code', 'symbol', 'quantity', 'price', 'pnl', 'direction', 'account', 'yd_quantity']:
+        if hasattr(position, attr):
+            value = getattr(position, attr)
+            if stock and attr in ['quantity', 'yd_quantity'] and isinstance(value, (int, float)):
+                position_data[f'{attr}_shares'] = value
+                position_data[f'{attr}_lots'] = value // 1000
+                position_data[attr] = value
+            else:
+                position_data[attr] = str(value) if not isinstance(value, (int, float, bool)) else value
+
+    # Calculate actual holding
+    current_qty = position_data.get('quantity', 0)
+    yd_qty = position_data.get('yd_quantity', 0)
+    actual_holding = max(current_qty, yd_qty)
+
+    position_data['actual_holding'] = actual_holding
+    if stock:
+        # Stock positions are listed in shares; futures quantities are already contracts
+        position_data['holding_lots'] = actual_holding // 1000
+        position_data['holding_odd_shares'] = actual_holding % 1000
+    return position_data
+
+
+async def _positions_for(target: AccountTarget) -> list[dict[str, Any]]:
+    api = target.api
+    account = target.account if target.account is not None else api.stock_account
+    stock = account_kind(account) == "stock"
+    if stock:
+        # Get positions in shares instead of lots
+        sj = get_shioaji()
+        positions = await run_sdk("account", api.list_positions, account, unit=sj.constant.Unit.Share)
+    else:
+        positions = await run_sdk("account", api.list_positions, account)
+    owner = AccountTarget(target.session, api, account).describe()
+    return [
+        {**_format_position(i, position, stock), **owner}
+        for i, position in enumerate(positions or [])
+    ]
+
+
+async def _balance_for(target: AccountTarget) -> dict[str, Any]:
+    api = target.api
+    account = target.account if target.account is not None else api.stock_account
+    owner = AccountTarget(target.session, api, account).describe()
+    if account_kind(account) == "stock":
+        # account_balance() takes no account argument and only ever reports the
+        # default stock account; switching the default would race order placement.
+        if account is not api.stock_account:
+            raise ValueError(
+                f"Balance of stock account {getattr(account, 'account_id', account)} is unavailable: "
+                "the SDK only reports the default stock account"
+            )
+        balance = await run_sdk("account", api.account_balance)
+        return {
+            **owner,
+            "currency": "TWD",
+            "cash_balance": getattr(balance, 'acc_balance', 0.0),
+            "available_balance": getattr(balance, 'available_balance', 0.0),
+            "margin_used": getattr(balance, 'margin_used', 0.0),
+            "total_equity": getattr(balance, 'total_balance', 0.0),
+            "unrealized_pnl": getattr(balance, 'unrealized_pnl', 0.0),
+            "realized_pnl": getattr(balance, 'realized_pnl', 0.0),
+        }
+
+    margin = await run_sdk("account", api.margin, account)
+    return {
+        **owner,
+        "currency": "TWD",
+        "cash_balance": getattr(margin, 'today_balance', 0.0),
+        "available_balance": getattr(margin, 'available_margin', 0.0),
+        "margin_used": getattr(margin, 'initial_margin', 0.0),
+        "total_equity": getattr(margin, 'equity_amount', 0.0),
+        "unrealized_pnl": getattr(margin, 'future_open_position', 0.0),
+        "realized_pnl": getattr(margin, 'future_settle_profitloss', 0.0),
+        "risk_indicator": getattr(margin, 'risk_indicator', None),
+    }
+
+
+async def _fan_out(targets: list[AccountTarget], query: Any) -> tuple[list[Any], list[dict[str, Any]]]:
+    """Run ``query`` for every account in parallel; returns (results, failures)."""
+    results = await asyncio.gather(*(query(target) for target in targets), return_exceptions=True)
+    succeeded, failures = [], []
+    for target, result in zip(targets, results, strict=True):
+        if isinstance(result, Exception):
+            logger.warning(f"Account query failed for {target.describe()}: {result}")
+            failures.append({**target.describe(), "error": str(result)})
+        else:
+            succeeded.append(result)
+    return succeeded, failures
+
+
+@registry.tool(
+    "get_positions",
+    "Get current positions of one account or, with account 'all', of every account combined",
+    {
+        "format": FORMAT_PROPERTY,
+        "account": ACCOUNT_PROPERTY,
+    },
+    connected=True,
+)
 async def get_positions(arguments: dict[str, Any]) -> list[Any]:
     """Get current positions."""
-    try:
-        if not auth_manager.is_connected():
-            return format_error_response(
-                Exception("Not connected. Please set SHIOAJI_API_KEY and SHIOAJI_SECRET_KEY environment variables.")
-            )
-
-        api = auth_manager.get_api()
-
-        try:
-            from ..utils.shioaji_wrapper import get_shioaji
-            sj = get_shioaji()
-
-            # Get positions in shares instead of lots
-            positions = api.list_positions(api.stock_account, unit=sj.constant.Unit.Share)
-
-            if not positions:
-                return format_success_response([], "No positions found")
-
-            position_list = []
-            for i, position in enumerate(positions):
-                position_data = {
-                    "index": i,
-                    "type": type(position).__name__,
-                    "raw_data": str(position)[:200],
-                }
-
-                # Extract position attributes
-                for attr in ['code', 'symbol', 'quantity', 'price', 'pnl', 'direction', 'account', 'yd_quantity']:
-                    if hasattr(position, attr):
-                        value = getattr(position, attr)
-                        if attr in ['quantity', 'yd_quantity'] and isinstance(value, (int, float)):
-                            position_data[f'{attr}_shares'] = value
-                            position_data[f'{attr}_lots'] = value // 1000
-                            position_data[attr] = value
-                        else:
-                            position_data[attr] = str(value) if not isinstance(value, (int, float, bool)) else value
-
-                # Calculate actual holding
-                current_qty = position_data.get('quantity', 0)
-                yd_qty = position_data.get('yd_quantity', 0)
-                actual_holding = max(current_qty, yd_qty)
-
-                position_data['actual_holding'] = actual_holding
-                position_data['holding_lots'] = actual_holding // 1000
-                position_data['holding_odd_shares'] = actual_holding % 1000
-
-                position_list.append(position_data)
-
-            return format_success_response(
-                position_list, f"Retrieved {len(position_list)} positions"
-            )
-
-        except Exception as e:
-            logger.error(f"Failed to get positions: {e}")
-            return format_error_response(e)
-
-    except Exception as e:
-        logger.error(f"Get positions error: {e}")
-        return format_error_response(e)
-
-
+    targets = await auth_manager.resolve_accounts(arguments.get("account"))
+    results, failures = await _fan_out(targets, _positions_for)
+    if failures and len(targets) == 1:
+        return format_error_response(Exception(failures[0]["error"]))
+
+    position_list = [position for positions in results for position in positions]
+    message = f"Retrieved {len(position_list)} positions"
+    if len(targets) > 1:
+        message += f" across {len(results)} accounts"
+    if failures:
+        message += f" ({len(failures)} accounts failed)"
+    if not position_list and not failures:
+        return format_success_response([], "No positions found", arguments.get("format"))
+
+    return format_success_response(
+        position_list + failures, message, arguments.get("format")
+    )
+
+
+@registry.tool(
+    "get_account_balance",
+    "Get account balance information (stock balance or futures margin) of one or every account",
+    {
+        "format": FORMAT_PROPERTY,
+        "account": ACCOUNT_PROPERTY,
+    },
+    connected=True,
+)
 async def get_account_balance(arguments: dict[str, Any]) -> list[Any]:
     """Get account balance information."""
-    try:
-        if not auth_manager.is_connected():
-            return format_error_response(
-                Exception("Not connected. Please set SHIOAJI_API_KEY and SHIOAJI_SECRET_KEY environment variables.")
-            )
-
-        api = auth_manager.get_api()
-
-        try:
-            accounts = api.list_accounts()
-            if not accounts:
-                return format_error_response(Exception("No accounts found"))
-
-            account = accounts[0]
-            balance = api.account_balance()
-
-            balance_data = {
-                "account_id": account.account_id,
-                "currency": "TWD",
-                "cash_balance": getattr(balance, 'acc_balance', 0.0),
-                "available_balance": getattr(balance, 'available_balance', 0.0),
-                "margin_used": getattr(balance, 'margin_used', 0.0),
-                "total_equity": getattr(balance, 'total_balance', 0.0),
-                "unrealized_pnl": getattr(balance, 'unrealized_pnl', 0.0),
-                "realized_pnl": getattr(balance, 'realized_pnl', 0.0),
-            }
-
-            return format_success_response(balance_data, "Account balance retrieved")
-
-        except Exception as e:
-            logger.error(f"Failed to get account balance: {e}")
-            return format_error_response(e)
-
-    except Exception as e:
-        logger.error(f"Get account balance error: {e}")
-        return format_error_response(e)
+    targets = await auth_manager.resolve_accounts(arguments.get("account"))
+    balances, failures = await _fan_out(targets, _balance_for)
+    if len(targets) == 1:
+        if failures:
+            return format_error_response(Exception(failures[0]["error"]))
+        return format_success_response(balances[0], "Account balance retrieved", arguments.get("format"))
+
+    message = f"Retrieved balances for {len(balances)} accounts"
+    if failures:
+        message += f" ({len(failures)} failed)"
+    return format_success_response(balances + failures, message, arguments.get("format"))
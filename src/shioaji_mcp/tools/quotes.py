@@ -0,0 +1,129 @@
+"""Real-time quote subscription tools for Shioaji MCP server."""
+
+import logging
+from typing import Any
+
+from ..utils.auth import auth_manager
+from ..utils.contract_catalog import contract_catalog
+from ..utils.formatters import format_error_response, format_success_response
+from ..utils.quote_engine import normalize_quote_types, quote_engine
+from .registry import current_client, registry
+from .schemas import FORMAT_PROPERTY, QUOTE_TYPES_PROPERTY
+
+logger = logging.getLogger(__name__)
+
+
+@registry.tool(
+    "subscribe_quotes",
+    "Subscribe to real-time ticks and 5-level order books for contracts",
+    {
+        "format": FORMAT_PROPERTY,
+        "contracts": {
+            "type": "array",
+            "items": {"type": "string"},
+            "description": "List of contract codes",
+        },
+        "quote_types": QUOTE_TYPES_PROPERTY,
+    },
+    ["contracts"],
+    connected=True,
+)
+async def subscribe_quotes(arguments: dict[str, Any]) -> list[Any]:
+    """Subscribe to real-time ticks and order books."""
+    contracts = arguments.get("contracts", [])
+    if not contracts:
+        return format_error_response(Exception("No contracts specified"))
+    quote_types = normalize_quote_types(arguments.get("quote_types"))
+
+    api = auth_manager.get_api()
+    quote_engine.attach(api)
+    await contract_catalog.refresh(api)
+
+    results = []
+    subscribed = 0
+    for contract_code in dict.fromkeys(contracts):
+        try:
+            contract = contract_catalog.resolve(api, contract_code)
+            if not contract:
+                raise LookupError(f"Contract {contract_code} not found")
+            await quote_engine.subscribe(api, contract, quote_types, owner=current_client())
+            results.append({"code": contract_code, "subscribed": quote_types})
+            subscribed += 1
+        except Exception as e:
+            logger.warning(f"Failed to subscribe {contract_code}: {e}")
+            results.append({"code": contract_code, "error": str(e)})
+
+    return format_success_response(
+        results,
+        f"Subscribed to {subscribed} contracts "
+        f"({len(quote_engine.subscribed_codes())} active)",
+        arguments.get("format"),
+    )
+
+
+@registry.tool(
+    "unsubscribe_quotes",
+    "Unsubscribe from real-time quotes (all of this client's contracts if none given)",
+    {
+        "format": FORMAT_PROPERTY,
+        "contracts": {
+            "type": "array",
+            "items": {"type": "string"},
+            "description": "List of contract codes",
+        },
+        "quote_types": QUOTE_TYPES_PROPERTY,
+    },
+    connected=True,
+)
+async def unsubscribe_quotes(arguments: dict[str, Any]) -> list[Any]:
+    """Unsubscribe from real-time quotes."""
+    # Only release feeds this client holds; other clients and quote
+    # resources may still be reading the same contracts
+    client = current_client()
+    contracts = arguments.get("contracts") or quote_engine.owned_codes(client)
+    quote_types = normalize_quote_types(arguments.get("quote_types"))
+    api = auth_manager.get_api()
+
+    results = []
+    for contract_code in dict.fromkeys(contracts):
+        try:
+            removed = await quote_engine.unsubscribe(api, contract_code, quote_types, owner=client)
+            results.append({"code": contract_code, "unsubscribed": removed})
+        except Exception as e:
+            logger.warning(f"Failed to unsubscribe {contract_code}: {e}")
+            results.append({"code": contract_code, "error": str(e)})
+
+    return format_success_response(
+        results,
+        f"Unsubscribed {len(results)} contracts "
+        f"({len(quote_engine.subscribed_codes())} active)",
+        arguments.get("format"),
+    )
+
+
+@registry.tool(
+    "get_quotes",
+    "Get the latest tick and order book of subscribed contracts from server memory",
+    {
+        "format": FORMAT_PROPERTY,
+        "contracts": {
+            "type": "array",
+            "items": {"type": "string"},
+            "description": "List of contract codes (all subscribed if omitted)",
+        },
+    },
+)
+async def get_quotes(arguments: dict[str, Any]) -> list[Any]:
+    """Read the latest ticks and order books from subscription state."""
+    contracts = arguments.get("contracts") or quote_engine.subscribed_codes()
+    if not contracts:
+        return format_error_response(
+            Exception("No active subscriptions. Call subscribe_quotes first.")
+        )
+
+    quotes = [quote_engine.get(contract_code) for contract_code in contracts]
+
+    return format_success_response(
+        quotes, f"Retrieved quotes for {len(quotes)} contracts", arguments.get("format")
+    )
+
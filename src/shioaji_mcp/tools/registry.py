@@ -0,0 +1,175 @@
+"""Registry of MCP tools declared with the ``@registry.tool`` decorator.
+
+A tool's ``Tool`` definition is built once when its module is imported, so
+``tools/list`` returns a prebuilt list and ``tools/call`` is a dict lookup
+followed by the middleware chain installed with ``registry.use``.
+
+The decorator also applies the checks every tool shares, so calling a tool
+function directly behaves like calling it through the registry:
+
+- ``trading=True`` refuses the call unless SHIOAJI_TRADING_ENABLED is set;
+- ``connected=True`` waits for the broker session and fails if it is down;
+- any exception is logged and returned as an ``Error:`` response.
+"""
+
+import contextvars
+import functools
+import logging
+from collections.abc import Awaitable, Callable
+from typing import Any
+
+from mcp.types import Tool
+
+from ..utils.auth import auth_manager
+from ..utils.formatters import format_error_response
+from ..utils.permissions import check_trading_permission
+
+logger = logging.getLogger(__name__)
+
+NOT_CONNECTED = "Not connected. Please set SHIOAJI_API_KEY and SHIOAJI_SECRET_KEY environment variables."
+
+Handler = Callable[[dict[str, Any]], Awaitable[list[Any]]]
+
+# MCP client session of the tool call running in this context
+_client: contextvars.ContextVar[Any] = contextvars.ContextVar("tool_client", default=None)
+
+
+def current_client() -> Any:
+    """The client session that issued the running tool call, if any."""
+    return _client.get()
+
+
+class ToolSpec:
+    """A registered tool: its MCP definition, handler and options."""
+
+    def __init__(
+        self,
+        name: str,
+        description: str,
+        input_schema: dict[str, Any],
+        handler: Handler,
+        cache_ttl: float = 0.0,
+    ):
+        self.name = name
+        self.handler = handler
+        self.cache_ttl = cache_ttl
+        self.schema = input_schema
+        self.tool = Tool(name=name, description=description, inputSchema=input_schema)
+
+
+class ToolCall:
+    """One tool invocation as seen by middleware."""
+
+    __slots__ = ("spec", "arguments", "client", "attrs")
+
+    def __init__(self, spec: ToolSpec, arguments: dict[str, Any], client: Any = None):
+        self.spec = spec
+        self.arguments = arguments
+        self.client = client
+        # Scratch space for middleware, e.g. the trace span of this call
+        self.attrs: dict[str, Any] = {}
+
+    @property
+    def name(self) -> str:
+        return self.spec.name
+
+
+Next = Callable[[ToolCall], Awaitable[list[Any]]]
+Middleware = Callable[[ToolCall, Next], Awaitable[list[Any]]]
+
+
+async def _invoke(call: ToolCall) -> list[Any]:
+    return await call.spec.handler(call.arguments)
+
+
+def _bind(middleware: Middleware, call_next: Next) -> Next:
+    """Wrap ``call_next`` in ``middleware``."""
+    async def call(tool_call: ToolCall) -> list[Any]:
+        return await middleware(tool_call, call_next)
+    return call
+
+
+class ToolRegistry:
+    """Tools by name plus the middleware run around every call."""
+
+    def __init__(self) -> None:
+        self._specs: dict[str, ToolSpec] = {}
+        self._tools: list[Tool] = []
+        self._middleware: list[Middleware] = []
+        self._chain: Next = _invoke
+
+    def tool(
+        self,
+        name: str,
+        description: str,
+        properties: dict[str, Any] | None = None,
+        required: list[str] | None = None,
+        *,
+        connected: bool = False,
+        trading: bool = False,
+        cache_ttl: float = 0.0,
+    ) -> Callable[[Handler], Handler]:
+        """Register an async ``arguments -> response`` function as tool ``name``.
+
+        ``cache_ttl`` (seconds) lets the response cache middleware reuse a
+        successful response to identical arguments for that long.
+        """
+        schema: dict[str, Any] = {"type": "object", "properties": properties or {}}
+        if required:
+            schema["required"] = list(required)
+
+        def decorate(func: Handler) -> Handler:
+            @functools.wraps(func)
+            async def handler(arguments: dict[str, Any]) -> list[Any]:
+                try:
+                    if trading:
+                        is_allowed, error_msg = check_trading_permission(name)
+                        if not is_allowed:
+                            return format_error_response(Exception(error_msg))
+                    if connected and not await auth_manager.ensure_connected():
+                        return format_error_response(Exception(NOT_CONNECTED))
+                    return await func(arguments)
+                except Exception as e:
+                    logger.error(f"{name} error: {e}")
+                    return format_error_response(e)
+
+            self.add(ToolSpec(name, description, schema, handler, cache_ttl))
+            return handler
+
+        return decorate
+
+    def add(self, spec: ToolSpec) -> None:
+        if spec.name in self._specs:
+            raise ValueError(f"Tool {spec.name} is already registered")
+        self._specs[spec.name] = spec
+        self._tools.append(spec.tool)
+
+    def use(self, middleware: Middleware) -> None:
+        """Add ``middleware`` inside those added before it."""
+        self._middleware.append(middleware)
+        chain: Next = _invoke
+        for outer in reversed(self._middleware):
+            chain = _bind(outer, chain)
+        self._chain = chain
+
+    def get(self, name: str) -> ToolSpec | None:
+        return self._specs.get(name)
+
+    def tools(self) -> list[Tool]:
+        """Tool definitions in registration order."""
+        return self._tools
+
+    async def call(self, name: str, arguments: dict[str, Any] | None, client: Any = None) -> list[Any]:
+        """Run tool ``name`` through the middleware chain."""
+        spec = self._specs.get(name)
+        if spec is None:
+            raise ValueError(f"Unknown tool: {name}")
+        token = _client.set(client)
+        try:
+            return await self._chain(ToolCall(spec, arguments or {}, client))
+        finally:
+            _client.reset(token)
+
+
+# Global tool registry
+registry = ToolRegistry()
@@ -0,0 +1,149 @@
+"""Market scanner tools for Shioaji MCP server."""
+
+import logging
+from typing import Any
+
+from ..utils.auth import auth_manager
+from ..utils.contract_catalog import contract_catalog
+from ..utils.executor import run_sdk
+from ..utils.formatters import format_error_response, format_success_response
+from ..utils.market_table import (
+    SCAN_FIELDS,
+    UNIVERSES,
+    MarketTable,
+    in_universe,
+    market_tables,
+    parse_filter,
+    parse_sort,
+)
+from .market_data import fetch_snapshot_chunk, snapshot_batch_size
+from .registry import registry
+from .schemas import FORMAT_PROPERTY
+
+logger = logging.getLogger(__name__)
+
+SCAN_LIMIT = 20
+MAX_SCAN_LIMIT = 500
+
+# Seconds a bulk refresh stays fresh; subscribed ticks update rows in between
+DEFAULT_MAX_AGE = 30
+
+# Columns returned for each match besides code, name and exchange
+DEFAULT_FIELDS = [
+    "close", "change_pct", "gap_pct", "volume_ratio", "total_volume",
+    "limit_up_distance_pct",
+]
+
+
+def _build_universe(api: Any, table: MarketTable, universe: str) -> None:
+    contract_catalog.ensure_current(api)
+    if len(table):
+        # Another scan of this universe built it while this one waited
+        return
+    records = [
+        record for record in contract_catalog.records("Stock") if in_universe(record, universe)
+    ]
+    contracts = [contract_catalog.get(record["code"]) for record in records]
+    table.build(universe, records, contracts)
+
+
+@registry.tool(
+    "scan_market",
+    (
+        "Scan the whole stock market from an in-memory snapshot table: filter "
+        "on change %, gap, volume ratio or distance to limit-up and return "
+        "the top matches"
+    ),
+    {
+        "format": FORMAT_PROPERTY,
+        "filters": {
+            "type": "array",
+            "items": {
+                "oneOf": [
+                    {"type": "string"},
+                    {
+                        "type": "object",
+                        "properties": {
+                            "field": {"type": "string", "enum": SCAN_FIELDS},
+                            "op": {
+                                "type": "string",
+                                "enum": [">", ">=", "<", "<=", "==", "!="],
+                            },
+                            "value": {"type": "number"},
+                        },
+                        "required": ["field", "value"],
+                    },
+                ]
+            },
+            "description": (
+                "Conditions that must all hold, e.g. 'change_pct >= 3' or "
+                "'volume_ratio > 2'. Fields: " + ", ".join(SCAN_FIELDS)
+            ),
+        },
+        "sort": {
+            "type": "string",
+            "description": "Sort field, prefixed with - for descending (default -change_pct)",
+        },
+        "limit": {
+            "type": "integer",
+            "minimum": 1,
+            "maximum": MAX_SCAN_LIMIT,
+            "description": f"Maximum number of matches to return (default {SCAN_LIMIT})",
+        },
+        "universe": {
+            "type": "string",
+            "enum": UNIVERSES,
+            "description": "Listings to scan: stocks (default), etfs or all",
+        },
+        "exchange": {
+            "type": "string",
+            "enum": ["TSE", "OTC"],
+            "description": "Only scan one exchange",
+        },
+        "max_age": {
+            "type": "number",
+            "minimum": 0,
+            "description": "Maximum snapshot age in seconds before a bulk refresh (default 30, 0 forces a refresh)",
+        },
+    },
+    connected=True,
+)
+async def scan_market(arguments: dict[str, Any]) -> list[Any]:
+    """Filter and rank the whole market from the in-memory snapshot table."""
+    universe = (arguments.get("universe") or "stocks").lower()
+    if universe not in UNIVERSES:
+        raise ValueError(f"Unknown universe: {universe}. Use any of {', '.join(UNIVERSES)}")
+    filters = [parse_filter(spec) for spec in arguments.get("filters") or []]
+    sort = parse_sort(arguments.get("sort"))
+    limit = int(arguments.get("limit") or SCAN_LIMIT)
+    if not 1 <= limit <= MAX_SCAN_LIMIT:
+        raise ValueError(f"limit must be between 1 and {MAX_SCAN_LIMIT}")
+    max_age = arguments.get("max_age")
+    max_age = DEFAULT_MAX_AGE if max_age is None else float(max_age)
+
+    api = auth_manager.get_api()
+    table = market_tables[universe]
+    if not len(table):
+        await run_sdk("data", _build_universe, api, table, universe)
+    if not len(table):
+        return format_error_response(Exception("No contracts available to scan"))
+
+    age = table.age()
+    if age is None or age > max_age:
+        await table.refresh(
+            lambda chunk: fetch_snapshot_chunk(api, chunk), snapshot_batch_size()
+        )
+        age = table.age()
+
+    fields = list(dict.fromkeys(DEFAULT_FIELDS + [field for field, _, _ in filters]))
+    if sort[0] not in fields:
+        fields.append(sort[0])
+    rows, matched = table.scan(
+        filters, sort, limit, fields, exchange=arguments.get("exchange")
+    )
+
+    message = (
+        f"Scanned {len(table)} contracts, {matched} matched "
+        f"(snapshot age {age:.1f}s)"
+    )
+    return format_success_response(rows, message, arguments.get("format"))
@@ -0,0 +1,40 @@
+"""JSON schema properties shared by several tools."""
+
+from ..utils.formatters import RESPONSE_FORMATS
+from ..utils.quote_engine import QUOTE_TYPES
+
+# Response encoding argument accepted by every tool
+FORMAT_PROPERTY = {
+    "type": "string",
+    "enum": RESPONSE_FORMATS,
+    "description": (
+        "Response encoding: json (indented, default), compact (no whitespace) "
+        "or columnar ({columns, rows} for tabular data)"
+    ),
+}
+
+# Account selection shared by the trading and portfolio tools
+ACCOUNT_PROPERTY = {
+    "type": "string",
+    "description": (
+        "Account ID, session name, or 'all' to query every account of every "
+        "session in parallel (default: the default session's account)"
+    ),
+}
+
+ORDER_ACCOUNT_PROPERTY = {
+    "type": "string",
+    "description": "Account ID or session name to trade through (default: the default session's account)",
+}
+
+QUOTE_TYPES_PROPERTY = {
+    "type": "array",
+    "items": {"type": "string", "enum": QUOTE_TYPES},
+    "description": "Quote types (tick, bidask; default both)",
+}
+
+CONTRACTS_PROPERTY = {
+    "type": "array",
+    "items": {"type": "string"},
+    "description": "List of contract codes",
+}
@@ -0,0 +1,164 @@
+"""HTTP transports that let many MCP clients share one server process."""
+
+import contextlib
+import hmac
+import ipaddress
+import logging
+import os
+from collections.abc import AsyncIterator
+from typing import Any
+
+from mcp.server.lowlevel import Server
+from mcp.server.sse import SseServerTransport
+from mcp.server.streamable_http_manager import StreamableHTTPSessionManager
+from starlette.applications import Starlette
+from starlette.datastructures import Headers
+from starlette.middleware import Middleware
+from starlette.requests import Request
+from starlette.responses import JSONResponse, PlainTextResponse, Response
+from starlette.routing import Mount, Route
+
+from .utils.auth import auth_manager
+from .utils.client_limits import client_limiter
+from .utils.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+TRANSPORTS = ["stdio", "http"]
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8000
+
+
+def transport_from_env() -> str:
+    """Transport selected by SHIOAJI_MCP_TRANSPORT (default stdio)."""
+    return os.getenv("SHIOAJI_MCP_TRANSPORT", "stdio").lower()
+
+
+def host_from_env() -> str:
+    return os.getenv("SHIOAJI_MCP_HOST", DEFAULT_HOST)
+
+
+def port_from_env() -> int:
+    try:
+        return int(os.getenv("SHIOAJI_MCP_PORT", DEFAULT_PORT))
+    except ValueError:
+        return DEFAULT_PORT
+
+
+def is_loopback(host: str) -> bool:
+    """Whether ``host`` only accepts connections from this machine."""
+    if host == "localhost":
+        return True
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        return False
+
+
+def auth_token_for(host: str) -> str | None:
+    """Bearer token clients must send, from SHIOAJI_MCP_AUTH_TOKEN.
+
+    The HTTP transports expose trading tools, so serving on anything but a
+    loopback address without a token is refused.
+    """
+    token = os.getenv("SHIOAJI_MCP_AUTH_TOKEN") or None
+    if token is None and not is_loopback(host):
+        raise ValueError(
+            f"Refusing to serve MCP over HTTP on {host} without authentication; "
+            "set SHIOAJI_MCP_AUTH_TOKEN or bind to 127.0.0.1"
+        )
+    return token
+
+
+class _BearerTokenAuth:
+    """ASGI middleware rejecting HTTP requests without the bearer token."""
+
+    def __init__(self, app: Any, token: str):
+        self.app = app
+        self.expected = f"Bearer {token}".encode()
+
+    async def __call__(self, scope: Any, receive: Any, send: Any) -> None:
+        if scope["type"] == "http":
+            supplied = Headers(scope=scope).get("authorization", "").encode()
+            if not hmac.compare_digest(supplied, self.expected):
+                response = PlainTextResponse(
+                    "Unauthorized", status_code=401, headers={"WWW-Authenticate": "Bearer"}
+                )
+                await response(scope, receive, send)
+                return
+        await self.app(scope, receive, send)
+
+
+class _StreamableHTTPEndpoint:
+    """ASGI endpoint handing requests to the session manager."""
+
+    def __init__(self, session_manager: StreamableHTTPSessionManager):
+        self.session_manager = session_manager
+
+    async def __call__(self, scope: Any, receive: Any, send: Any) -> None:
+        await self.session_manager.handle_request(scope, receive, send)
+
+
+def create_app(server: Server, token: str | None = None) -> Starlette:
+    """Serve ``server`` over streamable HTTP at ``/mcp`` and legacy SSE at ``/sse``.
+
+    ``/health`` reports session state and ``/metrics`` exposes Prometheus metrics.
+    With ``token`` every request must carry ``Authorization: Bearer <token>``.
+
+    Every client session runs in this process, so they share the broker
+    sessions, caches, order index and quote subscriptions.
+    """
+    session_manager = StreamableHTTPSessionManager(app=server)
+    sse = SseServerTransport("/messages/")
+
+    async def handle_sse(request: Request) -> Response:
+        async with sse.connect_sse(request.scope, request.receive, request._send) as (
+            read_stream,
+            write_stream,
+        ):
+            await server.run(read_stream, write_stream, server.create_initialization_options())
+        return Response()
+
+    async def handle_health(request: Request) -> JSONResponse:
+        return JSONResponse({
+            "connected": auth_manager.is_connected(),
+            "sessions": auth_manager.status(),
+            "clients": client_limiter.stats(),
+        })
+
+    async def handle_metrics(request: Request) -> PlainTextResponse:
+        return PlainTextResponse(
+            metrics.render_prometheus(), media_type="text/plain; version=0.0.4"
+        )
+
+    @contextlib.asynccontextmanager
+    async def lifespan(app: Starlette) -> AsyncIterator[None]:
+        async with session_manager.run():
+            yield
+
+    return Starlette(
+        routes=[
+            Route("/mcp", endpoint=_StreamableHTTPEndpoint(session_manager)),
+            Route("/sse", endpoint=handle_sse, methods=["GET"]),
+            Mount("/messages/", app=sse.handle_post_message),
+            Route("/health", endpoint=handle_health, methods=["GET"]),
+            Route("/metrics", endpoint=handle_metrics, methods=["GET"]),
+        ],
+        middleware=[Middleware(_BearerTokenAuth, token=token)] if token else [],
+        lifespan=lifespan,
+    )
+
+
+async def serve_http(server: Server, host: str, port: int, token: str | None = None) -> None:
+    """Run the HTTP transports until the process is stopped."""
+    import uvicorn
+
+    config = uvicorn.Config(
+        create_app(server, token),
+        host=host,
+        port=port,
+        log_level=os.getenv("LOG_LEVEL", "info").lower(),
+    )
+    logger.info(f"Serving MCP over HTTP at http://{host}:{port}/mcp (SSE at /sse)")
+    await uvicorn.Server(config).serve()
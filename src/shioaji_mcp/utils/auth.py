@@ -1,10 +1,21 @@
 """Authentication utilities for Shioaji API."""
 
+import asyncio
+import inspect
 import logging
 import os
+import random
+import time
+from collections.abc import Callable
+from typing import Any
 
 from dotenv import load_dotenv
 
+from .contract_cache import contract_cache
+from .contract_catalog import contract_catalog
+from .executor import run_sdk
+from .order_index import OrderIndex, order_index
+from .quote_engine import quote_engine
 from .shioaji_wrapper import get_shioaji
 
 # Don't import shioaji at module level to avoid read-only filesystem issues
@@ -14,59 +25,316 @@ logger = logging.getLogger(__name__)
 # Load environment variables from .env file if it exists
 load_dotenv()
 
+# Interval between session health checks
+DEFAULT_KEEPALIVE_INTERVAL_MS = 60_000
 
-class ShioajiAuth:
-    """Shioaji authentication manager."""
+# How long a tool call waits for a session before reporting it is not connected
+DEFAULT_READY_TIMEOUT_MS = 30_000
 
-    def __init__(self):
-        self.api = None
-        self._is_connected = False
-        self._sj = None
+# Delay between failed login attempts, doubling up to the maximum
+RELOGIN_BACKOFF_MIN = 1.0
+RELOGIN_BACKOFF_MAX = 60.0
 
-    def _auto_connect(self):
-        """Auto-connect using environment variables."""
-        if self._is_connected:
-            return
+# Solace session events forwarded by the SDK's quote event callback. The
+# SDK reconnects on its own after RECONNECTING (12); DOWN_ERROR (1) and
+# CONNECT_FAILED_ERROR (2) mean it gave up.
+SESSION_DOWN_EVENTS = {1, 2}
+
+# Name of the session logged in with SHIOAJI_API_KEY / SHIOAJI_SECRET_KEY
+DEFAULT_SESSION = "default"
+
+# Account argument selecting every account of every session
+ALL_ACCOUNTS = "all"
+
+# Session states
+IDLE = "idle"
+CONNECTING = "connecting"
+READY = "ready"
+RECONNECTING = "reconnecting"
+FAILED = "failed"
+
+
+def _ms_from_env(name: str, default: int) -> float:
+    """Read a duration in milliseconds from the environment, in seconds."""
+    try:
+        return max(0, int(os.getenv(name, default))) / 1000
+    except ValueError:
+        logger.warning(f"Invalid value for {name}: {os.getenv(name)!r}")
+        return default / 1000
+
+
+def configured_sessions() -> list[str]:
+    """Extra session names from SHIOAJI_SESSIONS (e.g. ``hedge,futures``).
+
+    Each named session logs in with SHIOAJI_<NAME>_API_KEY and
+    SHIOAJI_<NAME>_SECRET_KEY.
+    """
+    names = [name.strip().lower() for name in os.getenv("SHIOAJI_SESSIONS", "").split(",")]
+    return [name for name in dict.fromkeys(names) if name and name != DEFAULT_SESSION]
+
+
+def _value(value: Any) -> Any:
+    return getattr(value, "value", value)
+
+
+def account_kind(account: Any) -> str:
+    """``stock`` or ``futures`` for an SDK account."""
+    return "futures" if str(_value(getattr(account, "account_type", "S"))) == "F" else "stock"
+
+
+def _quiet_logout(api: Any) -> None:
+    """Release a replaced session; it is usually already dead."""
+    try:
+        api.logout()
+    except Exception as e:
+        logger.debug(f"Logout of replaced session failed: {e}")
+
+
+class LoginError(RuntimeError):
+    """Login failure that retrying cannot fix (missing or expired credentials)."""
+
+
+class ShioajiSession:
+    """One Shioaji login and the SDK API object serving it.
+
+    Logs in in the background as soon as the server starts, checks the
+    session with a periodic keepalive and the SDK's session events, and logs
+    in again with exponential backoff when the session drops. Tool calls
+    wait on a readiness future instead of failing while that happens.
+    """
+
+    def __init__(
+        self,
+        name: str = DEFAULT_SESSION,
+        keepalive_interval: float | None = None,
+        ready_timeout: float | None = None,
+        orders: OrderIndex | None = None,
+    ):
+        self.name = name
+        self.env_prefix = "SHIOAJI_" if name == DEFAULT_SESSION else f"SHIOAJI_{name.upper()}_"
+        self.api: Any = None
+        self._sj: Any = None
+        # Orders placed through this session, kept current by its order callback
+        self.orders = orders if orders is not None else OrderIndex()
+        self.keepalive_interval = (
+            keepalive_interval
+            if keepalive_interval is not None
+            else _ms_from_env("SHIOAJI_KEEPALIVE_INTERVAL_MS", DEFAULT_KEEPALIVE_INTERVAL_MS)
+        )
+        self.ready_timeout = (
+            ready_timeout
+            if ready_timeout is not None
+            else _ms_from_env("SHIOAJI_READY_TIMEOUT_MS", DEFAULT_READY_TIMEOUT_MS)
+        )
+        self.state = IDLE
+        self.last_error: str | None = None
+        self.logins = 0
+        self.session_drops = 0
+        self.connected_at: float | None = None
+        self._listeners: list[Callable[[Any], Any]] = []
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._task: asyncio.Task[None] | None = None
+        self._ready: asyncio.Future[bool] | None = None
+        self._wakeup: asyncio.Event | None = None
+
+    def add_listener(self, listener: Callable[[Any], Any]) -> None:
+        """Register a callback (sync or async) invoked with the API after each login."""
+        self._listeners.append(listener)
+
+    # -- Login -----------------------------------------------------------
 
+    def _login(self) -> Any:
+        """Create an SDK session and log in; runs on a worker thread."""
+        # Test Shioaji import before attempting connection
         try:
-            api_key = os.getenv("SHIOAJI_API_KEY")
-            secret_key = os.getenv("SHIOAJI_SECRET_KEY")
+            self._sj = get_shioaji()
+        except (ImportError, ValueError) as import_error:
+            raise LoginError(f"Shioaji import failed: {import_error}") from import_error
 
-            if not all([api_key, secret_key]):
-                raise ValueError("Missing SHIOAJI_API_KEY or SHIOAJI_SECRET_KEY environment variables")
+        api_key = os.getenv(f"{self.env_prefix}API_KEY")
+        secret_key = os.getenv(f"{self.env_prefix}SECRET_KEY")
+        if not all([api_key, secret_key]) and getattr(self._sj, "REQUIRES_CREDENTIALS", True):
+            raise LoginError(
+                f"Missing {self.env_prefix}API_KEY or {self.env_prefix}SECRET_KEY environment variables"
+            )
+        api = self._sj.Shioaji()
+
+        try:
+            # Login with API credentials only; the catalog indexes the default
+            # session's contracts as soon as the SDK finishes downloading them
+            if self.name == DEFAULT_SESSION:
+                contract_catalog.attach(api)
+                api.login(
+                    api_key=api_key,
+                    secret_key=secret_key,
+                    contracts_cb=contract_catalog.on_contracts_fetched,
+                )
+            else:
+                api.login(api_key=api_key, secret_key=secret_key, fetch_contract=False)
+        except Exception as e:
+            if "expired" in str(e).lower():
+                raise LoginError(
+                    f"Shioaji API key has expired. Please get a new API key from your broker: {e}"
+                ) from e
+            raise
 
-            # Test Shioaji import before attempting connection
+        self._install_session_callbacks(api)
+        return api
+
+    def _install_session_callbacks(self, api: Any) -> None:
+        quote = getattr(api, "quote", None)
+        set_event = getattr(quote, "set_event_callback", None)
+        if set_event is not None:
+            set_event(self._on_session_event)
+        set_down = getattr(quote, "set_session_down_callback", None)
+        if set_down is not None:
+            set_down(self._on_session_down)
+
+    async def _notify_listeners(self, api: Any) -> None:
+        for listener in self._listeners:
             try:
-                self._sj = get_shioaji()
-                self.api = self._sj.Shioaji()
-            except ImportError as import_error:
-                raise RuntimeError(f"Shioaji import failed: {import_error}") from import_error
-
-            # Login with API credentials only
-            self.api.login(
-                api_key=api_key,
-                secret_key=secret_key,
-            )
+                result = listener(api)
+                if inspect.isawaitable(result):
+                    await result
+            except Exception as e:
+                logger.warning(f"Login listener failed: {e}")
+
+    # -- Session events (SDK threads) -------------------------------------
+
+    def _on_session_event(self, resp_code: int, event_code: int, info: str, event: str) -> None:
+        """SDK quote event callback."""
+        if event_code in SESSION_DOWN_EVENTS:
+            self._signal_down(f"{event} ({event_code})")
+
+    def _on_session_down(self) -> None:
+        """SDK session-down callback."""
+        self._signal_down("session down")
 
-            self._is_connected = True
-            logger.info("Successfully auto-connected to Shioaji")
+    def _signal_down(self, reason: str) -> None:
+        loop = self._loop
+        if loop is not None and not loop.is_closed():
+            loop.call_soon_threadsafe(self._mark_down, reason)
 
+    # -- Supervisor ------------------------------------------------------
+
+    def _mark_ready(self, api: Any) -> None:
+        self.api = api
+        self.state = READY
+        self.last_error = None
+        self.logins += 1
+        self.connected_at = time.time()
+        if self._ready is not None and not self._ready.done():
+            self._ready.set_result(True)
+
+    def _mark_down(self, reason: str) -> None:
+        if self.state != READY or self._loop is None:
+            return
+        logger.warning(f"Shioaji session {self.name} lost: {reason}; logging in again")
+        self.state = RECONNECTING
+        self.last_error = reason
+        self.session_drops += 1
+        self._ready = self._loop.create_future()
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    def _fail(self, error: Exception) -> None:
+        logger.error(f"Login failed for session {self.name}: {error}")
+        self.state = FAILED
+        self.last_error = str(error)
+        if self._ready is not None and not self._ready.done():
+            self._ready.set_result(False)
+
+    async def _keepalive(self) -> bool:
+        try:
+            await run_sdk("account", self.api.usage)
+            return True
         except Exception as e:
-            error_msg = str(e)
-            if "expired" in error_msg.lower():
-                logger.error(f"API key expired: {e}")
-                raise RuntimeError(f"Shioaji API key has expired. Please get a new API key from your broker: {e}") from e
-            else:
-                logger.error(f"Auto-connect failed: {e}")
-            self._is_connected = False
-            raise
+            logger.warning(f"Keepalive failed: {e}")
+            return False
+
+    async def _supervise(self) -> None:
+        wakeup = self._wakeup
+        if wakeup is None:
+            return
+        delay = RELOGIN_BACKOFF_MIN
+        while True:
+            if self.state != READY:
+                try:
+                    api = await run_sdk("account", self._login)
+                except LoginError as e:
+                    self._fail(e)
+                    return
+                except Exception as e:
+                    self.last_error = str(e)
+                    wait = delay * random.uniform(0.8, 1.2)
+                    logger.warning(f"Login failed for session {self.name}, retrying in {wait:.1f}s: {e}")
+                    await asyncio.sleep(wait)
+                    delay = min(delay * 2, RELOGIN_BACKOFF_MAX)
+                    continue
+                previous = self.api
+                self._mark_ready(api)
+                delay = RELOGIN_BACKOFF_MIN
+                if previous is None:
+                    logger.info(f"Successfully auto-connected to Shioaji (session {self.name})")
+                else:
+                    logger.info(f"Successfully logged in to Shioaji again (session {self.name})")
+                    await self._notify_listeners(api)
+                    await run_sdk("account", _quiet_logout, previous)
+
+            wakeup.clear()
+            try:
+                await asyncio.wait_for(wakeup.wait(), self.keepalive_interval)
+            except asyncio.TimeoutError:
+                if self.state == READY and not await self._keepalive():
+                    self._mark_down("keepalive failed")
+
+    def start(self) -> None:
+        """Start logging in in the background; a no-op while already running."""
+        loop = asyncio.get_running_loop()
+        if self._task is not None and not self._task.done() and self._loop is loop:
+            return
+        self._loop = loop
+        self._wakeup = asyncio.Event()
+        self._ready = loop.create_future()
+        if self.state == READY:
+            self._ready.set_result(True)
+        else:
+            self.state = CONNECTING
+        self._task = loop.create_task(self._supervise(), name=f"shioaji-session-{self.name}")
+
+    async def stop(self) -> None:
+        """Stop the supervisor and log out."""
+        task, self._task = self._task, None
+        if task is not None and not task.done():
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        await self.logout()
+
+    async def ensure_connected(self, timeout: float | None = None) -> bool:
+        """Wait until a session is ready, starting the login if needed."""
+        if self.is_connected():
+            return True
+        self.start()
+        timeout = self.ready_timeout if timeout is None else timeout
+        ready = self._ready
+        if ready is None:
+            return False
+        try:
+            return await asyncio.wait_for(asyncio.shield(ready), timeout)
+        except asyncio.TimeoutError:
+            return False
+
+    # -- State -----------------------------------------------------------
 
     async def logout(self) -> dict:
         """Logout from Shioaji API."""
         try:
-            if self.api and self._is_connected:
+            if self.api and self.state == READY:
                 self.api.logout()
-                self._is_connected = False
+                self.state = IDLE
                 logger.info("Successfully logged out from Shioaji")
                 return {"success": True, "message": "Logout successful"}
             else:
@@ -75,21 +343,179 @@ class ShioajiAuth:
             logger.error(f"Logout failed: {e}")
             return {"success": False, "message": f"Logout failed: {str(e)}"}
 
+    def is_logged_in(self) -> bool:
+        """Check the current login state without attempting to connect."""
+        return self.state == READY and self.api is not None
+
     def is_connected(self) -> bool:
-        """Check if connected to Shioaji API."""
-        if not self._is_connected:
-            try:
-                self._auto_connect()
-            except Exception:
-                return False
-        return self._is_connected and self.api is not None
+        """Check if a session is ready; never blocks on a login."""
+        return self.is_logged_in()
 
-    def get_api(self):
+    def get_api(self) -> Any:
         """Get the Shioaji API instance."""
         if not self.is_connected():
-            raise RuntimeError("Not connected to Shioaji API. Please set SHIOAJI_API_KEY and SHIOAJI_SECRET_KEY environment variables.")
+            raise RuntimeError(f"Not connected to Shioaji API. Please set {self.env_prefix}API_KEY and {self.env_prefix}SECRET_KEY environment variables.")
         return self.api
 
+    def status(self) -> dict[str, Any]:
+        """Session state and counters."""
+        return {
+            "state": self.state,
+            "logins": self.logins,
+            "session_drops": self.session_drops,
+            "connected_at": self.connected_at,
+            "last_error": self.last_error,
+        }
+
+
+class AccountTarget:
+    """A broker account together with the session and API that serve it.
+
+    ``account`` is None for the session's default account, letting the SDK
+    pick the stock or futures account from the contract.
+    """
+
+    def __init__(self, session: ShioajiSession, api: Any, account: Any = None):
+        self.session = session
+        self.api = api
+        self.account = account
+
+    @property
+    def account_id(self) -> str | None:
+        return getattr(self.account, "account_id", None)
+
+    def describe(self) -> dict[str, Any]:
+        """Session name and account identifiers for tool responses."""
+        info: dict[str, Any] = {"session": self.session.name}
+        if self.account is not None:
+            info["account_id"] = self.account_id
+            info["account_type"] = account_kind(self.account)
+        return info
+
+
+class ShioajiAuth:
+    """Shioaji authentication manager.
+
+    Owns one ``ShioajiSession`` per configured login: the default session
+    from SHIOAJI_API_KEY plus any named sessions listed in SHIOAJI_SESSIONS.
+    Connection checks without an account refer to the default session.
+    """
+
+    def __init__(self, sessions: list[str] | None = None, **options: Any):
+        names = configured_sessions() if sessions is None else sessions
+        self.default = ShioajiSession(DEFAULT_SESSION, orders=order_index, **options)
+        self.sessions: dict[str, ShioajiSession] = {DEFAULT_SESSION: self.default}
+        for name in names:
+            self.sessions[name] = ShioajiSession(name, **options)
+
+    @property
+    def api(self) -> Any:
+        return self.default.api
+
+    def add_listener(self, listener: Callable[[Any], Any]) -> None:
+        """Register a callback invoked with the default session's API after a re-login."""
+        self.default.add_listener(listener)
+
+    def start(self) -> None:
+        """Start logging in every session in the background."""
+        for session in self.sessions.values():
+            session.start()
+
+    async def stop(self) -> None:
+        """Stop every session and log out."""
+        await asyncio.gather(*(session.stop() for session in self.sessions.values()))
+
+    async def ensure_connected(self, timeout: float | None = None) -> bool:
+        """Wait until the default session is ready, starting every session if needed."""
+        if self.is_connected():
+            return True
+        self.start()
+        return await self.default.ensure_connected(timeout)
+
+    async def logout(self) -> dict:
+        """Logout from Shioaji API."""
+        results = [await session.logout() for session in self.sessions.values()]
+        failed = [result for result in results if not result["success"]]
+        return failed[0] if failed else results[0]
+
+    def is_logged_in(self) -> bool:
+        """Check the default session's login state without attempting to connect."""
+        return self.default.is_logged_in()
+
+    def is_connected(self) -> bool:
+        """Check if the default session is ready; never blocks on a login."""
+        return self.default.is_connected()
+
+    def get_api(self) -> Any:
+        """Get the default session's Shioaji API instance."""
+        return self.default.get_api()
+
+    def status(self) -> dict[str, dict[str, Any]]:
+        """State and counters per session."""
+        return {name: session.status() for name, session in self.sessions.items()}
+
+    # -- Accounts --------------------------------------------------------
+
+    async def _session_api(self, session: ShioajiSession) -> Any | None:
+        """API of a ready session, or None if it cannot connect."""
+        if session is self.default:
+            return self.get_api() if await self.ensure_connected() else None
+        return session.get_api() if await session.ensure_connected() else None
+
+    async def list_accounts(self) -> list[AccountTarget]:
+        """Every account of every connected session, queried in parallel."""
+
+        async def accounts_of(session: ShioajiSession) -> list[AccountTarget]:
+            api = await self._session_api(session)
+            if api is None:
+                logger.warning(f"Session {session.name} is not connected; skipping its accounts")
+                return []
+            accounts = await run_sdk("account", api.list_accounts)
+            return [AccountTarget(session, api, account) for account in accounts or []]
+
+        per_session = await asyncio.gather(*(accounts_of(s) for s in self.sessions.values()))
+        return [target for targets in per_session for target in targets]
+
+    async def resolve_accounts(self, ref: str | None = None) -> list[AccountTarget]:
+        """Accounts selected by a tool's ``account`` argument.
+
+        ``ref`` is empty for the default session's default account, a
+        session name for that session's default account, an account ID
+        (optionally prefixed with the broker ID), or ``all``.
+        """
+        if not ref:
+            return [AccountTarget(self.default, self.get_api())]
+        ref = str(ref).strip()
+        session = self.sessions.get(ref.lower())
+        if session is not None:
+            api = await self._session_api(session)
+            if api is None:
+                raise RuntimeError(f"Session {session.name} is not connected: {session.last_error}")
+            return [AccountTarget(session, api)]
+
+        targets = await self.list_accounts()
+        if ref.lower() == ALL_ACCOUNTS:
+            return targets
+        matched = [
+            target for target in targets
+            if ref in (target.account_id, f"{target.account.broker_id}-{target.account_id}")
+        ]
+        if not matched:
+            raise LookupError(f"Unknown account: {ref}")
+        return matched[:1]
+
+    async def resolve_account(self, ref: str | None = None) -> AccountTarget:
+        """Exactly one account, as needed to place an order."""
+        if ref and str(ref).strip().lower() == ALL_ACCOUNTS:
+            raise ValueError("Orders need a single account, not 'all'")
+        return (await self.resolve_accounts(ref))[0]
+
+
+# Persist every catalog built from live contracts for the next cold start
+contract_catalog.add_listener(contract_cache.save_in_background)
 
 # Global authentication instance
 auth_manager = ShioajiAuth()
+
+# Restore live quote subscriptions on the new session after a re-login
+auth_manager.add_listener(quote_engine.restore)
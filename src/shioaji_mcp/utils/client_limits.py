@@ -0,0 +1,70 @@
+"""Per-client bounds on concurrent tool calls."""
+
+import asyncio
+import contextlib
+import logging
+import os
+import weakref
+from collections.abc import AsyncIterator
+from typing import Any
+
+logger = logging.getLogger(__name__)
+
+# Tool calls one client may run at once; further calls queue
+DEFAULT_CLIENT_CONCURRENCY = 8
+
+
+def _limit_from_env() -> int:
+    value = os.getenv("SHIOAJI_MCP_CLIENT_CONCURRENCY")
+    if not value:
+        return DEFAULT_CLIENT_CONCURRENCY
+    try:
+        return max(1, int(value))
+    except ValueError:
+        logger.warning(f"Invalid client concurrency: {value!r}")
+        return DEFAULT_CLIENT_CONCURRENCY
+
+
+class ClientLimiter:
+    """One semaphore per connected MCP session.
+
+    When many agents share one server process, a single client issuing a
+    burst of calls queues behind its own limit instead of taking every
+    broker worker and rate token from the others. Sessions are held weakly
+    and forgotten once their connection closes.
+    """
+
+    def __init__(self, limit: int | None = None):
+        self.limit = limit or _limit_from_env()
+        self._semaphores: weakref.WeakKeyDictionary[Any, asyncio.Semaphore] = (
+            weakref.WeakKeyDictionary()
+        )
+        self.calls = 0
+        self.queued = 0
+
+    @contextlib.asynccontextmanager
+    async def slot(self, client: Any | None) -> AsyncIterator[None]:
+        """Hold one of ``client``'s call slots; unlimited without a client."""
+        self.calls += 1
+        if client is None:
+            yield
+            return
+        semaphore = self._semaphores.get(client)
+        if semaphore is None:
+            semaphore = self._semaphores[client] = asyncio.Semaphore(self.limit)
+        if semaphore.locked():
+            self.queued += 1
+        async with semaphore:
+            yield
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "limit": self.limit,
+            "clients": len(self._semaphores),
+            "calls": self.calls,
+            "queued": self.queued,
+        }
+
+
+# Global client limiter instance
+client_limiter = ClientLimiter()
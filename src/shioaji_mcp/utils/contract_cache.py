@@ -0,0 +1,174 @@
+"""Persistent on-disk snapshot of the contract catalog."""
+
+import json
+import logging
+import os
+import threading
+from datetime import date, datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any
+
+from .contract_catalog import ContractCatalog
+
+logger = logging.getLogger(__name__)
+
+# Bump when the on-disk layout changes so old snapshots are ignored
+CACHE_FORMAT_VERSION = 2
+
+# Catalog record fields, all strings
+RECORD_FIELDS = ("code", "symbol", "name", "category", "exchange", "currency")
+
+# SDK contract fields kept in the snapshot; contracts are rebuilt from these
+CONTRACT_FIELDS = (
+    "security_type", "exchange", "code", "symbol", "name", "category",
+    "currency", "delivery_month", "delivery_date", "strike_price",
+    "option_right", "underlying_kind", "underlying_code", "unit",
+    "multiplier", "limit_up", "limit_down", "reference", "update_date",
+    "margin_trading_balance", "short_selling_balance", "day_trade",
+    "target_code",
+)
+
+_SCALARS = (str, int, float, bool)
+
+# Taiwan exchanges trade in UTC+8
+TAIPEI_TZ = timezone(timedelta(hours=8))
+
+
+def trading_date(now: datetime | None = None) -> date:
+    """Return the Taipei calendar date that contracts are published for."""
+    now = now or datetime.now(TAIPEI_TZ)
+    if now.tzinfo is not None:
+        now = now.astimezone(TAIPEI_TZ)
+    return now.date()
+
+
+def default_cache_dir() -> Path:
+    """Directory for the contract snapshot, from SHIOAJI_CACHE_DIR.
+
+    Backends other than the real SDK get a subdirectory of their own so
+    synthetic contracts and bars never mix with broker data.
+    """
+    from .shioaji_wrapper import DEFAULT_BACKEND, backend_name
+
+    root = Path(
+        os.getenv("SHIOAJI_CACHE_DIR")
+        or Path.home() / ".cache" / "shioaji-mcp"
+    )
+    backend = backend_name()
+    return root if backend == DEFAULT_BACKEND else root / backend
+
+
+def _plain_fields(entry: Any, fields: tuple[str, ...]) -> dict[str, Any]:
+    """Copy the known scalar ``fields`` of ``entry``, rejecting anything else."""
+    if not isinstance(entry, dict):
+        raise ValueError(f"Expected an object, got {type(entry).__name__}")
+    plain = {}
+    for field in fields:
+        value = entry.get(field)
+        if value is None:
+            continue
+        value = getattr(value, "value", value)
+        if not isinstance(value, _SCALARS):
+            raise ValueError(f"Unexpected {type(value).__name__} in field {field}")
+        plain[field] = value
+    return plain
+
+
+def _record(entry: Any) -> dict[str, str]:
+    record = _plain_fields(entry, RECORD_FIELDS)
+    if any(not isinstance(record.get(field), str) for field in RECORD_FIELDS):
+        raise ValueError(f"Incomplete contract record: {record}")
+    return record
+
+
+def _contract_factory(payload: dict[str, Any]) -> Any:
+    """Rebuild an SDK contract object from its persisted fields."""
+    from .shioaji_wrapper import get_shioaji
+
+    sj = get_shioaji()
+    return sj.contracts.Contract(**payload).astype()
+
+
+class ContractCache:
+    """Versioned contract snapshot keyed by trading date.
+
+    The snapshot is plain JSON holding explicit record and contract fields,
+    so a file in a shared cache directory can never run code on load.
+    """
+
+    def __init__(self, cache_dir: Path | None = None):
+        self.cache_dir = Path(cache_dir) if cache_dir else default_cache_dir()
+        self._save_lock = threading.Lock()
+
+    @property
+    def path(self) -> Path:
+        return self.cache_dir / f"contracts-v{CACHE_FORMAT_VERSION}.json"
+
+    def load_into(self, catalog: ContractCatalog, today: date | None = None) -> bool:
+        """Seed ``catalog`` from disk if a snapshot for today's trading date exists."""
+        if catalog.is_built:
+            return False
+
+        path = self.path
+        if not path.exists():
+            return False
+
+        today = today or trading_date()
+        try:
+            with path.open(encoding="utf-8") as f:
+                snapshot = json.load(f)
+            if (
+                not isinstance(snapshot, dict)
+                or snapshot.get("version") != CACHE_FORMAT_VERSION
+                or snapshot.get("trading_date") != today.isoformat()
+            ):
+                logger.info(f"Discarding stale contract cache {path}")
+                path.unlink(missing_ok=True)
+                return False
+            records = [_record(entry) for entry in snapshot["records"]]
+            payloads = [
+                _plain_fields(entry, CONTRACT_FIELDS) for entry in snapshot["payloads"]
+            ]
+            if len(records) != len(payloads):
+                raise ValueError("Record and contract counts differ")
+            catalog.load(records, payloads, _contract_factory)
+            return True
+        except Exception as e:
+            logger.warning(f"Failed to load contract cache {path}: {e}")
+            return False
+
+    def save(self, catalog: ContractCatalog, today: date | None = None) -> bool:
+        """Write the catalog to disk atomically."""
+        records, payloads = catalog.export()
+        if not records:
+            return False
+
+        snapshot = {
+            "version": CACHE_FORMAT_VERSION,
+            "trading_date": (today or trading_date()).isoformat(),
+            "records": [_record(record) for record in records],
+            "payloads": [_plain_fields(payload, CONTRACT_FIELDS) for payload in payloads],
+        }
+        path = self.path
+        tmp_path = path.with_suffix(".tmp")
+        try:
+            with self._save_lock:
+                self.cache_dir.mkdir(parents=True, exist_ok=True)
+                with tmp_path.open("w", encoding="utf-8") as f:
+                    json.dump(snapshot, f, ensure_ascii=False, separators=(",", ":"))
+                os.replace(tmp_path, path)
+            logger.info(f"Saved {len(records)} contracts to {path}")
+            return True
+        except Exception as e:
+            logger.warning(f"Failed to save contract cache {path}: {e}")
+            return False
+
+    def save_in_background(self, catalog: ContractCatalog) -> None:
+        """Catalog listener that refreshes the snapshot without blocking."""
+        threading.Thread(
+            target=self.save, args=(catalog,), name="contract-cache", daemon=True
+        ).start()
+
+
+# Global contract cache instance
+contract_cache = ContractCache()
@@ -0,0 +1,405 @@
+"""Indexed in-memory catalog of Shioaji contracts."""
+
+import bisect
+import logging
+import threading
+import time
+from collections.abc import Callable, Sequence
+from typing import Any
+
+from .executor import run_sdk
+from .tracing import tracer
+
+logger = logging.getLogger(__name__)
+
+# Product types in the order they are searched and ranked
+SECURITY_TYPES = [
+    ("Stock", "Stocks"),
+    ("Future", "Futures"),
+    ("Option", "Options"),
+    ("Index", "Indexs"),
+]
+
+_CATEGORY_ALIASES = {
+    "stock": "Stock",
+    "stocks": "Stock",
+    "future": "Future",
+    "futures": "Future",
+    "option": "Option",
+    "options": "Option",
+    "index": "Index",
+    "indexs": "Index",
+    "indices": "Index",
+    "indexes": "Index",
+}
+
+DEFAULT_LIMIT = 50
+MAX_LIMIT = 500
+
+# Match ranks, lower is better
+RANK_EXACT_CODE = 0
+RANK_CODE_PREFIX = 1
+RANK_EXACT_NAME = 2
+RANK_NAME_PREFIX = 3
+RANK_SUBSTRING = 4
+
+
+def normalize_category(category: str | None) -> str | None:
+    """Map user-supplied category names to catalog categories."""
+    if not category:
+        return None
+    return _CATEGORY_ALIASES.get(category.strip().lower(), category.strip().title())
+
+
+def _enum_value(value: Any) -> str:
+    return str(getattr(value, "value", value) or "")
+
+
+def _ngrams(text: str) -> set[str]:
+    """Character unigrams and bigrams used for substring lookup."""
+    grams = set(text)
+    grams.update(text[i:i + 2] for i in range(len(text) - 1))
+    return grams
+
+
+class _CatalogIndex:
+    """Immutable column store and lookup indexes for one contract download."""
+
+    def __init__(self, records: list[dict[str, Any]], contracts: list[Any]):
+        # Ids follow (product type, code) order so that sorting ids gives the
+        # default listing order without a key function
+        type_order = {name: n for n, (name, _) in enumerate(SECURITY_TYPES)}
+        order = sorted(
+            range(len(records)),
+            key=lambda i: (type_order[records[i]["category"]], records[i]["code"]),
+        )
+        self.records = [records[i] for i in order]
+        self.contracts = [contracts[i] for i in order]
+        records = self.records
+        self.codes = [record["code"] for record in records]
+        self.codes_lower = [code.lower() for code in self.codes]
+        self.symbols_lower = [record["symbol"].lower() for record in records]
+        self.names_lower = [record["name"].lower() for record in records]
+
+        self.by_code: dict[str, int] = {}
+        self.by_category: dict[str, set[int]] = {}
+        self.by_exchange: dict[str, set[int]] = {}
+        self.grams: dict[str, set[int]] = {}
+
+        for i, record in enumerate(records):
+            # First product type wins for codes shared across types
+            self.by_code.setdefault(record["code"], i)
+            self.by_code.setdefault(record["symbol"], i)
+            self.by_category.setdefault(record["category"], set()).add(i)
+            self.by_exchange.setdefault(record["exchange"], set()).add(i)
+            for text in (self.codes_lower[i], self.symbols_lower[i], self.names_lower[i]):
+                for gram in _ngrams(text):
+                    self.grams.setdefault(gram, set()).add(i)
+
+        # Sorted (code, id) pairs for prefix range scans
+        self.sorted_codes = sorted(
+            (code, i) for i, code in enumerate(self.codes_lower)
+        )
+        self.sorted_names = sorted(
+            (name, i) for i, name in enumerate(self.names_lower)
+        )
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def _prefix(self, pairs: list[tuple[str, int]], prefix: str) -> list[int]:
+        matches = []
+        for pos in range(bisect.bisect_left(pairs, (prefix, -1)), len(pairs)):
+            key, i = pairs[pos]
+            if not key.startswith(prefix):
+                break
+            matches.append(i)
+        return matches
+
+    def _substring(self, keyword: str) -> set[int]:
+        grams = [keyword] if len(keyword) == 1 else [
+            keyword[i:i + 2] for i in range(len(keyword) - 1)
+        ]
+        postings: list[set[int]] = []
+        for gram in set(grams):
+            posting = self.grams.get(gram)
+            if not posting:
+                return set()
+            postings.append(posting)
+        postings.sort(key=len)
+        candidates = set(postings[0])
+        for posting in postings[1:]:
+            candidates &= posting
+            if not candidates:
+                return candidates
+        return {
+            i for i in candidates
+            if keyword in self.names_lower[i]
+            or keyword in self.codes_lower[i]
+            or keyword in self.symbols_lower[i]
+        }
+
+    def match(self, keyword: str) -> dict[int, int]:
+        """Return matching ids mapped to their best rank."""
+        keyword = keyword.strip().lower()
+        ranks: dict[int, int] = {}
+
+        def add(ids: Any, rank: int) -> None:
+            for i in ids:
+                if rank < ranks.get(i, RANK_SUBSTRING + 1):
+                    ranks[i] = rank
+
+        add(self._substring(keyword), RANK_SUBSTRING)
+        add(self._prefix(self.sorted_names, keyword), RANK_NAME_PREFIX)
+        add(
+            (i for i in self._prefix(self.sorted_names, keyword)
+             if self.names_lower[i] == keyword),
+            RANK_EXACT_NAME,
+        )
+        add(self._prefix(self.sorted_codes, keyword), RANK_CODE_PREFIX)
+        add(
+            (i for i in self._prefix(self.sorted_codes, keyword)
+             if self.codes_lower[i] == keyword),
+            RANK_EXACT_CODE,
+        )
+        return ranks
+
+
+class ContractCatalog:
+    """Catalog of all Shioaji contracts with prebuilt search indexes.
+
+    The catalog is rebuilt whenever the SDK replaces its ``Contracts`` tree,
+    which happens on login and on every ``fetch_contracts`` redownload. It can
+    also be seeded from a persisted snapshot before login, in which case SDK
+    contract objects are materialized lazily on lookup.
+    """
+
+    def __init__(self) -> None:
+        self._index: _CatalogIndex | None = None
+        self._source_id: int | None = None
+        self._dirty = True
+        self._lock = threading.Lock()
+        self._api: Any = None
+        self._fetched_types: set[str] = set()
+        self._factory: Callable[[dict[str, Any]], Any] | None = None
+        self._listeners: list[Callable[[ContractCatalog], None]] = []
+        self.from_cache = False
+
+    def __len__(self) -> int:
+        index = self._index
+        return len(index) if index else 0
+
+    @property
+    def is_built(self) -> bool:
+        return self._index is not None
+
+    def add_listener(self, listener: Callable[["ContractCatalog"], None]) -> None:
+        """Register a callback run after every build from live SDK contracts."""
+        self._listeners.append(listener)
+
+    def invalidate(self) -> None:
+        """Mark the catalog stale so the next lookup rebuilds it."""
+        self._dirty = True
+
+    def attach(self, api: Any) -> None:
+        """Track a freshly logged-in API whose contracts are being fetched."""
+        self._api = api
+        self._fetched_types = set()
+        self.invalidate()
+
+    def on_contracts_fetched(self, security_type: Any = None) -> None:
+        """SDK ``contracts_cb`` hook; rebuilds once every product type is in."""
+        self.invalidate()
+        self._fetched_types.add(_enum_value(security_type))
+        if self._api is not None and len(self._fetched_types) >= len(SECURITY_TYPES):
+            try:
+                self.build(self._api.Contracts)
+            except Exception as e:
+                logger.warning(f"Contract catalog build failed: {e}")
+
+    def build(self, contracts: Any) -> None:
+        """Build the catalog from an SDK ``Contracts`` tree."""
+        started = time.perf_counter()
+        records: list[dict[str, Any]] = []
+        objects: list[Any] = []
+
+        for category, attr in SECURITY_TYPES:
+            source = getattr(contracts, attr, None)
+            if source is None:
+                continue
+            try:
+                for group in source:
+                    for contract in group:
+                        records.append(self._record(category, contract))
+                        objects.append(contract)
+            except Exception as e:
+                logger.warning(f"Error indexing {attr} contracts: {e}")
+
+        index = _CatalogIndex(records, objects)
+        with self._lock:
+            self._index = index
+            self._source_id = id(contracts)
+            self._dirty = False
+            self._factory = None
+            self.from_cache = False
+
+        elapsed = (time.perf_counter() - started) * 1000
+        logger.info(f"Indexed {len(index)} contracts in {elapsed:.0f} ms")
+
+        for listener in self._listeners:
+            try:
+                listener(self)
+            except Exception as e:
+                logger.warning(f"Contract catalog listener failed: {e}")
+
+    def load(
+        self,
+        records: list[dict[str, Any]],
+        payloads: list[dict[str, Any]],
+        factory: Callable[[dict[str, Any]], Any],
+    ) -> None:
+        """Seed the catalog from persisted records and contract payloads.
+
+        ``factory`` turns a payload into an SDK contract on first lookup.
+        """
+        index = _CatalogIndex(records, payloads)
+        with self._lock:
+            self._index = index
+            self._source_id = None
+            self._dirty = False
+            self._factory = factory
+            self.from_cache = True
+        logger.info(f"Loaded {len(index)} contracts from cache")
+
+    def export(self) -> tuple[list[dict[str, Any]], list[dict[str, Any]]]:
+        """Return (records, contract payloads) suitable for persisting."""
+        index = self._index
+        if index is None:
+            return [], []
+        payloads = [
+            contract if isinstance(contract, dict) else contract.dict()
+            for contract in index.contracts
+        ]
+        return list(index.records), payloads
+
+    @staticmethod
+    def _record(category: str, contract: Any) -> dict[str, Any]:
+        code = contract.code
+        return {
+            "code": code,
+            "symbol": getattr(contract, "symbol", "") or code,
+            "name": getattr(contract, "name", "") or "",
+            "category": category,
+            "exchange": _enum_value(getattr(contract, "exchange", "")),
+            "currency": _enum_value(getattr(contract, "currency", "TWD")) or "TWD",
+        }
+
+    def is_stale(self, api: Any) -> bool:
+        """Whether the SDK contracts changed since the last build."""
+        contracts = api.Contracts
+        if self._index is None:
+            return True
+        if not self._dirty and id(contracts) == self._source_id:
+            return False
+        # Keep serving the current index while the SDK is still downloading
+        return _enum_value(getattr(contracts, "status", "Fetched")) == "Fetched"
+
+    def ensure_current(self, api: Any) -> None:
+        """Rebuild the catalog if the SDK contracts changed since the last build."""
+        if self.is_stale(api):
+            self.build(api.Contracts)
+
+    async def refresh(self, api: Any) -> None:
+        """Rebuild a stale catalog on the data executor, off the event loop.
+
+        A full build takes over a second on the complete contract tree, so
+        async callers refresh here before resolving codes.
+        """
+        try:
+            if self.is_stale(api):
+                await run_sdk("data", self.ensure_current, api)
+        except Exception as e:
+            logger.warning(f"Contract catalog refresh failed: {e}")
+
+    def get(self, code: str) -> Any | None:
+        """Look up an SDK contract object by code or symbol."""
+        index = self._index
+        if index is None:
+            return None
+        i = index.by_code.get(code)
+        if i is None:
+            return None
+        contract = index.contracts[i]
+        if isinstance(contract, dict) and self._factory is not None:
+            contract = self._factory(contract)
+            index.contracts[i] = contract
+        return contract
+
+    def resolve(self, api: Any, code: str) -> Any | None:
+        """Resolve a code through the catalog, falling back to SDK stocks.
+
+        Only looks up the current index; ``await refresh(api)`` first so
+        futures and options codes resolve on a cold or stale catalog too.
+        """
+        with tracer.span("contract.resolve", code=code):
+            contract = self.get(code)
+            if contract is None:
+                try:
+                    contract = api.Contracts.Stocks[code]
+                except (KeyError, AttributeError, TypeError):
+                    contract = None
+            return contract
+
+    def records(self, category: str | None = None) -> list[dict[str, Any]]:
+        """All catalog records, optionally of one category."""
+        index = self._index
+        if index is None:
+            return []
+        if category is None:
+            return [dict(record) for record in index.records]
+        ids = index.by_category.get(normalize_category(category) or "", set())
+        return [dict(index.records[i]) for i in sorted(ids)]
+
+    def search(
+        self,
+        keyword: str = "",
+        exchange: str | None = None,
+        category: str | None = None,
+        limit: int = DEFAULT_LIMIT,
+        offset: int = 0,
+    ) -> tuple[list[dict[str, Any]], int]:
+        """Search the catalog.
+
+        Returns:
+            tuple[list[dict], int]: (page of ranked records, total matches)
+        """
+        index = self._index
+        if index is None:
+            return [], 0
+
+        allowed: set[int] | None = None
+        if category:
+            allowed = index.by_category.get(normalize_category(category) or "", set())
+        if exchange:
+            by_exchange = index.by_exchange.get(exchange.strip().upper(), set())
+            allowed = by_exchange if allowed is None else allowed & by_exchange
+
+        ordered: Sequence[int]
+        if keyword and keyword.strip():
+            ranks = index.match(keyword)
+            if allowed is not None:
+                ranks = {i: rank for i, rank in ranks.items() if i in allowed}
+            ordered = sorted(ranks, key=lambda i: (ranks[i], i))
+        elif allowed is None:
+            ordered = range(len(index))
+        else:
+            ordered = sorted(allowed)
+
+        limit = max(1, min(int(limit), MAX_LIMIT))
+        offset = max(0, int(offset))
+        page = [dict(index.records[i]) for i in ordered[offset:offset + limit]]
+        return page, len(ordered)
+
+
+# Global catalog instance
+contract_catalog = ContractCatalog()
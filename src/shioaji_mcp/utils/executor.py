@@ -0,0 +1,196 @@
+"""Bounded executor for dispatching blocking Shioaji SDK calls."""
+
+import asyncio
+import contextvars
+import functools
+import logging
+import os
+import threading
+import time
+from collections.abc import Callable
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any
+
+from .metrics import metrics
+from .rate_limit import rate_governor
+from .tracing import tracer
+
+logger = logging.getLogger(__name__)
+
+# Default per-category concurrency limits. Each category gets its own worker
+# pool so that, for example, snapshot quotes never queue behind a long
+# historical K-bar download.
+DEFAULT_LIMITS = {
+    "quote": 8,
+    "data": 4,
+    "order": 4,
+    "account": 2,
+}
+
+
+def _limit_from_env(category: str, default: int) -> int:
+    """Read a category limit from SHIOAJI_<CATEGORY>_CONCURRENCY."""
+    value = os.getenv(f"SHIOAJI_{category.upper()}_CONCURRENCY")
+    if not value:
+        return default
+    try:
+        limit = int(value)
+    except ValueError:
+        logger.warning(f"Invalid concurrency limit for {category}: {value!r}")
+        return default
+    return max(1, limit)
+
+
+class _CategoryPool:
+    """Worker pool and counters for one category of SDK calls."""
+
+    def __init__(self, category: str, limit: int):
+        self.category = category
+        self.limit = limit
+        self.pool = ThreadPoolExecutor(
+            max_workers=limit, thread_name_prefix=f"shioaji-{category}"
+        )
+        self._lock = threading.Lock()
+        self.queued = 0
+        self.active = 0
+        self.completed = 0
+        self.failed = 0
+        self.max_queued = 0
+
+    def submitted(self) -> int:
+        with self._lock:
+            self.queued += 1
+            self.max_queued = max(self.max_queued, self.queued)
+            return self.queued
+
+    def discarded(self, future: Future[Any]) -> None:
+        """Drop a call that was cancelled before a worker picked it up."""
+        if future.cancelled():
+            with self._lock:
+                self.queued -= 1
+
+    def started(self) -> None:
+        with self._lock:
+            self.queued -= 1
+            self.active += 1
+
+    def finished(self, ok: bool) -> None:
+        with self._lock:
+            self.active -= 1
+            if ok:
+                self.completed += 1
+            else:
+                self.failed += 1
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            return {
+                "limit": self.limit,
+                "queued": self.queued,
+                "active": self.active,
+                "completed": self.completed,
+                "failed": self.failed,
+                "max_queued": self.max_queued,
+            }
+
+
+class BrokerExecutor:
+    """Run blocking SDK calls in bounded per-category thread pools."""
+
+    def __init__(self, limits: dict[str, int] | None = None):
+        limits = limits or {
+            category: _limit_from_env(category, default)
+            for category, default in DEFAULT_LIMITS.items()
+        }
+        self._pools = {
+            category: _CategoryPool(category, limit)
+            for category, limit in limits.items()
+        }
+
+    def _get_pool(self, category: str) -> _CategoryPool:
+        try:
+            return self._pools[category]
+        except KeyError:
+            raise ValueError(f"Unknown executor category: {category}") from None
+
+    async def run(
+        self, category: str, func: Callable[..., Any], *args: Any, **kwargs: Any
+    ) -> Any:
+        """Run ``func(*args, **kwargs)`` in the pool for ``category``."""
+        pool = self._get_pool(category)
+        method = getattr(func, "__name__", "call")
+        submitted = time.perf_counter()
+
+        def call() -> Any:
+            pool.started()
+            started = time.perf_counter()
+            metrics.observe("broker_queue_seconds", started - submitted, category=category)
+            ok = False
+            try:
+                with tracer.span(f"sdk.{method}", category=category):
+                    result = func(*args, **kwargs)
+                ok = True
+                return result
+            finally:
+                pool.finished(ok)
+                metrics.observe(
+                    "broker_call_duration_seconds",
+                    time.perf_counter() - started,
+                    category=category,
+                    method=method,
+                    status="ok" if ok else "error",
+                )
+
+        depth = pool.submitted()
+        if depth > pool.limit:
+            logger.warning(
+                f"Shioaji {category} calls backing up: {depth} queued "
+                f"(limit {pool.limit})"
+            )
+
+        if not tracer.active():
+            return await self._submit(pool, call)
+        # Carry the trace into the worker thread, as asyncio.to_thread does
+        with tracer.span(f"broker.{method}", category=category, queued=depth):
+            context = contextvars.copy_context()
+            return await self._submit(pool, functools.partial(context.run, call))
+
+    @staticmethod
+    async def _submit(pool: _CategoryPool, call: Callable[[], Any]) -> Any:
+        # Cancelling the awaiting task cancels a call that has not started,
+        # so the queue count is released here rather than by the worker.
+        future = pool.pool.submit(call)
+        future.add_done_callback(pool.discarded)
+        return await asyncio.wrap_future(future)
+
+    def queue_depth(self, category: str | None = None) -> int:
+        """Return the number of calls waiting for a worker."""
+        if category is not None:
+            return self._get_pool(category).stats()["queued"]
+        return sum(pool.stats()["queued"] for pool in self._pools.values())
+
+    def stats(self) -> dict[str, dict[str, int]]:
+        """Return per-category limits, queue depth and call counters."""
+        return {category: pool.stats() for category, pool in self._pools.items()}
+
+    def shutdown(self, wait: bool = False) -> None:
+        """Shut down all worker pools."""
+        for pool in self._pools.values():
+            pool.pool.shutdown(wait=wait, cancel_futures=True)
+
+
+# Global executor instance shared by all tools
+broker_executor = BrokerExecutor()
+
+
+async def run_sdk(
+    category: str, func: Callable[..., Any], *args: Any, **kwargs: Any
+) -> Any:
+    """Dispatch a blocking Shioaji call through the shared executor.
+
+    The call first takes a token from the category's rate limit bucket.
+    """
+    with tracer.span("rate_limit.wait", category=category):
+        waited = await rate_governor.acquire(category)
+    metrics.observe("rate_limit_wait_seconds", waited, category=category)
+    return await broker_executor.run(category, func, *args, **kwargs)
@@ -1,8 +1,33 @@
 """Data formatting utilities."""
 
 import json
+from datetime import datetime, timezone
 from typing import Any
 
+import numpy as np
+import orjson
+
+from .metrics import metrics
+from .tracing import tracer
+
+# Datetimes go through the default hook to match the json module's output
+_ORJSON_OPTIONS = (
+    orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_PASSTHROUGH_DATETIME
+)
+
+# Supported values for a tool's ``format`` argument; the first is the default
+RESPONSE_FORMATS = ["json", "compact", "columnar"]
+
+
+def ns_to_datetime(ts: Any) -> datetime | None:
+    """Convert a Shioaji nanosecond timestamp to a naive exchange-local datetime."""
+    if ts is None:
+        return None
+    if isinstance(ts, datetime):
+        return ts
+    # Shioaji encodes exchange local time as if it were UTC
+    return datetime.fromtimestamp(int(ts) / 1e9, tz=timezone.utc).replace(tzinfo=None)
+
 
 def format_account_info(account_data: Any) -> dict[str, Any]:
     """Format account information for MCP response."""
@@ -34,8 +59,59 @@ def format_error_response(error: Exception) -> list[dict[str, str]]:
     return [{"type": "text", "text": f"Error: {str(error)}"}]
 
 
-def format_success_response(data: Any, message: str = None) -> list[dict[str, Any]]:
-    """Format success response for MCP."""
+def to_columnar(data: Any) -> Any:
+    """Convert a list of row dicts to ``{"columns": [...], "rows": [[...]]}``.
+
+    Other payloads are returned unchanged.
+    """
+    if not isinstance(data, list) or not data or not all(isinstance(row, dict) for row in data):
+        return data
+
+    columns: dict[str, None] = {}
+    for row in data:
+        for key in row:
+            columns.setdefault(key)
+    names = list(columns)
+    return {"columns": names, "rows": [[row.get(name) for name in names] for row in data]}
+
+
+def _json_default(value: Any) -> Any:
+    # numpy values become numbers and lists; anything else is stringified
+    if isinstance(value, np.generic | np.ndarray):
+        return value.tolist()
+    return str(value)
+
+
+def encode_json(data: Any) -> str:
+    """Encode data as compact JSON with orjson."""
+    try:
+        return orjson.dumps(data, default=_json_default, option=_ORJSON_OPTIONS).decode()
+    except TypeError:
+        # orjson rejects some inputs json accepts (e.g. >64-bit ints)
+        pass
+    return json.dumps(data, separators=(",", ":"), default=_json_default, ensure_ascii=False)
+
+
+def normalize_response_format(response_format: str | None) -> str:
+    """Validate a tool's ``format`` argument."""
+    value = (response_format or RESPONSE_FORMATS[0]).lower()
+    if value not in RESPONSE_FORMATS:
+        raise ValueError(
+            f"Unsupported format: {response_format}. Use one of {', '.join(RESPONSE_FORMATS)}"
+        )
+    return value
+
+
+def format_success_response(
+    data: Any, message: str | None = None, response_format: str | None = None
+) -> list[dict[str, Any]]:
+    """Format success response for MCP.
+
+    ``response_format`` selects ``json`` (indented, default), ``compact``
+    (no whitespace) or ``columnar`` (compact, lists of rows as
+    ``{"columns", "rows"}``).
+    """
+    response_format = normalize_response_format(response_format)
     response = []
 
     if message:
@@ -43,9 +119,21 @@ def format_success_response(data: Any, message: str = None) -> list[dict[str, An
 
     if data:
         if isinstance(data, dict | list):
-            response.append(
-                {"type": "text", "text": json.dumps(data, indent=2, default=str)}
-            )
+            with (
+                tracer.span("format.encode", format=response_format) as span,
+                metrics.timer("serialize_duration_seconds", format=response_format),
+            ):
+                if response_format == "columnar":
+                    data = to_columnar(data)
+                if response_format == "json":
+                    text = json.dumps(data, indent=2, default=_json_default)
+                else:
+                    text = encode_json(data)
+            size = len(text.encode())
+            metrics.observe("serialize_bytes", size, format=response_format)
+            if span is not None:
+                span.attrs["bytes"] = size
+            response.append({"type": "text", "text": text})
         else:
             response.append({"type": "text", "text": str(data)})
 
@@ -0,0 +1,199 @@
+"""Vectorized technical indicator kernels with memoization."""
+
+import math
+import threading
+from collections import OrderedDict
+from collections.abc import Callable
+from typing import Any
+
+import numpy as np
+
+# Indicator name -> (default parameters, output names)
+INDICATORS: dict[str, tuple[dict[str, float], list[str]]] = {
+    "sma": ({"period": 20}, ["value"]),
+    "ema": ({"period": 20}, ["value"]),
+    "rsi": ({"period": 14}, ["value"]),
+    "atr": ({"period": 14}, ["value"]),
+    "bollinger": ({"period": 20, "stddev": 2.0}, ["upper", "middle", "lower"]),
+}
+
+# Results kept in memory across calls
+DEFAULT_CACHE_ENTRIES = 512
+
+# Largest exponent kept in float64 while rescaling an EWM block
+_MAX_LOG10_SCALE = 150
+
+
+def normalize_indicator(spec: Any) -> tuple[str, dict[str, float]]:
+    """Validate one indicator spec: a name or ``{"name", **params}``."""
+    if isinstance(spec, str):
+        spec = {"name": spec}
+    if not isinstance(spec, dict) or not spec.get("name"):
+        raise ValueError(f"Invalid indicator: {spec!r}")
+    name = str(spec["name"]).lower()
+    if name not in INDICATORS:
+        raise ValueError(f"Unknown indicator: {name}. Use any of {', '.join(INDICATORS)}")
+
+    defaults, _ = INDICATORS[name]
+    unknown = set(spec) - {"name"} - set(defaults)
+    if unknown:
+        raise ValueError(f"Unknown parameters for {name}: {', '.join(sorted(unknown))}")
+    params = {key: spec.get(key, default) for key, default in defaults.items()}
+    if int(params["period"]) != params["period"] or params["period"] < 1:
+        raise ValueError(f"{name} period must be a positive integer")
+    params["period"] = int(params["period"])
+    return name, params
+
+
+def indicator_label(name: str, params: dict[str, float]) -> str:
+    """Output key, e.g. ``sma_20`` or ``bollinger_20_2``."""
+    return "_".join([name, *(f"{value:g}" for value in params.values())])
+
+
+def warmup_bars(name: str, params: dict[str, float]) -> int:
+    """Bars needed before an indicator's values settle."""
+    period = int(params["period"])
+    # Exponential averages need several periods to forget their seed
+    return period * 4 if name in ("ema", "rsi", "atr") else period
+
+
+def _nan(n: int) -> np.ndarray:
+    return np.full(n, np.nan)
+
+
+def _rolling_sum(x: np.ndarray, n: int) -> np.ndarray:
+    out = _nan(len(x))
+    if len(x) >= n:
+        c = np.cumsum(np.r_[0.0, x])
+        out[n - 1:] = c[n:] - c[:-n]
+    return out
+
+
+def sma(close: np.ndarray, period: int) -> np.ndarray:
+    return _rolling_sum(close, period) / period
+
+
+def ewm(x: np.ndarray, alpha: float, start: int, seed: float) -> np.ndarray:
+    """``y[t] = (1 - alpha) * y[t-1] + alpha * x[t]`` from ``y[start] = seed``.
+
+    Evaluated in closed form per block; blocks are sized so the rescaling
+    factors stay within float64 range.
+    """
+    out = _nan(len(x))
+    if start >= len(x):
+        return out
+    out[start] = seed
+    decay = 1.0 - alpha
+    if decay <= 0:
+        out[start + 1:] = x[start + 1:]
+        return out
+
+    block = max(1, int(_MAX_LOG10_SCALE / -math.log10(decay)))
+    prev = seed
+    i = start + 1
+    while i < len(x):
+        chunk = x[i:i + block]
+        k = np.arange(1, len(chunk) + 1)
+        powers = decay ** k
+        # y_k = decay^k * prev + alpha * sum_{j<=k} decay^(k-j) x_j
+        values = powers * (prev + alpha * np.cumsum(chunk / powers))
+        out[i:i + len(chunk)] = values
+        prev = values[-1]
+        i += len(chunk)
+    return out
+
+
+def ema(close: np.ndarray, period: int) -> np.ndarray:
+    if len(close) == 0:
+        return _nan(0)
+    return ewm(close, 2.0 / (period + 1), 0, float(close[0]))
+
+
+def _wilder(x: np.ndarray, period: int, offset: int = 0) -> np.ndarray:
+    """Wilder smoothing seeded with the mean of the first ``period`` values."""
+    start = offset + period - 1
+    if start >= len(x):
+        return _nan(len(x))
+    return ewm(x, 1.0 / period, start, float(np.mean(x[offset:start + 1])))
+
+
+def rsi(close: np.ndarray, period: int) -> np.ndarray:
+    change = np.diff(close, prepend=np.nan)
+    gain = np.where(change > 0, change, 0.0)
+    loss = np.where(change < 0, -change, 0.0)
+    avg_gain = _wilder(gain, period, offset=1)
+    avg_loss = _wilder(loss, period, offset=1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        value = 100.0 - 100.0 / (1.0 + avg_gain / avg_loss)
+    return np.where((avg_loss == 0) & ~np.isnan(avg_gain), 100.0, value)
+
+
+def atr(high: np.ndarray, low: np.ndarray, close: np.ndarray, period: int) -> np.ndarray:
+    prev_close = np.r_[np.nan, close[:-1]]
+    true_range = np.fmax(high - low, np.fmax(np.abs(high - prev_close), np.abs(low - prev_close)))
+    return _wilder(true_range, period)
+
+
+def bollinger(close: np.ndarray, period: int, stddev: float) -> tuple[np.ndarray, ...]:
+    middle = sma(close, period)
+    mean_sq = _rolling_sum(close * close, period) / period
+    std = np.sqrt(np.maximum(mean_sq - middle * middle, 0.0))
+    return middle + stddev * std, middle, middle - stddev * std
+
+
+def compute(name: str, params: dict[str, float], bars: dict[str, np.ndarray]) -> dict[str, np.ndarray]:
+    """Run one indicator over resampled bar columns."""
+    period = int(params["period"])
+    close = bars["close"]
+    if name == "sma":
+        return {"value": sma(close, period)}
+    if name == "ema":
+        return {"value": ema(close, period)}
+    if name == "rsi":
+        return {"value": rsi(close, period)}
+    if name == "atr":
+        return {"value": atr(bars["high"], bars["low"], close, period)}
+    upper, middle, lower = bollinger(close, period, float(params["stddev"]))
+    return {"upper": upper, "middle": middle, "lower": lower}
+
+
+def tail_values(series: np.ndarray, tail: int) -> Any:
+    """Last value, or the last ``tail`` values, with NaN as None."""
+    values = [None if math.isnan(v) else round(v, 6) for v in series[-tail:].tolist()]
+    return values[-1] if tail == 1 and values else values
+
+
+class IndicatorCache:
+    """LRU memo of indicator results keyed by contract, interval, parameters,
+    bar count and last bar timestamp."""
+
+    def __init__(self, max_entries: int = DEFAULT_CACHE_ENTRIES):
+        self.max_entries = max_entries
+        self._entries: OrderedDict[tuple, dict[str, np.ndarray]] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get_or_compute(
+        self, key: tuple, func: Callable[[], dict[str, np.ndarray]]
+    ) -> dict[str, np.ndarray]:
+        with self._lock:
+            result = self._entries.get(key)
+            if result is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return result
+            self.misses += 1
+        result = func()
+        with self._lock:
+            self._entries[key] = result
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return result
+
+    def stats(self) -> dict[str, int]:
+        return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+
+# Global indicator cache instance
+indicator_cache = IndicatorCache()
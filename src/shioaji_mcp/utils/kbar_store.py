@@ -0,0 +1,246 @@
+"""Local columnar K-bar store with incremental fetching."""
+
+import logging
+import os
+import struct
+import threading
+from array import array
+from collections.abc import AsyncIterator, Awaitable, Callable
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+
+from .contract_cache import default_cache_dir, trading_date
+from .resample import trading_day_numbers
+
+logger = logging.getLogger(__name__)
+
+# Column names and array typecodes, matching shioaji.data.Kbars
+KBAR_COLUMNS = [
+    ("ts", "q"),
+    ("Open", "d"),
+    ("High", "d"),
+    ("Low", "d"),
+    ("Close", "d"),
+    ("Volume", "q"),
+    ("Amount", "d"),
+]
+
+_MAGIC = b"KBAR"
+# Version 2 files put night-session bars past midnight on the next weekday
+_FORMAT_VERSION = 2
+_HEADER = struct.Struct("<4sHI")
+
+# Longest date range requested from the broker in one kbars call
+FETCH_WINDOW_DAYS = 31
+
+def empty_columns() -> dict[str, array]:
+    """Return an empty set of K-bar columns."""
+    return {name: array(code) for name, code in KBAR_COLUMNS}
+
+
+_EPOCH = date(1970, 1, 1)
+
+
+def bar_trading_day(ts: int) -> date:
+    """Return the trading day a bar timestamp belongs to.
+
+    Uses the resampler's rule, so stored days and daily bars agree: TAIFEX
+    night-session bars (15:00 onwards, and past midnight into Saturday)
+    belong to the next weekday.
+    """
+    return _EPOCH + timedelta(days=int(trading_day_numbers(np.array([ts], dtype=np.int64))[0]))
+
+
+def date_range(start: date, end: date) -> list[date]:
+    """Return all calendar dates from ``start`` to ``end`` inclusive."""
+    return [start + timedelta(days=i) for i in range((end - start).days + 1)]
+
+
+def contiguous_runs(days: list[date]) -> list[tuple[date, date]]:
+    """Group sorted dates into (first, last) runs of consecutive days."""
+    runs: list[tuple[date, date]] = []
+    for day in days:
+        if runs and day - runs[-1][1] == timedelta(days=1):
+            runs[-1] = (runs[-1][0], day)
+        else:
+            runs.append((day, day))
+    return runs
+
+
+def split_by_day(columns: dict[str, Any]) -> dict[date, dict[str, array]]:
+    """Split fetched K-bar columns into per-trading-day columns."""
+    days: dict[date, dict[str, array]] = {}
+    day_numbers = trading_day_numbers(np.asarray(columns["ts"], dtype=np.int64)).tolist()
+    for i, number in enumerate(day_numbers):
+        day = _EPOCH + timedelta(days=number)
+        day_columns = days.get(day)
+        if day_columns is None:
+            day_columns = days[day] = empty_columns()
+        for name, _ in KBAR_COLUMNS:
+            day_columns[name].append(columns[name][i])
+    return days
+
+
+class KBarStore:
+    """Per-contract directory of immutable, columnar per-day K-bar files.
+
+    Only days before the current trading date are persisted; those bars never
+    change once the session has closed. Empty days (weekends, holidays) are
+    stored too so they are not requested again.
+    """
+
+    def __init__(self, root: Path | None = None):
+        self.root = Path(root) if root else default_cache_dir() / "kbars"
+        self._days: dict[str, set[date]] = {}
+        self._lock = threading.Lock()
+
+    def _contract_dir(self, code: str) -> Path:
+        return self.root / code.replace("/", "_")
+
+    def _day_path(self, code: str, day: date) -> Path:
+        return self._contract_dir(code) / f"{day.isoformat()}.bin"
+
+    def stored_days(self, code: str) -> set[date]:
+        """Return the trading days already stored for ``code``."""
+        with self._lock:
+            days = self._days.get(code)
+            if days is None:
+                days = set()
+                directory = self._contract_dir(code)
+                if directory.is_dir():
+                    for path in directory.glob("*.bin"):
+                        try:
+                            days.add(date.fromisoformat(path.stem))
+                        except ValueError:
+                            continue
+                self._days[code] = days
+            return set(days)
+
+    def write_day(self, code: str, day: date, columns: dict[str, Any]) -> None:
+        """Persist one completed trading day from arrays or plain sequences."""
+        path = self._day_path(code, day)
+        tmp_path = path.with_suffix(".tmp")
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with tmp_path.open("wb") as f:
+            f.write(_HEADER.pack(_MAGIC, _FORMAT_VERSION, len(columns["ts"])))
+            for name, typecode in KBAR_COLUMNS:
+                column = columns[name]
+                if not isinstance(column, array):
+                    column = array(typecode, column)
+                f.write(column.tobytes())
+        os.replace(tmp_path, path)
+        with self._lock:
+            self._days.setdefault(code, set()).add(day)
+
+    def read_day(self, code: str, day: date) -> dict[str, array]:
+        """Read one stored trading day."""
+        data = self._day_path(code, day).read_bytes()
+        magic, version, count = _HEADER.unpack_from(data)
+        if magic != _MAGIC or version != _FORMAT_VERSION:
+            raise ValueError(f"Unsupported K-bar file for {code} {day}")
+
+        columns = {}
+        offset = _HEADER.size
+        for name, typecode in KBAR_COLUMNS:
+            column = array(typecode)
+            size = column.itemsize * count
+            column.frombytes(data[offset:offset + size])
+            offset += size
+            columns[name] = column
+        return columns
+
+    def forget(self, code: str, day: date) -> None:
+        """Drop a stored day, e.g. after a read error."""
+        self._day_path(code, day).unlink(missing_ok=True)
+        with self._lock:
+            self._days.get(code, set()).discard(day)
+
+    async def _fetch_run(
+        self,
+        code: str,
+        first: date,
+        last: date,
+        fetch: Callable[[date, date], Awaitable[dict[str, Any]]],
+        today: date,
+    ) -> dict[date, dict[str, array]]:
+        """Fetch ``first``..``last`` and persist the completed days."""
+        by_day = split_by_day(await fetch(first, last))
+        fetched = {}
+        for day in date_range(first, last):
+            day_columns = by_day.get(day, empty_columns())
+            fetched[day] = day_columns
+            if day < today:
+                try:
+                    self.write_day(code, day, day_columns)
+                except OSError as e:
+                    logger.warning(f"Failed to store K-bars for {code} {day}: {e}")
+        return fetched
+
+    async def iter_days(
+        self,
+        code: str,
+        start: date,
+        end: date,
+        fetch: Callable[[date, date], Awaitable[dict[str, Any]]],
+        today: date | None = None,
+        window_days: int = FETCH_WINDOW_DAYS,
+    ) -> AsyncIterator[tuple[date, dict[str, array]]]:
+        """Yield (day, columns) for ``start``..``end`` in order.
+
+        Stored days are read one at a time and missing days are fetched in
+        runs of at most ``window_days``, so memory stays bounded by the window
+        however long the range is. Consumers may stop early.
+        """
+        today = today or trading_date()
+        days = date_range(start, end)
+        stored = self.stored_days(code)
+
+        def is_missing(day: date) -> bool:
+            return day not in stored or day >= today
+
+        fetched: dict[date, dict[str, array]] = {}
+        for i, day in enumerate(days):
+            if day not in fetched and is_missing(day):
+                last = day
+                for next_day in days[i + 1:i + window_days]:
+                    if not is_missing(next_day):
+                        break
+                    last = next_day
+                fetched = await self._fetch_run(code, day, last, fetch, today)
+
+            day_columns = fetched.pop(day, None)
+            if day_columns is None:
+                try:
+                    day_columns = self.read_day(code, day)
+                except (OSError, ValueError, struct.error) as e:
+                    logger.warning(f"Discarding K-bar file for {code} {day}: {e}")
+                    self.forget(code, day)
+                    day_columns = split_by_day(await fetch(day, day)).get(
+                        day, empty_columns()
+                    )
+            yield day, day_columns
+
+    async def get(
+        self,
+        code: str,
+        start: date,
+        end: date,
+        fetch: Callable[[date, date], Awaitable[dict[str, Any]]],
+        today: date | None = None,
+    ) -> dict[str, array]:
+        """Return K-bar columns for ``start``..``end``, fetching only gaps.
+
+        ``fetch(first, last)`` must return broker columns for that range.
+        """
+        result = empty_columns()
+        async for _, day_columns in self.iter_days(code, start, end, fetch, today):
+            for name, _ in KBAR_COLUMNS:
+                result[name].extend(day_columns[name])
+        return result
+
+
+# Global K-bar store instance
+kbar_store = KBarStore()
@@ -0,0 +1,274 @@
+"""Columnar table of the latest market state for the whole stock universe."""
+
+import asyncio
+import logging
+import math
+import operator
+import re
+import threading
+import time
+from collections.abc import Awaitable, Callable
+from typing import Any
+
+import numpy as np
+
+from .quote_engine import QuoteEngine, quote_engine
+
+logger = logging.getLogger(__name__)
+
+# Raw columns filled from contracts (static) and snapshots (live)
+STATIC_COLUMNS = ["reference", "limit_up", "limit_down"]
+LIVE_COLUMNS = [
+    "open", "high", "low", "close", "total_volume", "yesterday_volume",
+    "total_amount", "buy_price", "sell_price",
+]
+
+# Live columns a subscribed tick can overwrite
+TICK_COLUMNS = ["open", "high", "low", "close", "total_volume", "total_amount"]
+
+# Fields available to filters, sorting and output
+SCAN_FIELDS = [
+    "close", "open", "high", "low", "reference", "limit_up", "limit_down",
+    "change_pct", "gap_pct", "range_pct", "volume_ratio", "total_volume",
+    "total_amount", "limit_up_distance_pct", "limit_down_distance_pct",
+]
+
+UNIVERSES = ["stocks", "etfs", "all"]
+
+_OPERATORS = {
+    ">": operator.gt,
+    ">=": operator.ge,
+    "<": operator.lt,
+    "<=": operator.le,
+    "==": operator.eq,
+    "!=": operator.ne,
+}
+_FILTER_PATTERN = re.compile(r"^\s*([a-z_]+)\s*(>=|<=|==|!=|>|<)\s*(-?\d+(?:\.\d+)?)\s*$")
+
+# Exchanges whose listings make up the scanner universe
+_EXCHANGES = {"TSE", "OTC"}
+
+
+def in_universe(record: dict[str, Any], universe: str) -> bool:
+    """Whether a catalog record belongs to ``universe``."""
+    if record.get("exchange") not in _EXCHANGES:
+        return False
+    code: str = record["code"]
+    if universe == "stocks":
+        return len(code) == 4 and not code.startswith("00")
+    if universe == "etfs":
+        return code.startswith("00")
+    return True
+
+
+def parse_filter(spec: Any) -> tuple[str, Callable[[Any, Any], Any], float]:
+    """Parse ``"change_pct >= 3"`` or ``{"field", "op", "value"}``."""
+    if isinstance(spec, str):
+        match = _FILTER_PATTERN.match(spec.lower())
+        if not match:
+            raise ValueError(f"Invalid filter: {spec!r}. Use e.g. 'change_pct >= 3'")
+        field, op, value = match.group(1), match.group(2), float(match.group(3))
+    elif isinstance(spec, dict):
+        field, op, raw = spec.get("field"), spec.get("op", ">="), spec.get("value")
+        if not isinstance(raw, int | float):
+            raise ValueError(f"Invalid filter value: {spec!r}")
+        value = float(raw)
+    else:
+        raise ValueError(f"Invalid filter: {spec!r}")
+    if field not in SCAN_FIELDS:
+        raise ValueError(f"Unknown field: {field}. Use any of {', '.join(SCAN_FIELDS)}")
+    if op not in _OPERATORS:
+        raise ValueError(f"Unknown operator: {op}. Use any of {', '.join(_OPERATORS)}")
+    return field, _OPERATORS[op], float(value)
+
+
+def parse_sort(sort: str | None) -> tuple[str, bool]:
+    """Parse ``"-change_pct"`` into (field, descending)."""
+    sort = (sort or "-change_pct").strip()
+    descending = sort.startswith("-")
+    field = sort.lstrip("+-")
+    if field not in SCAN_FIELDS:
+        raise ValueError(f"Unknown sort field: {field}. Use any of {', '.join(SCAN_FIELDS)}")
+    return field, descending
+
+
+def _number(value: Any) -> float:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return np.nan
+
+
+def _pct(numerator: np.ndarray, denominator: np.ndarray) -> np.ndarray:
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(denominator > 0, numerator / denominator * 100, np.nan)
+
+
+class MarketTable:
+    """Latest snapshot of every contract in the universe, one array per column.
+
+    Rows are refreshed in bulk from snapshot batches and updated in place by
+    the quote subscription feed, so scans are a handful of NumPy operations
+    over the whole universe.
+    """
+
+    def __init__(self, engine: QuoteEngine | None = None):
+        self.universe: str | None = None
+        self.codes: list[str] = []
+        self.names: list[str] = []
+        self.exchanges: list[str] = []
+        self._exchange_array = np.array([], dtype=object)
+        self.contracts: list[Any] = []
+        self._rows: dict[str, int] = {}
+        self.columns: dict[str, np.ndarray] = {}
+        self.refreshed_at: float | None = None
+        self._inflight: asyncio.Future | None = None
+        self._lock = threading.Lock()
+        self.engine = engine
+        if engine is not None:
+            engine.add_listener(self.on_quote)
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+    def age(self) -> float | None:
+        """Seconds since the last bulk refresh."""
+        if self.refreshed_at is None:
+            return None
+        return time.monotonic() - self.refreshed_at
+
+    def build(self, universe: str, records: list[dict[str, Any]], contracts: list[Any]) -> None:
+        """Reset the table to ``records`` with static columns from ``contracts``."""
+        with self._lock:
+            self.universe = universe
+            self.codes = [record["code"] for record in records]
+            self.names = [record.get("name", "") for record in records]
+            self.exchanges = [record.get("exchange", "") for record in records]
+            self._exchange_array = np.array(self.exchanges, dtype=object)
+            self.contracts = list(contracts)
+            self._rows = {code: i for i, code in enumerate(self.codes)}
+            self.columns = {
+                name: np.full(len(records), np.nan) for name in STATIC_COLUMNS + LIVE_COLUMNS
+            }
+            for i, contract in enumerate(contracts):
+                for name in STATIC_COLUMNS:
+                    self.columns[name][i] = _number(getattr(contract, name, None))
+            self.refreshed_at = None
+
+    def apply_snapshots(self, snapshots: dict[str, Any]) -> int:
+        """Write SDK snapshots keyed by code into their rows.
+
+        Failed lookups (exceptions) are skipped; returns the rows updated.
+        """
+        updated = 0
+        with self._lock:
+            for code, snapshot in snapshots.items():
+                i = self._rows.get(code)
+                if i is None or isinstance(snapshot, Exception):
+                    continue
+                for name in LIVE_COLUMNS:
+                    self.columns[name][i] = _number(getattr(snapshot, name, None))
+                updated += 1
+        return updated
+
+    def on_quote(self, code: str) -> None:
+        """Quote engine listener: fold the latest subscribed tick into its row."""
+        i = self._rows.get(code)
+        if i is None or self.engine is None:
+            return
+        tick = self.engine.get(code).get("tick")
+        if not tick:
+            return
+        with self._lock:
+            for name in TICK_COLUMNS:
+                if tick.get(name) is not None:
+                    self.columns[name][i] = _number(tick[name])
+
+    async def refresh(
+        self,
+        fetch_chunk: Callable[[list[tuple[str, Any]]], Awaitable[dict[str, Any]]],
+        batch_size: int,
+    ) -> int:
+        """Reload every row through concurrent snapshot batches.
+
+        ``fetch_chunk`` receives ``(code, contract)`` pairs and returns
+        snapshots (or exceptions) keyed by code. Concurrent callers share
+        one refresh. Returns the rows updated.
+        """
+        if self._inflight is not None:
+            return await asyncio.shield(self._inflight)
+
+        self._inflight = asyncio.get_running_loop().create_future()
+        started = time.perf_counter()
+        updated = 0
+        try:
+            pairs = list(zip(self.codes, self.contracts, strict=True))
+            chunks = [pairs[i:i + batch_size] for i in range(0, len(pairs), batch_size)]
+            for result in await asyncio.gather(*(fetch_chunk(chunk) for chunk in chunks)):
+                updated += self.apply_snapshots(result)
+            self.refreshed_at = time.monotonic()
+            elapsed = (time.perf_counter() - started) * 1000
+            logger.info(f"Refreshed {updated}/{len(pairs)} market rows in {elapsed:.0f} ms")
+            return updated
+        finally:
+            self._inflight.set_result(updated)
+            self._inflight = None
+
+    def derived(self) -> dict[str, np.ndarray]:
+        """Raw and derived columns over the whole table."""
+        c = self.columns
+        return {
+            **c,
+            "change_pct": _pct(c["close"] - c["reference"], c["reference"]),
+            "gap_pct": _pct(c["open"] - c["reference"], c["reference"]),
+            "range_pct": _pct(c["high"] - c["low"], c["reference"]),
+            "volume_ratio": np.where(
+                c["yesterday_volume"] > 0,
+                c["total_volume"] / np.where(c["yesterday_volume"] > 0, c["yesterday_volume"], 1),
+                np.nan,
+            ),
+            "limit_up_distance_pct": _pct(c["limit_up"] - c["close"], c["close"]),
+            "limit_down_distance_pct": _pct(c["close"] - c["limit_down"], c["close"]),
+        }
+
+    def scan(
+        self,
+        filters: list[tuple[str, Callable[[Any, Any], Any], float]],
+        sort: tuple[str, bool],
+        limit: int,
+        fields: list[str],
+        exchange: str | None = None,
+    ) -> tuple[list[dict[str, Any]], int]:
+        """Filter, sort and return the top ``limit`` rows and the match count."""
+        with self._lock:
+            data = self.derived()
+            # Rows without a price have not traded or were never refreshed
+            mask = ~np.isnan(data["close"])
+            if exchange:
+                mask &= self._exchange_array == exchange.upper()
+            with np.errstate(invalid="ignore"):
+                for field, op, value in filters:
+                    mask &= op(data[field], value)
+            matches = np.flatnonzero(mask)
+
+            key_field, descending = sort
+            keys = data[key_field][matches]
+            # NaN keys sort last either way
+            keys = np.where(np.isnan(keys), -np.inf if descending else np.inf, keys)
+            order = np.argsort(-keys if descending else keys, kind="stable")
+            top = matches[order[:limit]]
+
+            output = {name: np.round(data[name][top], 4).tolist() for name in fields}
+            rows = []
+            for j, i in enumerate(top.tolist()):
+                row = {"code": self.codes[i], "name": self.names[i], "exchange": self.exchanges[i]}
+                for name in fields:
+                    value = output[name][j]
+                    row[name] = None if math.isnan(value) else value
+                rows.append(row)
+        return rows, len(matches)
+
+
+# One table per universe, so concurrent scans of different universes never
+# rebuild each other's rows mid-refresh
+market_tables = {universe: MarketTable(quote_engine) for universe in UNIVERSES}
@@ -0,0 +1,272 @@
+"""Latency and size histograms for tool calls, broker calls and encoding.
+
+Histograms use fixed cumulative buckets, the same model Prometheus scrapes,
+so percentiles are estimated from bucket counts and recording a value is a
+bisect plus two additions under a lock.
+"""
+
+import asyncio
+import logging
+import os
+import threading
+import time
+from bisect import bisect_left
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from typing import Any
+
+logger = logging.getLogger(__name__)
+
+# Prefix of every exported metric name
+NAMESPACE = "shioaji_mcp"
+
+# Upper bounds of latency buckets, in seconds
+LATENCY_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+    0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0,
+)
+# Upper bounds of payload size buckets, in bytes
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+# Percentiles reported by ``Metrics.summary``
+QUANTILES = (0.5, 0.9, 0.99)
+
+DEFAULT_LOOP_MONITOR_INTERVAL_MS = 500
+
+
+def _escape(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labels: tuple[tuple[str, str], ...]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in labels) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Histogram:
+    """Cumulative-bucket histogram of observed values."""
+
+    def __init__(self, buckets: tuple[float, ...]):
+        self.buckets = tuple(buckets)
+        self._counts = [0] * (len(self.buckets) + 1)
+        self._lock = threading.Lock()
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float) -> None:
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            self._counts[index] += 1
+            self.count += 1
+            self.sum += value
+            if value > self.max:
+                self.max = value
+
+    def cumulative(self) -> list[tuple[float, int]]:
+        """``(upper bound, count of values <= bound)`` pairs, ending with +Inf."""
+        with self._lock:
+            counts = list(self._counts)
+        total = 0
+        result = []
+        for bound, count in zip((*self.buckets, float("inf")), counts, strict=True):
+            total += count
+            result.append((bound, total))
+        return result
+
+    def quantile(self, q: float) -> float | None:
+        """Estimate a quantile by interpolating inside its bucket."""
+        with self._lock:
+            counts = list(self._counts)
+            total = self.count
+            largest = self.max
+        if not total:
+            return None
+        rank = q * total
+        seen = 0
+        lower = 0.0
+        for index, count in enumerate(counts):
+            upper = self.buckets[index] if index < len(self.buckets) else largest
+            if count and seen + count >= rank:
+                upper = min(upper, largest)
+                return lower + (upper - lower) * (rank - seen) / count
+            seen += count
+            lower = upper
+        return largest
+
+
+class Metrics:
+    """Registry of labelled histograms and scraped component stats."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        # name -> (description, buckets)
+        self._histogram_specs: dict[str, tuple[str, tuple[float, ...]]] = {}
+        self._histograms: dict[str, dict[tuple[tuple[str, str], ...], Histogram]] = {}
+        # name -> (stats function, label for the first level of nested stats)
+        self._stats: dict[str, tuple[Callable[[], dict[str, Any]], str | None]] = {}
+        self.started_at = time.time()
+
+    def histogram(
+        self, name: str, description: str, buckets: tuple[float, ...] = LATENCY_BUCKETS
+    ) -> None:
+        """Declare a histogram; names ending in ``_seconds`` are latencies."""
+        with self._lock:
+            self._histogram_specs[name] = (description, tuple(buckets))
+            self._histograms.setdefault(name, {})
+
+    def observe(self, name: str, value: float, **labels: Any) -> None:
+        """Record ``value`` in histogram ``name``."""
+        key = tuple(sorted((k, str(v)) for k, v in labels.items()))
+        series = self._histograms[name]
+        histogram = series.get(key)
+        if histogram is None:
+            with self._lock:
+                histogram = series.setdefault(key, Histogram(self._histogram_specs[name][1]))
+        histogram.observe(value)
+
+    @contextmanager
+    def timer(self, name: str, **labels: Any) -> Iterator[None]:
+        """Time a block into histogram ``name``."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - started, **labels)
+
+    def register_stats(
+        self, name: str, stats: Callable[[], dict[str, Any]], label: str | None = None
+    ) -> None:
+        """Export a component's ``stats()`` as gauges at scrape time.
+
+        Numeric values become ``<namespace>_<name>_<key>`` gauges. For
+        stats nested one level deep (per category, per session), the outer
+        key becomes the ``label`` label.
+        """
+        with self._lock:
+            self._stats[name] = (stats, label)
+
+    def _collect_stats(self) -> dict[str, Any]:
+        with self._lock:
+            sources = dict(self._stats)
+        collected = {}
+        for name, (stats, _) in sources.items():
+            try:
+                collected[name] = stats()
+            except Exception as e:
+                logger.warning(f"Collecting {name} metrics failed: {e}")
+        return collected
+
+    def _gauges(self, collected: dict[str, Any]) -> dict[str, list[tuple[tuple[tuple[str, str], ...], float]]]:
+        gauges: dict[str, list[tuple[tuple[tuple[str, str], ...], float]]] = {}
+        for name, values in collected.items():
+            label = self._stats[name][1]
+            for key, value in values.items():
+                if label and isinstance(value, dict):
+                    for field, inner in value.items():
+                        if isinstance(inner, int | float) and not isinstance(inner, bool):
+                            gauges.setdefault(f"{name}_{field}", []).append((((label, str(key)),), inner))
+                elif isinstance(value, int | float) and not isinstance(value, bool):
+                    gauges.setdefault(f"{name}_{key}", []).append(((), value))
+        return gauges
+
+    def render_prometheus(self) -> str:
+        """Render every metric in the Prometheus text exposition format."""
+        lines = []
+        with self._lock:
+            histograms = {name: dict(series) for name, series in self._histograms.items()}
+
+        for name, series in histograms.items():
+            full = f"{NAMESPACE}_{name}"
+            lines.append(f"# HELP {full} {self._histogram_specs[name][0]}")
+            lines.append(f"# TYPE {full} histogram")
+            for labels, histogram in sorted(series.items()):
+                for bound, count in histogram.cumulative():
+                    bucket_labels = (*labels, ("le", _format_value(float(bound))))
+                    lines.append(f"{full}_bucket{_format_labels(bucket_labels)} {count}")
+                lines.append(f"{full}_sum{_format_labels(labels)} {_format_value(histogram.sum)}")
+                lines.append(f"{full}_count{_format_labels(labels)} {histogram.count}")
+
+        for name, samples in self._gauges(self._collect_stats()).items():
+            full = f"{NAMESPACE}_{name}"
+            lines.append(f"# TYPE {full} gauge")
+            for labels, value in samples:
+                lines.append(f"{full}{_format_labels(labels)} {_format_value(value)}")
+
+        lines.append(f"# TYPE {NAMESPACE}_uptime_seconds gauge")
+        lines.append(f"{NAMESPACE}_uptime_seconds {_format_value(time.time() - self.started_at)}")
+        return "\n".join(lines) + "\n"
+
+    def summary(self) -> dict[str, Any]:
+        """Percentiles of every histogram and component stats as JSON.
+
+        Latencies are reported in milliseconds, sizes in bytes.
+        """
+        with self._lock:
+            histograms = {name: dict(series) for name, series in self._histograms.items()}
+
+        result: dict[str, Any] = {"uptime_s": round(time.time() - self.started_at, 1)}
+        for name, series in histograms.items():
+            latency = name.endswith("_seconds")
+            scale, unit = (1000, "ms") if latency else (1, "bytes")
+            key = name.removesuffix("_seconds")
+            rows = []
+            for labels, histogram in sorted(series.items()):
+                if not histogram.count:
+                    continue
+                row: dict[str, Any] = dict(labels)
+                row["count"] = histogram.count
+                row[f"mean_{unit}"] = round(histogram.sum / histogram.count * scale, 3)
+                for q in QUANTILES:
+                    row[f"p{round(q * 100)}_{unit}"] = round((histogram.quantile(q) or 0.0) * scale, 3)
+                row[f"max_{unit}"] = round(histogram.max * scale, 3)
+                rows.append(row)
+            result[key] = rows
+        result.update(self._collect_stats())
+        return result
+
+    def reset(self) -> None:
+        """Drop every recorded value (component stats are left alone)."""
+        with self._lock:
+            for series in self._histograms.values():
+                series.clear()
+            self.started_at = time.time()
+
+    async def monitor_event_loop(self, interval: float | None = None) -> None:
+        """Record how late the event loop wakes up from a sleep, until cancelled.
+
+        A blocking call made on the loop shows up here as lag.
+        """
+        if interval is None:
+            try:
+                interval = int(os.getenv(
+                    "SHIOAJI_LOOP_MONITOR_INTERVAL_MS", DEFAULT_LOOP_MONITOR_INTERVAL_MS
+                )) / 1000
+            except ValueError:
+                interval = DEFAULT_LOOP_MONITOR_INTERVAL_MS / 1000
+        if interval <= 0:
+            return
+        loop = asyncio.get_running_loop()
+        while True:
+            started = loop.time()
+            await asyncio.sleep(interval)
+            self.observe("event_loop_lag_seconds", max(0.0, loop.time() - started - interval))
+
+
+# Global metrics registry
+metrics = Metrics()
+metrics.histogram("tool_duration_seconds", "Tool call latency by tool and status")
+metrics.histogram("tool_response_bytes", "Tool response size by tool", SIZE_BUCKETS)
+metrics.histogram("rate_limit_wait_seconds", "Time broker calls waited for a rate limit token")
+metrics.histogram("broker_queue_seconds", "Time broker calls waited for an executor worker")
+metrics.histogram("broker_call_duration_seconds", "Broker SDK call latency by category, method and status")
+metrics.histogram("serialize_duration_seconds", "Response encoding time by format")
+metrics.histogram("serialize_bytes", "Encoded response size by format", SIZE_BUCKETS)
+metrics.histogram("event_loop_lag_seconds", "Event loop wake-up delay")
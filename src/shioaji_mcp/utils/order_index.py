@@ -0,0 +1,242 @@
+"""In-memory order and trade state maintained from order callbacks."""
+
+import logging
+import threading
+from typing import Any
+
+from .executor import run_sdk
+
+logger = logging.getLogger(__name__)
+
+# Order lifecycle; a record never moves to an earlier stage, and terminal
+# statuses are final. Unknown statuses rank with Submitted.
+STATUS_STAGES = {
+    "PendingSubmit": 0,
+    "PreSubmitted": 1,
+    "Submitted": 2,
+    "PartFilled": 3,
+    "Filled": 4,
+    "Cancelled": 4,
+    "Failed": 4,
+}
+_TERMINAL_STAGE = 4
+
+
+def _stage(status: Any) -> int:
+    return STATUS_STAGES.get(status, STATUS_STAGES["Submitted"])
+
+
+def _value(value: Any) -> Any:
+    """Plain value of an SDK enum or the value itself."""
+    return getattr(value, "value", value)
+
+
+def _timestamp(value: Any) -> Any:
+    return value.isoformat() if hasattr(value, "isoformat") else value
+
+
+def format_trade(trade: Any) -> dict[str, Any]:
+    """Convert an SDK trade to an order record."""
+    order, status = trade.order, trade.status
+    return {
+        "order_id": order.id,
+        "account": getattr(getattr(order, "account", None), "account_id", None),
+        "contract": getattr(trade.contract, "code", str(trade.contract)),
+        "action": _value(order.action),
+        "quantity": order.quantity,
+        "price": order.price,
+        "status": _value(status.status),
+        "deal_quantity": getattr(status, "deal_quantity", 0) or 0,
+        "cancel_quantity": getattr(status, "cancel_quantity", 0) or 0,
+        "timestamp": _timestamp(getattr(status, "order_datetime", None)),
+    }
+
+
+class OrderIndex:
+    """Orders indexed by id, contract and status.
+
+    Seeded once per API session from ``list_trades`` and kept current by the
+    SDK order callback, so lookups and listings never go back to the broker.
+    The SDK trade objects are kept alongside the records for cancellation.
+    """
+
+    def __init__(self) -> None:
+        self._records: dict[str, dict[str, Any]] = {}
+        self._trades: dict[str, Any] = {}
+        self._by_contract: dict[str, set[str]] = {}
+        self._by_status: dict[str, set[str]] = {}
+        self._seeded_api: int | None = None
+        self._lock = threading.RLock()
+
+    @property
+    def is_seeded(self) -> bool:
+        return self._seeded_api is not None
+
+    def clear(self) -> None:
+        with self._lock:
+            self._records.clear()
+            self._trades.clear()
+            self._by_contract.clear()
+            self._by_status.clear()
+            self._seeded_api = None
+
+    def seed(self, api: Any) -> int:
+        """Install the order callback and load every trade of the session."""
+        api.set_order_callback(self.on_order)
+        api.update_status()
+        trades = api.list_trades()
+        with self._lock:
+            for trade in trades:
+                self.track(trade)
+            self._seeded_api = id(api)
+        logger.info(f"Order index seeded with {len(trades)} trades")
+        return len(trades)
+
+    async def ensure_seeded(self, api: Any, refresh: bool = False) -> None:
+        """Seed from the broker on first use, per session, or when asked to."""
+        if refresh or self._seeded_api != id(api):
+            if self._seeded_api is not None and self._seeded_api != id(api):
+                self.clear()
+            await run_sdk("order", self.seed, api)
+
+    def track(self, trade: Any) -> dict[str, Any]:
+        """Index an SDK trade, merging it into any record callbacks built.
+
+        The order callback can run before ``place_order`` returns, so the
+        trade may be older than the record it merges into.
+        """
+        record = format_trade(trade)
+        order_id = record["order_id"]
+        with self._lock:
+            previous = self._records.get(order_id)
+            if previous is not None:
+                record = self._merge(previous, record)
+            self._trades[order_id] = trade
+            self._store(record)
+            return self._records[order_id]
+
+    @staticmethod
+    def _merge(previous: dict[str, Any], record: dict[str, Any]) -> dict[str, Any]:
+        merged = dict(previous)
+        for key, value in record.items():
+            if value is None:
+                continue
+            if key in ("deal_quantity", "cancel_quantity"):
+                value = max(previous.get(key) or 0, value)
+            merged[key] = value
+        quantity = merged.get("quantity")
+        if (
+            quantity
+            and merged["deal_quantity"] >= quantity
+            and _stage(merged["status"]) < _TERMINAL_STAGE
+        ):
+            merged["status"] = "Filled"
+        return merged
+
+    def _store(self, record: dict[str, Any]) -> None:
+        order_id = record["order_id"]
+        previous = self._records.get(order_id)
+        if previous is not None:
+            stage = _stage(previous["status"])
+            if stage == _TERMINAL_STAGE or _stage(record["status"]) < stage:
+                record["status"] = previous["status"]
+            self._by_status.get(previous["status"], set()).discard(order_id)
+        self._records[order_id] = record
+        self._by_contract.setdefault(record["contract"], set()).add(order_id)
+        self._by_status.setdefault(record["status"], set()).add(order_id)
+
+    def _update(self, order_id: str, **changes: Any) -> None:
+        record = dict(self._records.get(order_id) or {"order_id": order_id})
+        record.update({key: value for key, value in changes.items() if value is not None})
+        record.setdefault("contract", "")
+        record.setdefault("status", "Submitted")
+        self._store(record)
+
+    def on_order(self, state: Any, msg: dict[str, Any]) -> None:
+        """SDK order/deal callback; runs on the SDK thread."""
+        try:
+            with self._lock:
+                if "Deal" in str(getattr(state, "name", state)):
+                    self._apply_deal(msg)
+                else:
+                    self._apply_order_event(msg)
+        except Exception as e:
+            logger.warning(f"Failed to process order event {state}: {e}")
+
+    def _apply_order_event(self, msg: dict[str, Any]) -> None:
+        order = msg.get("order", {})
+        status = msg.get("status", {})
+        operation = msg.get("operation", {})
+        order_id = order.get("id") or status.get("id")
+        if not order_id:
+            return
+
+        op_type = operation.get("op_type")
+        if operation.get("op_code", "00") != "00":
+            new_status = "Failed" if op_type == "New" else None
+        elif op_type == "Cancel":
+            new_status = "Cancelled"
+        else:
+            new_status = None if order_id in self._records else "Submitted"
+
+        self._update(
+            order_id,
+            account=(order.get("account") or {}).get("account_id"),
+            contract=msg.get("contract", {}).get("code"),
+            action=_value(order.get("action")),
+            quantity=order.get("quantity"),
+            price=status.get("modified_price") or order.get("price"),
+            cancel_quantity=status.get("cancel_quantity"),
+            status=new_status,
+            timestamp=_timestamp(status.get("exchange_ts")),
+        )
+
+    def _apply_deal(self, msg: dict[str, Any]) -> None:
+        order_id = msg.get("trade_id")
+        if not order_id:
+            return
+        record = self._records.get(order_id, {})
+        dealt = (record.get("deal_quantity") or 0) + (msg.get("quantity") or 0)
+        quantity = record.get("quantity")
+        status = "Filled" if quantity and dealt >= quantity else "PartFilled"
+        self._update(
+            order_id,
+            account=msg.get("account_id"),
+            contract=msg.get("code"),
+            deal_quantity=dealt,
+            status=status,
+        )
+
+    def get(self, order_id: str) -> dict[str, Any] | None:
+        """Order record by id."""
+        return self._records.get(order_id)
+
+    def get_trade(self, order_id: str) -> Any | None:
+        """SDK trade object by order id, as needed by ``cancel_order``."""
+        return self._trades.get(order_id)
+
+    def find(
+        self,
+        statuses: list[str] | None = None,
+        contract: str | None = None,
+        account: str | None = None,
+    ) -> list[dict[str, Any]]:
+        """Order records filtered by status, contract and account, in insertion order."""
+        with self._lock:
+            ids: set[str] | None = None
+            if statuses:
+                ids = set().union(*(self._by_status.get(status, set()) for status in statuses))
+            if contract:
+                contract_ids = self._by_contract.get(contract, set())
+                ids = contract_ids if ids is None else ids & contract_ids
+            records = [
+                record for order_id, record in self._records.items()
+                if ids is None or order_id in ids
+            ]
+        if account:
+            records = [record for record in records if record.get("account") == account]
+        return records
+
+
+# Global order index instance
+order_index = OrderIndex()
@@ -0,0 +1,30 @@
+"""Opaque cursors for paged tool responses."""
+
+import base64
+import json
+from typing import Any
+
+
+def encode_cursor(state: dict[str, Any]) -> str:
+    """Encode paging state as a URL-safe token."""
+    raw = json.dumps(state, separators=(",", ":"), sort_keys=True).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(token: str, kind: str) -> dict[str, Any]:
+    """Decode a token produced by ``encode_cursor`` for the tool ``kind``."""
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        state = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (ValueError, TypeError):
+        raise ValueError("Invalid cursor") from None
+    if not isinstance(state, dict) or state.get("kind") != kind:
+        raise ValueError("Invalid cursor")
+    return state
+
+
+def next_page_content(token: str | None) -> list[dict[str, str]]:
+    """Extra response content carrying the next page token, if any."""
+    if not token:
+        return []
+    return [{"type": "text", "text": json.dumps({"next_page": token})}]
@@ -0,0 +1,269 @@
+"""Real-time quote subscriptions with server-maintained order books."""
+
+import logging
+import os
+import threading
+import time
+from collections.abc import Callable
+from decimal import Decimal
+from typing import Any
+
+from .executor import run_sdk
+from .shioaji_wrapper import get_shioaji
+
+logger = logging.getLogger(__name__)
+
+QUOTE_TYPES = ["tick", "bidask"]
+
+# The broker allows a limited number of subscriptions per session
+DEFAULT_MAX_SUBSCRIPTIONS = 200
+
+_TICK_FIELDS = [
+    "open", "high", "low", "close", "avg_price", "volume", "total_volume",
+    "amount", "total_amount", "price_chg", "pct_chg", "tick_type", "chg_type",
+    "underlying_price", "simtrade",
+]
+
+
+def _number(value: Any) -> Any:
+    return float(value) if isinstance(value, Decimal) else value
+
+
+def normalize_quote_types(quote_types: list[str] | None) -> list[str]:
+    """Validate requested quote types, defaulting to tick and bidask."""
+    if not quote_types:
+        return list(QUOTE_TYPES)
+    normalized = [quote_type.lower() for quote_type in quote_types]
+    unknown = [quote_type for quote_type in normalized if quote_type not in QUOTE_TYPES]
+    if unknown:
+        raise ValueError(
+            f"Unknown quote types: {', '.join(unknown)}. Use any of {', '.join(QUOTE_TYPES)}"
+        )
+    return normalized
+
+
+def format_tick(tick: Any) -> dict[str, Any]:
+    """Convert an SDK tick (stock or futures/options) to plain values."""
+    data = {"datetime": tick.datetime.isoformat() if tick.datetime else None}
+    for field in _TICK_FIELDS:
+        if hasattr(tick, field):
+            data[field] = _number(getattr(tick, field))
+    return data
+
+
+def format_bidask(bidask: Any) -> dict[str, Any]:
+    """Convert an SDK bid/ask update to a 5-level book."""
+    return {
+        "datetime": bidask.datetime.isoformat() if bidask.datetime else None,
+        "bids": [
+            [_number(price), volume]
+            for price, volume in zip(bidask.bid_price, bidask.bid_volume, strict=False)
+        ],
+        "asks": [
+            [_number(price), volume]
+            for price, volume in zip(bidask.ask_price, bidask.ask_volume, strict=False)
+        ],
+        "simtrade": getattr(bidask, "simtrade", False),
+    }
+
+
+class QuoteEngine:
+    """Latest tick and order book per subscribed contract.
+
+    SDK callbacks write into plain dicts from the quote thread; readers get
+    the last published value without any broker traffic.
+
+    Each broker feed (contract and quote type) is reference counted by owner,
+    e.g. the MCP client that called ``subscribe_quotes`` or the quote resource
+    hub, and is only closed when its last owner releases it.
+    """
+
+    def __init__(self, max_subscriptions: int | None = None):
+        self.max_subscriptions = max_subscriptions or int(
+            os.getenv("SHIOAJI_MAX_SUBSCRIPTIONS", DEFAULT_MAX_SUBSCRIPTIONS)
+        )
+        self._ticks: dict[str, dict[str, Any]] = {}
+        self._books: dict[str, dict[str, Any]] = {}
+        self._updated: dict[str, float] = {}
+        self._subscriptions: dict[str, set[str]] = {}
+        # (code, quote type) -> owners holding the feed open
+        self._owners: dict[tuple[str, str], set[Any]] = {}
+        self._contracts: dict[str, Any] = {}
+        self._listeners: list[Callable[[str], None]] = []
+        self._attached_api: int | None = None
+        self._lock = threading.Lock()
+
+    def add_listener(self, listener: Callable[[str], None]) -> None:
+        """Register a callback invoked with the contract code on every update."""
+        self._listeners.append(listener)
+
+    def attach(self, api: Any) -> None:
+        """Install the SDK quote callbacks once per API session."""
+        if self._attached_api == id(api):
+            return
+        api.quote.set_on_tick_stk_v1_callback(self.on_tick)
+        api.quote.set_on_tick_fop_v1_callback(self.on_tick)
+        api.quote.set_on_bidask_stk_v1_callback(self.on_bidask)
+        api.quote.set_on_bidask_fop_v1_callback(self.on_bidask)
+        self._attached_api = id(api)
+
+    def _publish(self, code: str) -> None:
+        self._updated[code] = time.time()
+        for listener in self._listeners:
+            try:
+                listener(code)
+            except Exception as e:
+                logger.warning(f"Quote listener failed for {code}: {e}")
+
+    def on_tick(self, exchange: Any, tick: Any) -> None:
+        """SDK tick callback."""
+        try:
+            self._ticks[tick.code] = format_tick(tick)
+            self._publish(tick.code)
+        except Exception as e:
+            logger.warning(f"Failed to process tick: {e}")
+
+    def on_bidask(self, exchange: Any, bidask: Any) -> None:
+        """SDK bid/ask callback."""
+        try:
+            self._books[bidask.code] = format_bidask(bidask)
+            self._publish(bidask.code)
+        except Exception as e:
+            logger.warning(f"Failed to process bid/ask: {e}")
+
+    def _sdk_quote_type(self, quote_type: str) -> Any:
+        sj = get_shioaji()
+        return sj.constant.QuoteType.Tick if quote_type == "tick" else sj.constant.QuoteType.BidAsk
+
+    async def subscribe(
+        self, api: Any, contract: Any, quote_types: list[str], owner: Any = None
+    ) -> list[str]:
+        """Subscribe a contract for ``owner``; returns the quote types newly
+        subscribed at the broker."""
+        code = contract.code
+        with self._lock:
+            current = self._subscriptions.get(code, set())
+            if not current and len(self._subscriptions) >= self.max_subscriptions:
+                raise RuntimeError(
+                    f"Subscription limit reached ({self.max_subscriptions} contracts)"
+                )
+            new_types = [quote_type for quote_type in quote_types if quote_type not in current]
+            for quote_type in quote_types:
+                if quote_type in current:
+                    self._owners.setdefault((code, quote_type), set()).add(owner)
+
+        sj = get_shioaji()
+        for quote_type in new_types:
+            await run_sdk(
+                "quote",
+                api.quote.subscribe,
+                contract,
+                quote_type=self._sdk_quote_type(quote_type),
+                version=sj.constant.QuoteVersion.v1,
+            )
+            with self._lock:
+                self._subscriptions.setdefault(code, set()).add(quote_type)
+                self._owners.setdefault((code, quote_type), set()).add(owner)
+                self._contracts[code] = contract
+        return new_types
+
+    async def unsubscribe(
+        self, api: Any, code: str, quote_types: list[str], owner: Any = None
+    ) -> list[str]:
+        """Release ``owner``'s hold on a contract; returns the quote types it
+        released. A feed is unsubscribed at the broker once no owner is left."""
+        with self._lock:
+            contract = self._contracts.get(code)
+            current = self._subscriptions.get(code, set())
+            released, closing = [], []
+            for quote_type in quote_types:
+                owners = self._owners.get((code, quote_type), set())
+                if quote_type not in current or owner not in owners:
+                    continue
+                owners.discard(owner)
+                released.append(quote_type)
+                if not owners:
+                    # Closed from now on: a new owner subscribes at the broker again
+                    self._owners.pop((code, quote_type), None)
+                    current.discard(quote_type)
+                    closing.append(quote_type)
+
+        sj = get_shioaji()
+        for quote_type in closing:
+            try:
+                await run_sdk(
+                    "quote",
+                    api.quote.unsubscribe,
+                    contract,
+                    quote_type=self._sdk_quote_type(quote_type),
+                    version=sj.constant.QuoteVersion.v1,
+                )
+            except BaseException:
+                # The feed is still open; keep the owner's hold on it
+                with self._lock:
+                    current.add(quote_type)
+                    self._owners.setdefault((code, quote_type), set()).add(owner)
+                raise
+
+        with self._lock:
+            if not current:
+                self._subscriptions.pop(code, None)
+                self._contracts.pop(code, None)
+                self._ticks.pop(code, None)
+                self._books.pop(code, None)
+                self._updated.pop(code, None)
+        return released
+
+    async def restore(self, api: Any) -> None:
+        """Re-attach callbacks and replay every subscription on a new session."""
+        with self._lock:
+            subscriptions = [
+                (self._contracts[code], sorted(quote_types))
+                for code, quote_types in self._subscriptions.items()
+            ]
+        self.attach(api)
+
+        sj = get_shioaji()
+        for contract, quote_types in subscriptions:
+            for quote_type in quote_types:
+                try:
+                    await run_sdk(
+                        "quote",
+                        api.quote.subscribe,
+                        contract,
+                        quote_type=self._sdk_quote_type(quote_type),
+                        version=sj.constant.QuoteVersion.v1,
+                    )
+                except Exception as e:
+                    logger.warning(f"Failed to restore {quote_type} subscription for {contract.code}: {e}")
+        if subscriptions:
+            logger.info(f"Restored quote subscriptions for {len(subscriptions)} contracts")
+
+    def subscribed_codes(self) -> list[str]:
+        """Codes with at least one active subscription."""
+        return list(self._subscriptions)
+
+    def owned_codes(self, owner: Any) -> list[str]:
+        """Codes on which ``owner`` holds at least one feed."""
+        with self._lock:
+            return list(dict.fromkeys(
+                code for (code, _), owners in self._owners.items() if owner in owners
+            ))
+
+    def subscription(self, code: str) -> Any | None:
+        """SDK contract for a subscribed code."""
+        return self._contracts.get(code)
+
+    def get(self, code: str) -> dict[str, Any]:
+        """Latest known quote state for ``code``."""
+        return {
+            "code": code,
+            "subscribed": sorted(self._subscriptions.get(code, ())),
+            "tick": self._ticks.get(code),
+            "book": self._books.get(code),
+            "updated_at": self._updated.get(code),
+        }
+
+
+# Global quote engine instance
+quote_engine = QuoteEngine()
@@ -0,0 +1,194 @@
+"""Token-bucket pacing for broker requests."""
+
+import asyncio
+import logging
+import os
+import threading
+import time
+from collections.abc import Callable
+from typing import Any
+
+logger = logging.getLogger(__name__)
+
+# Share of the broker limits per endpoint category, as (requests, window
+# seconds). The broker allows 50 market data queries per 5 seconds, shared by
+# snapshots (quote) and historical data, 25 account queries per 5 seconds and
+# 250 order actions per 10 seconds; each share stays a little below that.
+BROKER_BUDGETS = {
+    "quote": (24, 5.0),
+    "data": (24, 5.0),
+    "order": (240, 10.0),
+    "account": (24, 5.0),
+}
+
+# Steady requests per second per category. The rest of each budget is the
+# burst capacity, see ``burst_capacity``.
+DEFAULT_RATES = {
+    "quote": 4.0,
+    "data": 4.0,
+    "order": 20.0,
+    "account": 4.0,
+}
+
+# Longest a request may queue for a token before it is rejected
+DEFAULT_MAX_WAIT_MS = 30_000
+
+
+class RateLimitExceededError(RuntimeError):
+    """Raised when a request would have to queue longer than allowed."""
+
+
+def burst_capacity(category: str, rate: float) -> float:
+    """Bucket capacity that keeps ``category`` within its broker budget.
+
+    A token bucket admits at most ``capacity + rate * window`` requests in
+    any window, so the capacity is what the steady rate leaves of the budget.
+    """
+    budget = BROKER_BUDGETS.get(category)
+    if budget is None:
+        return max(rate, 1.0)
+    requests, window = budget
+    capacity = requests - rate * window
+    if capacity < 1:
+        logger.warning(
+            f"{category} rate {rate:g}/s exceeds the broker budget of "
+            f"{requests} per {window:g}s"
+        )
+    return max(capacity, 1.0)
+
+
+def _rate_from_env(name: str, default: float) -> float:
+    value = os.getenv(name)
+    if not value:
+        return default
+    try:
+        return max(float(value), 0.01)
+    except ValueError:
+        logger.warning(f"Invalid rate for {name}: {value!r}")
+        return default
+
+
+class TokenBucket:
+    """Token bucket refilling at ``rate`` tokens per second up to ``capacity``.
+
+    Callers reserve a token immediately and sleep until their slot, so waiters
+    are served in arrival order and never fail. Safe to share between event
+    loops and threads.
+    """
+
+    def __init__(
+        self,
+        rate: float,
+        capacity: float | None = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(rate, 1.0)
+        self._clock = clock
+        self._tokens = self.capacity
+        self._updated = clock()
+        self._lock = threading.Lock()
+        self.acquired = 0
+        self.waited = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self.rejected = 0
+
+    def reserve(self) -> float:
+        """Take a token and return how long the caller must wait for it."""
+        with self._lock:
+            now = self._clock()
+            self._tokens = min(
+                self.capacity, self._tokens + (now - self._updated) * self.rate
+            )
+            self._updated = now
+            self._tokens -= 1
+            return max(0.0, -self._tokens / self.rate)
+
+    def release(self) -> None:
+        """Return a reserved token that will not be used."""
+        with self._lock:
+            self._tokens = min(self.capacity, self._tokens + 1)
+
+    def _record(self, delay: float) -> None:
+        with self._lock:
+            self.acquired += 1
+            if delay > 0:
+                self.waited += 1
+                self.total_wait += delay
+                self.max_wait = max(self.max_wait, delay)
+
+    async def acquire(self, max_wait: float | None = None) -> float:
+        """Wait for a token; returns the time spent waiting.
+
+        Raises RateLimitExceededError instead of waiting longer than ``max_wait``.
+        """
+        delay = self.reserve()
+        if max_wait is not None and delay > max_wait:
+            self.release()
+            with self._lock:
+                self.rejected += 1
+            raise RateLimitExceededError(
+                f"Rate limit queue full: next slot in {delay:.1f}s (limit {self.rate:g}/s)"
+            )
+        if delay > 0:
+            try:
+                await asyncio.sleep(delay)
+            except asyncio.CancelledError:
+                # Hand the slot back so later callers don't wait for a call that never ran
+                self.release()
+                raise
+        self._record(delay)
+        return delay
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                "rate": self.rate,
+                "capacity": self.capacity,
+                "acquired": self.acquired,
+                "waited": self.waited,
+                "total_wait_ms": round(self.total_wait * 1000, 3),
+                "max_wait_ms": round(self.max_wait * 1000, 3),
+                "rejected": self.rejected,
+            }
+
+
+class RateGovernor:
+    """One token bucket per broker endpoint category.
+
+    Every SDK call dispatched through ``run_sdk`` takes a token from its
+    category first, so bursts queue client-side instead of tripping the
+    broker's throttling.
+    """
+
+    def __init__(self, rates: dict[str, float] | None = None, max_wait: float | None = None):
+        rates = rates or {
+            category: _rate_from_env(f"SHIOAJI_{category.upper()}_RATE_LIMIT", default)
+            for category, default in DEFAULT_RATES.items()
+        }
+        self.buckets = {
+            category: TokenBucket(rate, burst_capacity(category, rate))
+            for category, rate in rates.items()
+        }
+        if max_wait is None:
+            max_wait = _rate_from_env("SHIOAJI_RATE_MAX_WAIT_MS", DEFAULT_MAX_WAIT_MS) / 1000
+        self.max_wait = max_wait
+
+    async def acquire(self, category: str) -> float:
+        """Wait for a token in ``category``; unknown categories are not paced."""
+        bucket = self.buckets.get(category)
+        if bucket is None:
+            return 0.0
+        delay = await bucket.acquire(self.max_wait)
+        if delay > 1:
+            logger.info(f"Shioaji {category} call waited {delay:.2f}s for rate limit")
+        return delay
+
+    def stats(self) -> dict[str, dict[str, Any]]:
+        """Per-category rate, wait time and rejection counters."""
+        return {category: bucket.stats() for category, bucket in self.buckets.items()}
+
+
+# Global rate governor shared by all broker calls
+rate_governor = RateGovernor()
@@ -0,0 +1,156 @@
+"""Vectorized K-bar resampling."""
+
+from typing import Any
+
+import numpy as np
+
+NS_PER_MINUTE = 60 * 1_000_000_000
+NS_PER_DAY = 24 * 60 * NS_PER_MINUTE
+
+# Bars from 15:00 belong to the next trading day (TAIFEX night session)
+NIGHT_SESSION_SHIFT = 9 * 60 * NS_PER_MINUTE
+
+# 1970-01-01 was a Thursday; (day + 3) % 7 gives Monday == 0
+_EPOCH_WEEKDAY_OFFSET = 3
+
+# Supported output intervals and their size in minutes (None for calendar)
+INTERVALS: dict[str, int | None] = {
+    "1m": 1,
+    "5m": 5,
+    "15m": 15,
+    "30m": 30,
+    "60m": 60,
+    "1D": None,
+    "1W": None,
+}
+
+_INTERVAL_ALIASES = {
+    "1min": "1m",
+    "5min": "5m",
+    "15min": "15m",
+    "30min": "30m",
+    "60min": "60m",
+    "1h": "60m",
+    "1d": "1D",
+    "d": "1D",
+    "day": "1D",
+    "1w": "1W",
+    "w": "1W",
+    "week": "1W",
+}
+
+KBAR_FIELDS = ["open", "high", "low", "close", "volume", "amount"]
+
+
+def normalize_interval(interval: str | None) -> str:
+    """Map user-supplied interval names to a supported interval."""
+    if not interval:
+        return "1m"
+    value = interval.strip()
+    if value in INTERVALS:
+        return value
+    normalized = _INTERVAL_ALIASES.get(value.lower(), value.lower())
+    if normalized not in INTERVALS:
+        raise ValueError(
+            f"Unsupported interval: {interval}. Use one of {', '.join(INTERVALS)}"
+        )
+    return normalized
+
+
+def normalize_fields(fields: list[str] | None) -> list[str]:
+    """Validate requested output fields, defaulting to OHLCV."""
+    if not fields:
+        return [field for field in KBAR_FIELDS if field != "amount"]
+    normalized = [field.lower() for field in fields]
+    unknown = [field for field in normalized if field not in KBAR_FIELDS]
+    if unknown:
+        raise ValueError(
+            f"Unknown fields: {', '.join(unknown)}. Use any of {', '.join(KBAR_FIELDS)}"
+        )
+    return normalized
+
+
+def trading_day_numbers(ts: np.ndarray) -> np.ndarray:
+    """Days since epoch of each bar's trading day, skipping weekends."""
+    days = (ts + NIGHT_SESSION_SHIFT) // NS_PER_DAY
+    weekday = (days + _EPOCH_WEEKDAY_OFFSET) % 7
+    # Friday night session bars fall on Saturday after the shift
+    return days + np.where(weekday == 5, 2, np.where(weekday == 6, 1, 0))
+
+
+def _bucket_labels(ts: np.ndarray, interval: str) -> np.ndarray:
+    """Bucket label (ns timestamp) for every bar."""
+    minutes = INTERVALS[interval]
+    if minutes is not None:
+        # Shioaji labels 1-minute bars by their end time, so bucket by end
+        size = minutes * NS_PER_MINUTE
+        return -(-ts // size) * size
+    days = trading_day_numbers(ts)
+    if interval == "1W":
+        days = days - (days + _EPOCH_WEEKDAY_OFFSET) % 7
+    return days * NS_PER_DAY
+
+
+def resample(columns: dict[str, Any], interval: str) -> dict[str, np.ndarray]:
+    """Aggregate 1-minute K-bar columns into ``interval`` bars.
+
+    ``columns`` uses the SDK column names (ts, Open, High, Low, Close, Volume,
+    Amount). Returns lowercase columns with ``ts`` set to the bucket label:
+    the bucket end for intraday intervals, the trading date for daily bars and
+    the Monday of the week for weekly bars.
+    """
+    ts = np.asarray(columns["ts"], dtype=np.int64)
+    opens = np.asarray(columns["Open"], dtype=np.float64)
+    highs = np.asarray(columns["High"], dtype=np.float64)
+    lows = np.asarray(columns["Low"], dtype=np.float64)
+    closes = np.asarray(columns["Close"], dtype=np.float64)
+    volumes = np.asarray(columns["Volume"], dtype=np.int64)
+    amounts = np.asarray(columns.get("Amount", np.zeros(len(ts))), dtype=np.float64)
+
+    if interval == "1m" or len(ts) == 0:
+        return {
+            "ts": ts, "open": opens, "high": highs, "low": lows,
+            "close": closes, "volume": volumes, "amount": amounts,
+        }
+
+    order = np.argsort(ts, kind="stable")
+    ts, opens, highs, lows, closes, volumes, amounts = (
+        column[order] for column in (ts, opens, highs, lows, closes, volumes, amounts)
+    )
+
+    labels = _bucket_labels(ts, interval)
+    starts = np.flatnonzero(np.r_[True, labels[1:] != labels[:-1]])
+    ends = np.r_[starts[1:], len(ts)] - 1
+
+    return {
+        "ts": labels[starts],
+        "open": opens[starts],
+        "high": np.maximum.reduceat(highs, starts),
+        "low": np.minimum.reduceat(lows, starts),
+        "close": closes[ends],
+        "volume": np.add.reduceat(volumes, starts),
+        "amount": np.add.reduceat(amounts, starts),
+    }
+
+
+def format_timestamps(ts: np.ndarray, interval: str) -> list[str]:
+    """Format ns timestamps as strings, dates only for daily and weekly bars."""
+    values = np.asarray(ts, dtype="datetime64[ns]")
+    if INTERVALS[interval] is None:
+        text = np.datetime_as_string(values, unit="D")
+    else:
+        text = np.char.replace(np.datetime_as_string(values, unit="s"), "T", " ")
+    labels: list[str] = text.tolist()
+    return labels
+
+
+def to_rows(bars: dict[str, np.ndarray], interval: str, fields: list[str]) -> list[dict[str, Any]]:
+    """Convert resampled columns into a list of row dicts."""
+    if len(bars["ts"]) == 0:
+        return []
+    dates = format_timestamps(bars["ts"], interval)
+    values = [bars[field].tolist() for field in fields]
+    return [
+        {"date": day, **dict(zip(fields, row, strict=True))}
+        for day, *row in zip(dates, *values, strict=True)
+    ]
@@ -1,11 +1,36 @@
-"""Shioaji wrapper for real API access."""
+"""Broker backend selection.
+
+A backend is a module exposing the parts of the ``shioaji`` package the
+server uses: the ``Shioaji`` API class, ``constant`` and
+``contracts.Contract``. Every broker call goes through an instance of that
+``Shioaji`` class, so swapping the module swaps the broker.
+"""
 
 import logging
+import os
 
 logger = logging.getLogger(__name__)
 
+# Backends selectable with SHIOAJI_BACKEND
+BACKENDS = ["shioaji", "simulator"]
+DEFAULT_BACKEND = "shioaji"
+
+
+def backend_name() -> str:
+    """Backend selected by SHIOAJI_BACKEND (default: the real Shioaji SDK)."""
+    return os.getenv("SHIOAJI_BACKEND", DEFAULT_BACKEND).strip().lower() or DEFAULT_BACKEND
+
+
 def get_shioaji():
-    """Get Shioaji module."""
+    """Get the module implementing the Shioaji SDK interface."""
+    backend = backend_name()
+    if backend == "simulator":
+        from . import simulator
+
+        return simulator
+    if backend != DEFAULT_BACKEND:
+        raise ValueError(f"Unknown SHIOAJI_BACKEND: {backend}. Use one of {', '.join(BACKENDS)}")
+
     try:
         import shioaji as sj
         logger.info("Successfully imported real Shioaji module")
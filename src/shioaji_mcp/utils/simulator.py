@@ -0,0 +1,1207 @@
+"""Deterministic local broker simulator.
+
+Selected with SHIOAJI_BACKEND=simulator. Implements the subset of the
+``shioaji`` package the server uses on top of synthetic contracts, quotes,
+historical data and a matching engine that fills marketable orders, with
+configurable call latency and broker rate limits. The same seed and the
+same sequence of calls always produce the same data, so throughput and
+latency can be measured offline and compared between runs.
+"""
+
+import heapq
+import itertools
+import logging
+import math
+import os
+import random
+import threading
+import time
+import zlib
+from collections import Counter, deque
+from collections.abc import Callable, Iterator
+from datetime import date, datetime, timedelta
+from enum import Enum
+from types import SimpleNamespace
+from typing import Any
+
+import numpy as np
+
+from .contract_cache import TAIPEI_TZ, trading_date
+
+logger = logging.getLogger(__name__)
+
+# The simulator has no accounts to protect; any or no credentials log in
+REQUIRES_CREDENTIALS = False
+
+DEFAULT_SEED = 0
+DEFAULT_STOCKS = 1000
+DEFAULT_TICKS_PER_DAY = 2000
+DEFAULT_QUOTE_INTERVAL_MS = 1000
+
+# Broker request limits as (requests, window seconds) per request group
+DEFAULT_RATE_LIMITS = {
+    "data": (50, 5.0),
+    "account": (25, 5.0),
+    "order": (250, 10.0),
+}
+
+INITIAL_CASH = 10_000_000.0
+INITIAL_MARGIN = 1_000_000.0
+
+# Listings every simulated session carries so examples can use familiar codes:
+# (code, name, exchange, reference price)
+WELL_KNOWN_STOCKS = [
+    ("0050", "元大台灣50", "TSE", 190.0),
+    ("2317", "鴻海", "TSE", 200.0),
+    ("2330", "台積電", "TSE", 1000.0),
+    ("2412", "中華電", "TSE", 125.0),
+    ("2454", "聯發科", "TSE", 1300.0),
+    ("2890", "永豐金", "TSE", 24.0),
+    ("6488", "環球晶", "OTC", 400.0),
+    ("8069", "元太", "OTC", 250.0),
+]
+
+# Holdings of the simulated stock account at login: (code, lots)
+INITIAL_POSITIONS = [("2330", 2), ("2890", 10)]
+
+FUTURES = [("TXF", "臺股期貨", 22000.0), ("MXF", "小型臺指", 22000.0)]
+INDEXES = [("TSE", "001", "加權指數", 22000.0), ("OTC", "101", "櫃買指數", 260.0)]
+
+NS_PER_SECOND = 1_000_000_000
+NS_PER_MINUTE = 60 * NS_PER_SECOND
+NS_PER_DAY = 24 * 60 * NS_PER_MINUTE
+
+# Regular sessions as (first bar minute, bars) in minutes after midnight
+STOCK_SESSION = (9 * 60 + 1, 270)
+FUTURES_SESSION = (8 * 60 + 46, 300)
+
+_MONTH_CODES = "ABCDEFGHIJKL"
+_PUT_MONTH_CODES = "MNOPQRSTUVWX"
+
+
+# -- Constants -----------------------------------------------------------
+
+
+class Action(str, Enum):
+    Buy = "Buy"
+    Sell = "Sell"
+
+
+class StockPriceType(str, Enum):
+    LMT = "LMT"
+    MKT = "MKT"
+
+
+class FuturesPriceType(str, Enum):
+    LMT = "LMT"
+    MKT = "MKT"
+    MKP = "MKP"
+
+
+class OrderType(str, Enum):
+    ROD = "ROD"
+    IOC = "IOC"
+    FOK = "FOK"
+
+
+class FuturesOCType(str, Enum):
+    Auto = "Auto"
+    New = "New"
+    Cover = "Cover"
+    DayTrade = "DayTrade"
+
+
+class Unit(str, Enum):
+    Common = "Common"
+    Share = "Share"
+
+
+class QuoteType(str, Enum):
+    Tick = "tick"
+    BidAsk = "bidask"
+
+
+class QuoteVersion(str, Enum):
+    v1 = "v1"
+
+
+class TicksQueryType(str, Enum):
+    AllDay = "AllDay"
+    RangeTime = "RangeTime"
+    LastCount = "LastCount"
+
+
+class Exchange(str, Enum):
+    TSE = "TSE"
+    OTC = "OTC"
+    OES = "OES"
+    TAIFEX = "TAIFEX"
+
+
+class SecurityType(str, Enum):
+    Index = "IND"
+    Stock = "STK"
+    Future = "FUT"
+    Option = "OPT"
+
+
+class OptionRight(str, Enum):
+    Call = "C"
+    Put = "P"
+
+
+class AccountType(str, Enum):
+    Stock = "S"
+    Future = "F"
+
+
+class Status(str, Enum):
+    PendingSubmit = "PendingSubmit"
+    PreSubmitted = "PreSubmitted"
+    Submitted = "Submitted"
+    Failed = "Failed"
+    Cancelled = "Cancelled"
+    Filled = "Filled"
+    PartFilled = "PartFilled"
+
+
+class OrderState(str, Enum):
+    StockOrder = "SORDER"
+    StockDeal = "SDEAL"
+    FuturesOrder = "FORDER"
+    FuturesDeal = "FDEAL"
+
+
+constant = SimpleNamespace(
+    Action=Action,
+    StockPriceType=StockPriceType,
+    FuturesPriceType=FuturesPriceType,
+    OrderType=OrderType,
+    FuturesOCType=FuturesOCType,
+    Unit=Unit,
+    QuoteType=QuoteType,
+    QuoteVersion=QuoteVersion,
+    TicksQueryType=TicksQueryType,
+    Exchange=Exchange,
+    SecurityType=SecurityType,
+    OptionRight=OptionRight,
+    AccountType=AccountType,
+    Status=Status,
+    OrderState=OrderState,
+)
+
+
+class SimulatorRateLimitError(RuntimeError):
+    """Raised when a request exceeds the simulated broker's rate limits."""
+
+
+# -- Configuration -------------------------------------------------------
+
+
+def _env_int(name: str, default: int) -> int:
+    value = os.getenv(name)
+    if not value:
+        return default
+    try:
+        return max(0, int(value))
+    except ValueError:
+        logger.warning(f"Invalid value for {name}: {value!r}")
+        return default
+
+
+def rate_limits_from_env() -> dict[str, tuple[int, float]]:
+    """Broker limits from SHIOAJI_SIM_RATE_LIMITS.
+
+    Accepts ``off`` or comma-separated ``group=requests/seconds`` entries
+    (e.g. ``data=50/5,order=250/10``) overriding the defaults.
+    """
+    value = os.getenv("SHIOAJI_SIM_RATE_LIMITS", "").strip().lower()
+    limits = dict(DEFAULT_RATE_LIMITS)
+    if value in ("off", "none", "0"):
+        return {}
+    for entry in filter(None, (part.strip() for part in value.split(","))):
+        try:
+            group, spec = entry.split("=")
+            requests, seconds = spec.split("/")
+            limits[group.strip()] = (int(requests), float(seconds))
+        except ValueError:
+            logger.warning(f"Invalid simulator rate limit: {entry!r}")
+    return limits
+
+
+def _seed_for(*parts: Any) -> int:
+    """Stable 32-bit seed from any values (unlike ``hash``, not salted per process)."""
+    return zlib.crc32(":".join(str(part) for part in parts).encode())
+
+
+def tick_size(price: float) -> float:
+    """TWSE price increment for a stock price."""
+    for bound, size in ((10, 0.01), (50, 0.05), (100, 0.1), (500, 0.5), (1000, 1.0)):
+        if price < bound:
+            return size
+    return 5.0
+
+
+def _round_price(price: float, down: bool | None = None) -> float:
+    """Round to a valid tick; ``down`` True/False floors/ceils instead."""
+    size = tick_size(price)
+    steps = round(price / size, 6)
+    if down is None:
+        steps = round(steps)
+    else:
+        steps = math.floor(steps) if down else math.ceil(steps)
+    return round(steps * size, 2)
+
+
+def _now() -> datetime:
+    """Taipei wall-clock time, naive like SDK timestamps."""
+    return datetime.now(TAIPEI_TZ).replace(tzinfo=None)
+
+
+def _to_ns(value: datetime) -> int:
+    """Wall-clock time as nanoseconds since the epoch, as the SDK encodes ``ts``."""
+    return int((value - datetime(1970, 1, 1)).total_seconds() * NS_PER_SECOND)
+
+
+def _ns_of_day(value: str) -> int:
+    """Nanoseconds after midnight of an ``HH:MM:SS`` time."""
+    hours, minutes, seconds = (int(float(part)) for part in value.split(":")[:3])
+    return ((hours * 60 + minutes) * 60 + seconds) * NS_PER_SECOND
+
+
+def _parse_date(value: Any) -> date:
+    return value if isinstance(value, date) else date.fromisoformat(str(value))
+
+
+def _third_wednesday(year: int, month: int) -> date:
+    first = date(year, month, 1)
+    return first + timedelta(days=(2 - first.weekday()) % 7 + 14)
+
+
+# -- Contracts -----------------------------------------------------------
+
+
+class Contract:
+    """Synthetic contract carrying the fields the server reads."""
+
+    def __init__(self, **fields: Any):
+        # Enums arrive as plain values when rebuilt from the contract cache
+        self.security_type = SecurityType(fields.pop("security_type", SecurityType.Stock))
+        self.exchange = Exchange(fields.pop("exchange", Exchange.TSE))
+        if fields.get("option_right"):
+            fields["option_right"] = OptionRight(fields["option_right"])
+        self.code = fields.pop("code")
+        self.symbol = fields.pop("symbol", "") or f"{self.exchange.value}{self.code}"
+        self.name = fields.pop("name", "")
+        self.category = fields.pop("category", "")
+        self.currency = fields.pop("currency", "TWD")
+        self.unit = fields.pop("unit", 1000 if self.security_type == SecurityType.Stock else 1)
+        self.reference = fields.pop("reference", 0.0)
+        self.limit_up = fields.pop("limit_up", 0.0)
+        self.limit_down = fields.pop("limit_down", 0.0)
+        self.update_date = fields.pop("update_date", trading_date().strftime("%Y/%m/%d"))
+        self.day_trade = fields.pop("day_trade", "Yes")
+        for name, value in fields.items():
+            setattr(self, name, value)
+
+    def dict(self) -> dict[str, Any]:
+        return dict(vars(self))
+
+    def astype(self) -> "Contract":
+        return self
+
+    def __repr__(self) -> str:
+        return f"Contract({self.code!r}, {self.name!r})"
+
+
+class ContractGroup:
+    """Contracts of one exchange or product, indexed by code."""
+
+    def __init__(self, name: str, contracts: list[Contract]):
+        self.name = name
+        self._by_code = {contract.code: contract for contract in contracts}
+
+    def __iter__(self) -> Iterator[Contract]:
+        return iter(self._by_code.values())
+
+    def __len__(self) -> int:
+        return len(self._by_code)
+
+    def __getitem__(self, code: str) -> Contract:
+        return self._by_code[code]
+
+    def get(self, code: str, default: Any = None) -> Any:
+        return self._by_code.get(code, default)
+
+
+class ContractTree:
+    """Groups of one product type: iterable, by group name, or by code."""
+
+    def __init__(self, groups: list[ContractGroup]):
+        self._groups = {group.name: group for group in groups}
+
+    def __iter__(self) -> Iterator[ContractGroup]:
+        return iter(self._groups.values())
+
+    def __getattr__(self, name: str) -> ContractGroup:
+        try:
+            groups: dict[str, ContractGroup] = self.__dict__["_groups"]
+            return groups[name]
+        except KeyError:
+            raise AttributeError(name) from None
+
+    def __getitem__(self, code: str) -> Contract:
+        for group in self._groups.values():
+            contract: Contract | None = group.get(code)
+            if contract is not None:
+                return contract
+        raise KeyError(code)
+
+    def get(self, code: str, default: Any = None) -> Any:
+        try:
+            return self[code]
+        except KeyError:
+            return default
+
+
+contracts = SimpleNamespace(Contract=Contract)
+
+
+def _stock(code: str, name: str, exchange: str, reference: float) -> Contract:
+    reference = _round_price(reference)
+    return Contract(
+        security_type=SecurityType.Stock,
+        exchange=Exchange(exchange),
+        code=code,
+        symbol=f"{exchange}{code}",
+        name=name,
+        category="00" if code.startswith("00") else "24",
+        reference=reference,
+        limit_up=_round_price(reference * 1.1, down=True),
+        limit_down=_round_price(reference * 0.9, down=False),
+    )
+
+
+def build_contracts(seed: int, stocks: int, today: date | None = None) -> SimpleNamespace:
+    """The synthetic contract tree for a seed: the well-known listings plus
+    ``stocks`` generated ones, index futures and options, and two indexes."""
+    today = today or trading_date()
+    rng = random.Random(_seed_for(seed, "contracts"))
+
+    listings = [_stock(*listing) for listing in WELL_KNOWN_STOCKS]
+    taken = {contract.code for contract in listings}
+    for code in (str(n) for n in itertools.count(1101)):
+        if len(listings) >= len(WELL_KNOWN_STOCKS) + stocks:
+            break
+        if code in taken:
+            continue
+        exchange = "TSE" if rng.random() < 0.6 else "OTC"
+        reference = round(float(np.exp(rng.gauss(4.0, 1.0))), 2)
+        listings.append(_stock(code, f"模擬{code}", exchange, max(reference, 5.0)))
+    stock_groups = [
+        ContractGroup(exchange, [c for c in listings if c.exchange.value == exchange])
+        for exchange in ("TSE", "OTC")
+    ]
+
+    months = []
+    year, month = today.year, today.month
+    if today > _third_wednesday(year, month):
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+    for _ in range(3):
+        months.append((year, month))
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+
+    future_groups = []
+    for root, name, reference in FUTURES:
+        group = []
+        for n, (year, month) in enumerate(months):
+            delivery = _third_wednesday(year, month)
+            fields: dict[str, Any] = {
+                "security_type": SecurityType.Future, "exchange": Exchange.TAIFEX,
+                "name": f"{name}{month:02d}", "category": root, "unit": 1, "reference": reference,
+                "limit_up": round(reference * 1.1), "limit_down": round(reference * 0.9),
+                "delivery_month": f"{year}{month:02d}",
+                "delivery_date": delivery.strftime("%Y/%m/%d"),
+                "underlying_kind": "I", "underlying_code": "", "target_code": "",
+            }
+            group.append(Contract(
+                code=f"{root}{_MONTH_CODES[month - 1]}{year % 10}",
+                symbol=f"{root}{year}{month:02d}", **fields,
+            ))
+            if n < 2:
+                group.append(Contract(
+                    code=f"{root}R{n + 1}", symbol=f"{root}R{n + 1}",
+                    **{**fields, "target_code": group[0].code},
+                ))
+        future_groups.append(ContractGroup(root, group))
+
+    options = []
+    year, month = months[0]
+    delivery = _third_wednesday(year, month)
+    for strike in range(21000, 23001, 100):
+        for right, codes in ((OptionRight.Call, _MONTH_CODES), (OptionRight.Put, _PUT_MONTH_CODES)):
+            intrinsic = max(0.0, 22000 - strike if right == OptionRight.Call else strike - 22000)
+            reference = round(intrinsic + 150.0 * float(np.exp(-abs(strike - 22000) / 800)), 1)
+            options.append(Contract(
+                security_type=SecurityType.Option, exchange=Exchange.TAIFEX,
+                code=f"TXO{strike}{codes[month - 1]}{year % 10}",
+                symbol=f"TXO{year}{month:02d}{strike}{right.value}",
+                name=f"臺指選擇權{month:02d}{strike}{'買權' if right == OptionRight.Call else '賣權'}",
+                category="TXO", unit=1, reference=reference,
+                limit_up=round(reference + 2200, 1), limit_down=0.1,
+                delivery_month=f"{year}{month:02d}", delivery_date=delivery.strftime("%Y/%m/%d"),
+                strike_price=float(strike), option_right=right, underlying_kind="I",
+            ))
+
+    indexes = [
+        ContractGroup(exchange, [Contract(
+            security_type=SecurityType.Index, exchange=Exchange(exchange), code=code,
+            symbol=f"{exchange}{code}", name=name, reference=reference,
+        )])
+        for exchange, code, name, reference in INDEXES
+    ]
+
+    return SimpleNamespace(
+        status="Fetched",
+        Stocks=ContractTree(stock_groups),
+        Futures=ContractTree(future_groups),
+        Options=ContractTree([ContractGroup("TXO", options)]),
+        Indexs=ContractTree(indexes),
+    )
+
+
+# -- Market --------------------------------------------------------------
+
+
+class _Market:
+    """Intraday state of one contract, advanced one step per observation."""
+
+    def __init__(self, seed: int, contract: Contract):
+        self.contract = contract
+        self._rng = random.Random(_seed_for(seed, "market", contract.code))
+        self.reference = float(contract.reference or 100.0)
+        self.open = self._bounded(self.reference * (1 + self._rng.gauss(0, 0.01)))
+        self.close = self.high = self.low = self.open
+        self.total_volume = self._rng.randint(100, 5000)
+        self.total_amount = self.close * self.total_volume * contract.unit
+        self.yesterday_volume = self._rng.randint(1000, 20000)
+        self.volume = 0
+
+    def _increment(self) -> float:
+        if self.contract.security_type == SecurityType.Stock:
+            return tick_size(self.close)
+        return 1.0 if self.reference >= 50 else 0.1
+
+    def _bounded(self, price: float) -> float:
+        contract = self.contract
+        if contract.security_type == SecurityType.Stock:
+            price = _round_price(price)
+        if contract.limit_up:
+            price = min(price, contract.limit_up)
+        if contract.limit_down:
+            price = max(price, contract.limit_down)
+        return round(price, 2)
+
+    def step(self) -> None:
+        change = self._rng.choice((-2, -1, -1, 0, 0, 0, 1, 1, 2)) * self._increment()
+        self.close = self._bounded(self.close + change)
+        self.high = max(self.high, self.close)
+        self.low = min(self.low, self.close)
+        self.volume = self._rng.randint(1, 50)
+        self.total_volume += self.volume
+        self.total_amount += self.close * self.volume * self.contract.unit
+
+    def snapshot(self) -> SimpleNamespace:
+        self.step()
+        spread = self._increment()
+        return SimpleNamespace(
+            ts=_to_ns(_now()),
+            code=self.contract.code,
+            exchange=self.contract.exchange.value,
+            open=self.open,
+            high=self.high,
+            low=self.low,
+            close=self.close,
+            tick_type="Buy",
+            change_price=round(self.close - self.reference, 2),
+            change_rate=round((self.close / self.reference - 1) * 100, 2),
+            change_type="Up" if self.close > self.reference else "Down" if self.close < self.reference else "Unchanged",
+            average_price=round(self.total_amount / max(self.total_volume * self.contract.unit, 1), 2),
+            volume=self.volume,
+            total_volume=self.total_volume,
+            amount=round(self.close * self.volume * self.contract.unit),
+            total_amount=round(self.total_amount),
+            yesterday_volume=self.yesterday_volume,
+            buy_price=round(self.close - spread, 2),
+            buy_volume=self._rng.randint(1, 100),
+            sell_price=self.close,
+            sell_volume=self._rng.randint(1, 100),
+            volume_ratio=round(self.total_volume / self.yesterday_volume, 2),
+        )
+
+    def tick(self) -> SimpleNamespace:
+        self.step()
+        return SimpleNamespace(
+            code=self.contract.code,
+            datetime=_now(),
+            open=self.open,
+            close=self.close,
+            high=self.high,
+            low=self.low,
+            avg_price=round(self.total_amount / max(self.total_volume * self.contract.unit, 1), 2),
+            volume=self.volume,
+            total_volume=self.total_volume,
+            amount=round(self.close * self.volume * self.contract.unit),
+            total_amount=round(self.total_amount),
+            tick_type=self._rng.choice((1, 2)),
+            chg_type=2 if self.close > self.reference else 4 if self.close < self.reference else 3,
+            price_chg=round(self.close - self.reference, 2),
+            pct_chg=round((self.close / self.reference - 1) * 100, 2),
+            simtrade=False,
+        )
+
+    def bidask(self) -> SimpleNamespace:
+        size = self._increment()
+        return SimpleNamespace(
+            code=self.contract.code,
+            datetime=_now(),
+            bid_price=[round(self.close - size * (n + 1), 2) for n in range(5)],
+            bid_volume=[self._rng.randint(1, 200) for _ in range(5)],
+            ask_price=[round(self.close + size * n, 2) for n in range(5)],
+            ask_volume=[self._rng.randint(1, 200) for _ in range(5)],
+            simtrade=False,
+        )
+
+
+def _trading_days(start: date, end: date) -> list[date]:
+    last = min(end, trading_date())
+    days = []
+    day = start
+    while day <= last:
+        if day.weekday() < 5:
+            days.append(day)
+        day += timedelta(days=1)
+    return days
+
+
+def _day_ns(day: date) -> int:
+    return (day - date(1970, 1, 1)).days * NS_PER_DAY
+
+
+def _session(contract: Contract) -> tuple[int, int]:
+    return STOCK_SESSION if contract.security_type == SecurityType.Stock else FUTURES_SESSION
+
+
+def generate_kbars(seed: int, contract: Contract, start: Any, end: Any) -> SimpleNamespace:
+    """1-minute bars for every weekday from ``start`` to ``end``, in SDK columns."""
+    first_minute, count = _session(contract)
+    reference = float(contract.reference or 100.0)
+    columns: dict[str, list[np.ndarray]] = {
+        name: [] for name in ("ts", "Open", "High", "Low", "Close", "Volume", "Amount")
+    }
+    for day in _trading_days(_parse_date(start), _parse_date(end)):
+        rng = np.random.default_rng(_seed_for(seed, "kbars", contract.code, day.isoformat()))
+        day_open = reference * float(np.exp(rng.normal(0, 0.02)))
+        close = np.round(day_open * np.exp(np.cumsum(rng.normal(0, 0.0015, count))), 2)
+        open_ = np.concatenate(([round(day_open, 2)], close[:-1]))
+        wick = np.abs(rng.normal(0, 0.0005, (2, count)))
+        volume = rng.integers(1, 200, count)
+        columns["ts"].append(_day_ns(day) + (first_minute + np.arange(count)) * NS_PER_MINUTE)
+        columns["Open"].append(open_)
+        columns["High"].append(np.round(np.maximum(open_, close) * (1 + wick[0]), 2))
+        columns["Low"].append(np.round(np.minimum(open_, close) * (1 - wick[1]), 2))
+        columns["Close"].append(close)
+        columns["Volume"].append(volume)
+        columns["Amount"].append(np.round(close * volume * contract.unit, 0))
+    return SimpleNamespace(**{
+        name: np.concatenate(parts).tolist() if parts else []
+        for name, parts in columns.items()
+    })
+
+
+def generate_ticks(
+    seed: int,
+    contract: Contract,
+    day: Any,
+    per_day: int,
+    query_type: Any = TicksQueryType.AllDay,
+    time_start: str | None = None,
+    time_end: str | None = None,
+    last_cnt: int = 0,
+) -> SimpleNamespace:
+    """Trade ticks of one day in SDK columns, sliced like ``api.ticks``."""
+    day = _parse_date(day)
+    names = ("ts", "close", "volume", "bid_price", "bid_volume", "ask_price", "ask_volume", "tick_type")
+    if day.weekday() >= 5 or day > trading_date() or per_day <= 0:
+        return SimpleNamespace(**{name: [] for name in names})
+
+    rng = np.random.default_rng(_seed_for(seed, "ticks", contract.code, day.isoformat()))
+    first_minute, count = _session(contract)
+    offsets = np.sort(rng.integers(0, (count + 1) * NS_PER_MINUTE, per_day))
+    ts = _day_ns(day) + (first_minute - 1) * NS_PER_MINUTE + offsets
+    reference = float(contract.reference or 100.0)
+    close = np.round(reference * np.exp(np.cumsum(rng.normal(0, 0.0004, per_day))), 2)
+    spread = tick_size(reference) if contract.security_type == SecurityType.Stock else 1.0
+    tick_type = rng.integers(1, 3, per_day)
+    columns = {
+        "ts": ts,
+        "close": close,
+        "volume": rng.integers(1, 30, per_day),
+        "bid_price": np.round(close - np.where(tick_type == 1, spread, 0), 2),
+        "bid_volume": rng.integers(1, 200, per_day),
+        "ask_price": np.round(close + np.where(tick_type == 2, spread, 0), 2),
+        "ask_volume": rng.integers(1, 200, per_day),
+        "tick_type": tick_type,
+    }
+
+    mask: slice | np.ndarray = slice(None)
+    query = getattr(query_type, "value", query_type)
+    if query == TicksQueryType.RangeTime.value and time_start and time_end:
+        of_day = ts - _day_ns(day)
+        mask = (of_day >= _ns_of_day(time_start)) & (of_day <= _ns_of_day(time_end))
+    elif query == TicksQueryType.LastCount.value and last_cnt:
+        mask = slice(-last_cnt, None)
+    return SimpleNamespace(**{name: values[mask].tolist() for name, values in columns.items()})
+
+
+# -- Orders --------------------------------------------------------------
+
+
+class Order:
+    """Order ticket as built by ``api.Order``."""
+
+    def __init__(
+        self,
+        price: float = 0,
+        quantity: int = 0,
+        action: Action = Action.Buy,
+        price_type: Any = StockPriceType.LMT,
+        order_type: OrderType = OrderType.ROD,
+        account: Any = None,
+        **fields: Any,
+    ):
+        self.id = ""
+        self.seqno = ""
+        self.ordno = ""
+        self.price = price
+        self.quantity = quantity
+        self.action = action
+        self.price_type = price_type
+        self.order_type = order_type
+        self.account = account
+        self.octype = fields.pop("octype", FuturesOCType.Auto)
+        self.custom_field = fields.pop("custom_field", "")
+        for name, value in fields.items():
+            setattr(self, name, value)
+
+
+# ``Shioaji.Order`` shadows the class name inside the SDK facade
+_OrderTicket = Order
+
+
+class _EventQueue:
+    """Delivers SDK callbacks in due-time order on one background thread."""
+
+    def __init__(self, name: str):
+        self._name = name
+        self._heap: list[tuple[float, int, Callable[..., Any], tuple]] = []
+        self._sequence = itertools.count()
+        self._condition = threading.Condition()
+        self._thread: threading.Thread | None = None
+        self._closed = False
+
+    def call_later(self, delay: float, callback: Callable[..., Any], *args: Any) -> None:
+        with self._condition:
+            if self._closed:
+                return
+            heapq.heappush(
+                self._heap, (time.monotonic() + delay, next(self._sequence), callback, args)
+            )
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name=self._name, daemon=True)
+                self._thread.start()
+            self._condition.notify()
+
+    def _run(self) -> None:
+        while True:
+            with self._condition:
+                while not self._closed and (
+                    not self._heap or self._heap[0][0] > time.monotonic()
+                ):
+                    timeout = self._heap[0][0] - time.monotonic() if self._heap else None
+                    self._condition.wait(timeout)
+                if self._closed:
+                    return
+                _, _, callback, args = heapq.heappop(self._heap)
+            try:
+                callback(*args)
+            except Exception as e:
+                logger.warning(f"Simulator callback failed: {e}")
+
+    def close(self) -> None:
+        with self._condition:
+            self._closed = True
+            self._heap.clear()
+            self._condition.notify()
+
+
+class _Quote:
+    """``api.quote``: callback registration and streamed subscriptions."""
+
+    def __init__(self, api: "Shioaji"):
+        self._api = api
+        self._callbacks: dict[str, Callable[..., Any]] = {}
+        self.subscriptions: dict[str, set[str]] = {}
+        self._streaming = False
+
+    def set_on_tick_stk_v1_callback(self, callback: Callable[..., Any]) -> None:
+        self._callbacks["tick_stk"] = callback
+
+    def set_on_tick_fop_v1_callback(self, callback: Callable[..., Any]) -> None:
+        self._callbacks["tick_fop"] = callback
+
+    def set_on_bidask_stk_v1_callback(self, callback: Callable[..., Any]) -> None:
+        self._callbacks["bidask_stk"] = callback
+
+    def set_on_bidask_fop_v1_callback(self, callback: Callable[..., Any]) -> None:
+        self._callbacks["bidask_fop"] = callback
+
+    def set_event_callback(self, callback: Callable[..., Any]) -> None:
+        self._callbacks["event"] = callback
+
+    def set_session_down_callback(self, callback: Callable[..., Any]) -> None:
+        self._callbacks["session_down"] = callback
+
+    def subscribe(self, contract: Contract, quote_type: Any = QuoteType.Tick, version: Any = None) -> None:
+        self._api._request("subscribe")
+        self.subscriptions.setdefault(contract.code, set()).add(getattr(quote_type, "value", quote_type))
+        self._api._contracts_by_code[contract.code] = contract
+        if not self._streaming and self._api.quote_interval > 0:
+            self._streaming = True
+            self._api._events.call_later(self._api.quote_interval, self._stream)
+
+    def unsubscribe(self, contract: Contract, quote_type: Any = QuoteType.Tick, version: Any = None) -> None:
+        self._api._request("unsubscribe")
+        current = self.subscriptions.get(contract.code, set())
+        current.discard(getattr(quote_type, "value", quote_type))
+        if not current:
+            self.subscriptions.pop(contract.code, None)
+
+    def _stream(self) -> None:
+        """Push one tick and book per subscription, then reschedule."""
+        if not self.subscriptions or not self._api.logged_in:
+            self._streaming = False
+            return
+        for code, quote_types in list(self.subscriptions.items()):
+            contract = self._api._contracts_by_code[code]
+            market = self._api._market(contract)
+            kind = "stk" if contract.security_type == SecurityType.Stock else "fop"
+            for quote_type in sorted(quote_types):
+                callback = self._callbacks.get(f"{quote_type}_{kind}")
+                if callback is None:
+                    continue
+                with self._api._lock:
+                    data = market.tick() if quote_type == "tick" else market.bidask()
+                callback(contract.exchange, data)
+        self._api._events.call_later(self._api.quote_interval, self._stream)
+
+    def fire_event(self, resp_code: int, event_code: int, info: str, event: str) -> None:
+        callback = self._callbacks.get("event")
+        if callback is not None:
+            callback(resp_code, event_code, info, event)
+
+
+class Shioaji:
+    """Simulated ``shioaji.Shioaji`` session.
+
+    Every request sleeps for the configured latency on the calling thread,
+    like a blocking SDK call, and counts against sliding-window limits
+    mirroring the broker's; a request over the limit raises
+    ``SimulatorRateLimitError``. Order and quote callbacks run on a
+    background thread, as in the SDK.
+    """
+
+    constant = constant
+
+    def __init__(
+        self,
+        simulation: bool = False,
+        seed: int | None = None,
+        latency_ms: int | None = None,
+        jitter_ms: int | None = None,
+        stocks: int | None = None,
+        ticks_per_day: int | None = None,
+        fill_ms: int | None = None,
+        quote_interval_ms: int | None = None,
+        rate_limits: dict[str, tuple[int, float]] | None = None,
+        **options: Any,
+    ):
+        def option(value: int | None, name: str, default: int) -> int:
+            return value if value is not None else _env_int(name, default)
+
+        self.simulation = simulation
+        self.seed = option(seed, "SHIOAJI_SIM_SEED", DEFAULT_SEED)
+        self.latency = option(latency_ms, "SHIOAJI_SIM_LATENCY_MS", 0) / 1000
+        self.jitter = option(jitter_ms, "SHIOAJI_SIM_JITTER_MS", 0) / 1000
+        self.stocks = option(stocks, "SHIOAJI_SIM_STOCKS", DEFAULT_STOCKS)
+        self.ticks_per_day = option(ticks_per_day, "SHIOAJI_SIM_TICKS_PER_DAY", DEFAULT_TICKS_PER_DAY)
+        self.fill_delay = option(fill_ms, "SHIOAJI_SIM_FILL_MS", 0) / 1000
+        self.quote_interval = option(
+            quote_interval_ms, "SHIOAJI_SIM_QUOTE_INTERVAL_MS", DEFAULT_QUOTE_INTERVAL_MS
+        ) / 1000
+        self.rate_limits = rate_limits if rate_limits is not None else rate_limits_from_env()
+
+        self._lock = threading.RLock()
+        self._jitter_rng = random.Random(_seed_for(self.seed, "jitter"))
+        self._windows: dict[str, deque[float]] = {group: deque() for group in self.rate_limits}
+        self._events = _EventQueue("shioaji-simulator")
+        self._markets: dict[str, _Market] = {}
+        self._contracts_by_code: dict[str, Contract] = {}
+        self._order_ids = itertools.count(1)
+        self._trades: list[Any] = []
+        self._positions: dict[tuple[str, str], dict[str, Any]] = {}
+        self._cash: dict[str, float] = {}
+        self._order_callback: Callable[..., Any] | None = None
+
+        self.calls: Counter[str] = Counter()
+        self.rejected = 0
+        self.logged_in = False
+        self.session_down = False
+        self.Contracts = SimpleNamespace(
+            status="Unfetch", Stocks=None, Futures=None, Options=None, Indexs=None
+        )
+        self.quote = _Quote(self)
+
+        self.stock_account = SimpleNamespace(
+            account_type=AccountType.Stock, person_id="SIM0000000", broker_id="9A95",
+            account_id="0000001", signed=True, username="simulator",
+        )
+        self.futopt_account = SimpleNamespace(
+            account_type=AccountType.Future, person_id="SIM0000000", broker_id="F002000",
+            account_id="1000001", signed=True, username="simulator",
+        )
+        self._accounts = [self.stock_account, self.futopt_account]
+
+    # -- Plumbing ------------------------------------------------------
+
+    _GROUPS = {
+        "snapshots": "data", "ticks": "data", "kbars": "data",
+        "list_positions": "account", "account_balance": "account", "margin": "account",
+        "place_order": "order", "cancel_order": "order",
+    }
+
+    def _request(self, method: str) -> None:
+        """Count, rate-limit and delay one request."""
+        if self.session_down:
+            raise ConnectionError("Simulated session is down")
+        if not self.logged_in:
+            raise RuntimeError("Please login first")
+        group = self._GROUPS.get(method)
+        with self._lock:
+            self.calls[method] += 1
+            if group is not None and group in self.rate_limits:
+                requests, window = self.rate_limits[group]
+                now = time.monotonic()
+                recent = self._windows.setdefault(group, deque())
+                while recent and recent[0] <= now - window:
+                    recent.popleft()
+                if len(recent) >= requests:
+                    self.rejected += 1
+                    raise SimulatorRateLimitError(
+                        f"Too many {group} requests: limit is {requests} per {window:g}s"
+                    )
+                recent.append(now)
+            delay = self.latency + (self._jitter_rng.uniform(0, self.jitter) if self.jitter else 0)
+        if delay:
+            time.sleep(delay)
+
+    def _market(self, contract: Contract) -> _Market:
+        market = self._markets.get(contract.code)
+        if market is None:
+            market = self._markets[contract.code] = _Market(self.seed, contract)
+        return market
+
+    def stats(self) -> dict[str, Any]:
+        """Requests served per method and requests rejected by the rate limits."""
+        return {"calls": dict(self.calls), "rejected": self.rejected}
+
+    # -- Session -------------------------------------------------------
+
+    def login(
+        self,
+        api_key: str | None = None,
+        secret_key: str | None = None,
+        fetch_contract: bool = True,
+        contracts_timeout: int = 0,
+        contracts_cb: Callable[[Any], None] | None = None,
+        subscribe_trade: bool = True,
+        **options: Any,
+    ) -> list[Any]:
+        time.sleep(self.latency)
+        self.logged_in = True
+        self.session_down = False
+        for account in self._accounts:
+            self._cash.setdefault(account.account_id, INITIAL_CASH)
+        if fetch_contract:
+            self.fetch_contracts(contracts_cb=contracts_cb)
+        self._seed_positions()
+        return list(self._accounts)
+
+    def fetch_contracts(self, contract_download: bool = False, contracts_timeout: int = 0,
+                        contracts_cb: Callable[[Any], None] | None = None) -> None:
+        self.Contracts = build_contracts(self.seed, self.stocks)
+        for tree in (self.Contracts.Stocks, self.Contracts.Futures,
+                     self.Contracts.Options, self.Contracts.Indexs):
+            for group in tree:
+                for contract in group:
+                    self._contracts_by_code[contract.code] = contract
+        if contracts_cb is not None:
+            for security_type in SecurityType:
+                contracts_cb(security_type)
+
+    def _seed_positions(self) -> None:
+        if self._positions or self.Contracts.Stocks is None:
+            return
+        for code, lots in INITIAL_POSITIONS:
+            contract = self.Contracts.Stocks.get(code)
+            if contract is not None:
+                self._positions[(self.stock_account.account_id, code)] = {
+                    "contract": contract, "quantity": lots * contract.unit,
+                    "yd_quantity": lots * contract.unit, "price": contract.reference,
+                }
+
+    def logout(self) -> bool:
+        self.logged_in = False
+        self._events.close()
+        self._events = _EventQueue("shioaji-simulator")
+        self.quote.subscriptions.clear()
+        self.quote._streaming = False
+        return True
+
+    def drop_session(self) -> None:
+        """Simulate the broker dropping the session (Solace DOWN_ERROR)."""
+        self.session_down = True
+        self.quote.fire_event(0, 1, "", "Session down")
+
+    def usage(self, timeout: int = 5000, cb: Callable | None = None) -> SimpleNamespace:
+        self._request("usage")
+        used = sum(self.calls.values()) * 1024
+        limit = 500 * 1024 * 1024
+        return SimpleNamespace(connections=1, bytes=used, limit_bytes=limit, remaining_bytes=limit - used)
+
+    def list_accounts(self) -> list[Any]:
+        self._request("list_accounts")
+        return list(self._accounts)
+
+    def set_default_account(self, account: Any) -> None:
+        if account.account_type == AccountType.Future:
+            self.futopt_account = account
+        else:
+            self.stock_account = account
+
+    # -- Market data ---------------------------------------------------
+
+    def snapshots(self, contracts: list[Contract], timeout: int = 30000, cb: Callable | None = None) -> list[Any]:
+        self._request("snapshots")
+        if len(contracts) > 500:
+            raise ValueError("Snapshots accept at most 500 contracts per request")
+        with self._lock:
+            return [self._market(contract).snapshot() for contract in contracts]
+
+    def kbars(self, contract: Contract, start: str | None = None, end: str | None = None,
+              timeout: int = 30000, cb: Callable | None = None) -> SimpleNamespace:
+        self._request("kbars")
+        today = trading_date()
+        return generate_kbars(self.seed, contract, start or today, end or today)
+
+    def ticks(self, contract: Contract, date: str | None = None,
+              query_type: Any = TicksQueryType.AllDay, time_start: str | None = None,
+              time_end: str | None = None, last_cnt: int = 0, timeout: int = 30000,
+              cb: Callable | None = None) -> SimpleNamespace:
+        self._request("ticks")
+        return generate_ticks(
+            self.seed, contract, date or trading_date(), self.ticks_per_day,
+            query_type, time_start, time_end, last_cnt,
+        )
+
+    # -- Orders --------------------------------------------------------
+
+    def Order(self, **fields: Any) -> _OrderTicket:  # noqa: N802 - mirrors the SDK's api.Order
+        return _OrderTicket(**fields)
+
+    def set_order_callback(self, callback: Callable[[Any, dict[str, Any]], None]) -> None:
+        self._order_callback = callback
+
+    def _emit(self, state: OrderState, msg: dict[str, Any]) -> None:
+        if self._order_callback is not None:
+            self._order_callback(state, msg)
+
+    def _order_event(self, trade: Any, op_type: str, op_code: str = "00", op_msg: str = "") -> None:
+        order, contract = trade.order, trade.contract
+        stock = contract.security_type == SecurityType.Stock
+        self._emit(OrderState.StockOrder if stock else OrderState.FuturesOrder, {
+            "operation": {"op_type": op_type, "op_code": op_code, "op_msg": op_msg},
+            "order": {
+                "id": order.id, "seqno": order.seqno, "ordno": order.ordno,
+                "account": {"account_id": order.account.account_id,
+                            "broker_id": order.account.broker_id},
+                "action": order.action, "price": order.price, "quantity": order.quantity,
+                "order_type": order.order_type, "price_type": order.price_type,
+            },
+            "status": {
+                "id": order.id, "exchange_ts": time.time(),
+                "modified_price": 0, "cancel_quantity": trade.status.cancel_quantity,
+            },
+            "contract": {"code": contract.code, "exchange": contract.exchange.value},
+        })
+
+    def place_order(self, contract: Contract, order: _OrderTicket, timeout: int = 5000,
+                    cb: Callable | None = None) -> Any:
+        self._request("place_order")
+        stock = contract.security_type == SecurityType.Stock
+        if order.account is None:
+            order.account = self.stock_account if stock else self.futopt_account
+        with self._lock:
+            n = next(self._order_ids)
+        order.id = f"{n:08x}"
+        order.seqno = f"{n:06d}"
+        order.ordno = f"S{n:05d}"
+        status = SimpleNamespace(
+            id=order.id, status=Status.Submitted, status_code="00", msg="",
+            order_datetime=_now(), deal_quantity=0, cancel_quantity=0, deals=[],
+            modified_price=0,
+        )
+        trade = SimpleNamespace(contract=contract, order=order, status=status)
+
+        market_order = getattr(order.price_type, "value", order.price_type) != "LMT"
+        in_range = not contract.limit_up or contract.limit_down <= order.price <= contract.limit_up
+        if order.quantity <= 0 or (not market_order and not in_range):
+            status.status = Status.Failed
+            status.msg = "Price or quantity out of range"
+            with self._lock:
+                self._trades.append(trade)
+            self._events.call_later(0, self._order_event, trade, "New", "88", status.msg)
+            return trade
+
+        with self._lock:
+            self._trades.append(trade)
+            last = self._market(contract).close
+        self._events.call_later(0, self._order_event, trade, "New")
+        buy = order.action == Action.Buy
+        if market_order or (order.price >= last if buy else order.price <= last):
+            price = last if market_order else min(order.price, last) if buy else max(order.price, last)
+            self._events.call_later(self.fill_delay, self._fill, trade, price)
+        return trade
+
+    def _fill(self, trade: Any, price: float) -> None:
+        """Fill the rest of an order at ``price`` and emit the deal."""
+        order, contract, status = trade.order, trade.contract, trade.status
+        with self._lock:
+            if status.status in (Status.Cancelled, Status.Failed, Status.Filled):
+                return
+            quantity = order.quantity - status.deal_quantity - status.cancel_quantity
+            status.deal_quantity += quantity
+            status.deals.append(SimpleNamespace(seq=f"{len(status.deals) + 1:06d}", price=price,
+                                                quantity=quantity, ts=time.time()))
+            status.status = Status.Filled
+            self._apply_fill(order.account, contract, order.action, quantity, price)
+        stock = contract.security_type == SecurityType.Stock
+        self._emit(OrderState.StockDeal if stock else OrderState.FuturesDeal, {
+            "trade_id": order.id, "seqno": order.seqno, "ordno": order.ordno,
+            "broker_id": order.account.broker_id, "account_id": order.account.account_id,
+            "action": order.action, "code": contract.code, "price": price,
+            "quantity": quantity, "ts": time.time(),
+        })
+
+    def _apply_fill(self, account: Any, contract: Contract, action: Action,
+                    quantity: int, price: float) -> None:
+        units = quantity * contract.unit
+        signed = units if action == Action.Buy else -units
+        key = (account.account_id, contract.code)
+        position = self._positions.setdefault(
+            key, {"contract": contract, "quantity": 0, "yd_quantity": 0, "price": price}
+        )
+        total = position["quantity"] + signed
+        if total and (position["quantity"] >= 0) == (signed > 0):
+            position["price"] = round(
+                (position["price"] * abs(position["quantity"]) + price * units) / abs(total), 4
+            )
+        position["quantity"] = total
+        if total == 0 and not position["yd_quantity"]:
+            self._positions.pop(key)
+        if contract.security_type == SecurityType.Stock:
+            self._cash[account.account_id] = self._cash.get(account.account_id, INITIAL_CASH) - signed * price
+
+    def cancel_order(self, trade: Any, timeout: int = 5000, cb: Callable | None = None) -> Any:
+        self._request("cancel_order")
+        status = trade.status
+        with self._lock:
+            if status.status in (Status.Cancelled, Status.Failed, Status.Filled):
+                raise ValueError(f"Order {trade.order.id} cannot be cancelled: {status.status.value}")
+            status.cancel_quantity = trade.order.quantity - status.deal_quantity
+            status.status = Status.Cancelled
+        self._events.call_later(0, self._order_event, trade, "Cancel")
+        return trade
+
+    def update_status(self, account: Any = None, trade: Any = None, timeout: int = 5000,
+                      cb: Callable | None = None) -> None:
+        self._request("update_status")
+
+    def list_trades(self) -> list[Any]:
+        with self._lock:
+            return list(self._trades)
+
+    # -- Accounts ------------------------------------------------------
+
+    def list_positions(self, account: Any = None, unit: Any = Unit.Common, timeout: int = 5000,
+                       cb: Callable | None = None) -> list[Any]:
+        self._request("list_positions")
+        account = account or self.stock_account
+        shares = getattr(unit, "value", unit) == Unit.Share.value
+        positions: list[Any] = []
+        with self._lock:
+            for (account_id, code), position in self._positions.items():
+                if account_id != account.account_id:
+                    continue
+                contract = position["contract"]
+                last = self._market(contract).close
+                divisor = 1 if shares else contract.unit
+                positions.append(SimpleNamespace(
+                    id=len(positions), code=code,
+                    direction=Action.Buy if position["quantity"] >= 0 else Action.Sell,
+                    quantity=abs(position["quantity"]) // divisor,
+                    yd_quantity=position["yd_quantity"] // divisor,
+                    price=position["price"], last_price=last,
+                    pnl=round((last - position["price"]) * position["quantity"], 2),
+                ))
+        return positions
+
+    def account_balance(self, timeout: int = 5000, cb: Callable | None = None) -> SimpleNamespace:
+        self._request("account_balance")
+        return SimpleNamespace(
+            status="Fetched", date=_now().isoformat(), errmsg="",
+            acc_balance=round(self._cash.get(self.stock_account.account_id, INITIAL_CASH), 2),
+        )
+
+    def margin(self, account: Any = None, timeout: int = 5000, cb: Callable | None = None) -> SimpleNamespace:
+        self._request("margin")
+        account = account or self.futopt_account
+        with self._lock:
+            open_pnl = sum(
+                (self._market(p["contract"]).close - p["price"]) * p["quantity"] * 200
+                for (account_id, _), p in self._positions.items()
+                if account_id == account.account_id
+            )
+            initial = sum(
+                abs(p["quantity"]) * 184_000
+                for (account_id, _), p in self._positions.items()
+                if account_id == account.account_id
+            )
+        equity = INITIAL_MARGIN + open_pnl
+        return SimpleNamespace(
+            status="Fetched", yesterday_balance=INITIAL_MARGIN, today_balance=INITIAL_MARGIN,
+            deposit_withdrawal=0.0, fee=0.0, tax=0.0, initial_margin=float(initial),
+            maintenance_margin=round(initial * 0.77, 0), margin_call=0.0, risk_indicator=999.0,
+            future_open_position=round(open_pnl, 2), future_settle_profitloss=0.0,
+            equity=equity, equity_amount=equity, available_margin=equity - initial,
+        )
@@ -0,0 +1,200 @@
+"""Shared TTL cache for market snapshots."""
+
+import asyncio
+import logging
+import os
+import sys
+import time
+from collections import OrderedDict
+from collections.abc import Awaitable, Callable
+from datetime import datetime
+from datetime import time as dtime
+from typing import Any
+
+from .contract_cache import TAIPEI_TZ
+
+logger = logging.getLogger(__name__)
+
+# Snapshots move every tick while the market is open, barely at all after close
+DEFAULT_TTL_MS = 1000
+DEFAULT_CLOSED_TTL_MS = 300_000
+DEFAULT_MAX_BYTES = 8 * 1024 * 1024
+
+# Trading sessions in Taipei time: TWSE/TAIFEX day session and TAIFEX night session
+_DAY_SESSION = (dtime(8, 30), dtime(13, 45))
+_NIGHT_SESSION = (dtime(15, 0), dtime(5, 0))
+
+
+def is_market_open(now: datetime | None = None) -> bool:
+    """Whether any Taiwan trading session is running at ``now``."""
+    now = now or datetime.now(TAIPEI_TZ)
+    if now.tzinfo is not None:
+        now = now.astimezone(TAIPEI_TZ)
+    clock, weekday = now.time(), now.weekday()
+    if weekday < 5 and _DAY_SESSION[0] <= clock < _DAY_SESSION[1]:
+        return True
+    # Night session runs Monday 15:00 through Saturday 05:00
+    if weekday < 5 and clock >= _NIGHT_SESSION[0]:
+        return True
+    return 0 < weekday < 6 and clock < _NIGHT_SESSION[1]
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.getenv(name, default))
+    except ValueError:
+        return default
+
+
+def _estimate_size(value: Any) -> int:
+    """Approximate memory footprint of a formatted snapshot."""
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(
+            sys.getsizeof(k) + sys.getsizeof(v) for k, v in value.items()
+        )
+    return sys.getsizeof(value)
+
+
+Fetcher = Callable[[list[str]], Awaitable[dict[str, Any]]]
+
+
+class SnapshotCache:
+    """Snapshot cache keyed by contract code.
+
+    Entries expire after ``ttl`` seconds while the market is open and after
+    ``closed_ttl`` otherwise. Concurrent requests for the same code share one
+    broker call (single flight), and the least recently used entries are
+    evicted once the estimated size exceeds ``max_bytes``.
+    """
+
+    def __init__(
+        self,
+        ttl: float | None = None,
+        closed_ttl: float | None = None,
+        max_bytes: int | None = None,
+        clock: Callable[[], float] = time.monotonic,
+        market_open: Callable[[], bool] = is_market_open,
+    ):
+        self.ttl = ttl if ttl is not None else _env_int("SHIOAJI_SNAPSHOT_TTL_MS", DEFAULT_TTL_MS) / 1000
+        self.closed_ttl = closed_ttl if closed_ttl is not None else _env_int(
+            "SHIOAJI_SNAPSHOT_CLOSED_TTL_MS", DEFAULT_CLOSED_TTL_MS
+        ) / 1000
+        self.max_bytes = max_bytes or _env_int("SHIOAJI_SNAPSHOT_CACHE_BYTES", DEFAULT_MAX_BYTES)
+        self._clock = clock
+        self._market_open = market_open
+        # code -> (expires_at, size, value), oldest first
+        self._entries: OrderedDict[str, tuple[float, int, Any]] = OrderedDict()
+        self._inflight: dict[str, asyncio.Future[Any]] = {}
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+
+    def current_ttl(self) -> float:
+        return self.ttl if self._market_open() else self.closed_ttl
+
+    def peek(self, code: str) -> Any | None:
+        """Return a fresh cached value without touching the counters."""
+        entry = self._entries.get(code)
+        if entry is None or entry[0] <= self._clock():
+            return None
+        return entry[2]
+
+    def put(self, code: str, value: Any) -> None:
+        """Store ``value`` and evict least recently used entries over budget."""
+        self._drop(code)
+        size = _estimate_size(value)
+        self._entries[code] = (self._clock() + self.current_ttl(), size, value)
+        self._bytes += size
+        while self._bytes > self.max_bytes and len(self._entries) > 1:
+            oldest = next(iter(self._entries))
+            self._drop(oldest)
+            self.evictions += 1
+
+    def invalidate(self, code: str | None = None) -> None:
+        """Forget one code, or everything."""
+        if code is None:
+            self._entries.clear()
+            self._bytes = 0
+        else:
+            self._drop(code)
+
+    def _drop(self, code: str) -> None:
+        entry = self._entries.pop(code, None)
+        if entry is not None:
+            self._bytes -= entry[1]
+
+    async def get_many(self, codes: list[str], fetch: Fetcher) -> dict[str, Any]:
+        """Return values for ``codes``, fetching only misses not already in flight.
+
+        ``fetch`` receives the missing codes and returns a mapping of code to
+        value or Exception. Exceptions are returned to every waiter but never
+        cached.
+        """
+        results: dict[str, Any] = {}
+        waiting: dict[str, asyncio.Future[Any]] = {}
+        missing: list[str] = []
+        now = self._clock()
+
+        for code in codes:
+            entry = self._entries.get(code)
+            if entry is not None and entry[0] > now:
+                self._entries.move_to_end(code)
+                results[code] = entry[2]
+                self.hits += 1
+            elif code in self._inflight:
+                waiting[code] = self._inflight[code]
+                self.coalesced += 1
+            else:
+                missing.append(code)
+                self.misses += 1
+
+        if missing:
+            loop = asyncio.get_running_loop()
+            futures = {code: loop.create_future() for code in missing}
+            self._inflight.update(futures)
+            try:
+                fetched = await fetch(missing)
+            except Exception as e:
+                fetched = dict.fromkeys(missing, e)
+            except BaseException:
+                # Cancelled leader: hand waiters an error instead of hanging them
+                for future in futures.values():
+                    if not future.done():
+                        future.set_result(RuntimeError("Snapshot request was cancelled"))
+                raise
+            finally:
+                for code in missing:
+                    self._inflight.pop(code, None)
+
+            for code, future in futures.items():
+                value = fetched.get(code, LookupError(f"No snapshot returned for {code}"))
+                if not isinstance(value, Exception):
+                    self.put(code, value)
+                future.set_result(value)
+                results[code] = value
+
+        for code, future in waiting.items():
+            results[code] = await asyncio.shield(future)
+
+        return results
+
+    def stats(self) -> dict[str, Any]:
+        """Counters for tuning the TTL and memory budget."""
+        lookups = self.hits + self.misses + self.coalesced
+        return {
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "max_bytes": self.max_bytes,
+            "ttl_ms": int(self.current_ttl() * 1000),
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "evictions": self.evictions,
+            "hit_rate": round((self.hits + self.coalesced) / lookups, 4) if lookups else 0.0,
+        }
+
+
+# Global snapshot cache instance
+snapshot_cache = SnapshotCache()
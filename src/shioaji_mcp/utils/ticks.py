@@ -0,0 +1,244 @@
+"""Vectorized tick filtering and summarization."""
+
+import os
+import threading
+import time as clock
+from collections import OrderedDict
+from collections.abc import Callable, Iterator
+from datetime import time
+from typing import Any
+
+import numpy as np
+
+from .resample import INTERVALS, NS_PER_DAY, NS_PER_MINUTE, format_timestamps
+
+# Column names and dtypes, matching shioaji.data.Ticks
+TICK_COLUMNS = {
+    "ts": np.int64,
+    "close": np.float64,
+    "volume": np.int64,
+    "bid_price": np.float64,
+    "bid_volume": np.int64,
+    "ask_price": np.float64,
+    "ask_volume": np.int64,
+    "tick_type": np.int8,
+}
+
+# tick_type values: trades at the ask (buyer-initiated) and at the bid
+TICK_TYPE_BUY = 1
+TICK_TYPE_SELL = 2
+
+TICK_MODES = ["summary", "volume_profile", "raw"]
+
+# A busy contract's day is a few MB of arrays; keep a handful for paging
+DEFAULT_TICK_CACHE_TTL_MS = 30_000
+DEFAULT_TICK_CACHE_ENTRIES = 4
+
+
+def to_arrays(ticks: Any) -> dict[str, np.ndarray]:
+    """Wrap the SDK's columnar tick lists in NumPy arrays."""
+    return {
+        name: np.asarray(
+            [] if getattr(ticks, name, None) is None else getattr(ticks, name), dtype=dtype
+        )
+        for name, dtype in TICK_COLUMNS.items()
+    }
+
+
+def _ns_of_day(value: time) -> int:
+    return ((value.hour * 60 + value.minute) * 60 + value.second) * 1_000_000_000
+
+
+def select(
+    columns: dict[str, np.ndarray],
+    time_start: time | None = None,
+    time_end: time | None = None,
+    min_volume: int | None = None,
+    min_price: float | None = None,
+    max_price: float | None = None,
+) -> dict[str, np.ndarray]:
+    """Keep ticks within a time-of-day range and volume/price bounds.
+
+    A ``time_start`` later than ``time_end`` selects a range across
+    midnight, as for the TAIFEX night session.
+    """
+    mask = np.ones(len(columns["ts"]), dtype=bool)
+    if time_start is not None or time_end is not None:
+        of_day = columns["ts"] % NS_PER_DAY
+        start = _ns_of_day(time_start) if time_start else 0
+        end = _ns_of_day(time_end) if time_end else NS_PER_DAY
+        if start <= end:
+            mask &= (of_day >= start) & (of_day <= end)
+        else:
+            mask &= (of_day >= start) | (of_day <= end)
+    if min_volume is not None:
+        mask &= columns["volume"] >= min_volume
+    if min_price is not None:
+        mask &= columns["close"] >= min_price
+    if max_price is not None:
+        mask &= columns["close"] <= max_price
+    if mask.all():
+        return columns
+    return {name: column[mask] for name, column in columns.items()}
+
+
+def _vwap(notional: np.ndarray, volume: np.ndarray) -> np.ndarray:
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(volume > 0, notional / np.maximum(volume, 1), np.nan)
+
+
+def summarize(columns: dict[str, np.ndarray], bucket: str | None = None) -> list[dict[str, Any]]:
+    """Trade count, volume, VWAP and OHLC per bucket, or for the whole day.
+
+    Buckets are labelled by their end time like K-bars.
+    """
+    ts = columns["ts"]
+    if len(ts) == 0:
+        return []
+    order = np.argsort(ts, kind="stable")
+    ts = ts[order]
+    price = columns["close"][order]
+    volume = columns["volume"][order]
+    tick_type = columns["tick_type"][order]
+
+    if bucket is None:
+        starts = np.array([0])
+    else:
+        minutes = INTERVALS[bucket]
+        if minutes is None:
+            raise ValueError(f"Tick buckets must be intraday, got {bucket}")
+        size = minutes * NS_PER_MINUTE
+        bucket_labels = -(-ts // size) * size
+        starts = np.flatnonzero(np.r_[True, bucket_labels[1:] != bucket_labels[:-1]])
+        labels = bucket_labels[starts]
+    ends = np.r_[starts[1:], len(ts)] - 1
+
+    volumes = np.add.reduceat(volume, starts)
+    vwap = _vwap(np.add.reduceat(price * volume, starts), volumes)
+    buy = np.add.reduceat(np.where(tick_type == TICK_TYPE_BUY, volume, 0), starts)
+    sell = np.add.reduceat(np.where(tick_type == TICK_TYPE_SELL, volume, 0), starts)
+
+    summary: dict[str, list[Any]]
+    if bucket is None:
+        summary = {
+            "start": format_timestamps(ts[:1], "1m"),
+            "end": format_timestamps(ts[-1:], "1m"),
+        }
+    else:
+        summary = {"time": format_timestamps(labels, "1m")}
+    summary |= {
+        "trades": (ends - starts + 1).tolist(),
+        "volume": volumes.tolist(),
+        "vwap": [None if np.isnan(v) else v for v in np.round(vwap, 4).tolist()],
+        "open": price[starts].tolist(),
+        "high": np.maximum.reduceat(price, starts).tolist(),
+        "low": np.minimum.reduceat(price, starts).tolist(),
+        "close": price[ends].tolist(),
+        "buy_volume": buy.tolist(),
+        "sell_volume": sell.tolist(),
+    }
+    names = list(summary)
+    return [dict(zip(names, row, strict=True)) for row in zip(*summary.values(), strict=True)]
+
+
+def volume_profile(columns: dict[str, np.ndarray]) -> list[dict[str, Any]]:
+    """Traded volume per price level, split into buyer- and seller-initiated."""
+    if len(columns["ts"]) == 0:
+        return []
+    prices, inverse = np.unique(columns["close"], return_inverse=True)
+    volume = columns["volume"]
+    tick_type = columns["tick_type"]
+    total = np.bincount(inverse, weights=volume, minlength=len(prices))
+    buy = np.bincount(
+        inverse, weights=np.where(tick_type == TICK_TYPE_BUY, volume, 0), minlength=len(prices)
+    )
+    sell = np.bincount(
+        inverse, weights=np.where(tick_type == TICK_TYPE_SELL, volume, 0), minlength=len(prices)
+    )
+    trades = np.bincount(inverse, minlength=len(prices))
+    share = total / total.sum() if total.sum() else np.zeros_like(total)
+    return [
+        {
+            "price": price,
+            "volume": int(vol),
+            "buy_volume": int(b),
+            "sell_volume": int(s),
+            "trades": int(n),
+            "share": round(float(pct), 6),
+        }
+        for price, vol, b, s, n, pct in zip(
+            prices.tolist(), total, buy, sell, trades, share, strict=True
+        )
+    ]
+
+
+def iter_rows(
+    columns: dict[str, np.ndarray], offset: int = 0, limit: int | None = None
+) -> Iterator[dict[str, Any]]:
+    """Yield raw tick rows from ``offset``, converting only the requested slice."""
+    stop = len(columns["ts"]) if limit is None else offset + limit
+    page = {name: column[offset:stop] for name, column in columns.items()}
+    if len(page["ts"]) == 0:
+        return
+    times = np.datetime_as_string(page["ts"].astype("datetime64[ns]"), unit="us")
+    values = {name: page[name].tolist() for name in TICK_COLUMNS if name != "ts"}
+    for i, ts in enumerate(times.tolist()):
+        yield {"time": ts.replace("T", " "), **{name: column[i] for name, column in values.items()}}
+
+
+class TickCache:
+    """Short-lived LRU of one day's tick arrays per broker query.
+
+    Raw pages of a cursor and repeated summaries of the same day reuse the
+    arrays instead of downloading the whole day from the broker again.
+    """
+
+    def __init__(
+        self,
+        ttl: float | None = None,
+        max_entries: int = DEFAULT_TICK_CACHE_ENTRIES,
+        clock: Callable[[], float] = clock.monotonic,
+    ):
+        if ttl is None:
+            try:
+                ttl = int(os.getenv("SHIOAJI_TICK_CACHE_TTL_MS", DEFAULT_TICK_CACHE_TTL_MS)) / 1000
+            except ValueError:
+                ttl = DEFAULT_TICK_CACHE_TTL_MS / 1000
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._clock = clock
+        self._entries: OrderedDict[tuple, tuple[float, dict[str, np.ndarray]]] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: tuple) -> dict[str, np.ndarray] | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] <= self._clock():
+                self._entries.pop(key, None)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key: tuple, columns: dict[str, np.ndarray]) -> None:
+        if self.ttl <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (self._clock() + self.ttl, columns)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict[str, Any]:
+        return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+
+# Global tick cache instance
+tick_cache = TickCache()
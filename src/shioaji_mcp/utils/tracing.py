@@ -0,0 +1,431 @@
+"""Opt-in request tracing and profiling of the slowest tool calls.
+
+Tracing is off unless ``SHIOAJI_TRACE_FILE`` or ``SHIOAJI_PROFILE_SLOWEST``
+is set; while off, ``tracer.span`` returns a shared no-op context manager.
+
+Each sampled tool call becomes a trace whose spans (contract resolution,
+rate limit waits, broker SDK calls, formatting, JSON encoding) are written
+to the trace file when the call finishes, either as Chrome trace events
+(open in ``chrome://tracing`` or https://ui.perfetto.dev, one track per
+call) or as OTLP/JSON lines (one ``ExportTraceServiceRequest`` per call).
+
+With ``SHIOAJI_PROFILE_SLOWEST=N`` a sampling profiler records the stacks
+of threads working on traced calls and keeps folded stacks (for
+speedscope or flamegraph.pl) of the N slowest calls. Event loop samples
+are shared by the calls in flight at that moment; executor thread samples
+belong to the call that submitted the SDK call.
+"""
+
+import contextlib
+import contextvars
+import heapq
+import json
+import logging
+import os
+import random
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from collections.abc import Iterator
+from pathlib import Path
+from typing import Any, TextIO
+
+logger = logging.getLogger(__name__)
+
+TRACE_FORMATS = ["chrome", "otlp"]
+
+DEFAULT_PROFILE_DIR = "shioaji-profiles"
+DEFAULT_PROFILE_INTERVAL_MS = 5
+# Frames kept per sampled stack, innermost first
+MAX_STACK_DEPTH = 64
+
+SERVICE_NAME = "shioaji-mcp"
+
+# perf_counter_ns is monotonic; this offset turns it into Unix time
+_EPOCH_OFFSET_NS = time.time_ns() - time.perf_counter_ns()
+
+_NOOP = contextlib.nullcontext()
+
+# (trace, current span) of the running task or executor call
+_active: contextvars.ContextVar[tuple["Trace", "Span"] | None] = contextvars.ContextVar(
+    "shioaji_trace", default=None
+)
+
+
+def _now_ns() -> int:
+    return time.perf_counter_ns() + _EPOCH_OFFSET_NS
+
+
+def _float_from_env(name: str, default: float) -> float:
+    value = os.getenv(name)
+    if not value:
+        return default
+    try:
+        return float(value)
+    except ValueError:
+        logger.warning(f"Invalid {name}: {value!r}")
+        return default
+
+
+class Span:
+    """A timed operation inside a trace; also its own context manager."""
+
+    __slots__ = (
+        "trace", "name", "attrs", "span_id", "parent_id", "start_ns", "end_ns", "error",
+        "_token", "_owner",
+    )
+
+    def __init__(self, trace: "Trace", name: str, parent_id: str | None, attrs: dict[str, Any]):
+        self.trace = trace
+        self.name = name
+        self.attrs = attrs
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent_id
+        self.start_ns = 0
+        self.end_ns = 0
+        self.error = False
+        self._token: contextvars.Token[tuple[Trace, Span] | None] | None = None
+        self._owner: Trace | None = None
+
+    def __enter__(self) -> "Span":
+        self._token = _active.set((self.trace, self))
+        profiler = self.trace.tracer._profiler
+        if profiler is not None:
+            self._owner = profiler.claim(self.trace)
+        self.start_ns = _now_ns()
+        return self
+
+    def __exit__(self, exc_type: Any, exc: Any, tb: Any) -> None:
+        self.end_ns = _now_ns()
+        if exc_type is not None:
+            self.error = True
+            self.attrs.setdefault("error", str(exc) or exc_type.__name__)
+        if self._token is not None:
+            _active.reset(self._token)
+        profiler = self.trace.tracer._profiler
+        if profiler is not None:
+            profiler.release(self._owner)
+        self.trace.spans.append(self)
+
+
+class Trace:
+    """Spans recorded for one tool call."""
+
+    def __init__(self, tracer: "Tracer", seq: int, tool: str):
+        self.tracer = tracer
+        self.seq = seq
+        self.tool = tool
+        self.trace_id = os.urandom(16).hex()
+        self.thread_id = threading.get_ident()
+        self.spans: list[Span] = []
+        self.stacks: Counter[str] = Counter()
+
+
+class _SlowestProfiler:
+    """Sample thread stacks of traced calls and keep the N slowest profiles."""
+
+    def __init__(self, keep: int, directory: Path, interval: float):
+        self.keep = keep
+        self.directory = directory
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._in_flight: dict[int, Trace] = {}
+        # executor thread id -> trace of the SDK call it is running
+        self._owners: dict[int, Trace] = {}
+        self._kept: list[tuple[float, int, Path]] = []
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def started(self, trace: Trace) -> None:
+        with self._lock:
+            self._in_flight[trace.seq] = trace
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name="shioaji-profiler", daemon=True
+                )
+                self._thread.start()
+
+    def claim(self, trace: Trace) -> Trace | None:
+        """Attribute the calling executor thread to ``trace``; returns the previous owner."""
+        thread_id = threading.get_ident()
+        if thread_id == trace.thread_id:
+            return None
+        previous = self._owners.get(thread_id)
+        self._owners[thread_id] = trace
+        return previous
+
+    def release(self, previous: Trace | None) -> None:
+        thread_id = threading.get_ident()
+        if previous is not None:
+            self._owners[thread_id] = previous
+        else:
+            self._owners.pop(thread_id, None)
+
+    def finished(self, trace: Trace, duration: float) -> None:
+        with self._lock:
+            self._in_flight.pop(trace.seq, None)
+            if not trace.stacks:
+                return
+            if len(self._kept) >= self.keep and duration <= self._kept[0][0]:
+                return
+            tool = re.sub(r"[^\w.-]", "_", trace.tool)
+            path = self.directory / f"{trace.seq:06d}-{tool}-{duration * 1000:.0f}ms.folded"
+            heapq.heappush(self._kept, (duration, trace.seq, path))
+            dropped = heapq.heappop(self._kept)[2] if len(self._kept) > self.keep else None
+        try:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            path.write_text(
+                "".join(f"{stack} {count}\n" for stack, count in trace.stacks.most_common()),
+                encoding="utf-8",
+            )
+            if dropped is not None:
+                dropped.unlink(missing_ok=True)
+        except OSError as e:
+            logger.warning(f"Failed to write profile {path}: {e}")
+
+    def profiles(self) -> list[Path]:
+        """Kept profile files, slowest first."""
+        with self._lock:
+            return [path for _, _, path in sorted(self._kept, reverse=True)]
+
+    def _run(self) -> None:
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            # Held for the whole pass so finished traces stop receiving samples
+            with self._lock:
+                if not self._in_flight:
+                    continue
+                in_flight = list(self._in_flight.values())
+                owners = dict(self._owners)
+                for thread_id, frame in sys._current_frames().items():
+                    if thread_id == own:
+                        continue
+                    owner = owners.get(thread_id)
+                    targets = [owner] if owner in in_flight else [
+                        trace for trace in in_flight if trace.thread_id == thread_id
+                    ]
+                    if targets:
+                        stack = _fold(frame)
+                        for trace in targets:
+                            trace.stacks[stack] += 1
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=1)
+
+
+def _fold(frame: Any) -> str:
+    """Collapse a stack into ``outer;...;inner`` frame names."""
+    names: list[str] = []
+    while frame is not None and len(names) < MAX_STACK_DEPTH:
+        code = frame.f_code
+        names.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+        frame = frame.f_back
+    return ";".join(reversed(names))
+
+
+def _otlp_value(value: Any) -> dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+class Tracer:
+    """Record spans of sampled tool calls and export them to a trace file."""
+
+    def __init__(self) -> None:
+        self.enabled = False
+        self._file: TextIO | None = None
+        self._profiler: _SlowestProfiler | None = None
+        self._lock = threading.Lock()
+        self.configure()
+
+    def configure(
+        self,
+        path: str | None = None,
+        trace_format: str | None = None,
+        sample_rate: float | None = None,
+        profile_slowest: int | None = None,
+        profile_dir: str | None = None,
+        profile_interval_ms: float | None = None,
+    ) -> None:
+        """(Re)configure tracing; unset arguments are read from the environment."""
+        self.close()
+        path = path if path is not None else os.getenv("SHIOAJI_TRACE_FILE", "")
+        trace_format = (trace_format or os.getenv("SHIOAJI_TRACE_FORMAT") or "chrome").lower()
+        if trace_format not in TRACE_FORMATS:
+            logger.warning(f"Unknown SHIOAJI_TRACE_FORMAT {trace_format!r}, using chrome")
+            trace_format = "chrome"
+        if sample_rate is None:
+            sample_rate = _float_from_env("SHIOAJI_TRACE_SAMPLE_RATE", 1.0)
+        if profile_slowest is None:
+            profile_slowest = int(_float_from_env("SHIOAJI_PROFILE_SLOWEST", 0))
+        if profile_interval_ms is None:
+            profile_interval_ms = _float_from_env(
+                "SHIOAJI_PROFILE_INTERVAL_MS", DEFAULT_PROFILE_INTERVAL_MS
+            )
+
+        self.path = Path(path) if path else None
+        self.format = trace_format
+        self.sample_rate = min(max(sample_rate, 0.0), 1.0)
+        self._seq = 0
+        self._events_written = 0
+        if self.path is not None:
+            try:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                self._file = open(self.path, "w", encoding="utf-8")
+            except OSError as e:
+                logger.warning(f"Tracing disabled, cannot open {self.path}: {e}")
+                self.path = None
+            else:
+                if self.format == "chrome":
+                    self._file.write("[")
+        if profile_slowest > 0:
+            self._profiler = _SlowestProfiler(
+                profile_slowest,
+                Path(profile_dir or os.getenv("SHIOAJI_PROFILE_DIR") or DEFAULT_PROFILE_DIR),
+                max(profile_interval_ms, 0.1) / 1000,
+            )
+        self.enabled = (self.path is not None or self._profiler is not None) and self.sample_rate > 0
+        if self.enabled:
+            logger.info(
+                f"Tracing {self.sample_rate:.0%} of tool calls"
+                + (f" to {self.path} ({self.format})" if self.path else "")
+                + (f", profiling the {profile_slowest} slowest" if self._profiler else "")
+            )
+
+    def request(self, tool: str, arguments: dict[str, Any] | None = None) -> Any:
+        """Trace one tool call if it is sampled; the context yields its root span or None."""
+        if not self.enabled or (self.sample_rate < 1 and random.random() >= self.sample_rate):
+            return _NOOP
+        return self._traced(tool, arguments)
+
+    @contextlib.contextmanager
+    def _traced(self, tool: str, arguments: dict[str, Any] | None) -> Iterator[Span]:
+        with self._lock:
+            self._seq += 1
+            seq = self._seq
+        trace = Trace(self, seq, tool)
+        arg_bytes = len(json.dumps(arguments or {}, default=str, separators=(",", ":")))
+        root = Span(trace, f"tool.{tool}", None, {"tool": tool, "arg_bytes": arg_bytes})
+        if self._profiler is not None:
+            self._profiler.started(trace)
+        try:
+            with root:
+                yield root
+        finally:
+            duration = (root.end_ns - root.start_ns) / 1e9
+            if self._profiler is not None:
+                self._profiler.finished(trace, duration)
+            self._export(trace)
+
+    def span(self, name: str, **attrs: Any) -> Any:
+        """Time a block as a child of the current span; a no-op when untraced."""
+        active = _active.get()
+        if active is None:
+            return _NOOP
+        trace, parent = active
+        return Span(trace, name, parent.span_id, attrs)
+
+    def active(self) -> bool:
+        """Whether the calling task is inside a traced tool call."""
+        return _active.get() is not None
+
+    def profiles(self) -> list[Path]:
+        """Folded stack files of the slowest traced calls, slowest first."""
+        return self._profiler.profiles() if self._profiler is not None else []
+
+    def _export(self, trace: Trace) -> None:
+        with self._lock:
+            if self._file is None:
+                return
+            spans = sorted(trace.spans, key=lambda span: span.start_ns)
+            if self.format == "chrome":
+                text = self._chrome_events(trace, spans)
+            else:
+                text = json.dumps(self._otlp_request(trace, spans), default=str) + "\n"
+            try:
+                self._file.write(text)
+                self._file.flush()
+            except (OSError, ValueError) as e:
+                logger.warning(f"Failed to write trace: {e}")
+
+    def _chrome_events(self, trace: Trace, spans: list[Span]) -> str:
+        pid = os.getpid()
+        events = [{
+            "name": "thread_name", "ph": "M", "pid": pid, "tid": trace.seq,
+            "args": {"name": f"{trace.tool} #{trace.seq}"},
+        }]
+        for span in spans:
+            events.append({
+                "name": span.name,
+                "cat": span.name.split(".", 1)[0],
+                "ph": "X",
+                "ts": span.start_ns / 1000,
+                "dur": (span.end_ns - span.start_ns) / 1000,
+                "pid": pid,
+                "tid": trace.seq,
+                "args": span.attrs,
+            })
+        # The array is left open so the file stays loadable if the process dies
+        text = "".join(
+            ("\n" if self._events_written + i == 0 else ",\n") + json.dumps(event, default=str)
+            for i, event in enumerate(events)
+        )
+        self._events_written += len(events)
+        return text
+
+    @staticmethod
+    def _otlp_request(trace: Trace, spans: list[Span]) -> dict[str, Any]:
+        otlp_spans = []
+        for span in spans:
+            otlp_span = {
+                "traceId": trace.trace_id,
+                "spanId": span.span_id,
+                "name": span.name,
+                "kind": 1,
+                "startTimeUnixNano": str(span.start_ns),
+                "endTimeUnixNano": str(span.end_ns),
+                "attributes": [
+                    {"key": key, "value": _otlp_value(value)} for key, value in span.attrs.items()
+                ],
+                "status": {"code": 2 if span.error else 1},
+            }
+            if span.parent_id:
+                otlp_span["parentSpanId"] = span.parent_id
+            otlp_spans.append(otlp_span)
+        return {
+            "resourceSpans": [{
+                "resource": {
+                    "attributes": [{"key": "service.name", "value": {"stringValue": SERVICE_NAME}}]
+                },
+                "scopeSpans": [{"scope": {"name": "shioaji_mcp"}, "spans": otlp_spans}],
+            }]
+        }
+
+    def close(self) -> None:
+        """Finish the trace file and stop the profiler."""
+        with self._lock:
+            if self._file is not None:
+                try:
+                    if self.format == "chrome":
+                        self._file.write("\n]\n")
+                    self._file.close()
+                except OSError as e:
+                    logger.warning(f"Failed to close trace file: {e}")
+                self._file = None
+        if self._profiler is not None:
+            self._profiler.stop()
+            self._profiler = None
+        self.enabled = False
+
+
+# Global tracer shared by the dispatcher, executor and formatters
+tracer = Tracer()
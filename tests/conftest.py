@@ -0,0 +1,35 @@
+"""Shared test fixtures."""
+
+import pytest_asyncio
+
+from shioaji_mcp.tools import market_data
+from shioaji_mcp.utils.auth import auth_manager
+from shioaji_mcp.utils.contract_cache import contract_cache
+from shioaji_mcp.utils.contract_catalog import contract_catalog
+from shioaji_mcp.utils.kbar_store import KBarStore
+from shioaji_mcp.utils.snapshot_cache import snapshot_cache
+
+
+@pytest_asyncio.fixture
+async def simulator(monkeypatch, tmp_path):
+    """The global auth manager logged in to the local broker simulator."""
+    monkeypatch.setenv("SHIOAJI_BACKEND", "simulator")
+    monkeypatch.setenv("SHIOAJI_SIM_RATE_LIMITS", "off")
+    monkeypatch.setattr(contract_cache, "cache_dir", tmp_path)
+    monkeypatch.setattr(market_data, "kbar_store", KBarStore(tmp_path / "kbars"))
+    assert await auth_manager.ensure_connected()
+    yield auth_manager.get_api()
+    await auth_manager.stop()
+    contract_catalog.invalidate()
+    snapshot_cache.invalidate()
+
+
+@pytest_asyncio.fixture
+async def logged_out(monkeypatch):
+    """The global auth manager logged out, with no credentials to log in again."""
+    monkeypatch.delenv("SHIOAJI_API_KEY", raising=False)
+    monkeypatch.delenv("SHIOAJI_SECRET_KEY", raising=False)
+    monkeypatch.setenv("SHIOAJI_BACKEND", "shioaji")
+    await auth_manager.stop()
+    yield auth_manager
+    await auth_manager.stop()
@@ -0,0 +1,171 @@
+"""Tests for multi-session account resolution and account fan-out."""
+
+import json
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from shioaji_mcp.tools import orders as order_tools
+from shioaji_mcp.tools import positions as position_tools
+from shioaji_mcp.tools import registry as tool_registry
+from shioaji_mcp.tools.orders import list_orders, place_order
+from shioaji_mcp.tools.positions import get_account_balance, get_positions
+from shioaji_mcp.utils.auth import ShioajiAuth, configured_sessions
+
+
+def _account(account_id, account_type="S"):
+    return SimpleNamespace(
+        account_id=account_id, broker_id="9A95", account_type=SimpleNamespace(value=account_type),
+        signed=True,
+    )
+
+
+def _api(stock_ids, futures_ids=()):
+    api = MagicMock()
+    accounts = [_account(i) for i in stock_ids] + [_account(i, "F") for i in futures_ids]
+    api.list_accounts.return_value = accounts
+    api.stock_account = accounts[0]
+    api.list_trades.return_value = []
+    api.list_positions.side_effect = lambda account, **kwargs: [
+        SimpleNamespace(code="2330", quantity=2000, yd_quantity=2000, price=600.0)
+    ]
+    api.futopt_account = next((a for a in accounts if a.account_type.value == "F"), None)
+    api.account_balance.return_value = SimpleNamespace(acc_balance=1000.0)
+    api.margin.return_value = SimpleNamespace(today_balance=5000.0, available_margin=4000.0)
+    api.Order.side_effect = lambda **kwargs: SimpleNamespace(**kwargs)
+
+    def place(contract, order):
+        return SimpleNamespace(
+            contract=contract,
+            order=SimpleNamespace(
+                id=f"o-{order.account.account_id}", account=order.account,
+                action=SimpleNamespace(value="Buy"), quantity=order.quantity, price=order.price,
+            ),
+            status=SimpleNamespace(
+                status=SimpleNamespace(value="Submitted"), deal_quantity=0,
+                cancel_quantity=0, order_datetime=None,
+            ),
+        )
+
+    api.place_order.side_effect = place
+    api.Contracts.Stocks = {"2330": SimpleNamespace(code="2330", name="TSMC")}
+    return api
+
+
+@pytest.fixture
+def manager():
+    manager = ShioajiAuth(sessions=["hedge"])
+    manager.default._mark_ready(_api(["S1", "S2"], ["F1"]))
+    manager.sessions["hedge"]._mark_ready(_api(["S9"]))
+    with patch.object(position_tools, "auth_manager", manager), \
+            patch.object(order_tools, "auth_manager", manager), \
+            patch.object(tool_registry, "auth_manager", manager), \
+            patch.dict("os.environ", {"SHIOAJI_TRADING_ENABLED": "true"}):
+        yield manager
+
+
+def test_configured_sessions(monkeypatch):
+    monkeypatch.setenv("SHIOAJI_SESSIONS", "Hedge, futures,,default,hedge")
+    assert configured_sessions() == ["hedge", "futures"]
+    assert ShioajiAuth().sessions["futures"].env_prefix == "SHIOAJI_FUTURES_"
+
+
+@pytest.mark.asyncio
+async def test_resolve_accounts(manager):
+    [default] = await manager.resolve_accounts(None)
+    assert default.session is manager.default and default.account is None
+    [hedge] = await manager.resolve_accounts("hedge")
+    assert hedge.session.name == "hedge"
+    [s2] = await manager.resolve_accounts("9A95-S2")
+    assert (s2.session.name, s2.account_id) == ("default", "S2")
+
+    everything = await manager.resolve_accounts("all")
+    assert [(t.session.name, t.account_id) for t in everything] == [
+        ("default", "S1"), ("default", "S2"), ("default", "F1"), ("hedge", "S9"),
+    ]
+    with pytest.raises(LookupError, match="Unknown account"):
+        await manager.resolve_accounts("X1")
+    with pytest.raises(ValueError, match="single account"):
+        await manager.resolve_account("all")
+
+
+@pytest.mark.asyncio
+async def test_positions_fan_out_across_sessions(manager):
+    manager.sessions["hedge"].api.list_positions.side_effect = RuntimeError("timeout")
+
+    result = await get_positions({"account": "all"})
+
+    assert "Retrieved 3 positions across 3 accounts (1 accounts failed)" in result[0]["text"]
+    rows = json.loads(result[1]["text"])
+    assert [row.get("account_id") for row in rows] == ["S1", "S2", "F1", "S9"]
+    assert rows[-1] == {
+        "session": "hedge", "account_id": "S9", "account_type": "stock", "error": "timeout",
+    }
+
+
+@pytest.mark.asyncio
+async def test_futures_positions_are_not_converted_to_lots(manager):
+    manager.default.api.list_positions.side_effect = lambda account, **kwargs: [
+        SimpleNamespace(code="TXFJ6", quantity=3, yd_quantity=2, price=22000.0)
+    ]
+
+    stock = json.loads((await get_positions({"account": "S1"}))[1]["text"])[0]
+    futures = json.loads((await get_positions({"account": "F1"}))[1]["text"])[0]
+
+    assert (stock["quantity_lots"], stock["holding_lots"], stock["holding_odd_shares"]) == (0, 0, 3)
+    assert (futures["quantity"], futures["yd_quantity"], futures["actual_holding"]) == (3, 2, 3)
+    assert "quantity_lots" not in futures and "holding_lots" not in futures
+
+
+@pytest.mark.asyncio
+async def test_balance_of_non_default_account(manager):
+    api = manager.default.api
+
+    result = await get_account_balance({"account": "S1"})
+    data = json.loads(result[1]["text"])
+    assert (data["account_id"], data["cash_balance"]) == ("S1", 1000.0)
+
+    # The SDK only reports the default stock account; it is never switched
+    result = await get_account_balance({"account": "S2"})
+    assert "only reports the default stock account" in result[0]["text"]
+    api.set_default_account.assert_not_called()
+
+    result = await get_account_balance({"account": "F1"})
+    data = json.loads(result[1]["text"])
+    assert (data["account_type"], data["cash_balance"]) == ("futures", 5000.0)
+    api.margin.assert_called_once()
+
+
+@pytest.mark.asyncio
+async def test_orders_route_to_account_session(manager):
+    result = await place_order(
+        {"contract": "2330", "action": "Buy", "quantity": 1, "price": 600, "account": "S9"}
+    )
+    data = json.loads(result[1]["text"])
+    assert (data["order_id"], data["session"]) == ("o-S9", "hedge")
+    assert manager.sessions["hedge"].orders.get("o-S9")["account"] == "S9"
+    assert manager.default.orders.get("o-S9") is None
+
+    await place_order({"contract": "2330", "action": "Buy", "quantity": 1, "account": "S2"})
+    result = await list_orders({"account": "all"})
+    rows = json.loads(result[1]["text"])
+    assert sorted((row["session"], row["order_id"]) for row in rows) == [
+        ("default", "o-S2"), ("hedge", "o-S9"),
+    ]
+
+    result = await list_orders({"account": "S2"})
+    assert [row["order_id"] for row in json.loads(result[1]["text"])] == ["o-S2"]
+    manager.default.orders.clear()
+
+
+@pytest.mark.asyncio
+async def test_orders_carry_explicit_account(manager):
+    api = manager.default.api
+
+    await place_order({"contract": "2330", "action": "Buy", "quantity": 1})
+    assert api.Order.call_args.kwargs["account"] is api.stock_account
+
+    result = await place_order({"contract": "2330", "action": "Buy", "quantity": 1, "account": "F1"})
+    assert "a stock account is required" in result[0]["text"]
+    manager.default.orders.clear()
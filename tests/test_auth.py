@@ -6,52 +6,41 @@ from shioaji_mcp.utils.auth import ShioajiAuth
 
 
 @pytest.mark.asyncio
-async def test_auth_login_success():
-    """Test successful login."""
-    auth = ShioajiAuth()
-
-    result = await auth.login(
-        api_key="test_key",
-        secret_key="test_secret",
-        person_id="test_person",
-        password="test_password",
-    )
+async def test_auth_login_success(monkeypatch):
+    """Test successful login against the simulator backend."""
+    monkeypatch.setenv("SHIOAJI_BACKEND", "simulator")
+    auth = ShioajiAuth(sessions=[], ready_timeout=5)
 
-    assert result["success"] is True
-    assert "Login successful" in result["message"]
+    assert await auth.ensure_connected() is True
     assert auth.is_connected() is True
+    assert auth.status()["default"]["logins"] == 1
+    await auth.stop()
 
 
 @pytest.mark.asyncio
-async def test_auth_login_missing_credentials():
+async def test_auth_login_missing_credentials(monkeypatch):
     """Test login with missing credentials."""
-    auth = ShioajiAuth()
+    monkeypatch.delenv("SHIOAJI_API_KEY", raising=False)
+    monkeypatch.setenv("SHIOAJI_BACKEND", "shioaji")
+    auth = ShioajiAuth(sessions=[], ready_timeout=5)
 
-    result = await auth.login()
-
-    assert result["success"] is False
-    assert "Missing required credentials" in result["message"]
+    assert await auth.ensure_connected() is False
+    assert "Missing SHIOAJI_API_KEY" in auth.status()["default"]["last_error"]
     assert auth.is_connected() is False
 
 
 @pytest.mark.asyncio
-async def test_auth_logout():
+async def test_auth_logout(monkeypatch):
     """Test logout functionality."""
-    auth = ShioajiAuth()
-
-    # Login first
-    await auth.login(
-        api_key="test_key",
-        secret_key="test_secret",
-        person_id="test_person",
-        password="test_password",
-    )
+    monkeypatch.setenv("SHIOAJI_BACKEND", "simulator")
+    auth = ShioajiAuth(sessions=[], ready_timeout=5)
+    assert await auth.ensure_connected()
 
-    # Then logout
-    result = await auth.logout()
+    result = await auth.stop()
 
-    assert result["success"] is True
+    assert result is None
     assert auth.is_connected() is False
+    assert (await auth.logout())["message"] == "Already logged out"
 
 
 def test_get_api_not_connected():
@@ -0,0 +1,156 @@
+"""Tests for batch order placement and cancellation."""
+
+import json
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from shioaji_mcp.tools.orders import cancel_all, cancel_orders, place_orders
+from shioaji_mcp.utils.auth import auth_manager
+from shioaji_mcp.utils.order_index import order_index
+
+
+def _trade(order_id, code, status="Submitted"):
+    return SimpleNamespace(
+        contract=SimpleNamespace(code=code),
+        order=SimpleNamespace(
+            id=order_id, action=SimpleNamespace(value="Buy"), quantity=1, price=10.0
+        ),
+        status=SimpleNamespace(
+            status=SimpleNamespace(value=status), deal_quantity=0,
+            cancel_quantity=0, order_datetime=None,
+        ),
+    )
+
+
+@pytest.fixture
+def api():
+    api = MagicMock()
+    api.Contracts.Stocks = {
+        code: SimpleNamespace(code=code, name=code) for code in ["2330", "2317", "2454"]
+    }
+    api.list_trades.return_value = []
+    counter = iter(range(1000))
+
+    def place(contract, order):
+        if contract.code == "2454":
+            raise RuntimeError("rejected")
+        return _trade(f"o{next(counter)}", contract.code)
+
+    api.place_order.side_effect = place
+    api.cancel_order.side_effect = lambda trade: trade
+    return api
+
+
+@pytest.fixture(autouse=True)
+def trading_session(api):
+    order_index.clear()
+    with patch.object(auth_manager, "is_connected", return_value=True), \
+            patch.object(auth_manager, "get_api", return_value=api), \
+            patch.dict("os.environ", {"SHIOAJI_TRADING_ENABLED": "true"}):
+        yield
+    order_index.clear()
+
+
+@pytest.mark.asyncio
+async def test_place_orders_returns_per_order_results(api):
+    """Test concurrent placement with one contract resolution per code."""
+    result = await place_orders({"orders": [
+        {"contract": "2330", "action": "buy", "quantity": 1, "price": 600},
+        {"contract": "2330", "action": "sell", "quantity": 2},
+        {"contract": "2454", "action": "buy", "quantity": 1},
+    ]})
+
+    assert "Placed 2 of 3 orders (1 failed)" in result[0]["text"]
+    data = json.loads(result[1]["text"])
+    assert [item["index"] for item in data] == [0, 1, 2]
+    assert data[0]["action"] == "BUY" and data[1]["price"] == "Market"
+    assert data[2]["error"] == "rejected"
+    assert len(order_index.find()) == 2
+
+
+@pytest.mark.asyncio
+async def test_place_orders_rejects_invalid_batch(api):
+    """Test that nothing is sent when any order fails validation."""
+    result = await place_orders({"orders": [
+        {"contract": "2330", "action": "Buy", "quantity": 1},
+        {"contract": "2330", "action": "Hold", "quantity": 1},
+        {"contract": "9999", "action": "Buy", "quantity": 1},
+    ]})
+
+    assert "order 1: Invalid action: Hold" in result[0]["text"]
+    assert "order 2: Contract 9999 not found" in result[0]["text"]
+    api.place_order.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_place_orders_rejects_bool_quantity_and_bad_price(api):
+    """Test that booleans and invalid prices are rejected before sending."""
+    result = await place_orders({"orders": [
+        {"contract": "2330", "action": "Buy", "quantity": True},
+        {"contract": "2330", "action": "Buy", "quantity": 1, "price": -1},
+        {"contract": "2330", "action": "Buy", "quantity": 1, "price": "600"},
+        {"contract": "2330", "action": "Buy", "quantity": 1, "price": False},
+    ]})
+
+    assert "order 0: Invalid quantity: True" in result[0]["text"]
+    assert "order 1: Invalid price: -1" in result[0]["text"]
+    assert "order 2: Invalid price: 600" in result[0]["text"]
+    assert "order 3: Invalid price: False" in result[0]["text"]
+    api.place_order.assert_not_called()
+
+
+def test_futures_orders_use_futures_price_types():
+    """Test that futures and options orders get SDK futures price types."""
+    import shioaji as sj
+
+    from shioaji_mcp.tools.orders import _create_order
+
+    api = MagicMock()
+    api.stock_account = SimpleNamespace(account_id="S1", account_type="S")
+    api.futopt_account = SimpleNamespace(account_id="F1", account_type="F")
+    future = SimpleNamespace(code="TXFA6", security_type=sj.constant.SecurityType.Future)
+    _create_order(api, future, "buy", 1, 22000.0, "ROD")
+    fields = api.Order.call_args.kwargs
+    assert fields["account"] is api.futopt_account
+    assert fields["price_type"] is sj.constant.FuturesPriceType.LMT
+    assert fields["octype"] is sj.constant.FuturesOCType.Auto
+    assert fields["action"] is sj.constant.Action.Buy
+
+    stock = SimpleNamespace(code="2330", security_type=sj.constant.SecurityType.Stock)
+    _create_order(api, stock, "sell", 1, None, "IOC")
+    fields = api.Order.call_args.kwargs
+    assert fields["price_type"] is sj.constant.StockPriceType.MKT
+    assert fields["order_type"] is sj.constant.OrderType.IOC
+    assert fields["account"] is api.stock_account
+    assert "octype" not in fields
+
+
+@pytest.mark.asyncio
+async def test_cancel_orders_and_cancel_all(api):
+    """Test cancelling by id and cancelling every open order."""
+    api.list_trades.return_value = [
+        _trade("a", "2330"), _trade("b", "2317"), _trade("c", "2330", status="Filled"),
+    ]
+
+    result = await cancel_orders({"order_ids": ["a", "zzz"]})
+    data = json.loads(result[1]["text"])
+    assert data == [
+        {"order_id": "a", "status": "Cancelled"},
+        {"order_id": "zzz", "error": "Order zzz not found"},
+    ]
+
+    api.cancel_order.reset_mock()
+    result = await cancel_all({"contract": "2317"})
+    assert "Cancelled 1 of 1 orders" in result[0]["text"]
+    assert api.cancel_order.call_count == 1
+
+
+@pytest.mark.asyncio
+async def test_batch_tools_require_trading_permission():
+    """Test that batch tools honour SHIOAJI_TRADING_ENABLED."""
+    with patch.dict("os.environ", {"SHIOAJI_TRADING_ENABLED": "false"}):
+        for tool in (place_orders, cancel_orders, cancel_all):
+            result = await tool({})
+            assert "not permitted" in result[0]["text"]
@@ -0,0 +1,95 @@
+"""Tests for the persistent contract cache."""
+
+import json
+from datetime import date, datetime
+from types import SimpleNamespace
+
+from shioaji.contracts import Future, Stock
+
+from shioaji_mcp.utils.contract_cache import ContractCache, trading_date
+from shioaji_mcp.utils.contract_catalog import ContractCatalog
+
+TODAY = date(2026, 1, 5)
+
+
+def _live_catalog():
+    catalog = ContractCatalog()
+    catalog.build(SimpleNamespace(
+        Stocks=[[
+            Stock(code="2330", exchange="TSE", name="台積電", symbol="TSE2330"),
+            Stock(code="6488", exchange="OTC", name="環球晶", symbol="OTC6488"),
+        ]],
+        Futures=[[Future(code="TXFA6", name="臺股期貨01", symbol="TXF202601")]],
+    ))
+    return catalog
+
+
+def test_save_and_load_roundtrip(tmp_path):
+    """Test that a saved snapshot seeds an empty catalog."""
+    cache = ContractCache(tmp_path)
+    assert cache.save(_live_catalog(), today=TODAY)
+
+    catalog = ContractCatalog()
+    assert cache.load_into(catalog, today=TODAY)
+    assert catalog.from_cache
+    assert len(catalog) == 3
+
+    results, _ = catalog.search("積電")
+    assert results[0]["code"] == "2330"
+
+    contract = catalog.get("2330")
+    assert isinstance(contract, Stock)
+    assert contract.exchange.value == "TSE"
+    assert isinstance(catalog.get("TXFA6"), Future)
+
+
+def test_stale_snapshot_is_discarded(tmp_path):
+    """Test that a snapshot from another trading date is not used."""
+    cache = ContractCache(tmp_path)
+    cache.save(_live_catalog(), today=TODAY)
+
+    catalog = ContractCatalog()
+    assert not cache.load_into(catalog, today=date(2026, 1, 6))
+    assert not catalog.is_built
+    assert not cache.path.exists()
+
+
+def test_load_skips_built_catalog(tmp_path):
+    """Test that a live catalog is never replaced by the snapshot."""
+    cache = ContractCache(tmp_path)
+    cache.save(_live_catalog(), today=TODAY)
+
+    catalog = _live_catalog()
+    assert not cache.load_into(catalog, today=TODAY)
+    assert not catalog.from_cache
+
+
+def test_corrupt_snapshot_is_ignored(tmp_path):
+    """Test that an unreadable cache file does not raise."""
+    cache = ContractCache(tmp_path)
+    cache.path.write_bytes(b"not json")
+
+    assert not cache.load_into(ContractCatalog(), today=TODAY)
+
+
+def test_snapshot_is_plain_json_with_known_fields(tmp_path):
+    """Test that snapshots hold only explicit scalar fields."""
+    cache = ContractCache(tmp_path)
+    cache.save(_live_catalog(), today=TODAY)
+
+    snapshot = json.loads(cache.path.read_text(encoding="utf-8"))
+    assert snapshot["records"][0]["name"] == "台積電"
+    assert snapshot["payloads"][0]["exchange"] == "TSE"
+
+    snapshot["payloads"][0]["exchange"] = {"__reduce__": "os.system"}
+    cache.path.write_text(json.dumps(snapshot), encoding="utf-8")
+    catalog = ContractCatalog()
+    assert not cache.load_into(catalog, today=TODAY)
+    assert not catalog.is_built
+
+
+def test_trading_date_uses_taipei_time():
+    """Test that trading dates follow the Taipei calendar."""
+    from datetime import timezone
+
+    assert trading_date(datetime(2026, 1, 5, 17, 0, tzinfo=timezone.utc)) == date(2026, 1, 6)
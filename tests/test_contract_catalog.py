@@ -0,0 +1,136 @@
+"""Tests for the indexed contract catalog."""
+
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from shioaji_mcp.utils.contract_catalog import ContractCatalog
+
+
+def _contract(code, name, exchange, symbol=None):
+    return SimpleNamespace(
+        code=code, symbol=symbol or code, name=name, exchange=exchange, currency="TWD"
+    )
+
+
+def _contracts():
+    return SimpleNamespace(
+        Stocks=[
+            [
+                _contract("2330", "台積電", "TSE"),
+                _contract("2317", "鴻海", "TSE"),
+                _contract("2303", "聯電", "TSE"),
+            ],
+            [_contract("6488", "環球晶", "OTC")],
+        ],
+        Futures=[[_contract("TXFA6", "臺股期貨01", "TAIFEX", symbol="TXF202601")]],
+        Options=[],
+        Indexs=[[_contract("001", "加權指數", "TSE")]],
+    )
+
+
+@pytest.fixture
+def catalog():
+    catalog = ContractCatalog()
+    catalog.build(_contracts())
+    return catalog
+
+
+def test_build_indexes_all_product_types(catalog):
+    """Test that stocks, futures and indexes are all indexed."""
+    assert len(catalog) == 6
+    categories = {item["category"] for item in catalog.search(limit=500)[0]}
+    assert categories == {"Stock", "Future", "Index"}
+
+
+def test_search_ranks_exact_code_first(catalog):
+    """Test that exact code matches outrank prefix matches."""
+    results, total = catalog.search("23")
+    assert total == 3
+    assert [item["code"] for item in results] == ["2303", "2317", "2330"]
+
+    results, _ = catalog.search("2330")
+    assert results[0]["code"] == "2330"
+    assert results[0]["name"] == "台積電"
+
+
+def test_search_by_name_substring(catalog):
+    """Test substring matching on Chinese contract names."""
+    results, total = catalog.search("積電")
+    assert total == 1
+    assert results[0]["code"] == "2330"
+
+
+def test_search_filters_and_pagination(catalog):
+    """Test exchange/category filters and offset pagination."""
+    results, total = catalog.search(exchange="otc")
+    assert total == 1 and results[0]["code"] == "6488"
+
+    results, total = catalog.search(category="futures")
+    assert total == 1 and results[0]["symbol"] == "TXF202601"
+
+    page1, total = catalog.search(category="Stock", limit=2)
+    page2, _ = catalog.search(category="Stock", limit=2, offset=2)
+    assert total == 4
+    assert [item["code"] for item in page1 + page2] == ["2303", "2317", "2330", "6488"]
+
+
+def test_get_by_code_and_symbol(catalog):
+    """Test direct contract lookup."""
+    assert catalog.get("2330").name == "台積電"
+    assert catalog.get("TXF202601").code == "TXFA6"
+    assert catalog.get("0000") is None
+
+
+def test_ensure_current_rebuilds_on_redownload(catalog):
+    """Test that a new SDK Contracts tree triggers a rebuild."""
+    api = SimpleNamespace(Contracts=_contracts())
+    catalog.ensure_current(api)
+    assert len(catalog) == 6
+
+    api.Contracts = SimpleNamespace(Stocks=[[_contract("1101", "台泥", "TSE")]])
+    catalog.ensure_current(api)
+    assert len(catalog) == 1
+    assert catalog.get("2330") is None
+
+
+@pytest.mark.asyncio
+async def test_refresh_builds_cold_catalog_off_the_loop():
+    """Test that resolve only looks up, and refresh indexes the SDK contracts."""
+    catalog = ContractCatalog()
+    api = SimpleNamespace(Contracts=_contracts())
+    assert catalog.resolve(api, "TXF202601") is None
+    assert not catalog.is_built
+
+    loop_thread = threading.get_ident()
+    build = catalog.build
+    threads = []
+
+    def tracked_build(contracts):
+        threads.append(threading.get_ident())
+        build(contracts)
+
+    catalog.build = tracked_build
+    await catalog.refresh(api)
+    await catalog.refresh(api)
+    assert len(threads) == 1 and threads[0] != loop_thread
+    assert catalog.resolve(api, "TXF202601").code == "TXFA6"
+    assert catalog.resolve(api, "2330").name == "台積電"
+    assert catalog.resolve(api, "0000") is None
+
+
+def test_search_is_fast_on_large_catalog():
+    """Test that queries stay well under a millisecond on a large catalog."""
+    catalog = ContractCatalog()
+    catalog.build(SimpleNamespace(Stocks=[[
+        _contract(str(100000 + i), f"股票{i}", "TSE") for i in range(50000)
+    ]]))
+
+    started = time.perf_counter()
+    for _ in range(100):
+        catalog.search("1234")
+    elapsed = (time.perf_counter() - started) / 100
+
+    assert elapsed < 0.005
@@ -0,0 +1,90 @@
+"""Tests for the bounded SDK executor."""
+
+import asyncio
+import threading
+
+import pytest
+
+from shioaji_mcp.utils.executor import BrokerExecutor
+
+
+@pytest.mark.asyncio
+async def test_run_returns_result_off_event_loop():
+    """Test that calls run in a worker thread and return their result."""
+    executor = BrokerExecutor({"quote": 2})
+    loop_thread = threading.get_ident()
+
+    result = await executor.run("quote", threading.get_ident)
+
+    assert result != loop_thread
+    assert executor.stats()["quote"]["completed"] == 1
+    executor.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_run_propagates_errors():
+    """Test that SDK exceptions are raised to the caller and counted."""
+    executor = BrokerExecutor({"order": 1})
+
+    def fail():
+        raise RuntimeError("broker down")
+
+    with pytest.raises(RuntimeError, match="broker down"):
+        await executor.run("order", fail)
+
+    assert executor.stats()["order"]["failed"] == 1
+    executor.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_unknown_category():
+    """Test that an unknown category is rejected."""
+    executor = BrokerExecutor({"quote": 1})
+
+    with pytest.raises(ValueError, match="Unknown executor category"):
+        await executor.run("history", lambda: None)
+    executor.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_categories_are_isolated():
+    """Test that a blocked category does not delay another category."""
+    executor = BrokerExecutor({"quote": 1, "data": 1})
+    release = threading.Event()
+
+    slow = asyncio.ensure_future(executor.run("data", release.wait, 5))
+    queued = asyncio.ensure_future(executor.run("data", lambda: "queued"))
+    await asyncio.sleep(0.05)
+
+    assert await executor.run("quote", lambda: "fast") == "fast"
+    assert executor.queue_depth("data") == 1
+    assert executor.stats()["data"]["active"] == 1
+
+    release.set()
+    assert await slow is True
+    assert await queued == "queued"
+    assert executor.queue_depth() == 0
+    executor.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_cancelled_queued_call_leaves_queue():
+    """Test that a call cancelled while queued is not counted as queued."""
+    executor = BrokerExecutor({"data": 1})
+    release = threading.Event()
+
+    slow = asyncio.ensure_future(executor.run("data", release.wait, 5))
+    queued = asyncio.ensure_future(executor.run("data", lambda: "queued"))
+    await asyncio.sleep(0.05)
+    assert executor.queue_depth("data") == 1
+
+    queued.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await queued
+    assert executor.queue_depth("data") == 0
+
+    release.set()
+    assert await slow is True
+    stats = executor.stats()["data"]
+    assert (stats["queued"], stats["active"], stats["completed"]) == (0, 0, 1)
+    executor.shutdown()
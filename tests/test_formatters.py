@@ -0,0 +1,68 @@
+"""Tests for response formatting."""
+
+import json
+from datetime import datetime
+
+import numpy as np
+import pytest
+
+from shioaji_mcp.utils.formatters import format_success_response, to_columnar
+
+ROWS = [
+    {"date": "2026-01-05 09:01:00", "close": 600.0, "volume": 10},
+    {"date": "2026-01-05 09:02:00", "close": 601.0, "volume": 12},
+]
+
+
+def test_default_format_is_indented_json():
+    """Test that the default output is unchanged pretty-printed JSON."""
+    result = format_success_response(ROWS, "ok")
+
+    assert result[0]["text"] == "ok"
+    assert result[1]["text"] == json.dumps(ROWS, indent=2, default=str)
+
+
+def test_compact_format():
+    """Test compact output has no whitespace and round-trips."""
+    result = format_success_response(ROWS, "ok", "compact")
+
+    assert "\n" not in result[1]["text"] and ", " not in result[1]["text"]
+    assert json.loads(result[1]["text"]) == ROWS
+
+
+def test_columnar_format():
+    """Test columnar output for lists of rows."""
+    result = format_success_response(ROWS, "ok", "columnar")
+
+    assert json.loads(result[1]["text"]) == {
+        "columns": ["date", "close", "volume"],
+        "rows": [["2026-01-05 09:01:00", 600.0, 10], ["2026-01-05 09:02:00", 601.0, 12]],
+    }
+
+
+def test_columnar_leaves_dicts_unchanged():
+    """Test that non-tabular payloads are only compacted."""
+    data = {"account_id": "123", "cash": 1.5}
+    assert to_columnar(data) is data
+    result = format_success_response(data, None, "columnar")
+    assert json.loads(result[0]["text"]) == data
+
+
+def test_compact_datetime_matches_json_default():
+    """Test that datetimes encode like json's default=str."""
+    ts = datetime(2026, 1, 5, 9, 1)
+    result = format_success_response({"ts": ts}, None, "compact")
+    assert json.loads(result[0]["text"]) == {"ts": str(ts)}
+
+
+def test_compact_encodes_numpy_and_big_ints():
+    """Test numpy values encode as numbers and oversized ints still encode."""
+    data = {"close": np.float64(1.5), "volume": np.array([1, 2]), "big": 2**70}
+    result = format_success_response(data, None, "compact")
+    assert json.loads(result[0]["text"]) == {"close": 1.5, "volume": [1, 2], "big": 2**70}
+
+
+def test_unknown_format():
+    """Test that unsupported formats are rejected."""
+    with pytest.raises(ValueError, match="Unsupported format"):
+        format_success_response(ROWS, "ok", "xml")
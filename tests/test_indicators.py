@@ -0,0 +1,145 @@
+"""Tests for indicator kernels and the compute_indicators tool."""
+
+import json
+from datetime import date, datetime, timedelta, timezone
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+
+import numpy as np
+import pytest
+
+from shioaji_mcp.tools import indicators as indicator_tools
+from shioaji_mcp.tools.indicators import compute_indicators, default_start
+from shioaji_mcp.utils.auth import auth_manager
+from shioaji_mcp.utils.indicators import (
+    IndicatorCache,
+    atr,
+    bollinger,
+    ema,
+    normalize_indicator,
+    rsi,
+    sma,
+)
+from shioaji_mcp.utils.kbar_store import KBarStore
+
+
+def _reference_ewm(x, alpha, start, seed):
+    out = [np.nan] * len(x)
+    out[start] = seed
+    for i in range(start + 1, len(x)):
+        out[i] = (1 - alpha) * out[i - 1] + alpha * x[i]
+    return np.array(out)
+
+
+@pytest.fixture
+def close():
+    rng = np.random.default_rng(7)
+    return 100 + np.cumsum(rng.normal(0, 1, 3000))
+
+
+def test_sma_and_bollinger(close):
+    """Test rolling mean and bands against a direct computation."""
+    assert np.isnan(sma(close, 20)[18])
+    assert sma(close, 20)[19] == pytest.approx(close[:20].mean())
+    upper, middle, lower = bollinger(close, 20, 2)
+    window = close[-20:]
+    assert middle[-1] == pytest.approx(window.mean())
+    assert upper[-1] - middle[-1] == pytest.approx(2 * window.std(), rel=1e-6)
+    assert middle[-1] - lower[-1] == pytest.approx(2 * window.std(), rel=1e-6)
+
+
+@pytest.mark.parametrize("period", [2, 20, 200])
+def test_ema_matches_recursion_over_long_series(close, period):
+    """Test that the blockwise closed form stays exact for long series."""
+    expected = _reference_ewm(close, 2 / (period + 1), 0, close[0])
+    np.testing.assert_allclose(ema(close, period), expected, rtol=1e-9)
+
+
+def test_rsi_and_atr_use_wilder_smoothing(close):
+    """Test RSI and ATR against straightforward Wilder recursions."""
+    period = 14
+    change = np.diff(close)
+    gain, loss = np.maximum(change, 0), np.maximum(-change, 0)
+    avg_gain = _reference_ewm(np.r_[0, gain], 1 / period, period, gain[:period].mean())
+    avg_loss = _reference_ewm(np.r_[0, loss], 1 / period, period, loss[:period].mean())
+    np.testing.assert_allclose(
+        rsi(close, period)[period:], (100 - 100 / (1 + avg_gain / avg_loss))[period:], rtol=1e-9
+    )
+    assert np.isnan(rsi(close, period)[period - 1])
+
+    high, low = close + 1, close - 1
+    tr = np.maximum(high - low, np.maximum(abs(high - np.r_[close[0], close[:-1]]),
+                                           abs(low - np.r_[close[0], close[:-1]])))
+    expected = _reference_ewm(tr, 1 / period, period - 1, tr[:period].mean())
+    np.testing.assert_allclose(atr(high, low, close, period)[period - 1:],
+                               expected[period - 1:], rtol=1e-9)
+
+
+def test_rsi_of_rising_series_is_100():
+    assert rsi(np.arange(30, dtype=float), 14)[-1] == 100
+
+
+def test_normalize_indicator():
+    assert normalize_indicator("rsi") == ("rsi", {"period": 14})
+    assert normalize_indicator({"name": "Bollinger", "period": 10}) == (
+        "bollinger", {"period": 10, "stddev": 2.0}
+    )
+    with pytest.raises(ValueError, match="Unknown indicator"):
+        normalize_indicator("macd")
+    with pytest.raises(ValueError, match="Unknown parameters"):
+        normalize_indicator({"name": "sma", "window": 5})
+
+
+def test_default_start_covers_warmup():
+    end = date(2026, 1, 9)
+    assert default_start(end, "1D", 60) <= end - timedelta(days=84)
+    assert default_start(end, "5m", 60) < end
+
+
+def _daily_kbars(start, end):
+    """One 13:30 bar per weekday with a rising close."""
+    columns = {name: [] for name in ("ts", "Open", "High", "Low", "Close", "Volume", "Amount")}
+    day = date.fromisoformat(start)
+    while day <= date.fromisoformat(end):
+        if day.weekday() < 5:
+            ts = datetime(day.year, day.month, day.day, 13, 30, tzinfo=timezone.utc)
+            price = 100.0 + day.toordinal() % 1000
+            columns["ts"].append(int(ts.timestamp()) * 1_000_000_000)
+            for name, value in (("Open", price), ("High", price + 1), ("Low", price - 1),
+                                ("Close", price)):
+                columns[name].append(value)
+            columns["Volume"].append(10)
+            columns["Amount"].append(price * 10)
+        day += timedelta(days=1)
+    return SimpleNamespace(**columns)
+
+
+@pytest.mark.asyncio
+async def test_compute_indicators_returns_latest_values(tmp_path):
+    """Test tails, per-contract errors and memoization across calls."""
+    api = MagicMock()
+    api.Contracts.Stocks = {"2330": SimpleNamespace(code="2330", name="TSMC")}
+    api.kbars.side_effect = lambda contract, start, end, timeout: _daily_kbars(start, end)
+    cache = IndicatorCache()
+    arguments = {
+        "contracts": ["2330", "9999"],
+        "indicators": [{"name": "sma", "period": 5}, "rsi", "bollinger"],
+        "end_date": "2025-06-30",
+        "tail": 3,
+    }
+
+    with patch.object(auth_manager, "is_connected", return_value=True), \
+            patch.object(auth_manager, "get_api", return_value=api), \
+            patch.object(indicator_tools, "kbar_store", KBarStore(tmp_path)), \
+            patch.object(indicator_tools, "indicator_cache", cache):
+        result = await compute_indicators(arguments)
+        await compute_indicators(arguments)
+
+    assert "Computed 3 indicators for 1 contracts (1 failed)" in result[0]["text"]
+    data = json.loads(result[1]["text"])
+    assert data[0]["date"][-1] == "2025-06-30"
+    assert len(data[0]["indicators"]["sma_5"]) == 3
+    assert data[0]["indicators"]["rsi_14"][-1] == 100
+    assert set(data[0]["indicators"]["bollinger_20_2"]) == {"upper", "middle", "lower"}
+    assert "not found" in data[1]["error"]
+    assert cache.stats() == {"entries": 3, "hits": 3, "misses": 3}
@@ -0,0 +1,137 @@
+"""Tests for the local K-bar store."""
+
+from datetime import date, datetime, timezone
+
+import pytest
+
+from shioaji_mcp.utils.kbar_store import KBarStore, bar_trading_day, contiguous_runs
+
+TODAY = date(2026, 1, 10)
+
+
+def _ts(day, hour, minute=0):
+    dt = datetime(day.year, day.month, day.day, hour, minute, tzinfo=timezone.utc)
+    return int(dt.timestamp() * 1_000_000_000)
+
+
+class FakeBroker:
+    """Return two bars per weekday and record requested ranges."""
+
+    def __init__(self):
+        self.calls = []
+
+    async def fetch(self, first, last):
+        self.calls.append((first, last))
+        columns = {name: [] for name in ("ts", "Open", "High", "Low", "Close", "Volume", "Amount")}
+        day = first
+        while day <= last:
+            if day.weekday() < 5:
+                for minute in (1, 2):
+                    columns["ts"].append(_ts(day, 9, minute))
+                    for name in ("Open", "High", "Low", "Close"):
+                        columns[name].append(100.0 + minute)
+                    columns["Volume"].append(minute)
+                    columns["Amount"].append(1000.0)
+            day = day.fromordinal(day.toordinal() + 1)
+        return columns
+
+
+@pytest.mark.asyncio
+async def test_repeated_query_uses_local_store(tmp_path):
+    """Test that closed sessions are fetched once and then read locally."""
+    store = KBarStore(tmp_path)
+    broker = FakeBroker()
+
+    first = await store.get("2330", date(2026, 1, 5), date(2026, 1, 9), broker.fetch, today=TODAY)
+    second = await store.get("2330", date(2026, 1, 5), date(2026, 1, 9), broker.fetch, today=TODAY)
+
+    assert broker.calls == [(date(2026, 1, 5), date(2026, 1, 9))]
+    assert len(first["ts"]) == 10
+    assert list(second["ts"]) == list(first["ts"])
+    assert list(second["Volume"]) == [1, 2] * 5
+
+
+@pytest.mark.asyncio
+async def test_overlapping_query_fetches_only_gaps(tmp_path):
+    """Test that only missing days are requested from the broker."""
+    store = KBarStore(tmp_path)
+    broker = FakeBroker()
+
+    await store.get("2330", date(2026, 1, 6), date(2026, 1, 7), broker.fetch, today=TODAY)
+    result = await store.get("2330", date(2026, 1, 5), date(2026, 1, 9), broker.fetch, today=TODAY)
+
+    assert broker.calls[1:] == [
+        (date(2026, 1, 5), date(2026, 1, 5)),
+        (date(2026, 1, 8), date(2026, 1, 9)),
+    ]
+    assert len(result["ts"]) == 10
+    assert list(result["ts"]) == sorted(result["ts"])
+
+
+@pytest.mark.asyncio
+async def test_current_trading_day_is_never_stored(tmp_path):
+    """Test that the in-progress session is always fetched live."""
+    store = KBarStore(tmp_path)
+    broker = FakeBroker()
+
+    await store.get("2330", date(2026, 1, 9), TODAY, broker.fetch, today=TODAY)
+    await store.get("2330", date(2026, 1, 9), TODAY, broker.fetch, today=TODAY)
+
+    assert broker.calls[-1] == (TODAY, TODAY)
+    assert TODAY not in store.stored_days("2330")
+    # A new store instance sees the persisted days
+    assert date(2026, 1, 9) in KBarStore(tmp_path).stored_days("2330")
+
+
+@pytest.mark.asyncio
+async def test_corrupt_day_is_refetched(tmp_path):
+    """Test that an unreadable day file is discarded and refetched."""
+    store = KBarStore(tmp_path)
+    broker = FakeBroker()
+    await store.get("2330", date(2026, 1, 5), date(2026, 1, 5), broker.fetch, today=TODAY)
+    (tmp_path / "2330" / "2026-01-05.bin").write_bytes(b"junk")
+
+    result = await store.get("2330", date(2026, 1, 5), date(2026, 1, 5), broker.fetch, today=TODAY)
+
+    assert len(result["ts"]) == 2
+    assert len(broker.calls) == 2
+
+
+def test_night_session_belongs_to_next_trading_day():
+    """Test TAIFEX night-session bars roll to the next weekday."""
+    friday = date(2026, 1, 9)
+    assert bar_trading_day(_ts(friday, 10)) == friday
+    assert bar_trading_day(_ts(friday, 16)) == date(2026, 1, 12)
+    # Past midnight the Friday night session is stamped on Saturday
+    assert bar_trading_day(_ts(date(2026, 1, 10), 1)) == date(2026, 1, 12)
+
+
+def test_contiguous_runs():
+    """Test grouping of missing days into fetch ranges."""
+    days = [date(2026, 1, 1), date(2026, 1, 2), date(2026, 1, 5)]
+    assert contiguous_runs(days) == [
+        (date(2026, 1, 1), date(2026, 1, 2)),
+        (date(2026, 1, 5), date(2026, 1, 5)),
+    ]
+
+
+@pytest.mark.asyncio
+async def test_iter_days_fetches_lazily_in_windows(tmp_path):
+    """Test that long ranges are fetched window by window as they are consumed."""
+    store = KBarStore(tmp_path)
+    broker = FakeBroker()
+
+    days = store.iter_days(
+        "2330", date(2025, 12, 1), date(2026, 1, 9), broker.fetch, today=TODAY, window_days=7
+    )
+    first_day, columns = await anext(days)
+    assert first_day == date(2025, 12, 1)
+    assert len(columns["ts"]) == 2
+    assert broker.calls == [(date(2025, 12, 1), date(2025, 12, 7))]
+    await days.aclose()
+
+    seen = [day async for day, _ in store.iter_days(
+        "2330", date(2025, 12, 1), date(2026, 1, 9), broker.fetch, today=TODAY, window_days=7
+    )]
+    assert seen[0] == date(2025, 12, 1) and seen[-1] == date(2026, 1, 9)
+    assert len(broker.calls) == 6
@@ -1,35 +1,44 @@
 """Tests for market data tools."""
 
+import json
+import os
+from datetime import date, datetime, timedelta, timezone
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+
 import pytest
 
+from shioaji_mcp.tools import contracts, market_data
 from shioaji_mcp.tools.contracts import search_contracts
 from shioaji_mcp.tools.market_data import get_kbars, get_snapshots
 from shioaji_mcp.utils.auth import auth_manager
+from shioaji_mcp.utils.contract_catalog import ContractCatalog
+from shioaji_mcp.utils.kbar_store import KBarStore
+from shioaji_mcp.utils.pagination import encode_cursor
+from shioaji_mcp.utils.snapshot_cache import snapshot_cache
 
 
-@pytest.mark.asyncio
-async def test_search_contracts_not_logged_in():
-    """Test contract search when not logged in."""
-    # Ensure we're logged out
-    await auth_manager.logout()
+@pytest.fixture(autouse=True)
+def clear_snapshot_cache():
+    """Keep cached snapshots from leaking between tests."""
+    snapshot_cache.invalidate()
+    yield
+    snapshot_cache.invalidate()
+
 
-    result = await search_contracts({})
+@pytest.mark.asyncio
+async def test_search_contracts_not_logged_in(logged_out):
+    """Test contract search when not logged in and without a cached catalog."""
+    with patch.object(contracts, "contract_catalog", ContractCatalog()):
+        result = await search_contracts({})
 
     assert len(result) == 1
-    assert "Error: Not logged in" in result[0]["text"]
+    assert "Error: Not connected" in result[0]["text"]
 
 
 @pytest.mark.asyncio
-async def test_search_contracts_success():
+async def test_search_contracts_success(simulator):
     """Test successful contract search."""
-    # Login first
-    await auth_manager.login(
-        api_key="test_key",
-        secret_key="test_secret",
-        person_id="test_person",
-        password="test_password",
-    )
-
     result = await search_contracts({"keyword": "台積電"})
 
     assert len(result) == 2  # Success message + data
@@ -37,16 +46,8 @@ async def test_search_contracts_success():
 
 
 @pytest.mark.asyncio
-async def test_get_snapshots_missing_contracts():
+async def test_get_snapshots_missing_contracts(simulator):
     """Test snapshots with missing contracts."""
-    # Ensure logged in
-    await auth_manager.login(
-        api_key="test_key",
-        secret_key="test_secret",
-        person_id="test_person",
-        password="test_password",
-    )
-
     result = await get_snapshots({})
 
     assert len(result) == 1
@@ -54,16 +55,8 @@ async def test_get_snapshots_missing_contracts():
 
 
 @pytest.mark.asyncio
-async def test_get_snapshots_success():
+async def test_get_snapshots_success(simulator):
     """Test successful snapshot retrieval."""
-    # Ensure logged in
-    await auth_manager.login(
-        api_key="test_key",
-        secret_key="test_secret",
-        person_id="test_person",
-        password="test_password",
-    )
-
     result = await get_snapshots({"contracts": ["2330", "2317"]})
 
     assert len(result) == 2  # Success message + data
@@ -71,16 +64,8 @@ async def test_get_snapshots_success():
 
 
 @pytest.mark.asyncio
-async def test_get_kbars_missing_contract():
+async def test_get_kbars_missing_contract(simulator):
     """Test K-bars with missing contract."""
-    # Ensure logged in
-    await auth_manager.login(
-        api_key="test_key",
-        secret_key="test_secret",
-        person_id="test_person",
-        password="test_password",
-    )
-
     result = await get_kbars({})
 
     assert len(result) == 1
@@ -88,17 +73,168 @@ async def test_get_kbars_missing_contract():
 
 
 @pytest.mark.asyncio
-async def test_get_kbars_success():
+async def test_get_kbars_success(simulator):
     """Test successful K-bar retrieval."""
-    # Ensure logged in
-    await auth_manager.login(
-        api_key="test_key",
-        secret_key="test_secret",
-        person_id="test_person",
-        password="test_password",
-    )
-
     result = await get_kbars({"contract": "2330"})
 
     assert len(result) == 2  # Success message + data
     assert "Retrieved" in result[0]["text"] and "K-bars for 2330" in result[0]["text"]
+
+
+def _fake_snapshot(code, close=100.0):
+    """Build a minimal snapshot object."""
+    return SimpleNamespace(
+        code=code, ts=1700000000000000000, open=close, high=close, low=close,
+        close=close, volume=10, buy_price=close - 0.5, sell_price=close + 0.5,
+    )
+
+
+@pytest.mark.asyncio
+async def test_get_snapshots_batches_requests():
+    """Test that snapshots are fetched in chunks and mapped back by code."""
+    codes = [str(1000 + i) for i in range(5)]
+    api = MagicMock()
+    api.Contracts.Stocks = {
+        code: SimpleNamespace(code=code, name=f"Stock {code}") for code in codes
+    }
+    api.snapshots.side_effect = lambda contracts: [
+        _fake_snapshot(c.code) for c in reversed(contracts)
+    ]
+
+    with patch.object(auth_manager, "is_connected", return_value=True), \
+            patch.object(auth_manager, "get_api", return_value=api), \
+            patch.dict(os.environ, {"SHIOAJI_SNAPSHOT_BATCH_SIZE": "2"}):
+        result = await get_snapshots({"contracts": codes + ["9999"]})
+
+    assert api.snapshots.call_count == 3
+    assert "Retrieved snapshots for 5 contracts (1 failed)" in result[0]["text"]
+    data = json.loads(result[1]["text"])
+    assert [item["code"] for item in data] == codes + ["9999"]
+    assert data[0]["name"] == "Stock 1000"
+    assert "not found" in data[-1]["error"]
+
+
+@pytest.mark.asyncio
+async def test_get_snapshots_chunk_failure_keeps_other_chunks():
+    """Test that a failed chunk reports per-code errors only for its codes."""
+    codes = ["1101", "1102", "1103"]
+    api = MagicMock()
+    api.Contracts.Stocks = {
+        code: SimpleNamespace(code=code, name=code) for code in codes
+    }
+
+    def snapshots(contracts):
+        if contracts[0].code == "1103":
+            raise TimeoutError("timeout")
+        return [_fake_snapshot(c.code) for c in contracts]
+
+    api.snapshots.side_effect = snapshots
+
+    with patch.object(auth_manager, "is_connected", return_value=True), \
+            patch.object(auth_manager, "get_api", return_value=api), \
+            patch.dict(os.environ, {"SHIOAJI_SNAPSHOT_BATCH_SIZE": "2"}):
+        result = await get_snapshots({"contracts": codes})
+
+    data = json.loads(result[1]["text"])
+    assert "close" in data[0] and "close" in data[1]
+    assert data[2] == {"code": "1103", "error": "timeout"}
+
+
+@pytest.mark.asyncio
+async def test_get_snapshots_served_from_cache():
+    """Test that a repeated request is answered without a broker call."""
+    api = MagicMock()
+    api.Contracts.Stocks = {"2330": SimpleNamespace(code="2330", name="TSMC")}
+    api.snapshots.side_effect = lambda contracts: [_fake_snapshot(c.code) for c in contracts]
+
+    with patch.object(auth_manager, "is_connected", return_value=True), \
+            patch.object(auth_manager, "get_api", return_value=api):
+        await get_snapshots({"contracts": ["2330"]})
+        result = await get_snapshots({"contracts": ["2330"]})
+
+    assert api.snapshots.call_count == 1
+    assert "(1 cached)" in result[0]["text"]
+
+
+def _fake_kbars(start, end):
+    """Three 1-minute bars per weekday."""
+    columns = {name: [] for name in ("ts", "Open", "High", "Low", "Close", "Volume", "Amount")}
+    day = date.fromisoformat(start)
+    while day <= date.fromisoformat(end):
+        if day.weekday() < 5:
+            for minute in (1, 2, 3):
+                ts = datetime(day.year, day.month, day.day, 9, minute, tzinfo=timezone.utc)
+                columns["ts"].append(int(ts.timestamp()) * 1_000_000_000)
+                for name in ("Open", "High", "Low", "Close"):
+                    columns[name].append(100.0)
+                columns["Volume"].append(1)
+                columns["Amount"].append(100.0)
+        day += timedelta(days=1)
+    return SimpleNamespace(**columns)
+
+
+@pytest.mark.asyncio
+async def test_get_kbars_pages_with_cursor(tmp_path):
+    """Test that long ranges are returned page by page through next_page."""
+    api = MagicMock()
+    api.Contracts.Stocks = {"2330": SimpleNamespace(code="2330", name="TSMC")}
+    api.kbars.side_effect = lambda contract, start, end, timeout: _fake_kbars(start, end)
+
+    pages = []
+    arguments = {"contract": "2330", "start_date": "2025-01-06", "end_date": "2025-01-17",
+                 "page_size": 7}
+    with patch.object(auth_manager, "is_connected", return_value=True), \
+            patch.object(auth_manager, "get_api", return_value=api), \
+            patch.object(market_data, "kbar_store", KBarStore(tmp_path)):
+        while True:
+            result = await get_kbars(arguments)
+            pages.append(json.loads(result[1]["text"]))
+            if len(result) < 3:
+                break
+            arguments = {"contract": "2330", "cursor": json.loads(result[2]["text"])["next_page"],
+                         "page_size": 7}
+
+    assert [len(page) for page in pages] == [9, 9, 9, 3]
+    dates = [bar["date"] for page in pages for bar in page]
+    assert len(dates) == 30 and dates == sorted(dates)
+    assert api.kbars.call_count == 1
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("interval", ["1D", "1W"])
+async def test_get_kbars_night_session_after_midnight_joins_monday(tmp_path, interval):
+    """Test that a Saturday 01:00 futures bar lands in Monday's single daily bar."""
+    def ts(day, hour):
+        return int(datetime(2026, 10, day, hour, tzinfo=timezone.utc).timestamp() * 1_000_000_000)
+
+    stamps = [ts(16, 16), ts(17, 1), ts(19, 9)]  # Friday night, Saturday 01:00, Monday
+    api = MagicMock()
+    api.Contracts.Stocks = {"TXFK6": SimpleNamespace(code="TXFK6", name="TXF")}
+    api.kbars.return_value = SimpleNamespace(
+        ts=stamps, Open=[1.0] * 3, High=[1.0] * 3, Low=[1.0] * 3, Close=[1.0] * 3,
+        Volume=[1] * 3, Amount=[1.0] * 3,
+    )
+
+    with patch.object(auth_manager, "is_connected", return_value=True), \
+            patch.object(auth_manager, "get_api", return_value=api), \
+            patch.object(market_data, "kbar_store", KBarStore(tmp_path)):
+        result = await get_kbars({"contract": "TXFK6", "start_date": "2026-10-16",
+                                  "end_date": "2026-10-19", "interval": interval})
+
+    bars = json.loads(result[1]["text"])
+    assert [(bar["date"], bar["volume"]) for bar in bars] == [("2026-10-19", 3)]
+
+
+@pytest.mark.asyncio
+async def test_get_kbars_rejects_foreign_cursor():
+    """Test that a cursor cannot be replayed against another contract."""
+    api = MagicMock()
+    api.Contracts.Stocks = {"2317": SimpleNamespace(code="2317", name="Hon Hai")}
+    cursor = encode_cursor({"kind": "kbars", "contract": "2330", "start": "2025-01-06",
+                            "end": "2025-01-07", "interval": "1m", "fields": ["close"]})
+
+    with patch.object(auth_manager, "is_connected", return_value=True), \
+            patch.object(auth_manager, "get_api", return_value=api):
+        result = await get_kbars({"contract": "2317", "cursor": cursor})
+
+    assert "different contract" in result[0]["text"]
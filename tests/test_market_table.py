@@ -0,0 +1,189 @@
+"""Tests for the market table and the scan_market tool."""
+
+import asyncio
+import json
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from shioaji_mcp.tools import scanner
+from shioaji_mcp.tools.scanner import scan_market
+from shioaji_mcp.utils.auth import auth_manager
+from shioaji_mcp.utils.market_table import (
+    MarketTable,
+    in_universe,
+    parse_filter,
+    parse_sort,
+)
+from shioaji_mcp.utils.quote_engine import QuoteEngine
+
+# code -> (reference, open, close, total_volume, yesterday_volume)
+MARKET = {
+    "2330": (500.0, 505.0, 540.0, 90_000, 30_000),
+    "2317": (100.0, 99.0, 101.0, 40_000, 40_000),
+    "2454": (1000.0, 1000.0, 960.0, 5_000, 10_000),
+    "6488": (400.0, 410.0, 439.5, 8_000, 2_000),
+}
+
+
+def _records():
+    return [
+        {"code": code, "name": f"Name {code}", "exchange": "OTC" if code == "6488" else "TSE"}
+        for code in MARKET
+    ]
+
+
+def _contracts():
+    return [
+        SimpleNamespace(
+            code=code, reference=ref, limit_up=round(ref * 1.1, 1), limit_down=round(ref * 0.9, 1)
+        )
+        for code, (ref, *_) in MARKET.items()
+    ]
+
+
+def _snapshot(code):
+    ref, open_, close, volume, yesterday = MARKET[code]
+    return SimpleNamespace(
+        code=code, open=open_, high=max(open_, close), low=min(open_, close), close=close,
+        total_volume=volume, yesterday_volume=yesterday, total_amount=close * volume,
+        buy_price=close, sell_price=close,
+    )
+
+
+async def _fetch_chunk(chunk):
+    return {code: _snapshot(code) for code, _ in chunk}
+
+
+@pytest.fixture
+def table():
+    table = MarketTable()
+    table.build("stocks", _records(), _contracts())
+    return table
+
+
+def test_parse_filter_and_sort():
+    field, op, value = parse_filter("change_pct >= 3")
+    assert (field, op(3, value), op(2.9, value)) == ("change_pct", True, False)
+    assert parse_filter({"field": "volume_ratio", "op": ">", "value": 2})[0] == "volume_ratio"
+    assert parse_sort(None) == ("change_pct", True)
+    assert parse_sort("gap_pct") == ("gap_pct", False)
+    for bad in ("change_pct ~ 3", "unknown > 1", {"field": "close", "value": "x"}):
+        with pytest.raises(ValueError):
+            parse_filter(bad)
+    with pytest.raises(ValueError):
+        parse_sort("-unknown")
+
+
+def test_in_universe():
+    assert in_universe({"code": "2330", "exchange": "TSE"}, "stocks")
+    assert not in_universe({"code": "0050", "exchange": "TSE"}, "stocks")
+    assert in_universe({"code": "00878", "exchange": "TSE"}, "etfs")
+    assert not in_universe({"code": "2330", "exchange": "OES"}, "all")
+
+
+@pytest.mark.asyncio
+async def test_refresh_and_scan(table):
+    assert await table.refresh(_fetch_chunk, batch_size=3) == 4
+    fields = ["change_pct", "volume_ratio", "limit_up_distance_pct"]
+
+    rows, matched = table.scan([], ("change_pct", True), 10, fields)
+    assert matched == 4
+    assert [row["code"] for row in rows] == ["6488", "2330", "2317", "2454"]
+    assert rows[0]["change_pct"] == pytest.approx(9.875)
+    assert rows[0]["volume_ratio"] == 4.0
+
+    near_limit = [parse_filter("limit_up_distance_pct < 1"), parse_filter("volume_ratio >= 2")]
+    rows, matched = table.scan(near_limit, ("change_pct", True), 10, fields)
+    assert [row["code"] for row in rows] == ["6488"]
+
+    rows, matched = table.scan([], ("gap_pct", False), 1, ["gap_pct"], exchange="TSE")
+    assert matched == 3
+    assert rows == [{"code": "2317", "name": "Name 2317", "exchange": "TSE", "gap_pct": -1.0}]
+
+
+@pytest.mark.asyncio
+async def test_rows_without_snapshot_are_skipped(table):
+    async def partial(chunk):
+        return {code: _snapshot(code) if code != "2454" else LookupError(code) for code, _ in chunk}
+
+    assert await table.refresh(partial, batch_size=10) == 3
+    _, matched = table.scan([], ("change_pct", True), 10, ["close"])
+    assert matched == 3
+
+
+@pytest.mark.asyncio
+async def test_subscribed_ticks_update_rows():
+    engine = QuoteEngine(max_subscriptions=10)
+    table = MarketTable(engine)
+    table.build("stocks", _records(), _contracts())
+    await table.refresh(_fetch_chunk, batch_size=10)
+
+    engine._ticks["2454"] = {"close": 1099.0, "high": 1099.0, "total_volume": 30_000}
+    engine._publish("2454")
+
+    rows, _ = table.scan([], ("change_pct", True), 1, ["close", "change_pct", "volume_ratio"])
+    assert rows[0]["code"] == "2454"
+    assert rows[0]["change_pct"] == pytest.approx(9.9)
+    assert rows[0]["volume_ratio"] == 3.0
+
+
+@pytest.mark.asyncio
+async def test_scan_market_refreshes_once_within_max_age():
+    table = MarketTable()
+    catalog = MagicMock()
+    catalog.records.return_value = _records()
+    contracts = dict(zip(MARKET, _contracts(), strict=True))
+    catalog.get.side_effect = contracts.get
+    api = MagicMock()
+    api.snapshots.side_effect = lambda batch: [_snapshot(c.code) for c in batch]
+
+    with patch.object(auth_manager, "is_connected", return_value=True), \
+            patch.object(auth_manager, "get_api", return_value=api), \
+            patch.object(scanner, "market_tables", {"stocks": table}), \
+            patch.object(scanner, "contract_catalog", catalog):
+        result = await scan_market({"filters": ["change_pct > 0"], "limit": 2})
+        again = await scan_market({"sort": "volume_ratio"})
+
+    assert "Scanned 4 contracts, 3 matched" in result[0]["text"]
+    data = json.loads(result[1]["text"])
+    assert [row["code"] for row in data] == ["6488", "2330"]
+    assert api.snapshots.call_count == 1
+    assert json.loads(again[1]["text"])[0]["code"] == "2454"
+
+
+@pytest.mark.asyncio
+async def test_scan_market_keeps_one_table_per_universe():
+    tables = {"stocks": MarketTable(), "all": MarketTable()}
+    catalog = MagicMock()
+    catalog.records.return_value = _records()
+    contracts = dict(zip(MARKET, _contracts(), strict=True))
+    catalog.get.side_effect = contracts.get
+    api = MagicMock()
+    api.snapshots.side_effect = lambda batch: [_snapshot(c.code) for c in batch]
+
+    with patch.object(auth_manager, "is_connected", return_value=True), \
+            patch.object(auth_manager, "get_api", return_value=api), \
+            patch.object(scanner, "market_tables", tables), \
+            patch.object(scanner, "contract_catalog", catalog):
+        results = await asyncio.gather(
+            scan_market({"universe": "stocks"}),
+            scan_market({"universe": "all"}),
+        )
+        again = await scan_market({"universe": "stocks"})
+
+    assert all("Scanned 4 contracts" in result[0]["text"] for result in results)
+    assert "Scanned 4 contracts" in again[0]["text"]
+    assert tables["stocks"].universe == "stocks"
+    assert tables["all"].universe == "all"
+    # Each universe is built and refreshed once; alternating scans reuse them
+    assert catalog.records.call_count == 2
+    assert api.snapshots.call_count == 2
+
+
+@pytest.mark.asyncio
+async def test_scan_market_rejects_bad_filter():
+    with patch.object(auth_manager, "is_connected", return_value=True):
+        result = await scan_market({"filters": ["change_pct >> 3"]})
+    assert "Invalid filter" in result[0]["text"]
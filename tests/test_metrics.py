@@ -0,0 +1,82 @@
+"""Tests for latency metrics and their exposure."""
+
+import json
+
+import pytest
+from starlette.testclient import TestClient
+
+from shioaji_mcp.server import handle_call_tool, server
+from shioaji_mcp.transport import create_app
+from shioaji_mcp.utils.metrics import Histogram, Metrics, metrics
+
+
+@pytest.fixture(autouse=True)
+def fresh_metrics():
+    metrics.reset()
+    yield
+    metrics.reset()
+
+
+def test_histogram_quantiles_interpolate_within_buckets():
+    histogram = Histogram((1, 2, 4, 8))
+    for value in (0.5, 1.5, 1.5, 3, 3, 3, 3, 6, 6, 7):
+        histogram.observe(value)
+
+    assert histogram.count == 10 and histogram.sum == pytest.approx(34.5)
+    assert histogram.quantile(0.5) == pytest.approx(3.0)
+    assert 2 < histogram.quantile(0.6) <= 4
+    assert histogram.quantile(1.0) == 7
+    assert [count for _, count in histogram.cumulative()] == [1, 3, 7, 10, 10]
+    assert Histogram((1,)).quantile(0.5) is None
+
+
+def test_prometheus_rendering_and_component_stats():
+    registry = Metrics()
+    registry.histogram("call_seconds", "Call latency", (0.1, 1))
+    registry.observe("call_seconds", 0.05, tool="get_snapshots")
+    registry.observe("call_seconds", 2, tool="get_snapshots")
+    registry.register_stats("pool", lambda: {"quote": {"queued": 3, "name": "x"}}, label="category")
+    registry.register_stats("cache", lambda: {"hits": 4, "hit_rate": 0.5})
+
+    text = registry.render_prometheus()
+    assert "# TYPE shioaji_mcp_call_seconds histogram" in text
+    assert 'shioaji_mcp_call_seconds_bucket{tool="get_snapshots",le="0.1"} 1' in text
+    assert 'shioaji_mcp_call_seconds_bucket{tool="get_snapshots",le="+Inf"} 2' in text
+    assert 'shioaji_mcp_call_seconds_count{tool="get_snapshots"} 2' in text
+    assert 'shioaji_mcp_pool_queued{category="quote"} 3' in text
+    assert "shioaji_mcp_cache_hit_rate 0.5" in text
+    assert "pool_name" not in text
+
+    summary = registry.summary()
+    [row] = summary["call"]
+    assert row["tool"] == "get_snapshots" and row["count"] == 2 and row["max_ms"] == 2000
+    assert summary["cache"] == {"hits": 4, "hit_rate": 0.5}
+
+
+@pytest.mark.asyncio
+async def test_tool_calls_and_broker_calls_are_timed(simulator):
+    await handle_call_tool("get_snapshots", {"contracts": ["2330"]})
+    await handle_call_tool("get_snapshots", {"contracts": []})
+
+    result = await handle_call_tool("get_server_metrics", {})
+    summary = json.loads(result[1]["text"])
+    tools = {(row["tool"], row["status"]): row for row in summary["tool_duration"]}
+    assert tools[("get_snapshots", "ok")]["count"] == 1
+    assert tools[("get_snapshots", "error")]["count"] == 1
+    assert any(
+        row["category"] == "quote" and row["method"] == "snapshots" and row["status"] == "ok"
+        for row in summary["broker_call_duration"]
+    )
+    assert [row["format"] for row in summary["serialize_duration"]] == ["json"]
+    assert summary["snapshot_cache"]["misses"] >= 1
+    assert summary["session"]["default"]["state"] == "ready"
+
+
+def test_metrics_endpoint_serves_prometheus_text():
+    metrics.observe("tool_duration_seconds", 0.01, tool="get_quotes", status="ok")
+    with TestClient(create_app(server)) as client:
+        response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    assert 'shioaji_mcp_tool_duration_seconds_count{status="ok",tool="get_quotes"} 1' in response.text
+    assert "shioaji_mcp_broker_executor_limit{category=" in response.text
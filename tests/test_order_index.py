@@ -0,0 +1,137 @@
+"""Tests for the order index and order tools."""
+
+import json
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from shioaji_mcp.tools.orders import cancel_order, list_orders
+from shioaji_mcp.utils.auth import auth_manager
+from shioaji_mcp.utils.order_index import OrderIndex, order_index
+
+
+def _trade(order_id, code="2330", quantity=2, status="Submitted"):
+    return SimpleNamespace(
+        contract=SimpleNamespace(code=code),
+        order=SimpleNamespace(
+            id=order_id, action=SimpleNamespace(value="Buy"), quantity=quantity, price=600.0
+        ),
+        status=SimpleNamespace(
+            status=SimpleNamespace(value=status), deal_quantity=0,
+            cancel_quantity=0, order_datetime=None,
+        ),
+    )
+
+
+def _api(trades):
+    api = MagicMock()
+    api.list_trades.return_value = trades
+    api.cancel_order.side_effect = lambda trade: trade
+    return api
+
+
+@pytest.fixture(autouse=True)
+def clear_order_index():
+    order_index.clear()
+    yield
+    order_index.clear()
+
+
+def test_seed_indexes_trades():
+    """Test seeding from list_trades and filtering by status and contract."""
+    index = OrderIndex()
+    api = _api([_trade("a"), _trade("b", code="2317"), _trade("c", status="Filled")])
+    index.seed(api)
+
+    api.set_order_callback.assert_called_once_with(index.on_order)
+    assert [r["order_id"] for r in index.find()] == ["a", "b", "c"]
+    assert [r["order_id"] for r in index.find(statuses=["Submitted"])] == ["a", "b"]
+    assert [r["order_id"] for r in index.find(statuses=["Submitted"], contract="2330")] == ["a"]
+    assert index.find(contract="9999") == []
+
+
+def test_track_does_not_regress_callback_state():
+    """Test that a stale trade from place_order merges into newer callback state."""
+    index = OrderIndex()
+    index.on_order(SimpleNamespace(name="StockDeal"), {"trade_id": "a", "code": "2330", "quantity": 2})
+    index.on_order(
+        SimpleNamespace(name="StockOrder"),
+        {"operation": {"op_type": "Cancel", "op_code": "00"}, "order": {"id": "b"},
+         "status": {"cancel_quantity": 2}, "contract": {"code": "2330"}},
+    )
+
+    record = index.track(_trade("a", status="PendingSubmit"))
+    assert record["status"] == "Filled"
+    assert record["deal_quantity"] == 2
+    assert record["price"] == 600.0
+    assert index.track(_trade("b", status="PendingSubmit"))["status"] == "Cancelled"
+    assert index.find(statuses=["PendingSubmit"]) == []
+
+    index.on_order(SimpleNamespace(name="StockDeal"), {"trade_id": "b", "code": "2330", "quantity": 1})
+    assert index.get("b")["status"] == "Cancelled"
+    assert index.get_trade("a") is not None
+
+
+def test_callbacks_update_status():
+    """Test that order and deal callbacks move orders between statuses."""
+    index = OrderIndex()
+    index.seed(_api([_trade("a"), _trade("b")]))
+
+    index.on_order(SimpleNamespace(name="StockDeal"), {"trade_id": "a", "code": "2330", "quantity": 1})
+    assert index.get("a")["status"] == "PartFilled"
+    index.on_order(SimpleNamespace(name="StockDeal"), {"trade_id": "a", "code": "2330", "quantity": 1})
+    assert index.get("a")["status"] == "Filled"
+    assert index.get("a")["deal_quantity"] == 2
+
+    index.on_order(
+        SimpleNamespace(name="StockOrder"),
+        {
+            "operation": {"op_type": "Cancel", "op_code": "00"},
+            "order": {"id": "b"},
+            "status": {"cancel_quantity": 2},
+            "contract": {"code": "2330"},
+        },
+    )
+    assert index.get("b")["status"] == "Cancelled"
+    assert [r["order_id"] for r in index.find(statuses=["Submitted"])] == []
+
+    # Orders placed elsewhere appear from their first event
+    index.on_order(
+        SimpleNamespace(name="StockOrder"),
+        {"operation": {"op_type": "New", "op_code": "00"}, "order": {"id": "x", "quantity": 1},
+         "status": {}, "contract": {"code": "2603"}},
+    )
+    assert index.get("x")["status"] == "Submitted"
+    assert index.get("x")["contract"] == "2603"
+
+
+@pytest.mark.asyncio
+async def test_list_orders_answers_from_memory():
+    """Test that list_orders seeds once and filters without broker calls."""
+    api = _api([_trade("a"), _trade("b", status="Filled")])
+
+    with patch.object(auth_manager, "is_connected", return_value=True), \
+            patch.object(auth_manager, "get_api", return_value=api):
+        await list_orders({})
+        result = await list_orders({"status": ["filled"]})
+
+    assert api.list_trades.call_count == 1
+    assert [r["order_id"] for r in json.loads(result[1]["text"])] == ["b"]
+
+
+@pytest.mark.asyncio
+async def test_cancel_order_uses_index():
+    """Test that cancel_order finds the trade by id."""
+    trade = _trade("a")
+    api = _api([trade])
+
+    with patch.object(auth_manager, "is_connected", return_value=True), \
+            patch.object(auth_manager, "get_api", return_value=api), \
+            patch("shioaji_mcp.tools.registry.check_trading_permission", return_value=(True, "")):
+        result = await cancel_order({"order_id": "a"})
+        missing = await cancel_order({"order_id": "zzz"})
+
+    api.cancel_order.assert_called_once_with(trade)
+    assert "cancelled successfully" in result[0]["text"]
+    assert "Order zzz not found" in missing[0]["text"]
@@ -0,0 +1,158 @@
+"""Tests for quote resources and update notifications."""
+
+import asyncio
+import json
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import pytest
+
+from shioaji_mcp.resources.quotes import QuoteResourceHub, parse_quote_uri, quote_uri
+from shioaji_mcp.utils.quote_engine import QuoteEngine
+
+
+class FakeSession:
+    """Collect resources/updated notifications."""
+
+    def __init__(self, fail=False):
+        self.updates = []
+        self.fail = fail
+
+    async def send_resource_updated(self, uri):
+        if self.fail:
+            raise ConnectionError("closed")
+        self.updates.append(str(uri))
+
+
+def _tick(code):
+    return SimpleNamespace(code=code, datetime=None, close=600.0)
+
+
+def test_quote_uri_roundtrip():
+    """Test building and parsing quote URIs."""
+    uri = quote_uri(SimpleNamespace(value="TSE"), "2330")
+    assert uri == "quote://TSE/2330"
+    assert parse_quote_uri(uri) == ("TSE", "2330")
+    with pytest.raises(ValueError, match="Invalid quote resource URI"):
+        parse_quote_uri("http://TSE/2330")
+
+
+@pytest.mark.asyncio
+async def test_updates_are_coalesced_and_throttled():
+    """Test that a burst of ticks produces one notification per interval."""
+    engine = QuoteEngine()
+    hub = QuoteResourceHub(engine, interval=0.05)
+    session = FakeSession()
+    hub.subscribe("quote://TSE/2330", session)
+
+    for _ in range(100):
+        engine.on_tick("TSE", _tick("2330"))
+    engine.on_tick("TSE", _tick("2317"))  # not subscribed
+    await asyncio.sleep(0.02)
+    assert session.updates == ["quote://TSE/2330"]
+
+    for _ in range(100):
+        engine.on_tick("TSE", _tick("2330"))
+    await asyncio.sleep(0.1)
+    assert session.updates == ["quote://TSE/2330"] * 2
+
+    hub.unsubscribe("quote://TSE/2330", session)
+    engine.on_tick("TSE", _tick("2330"))
+    await asyncio.sleep(0.1)
+    assert len(session.updates) == 2
+
+
+@pytest.mark.asyncio
+async def test_failed_session_is_dropped():
+    """Test that a closed session is unsubscribed on send failure."""
+    engine = QuoteEngine()
+    hub = QuoteResourceHub(engine, interval=0.01)
+    hub.subscribe("quote://TSE/2330", FakeSession(fail=True))
+
+    engine.on_tick("TSE", _tick("2330"))
+    await asyncio.sleep(0.05)
+
+    assert hub.subscriber_count("quote://TSE/2330") == 0
+
+
+@pytest.mark.asyncio
+async def test_read_resource_returns_quote_state():
+    """Test reading a quote resource through the server handler."""
+    from shioaji_mcp.server import handle_read_resource
+    from shioaji_mcp.utils.quote_engine import quote_engine
+
+    quote_engine.on_tick("TSE", _tick("2330"))
+    contents = await handle_read_resource("quote://TSE/2330")
+
+    assert contents[0].mime_type == "application/json"
+    assert json.loads(contents[0].content)["tick"]["close"] == 600.0
+
+
+@pytest.mark.asyncio
+async def test_resource_feed_is_reference_counted(simulator):
+    """Test that the broker feed closes when the last session unsubscribes."""
+    engine = QuoteEngine()
+    hub = QuoteResourceHub(engine, interval=0.01, get_api=lambda: simulator)
+    first, second = FakeSession(), FakeSession()
+
+    await hub.acquire(simulator, "quote://TSE/2330", first)
+    await hub.acquire(simulator, "quote://TSE/2330", second)
+    assert engine.subscribed_codes() == ["2330"]
+
+    await hub.release("quote://TSE/2330", first)
+    assert engine.subscribed_codes() == ["2330"]
+    await hub.release("quote://TSE/2330", second)
+    assert engine.subscribed_codes() == []
+
+
+@pytest.mark.asyncio
+async def test_unknown_resource_contract_is_not_registered(simulator):
+    """Test that subscribing to an unknown contract fails without registering."""
+    engine = QuoteEngine()
+    hub = QuoteResourceHub(engine, get_api=lambda: simulator)
+
+    with pytest.raises(LookupError, match="Contract 0000 not found"):
+        await hub.acquire(simulator, "quote://TSE/0000", FakeSession())
+    assert hub.subscriber_count("quote://TSE/0000") == 0
+    assert engine.subscribed_codes() == []
+
+
+@pytest.mark.asyncio
+async def test_tool_feed_outlives_resource_sessions(simulator):
+    """Test that feeds opened by subscribe_quotes are not closed by resources."""
+    engine = QuoteEngine()
+    hub = QuoteResourceHub(engine, get_api=lambda: simulator)
+    contract = simulator.Contracts.Stocks["2330"]
+    await engine.subscribe(simulator, contract, ["tick"])
+
+    session = FakeSession()
+    await hub.acquire(simulator, "quote://TSE/2330", session)
+    await hub.release("quote://TSE/2330", session)
+    assert engine.subscribed_codes() == ["2330"]
+
+
+@pytest.mark.asyncio
+async def test_unsubscribe_quotes_only_releases_callers_feeds(simulator):
+    """Test that a client's unsubscribe_quotes leaves other holders' feeds open."""
+    from shioaji_mcp.tools import quotes as quote_tools
+    from shioaji_mcp.tools.registry import registry
+
+    engine = QuoteEngine()
+    hub = QuoteResourceHub(engine, get_api=lambda: simulator)
+    reader = FakeSession()
+    await hub.acquire(simulator, "quote://TSE/2330", reader)
+
+    client_a, client_b = FakeSession(), FakeSession()
+    with patch.object(quote_tools, "quote_engine", engine):
+        await registry.call("subscribe_quotes", {"contracts": ["2330", "2317"]}, client_a)
+        await registry.call("subscribe_quotes", {"contracts": ["2317"]}, client_b)
+        result = await registry.call("unsubscribe_quotes", {}, client_a)
+
+    assert sorted(row["code"] for row in json.loads(result[1]["text"])) == ["2317", "2330"]
+    # The resource reader and client-b still hold their feeds
+    assert sorted(engine.subscribed_codes()) == ["2317", "2330"]
+    assert engine.get("2330")["subscribed"] == ["bidask", "tick"]
+    assert engine.owned_codes(client_a) == []
+
+    await hub.release("quote://TSE/2330", reader)
+    assert engine.subscribed_codes() == ["2317"]
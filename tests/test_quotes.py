@@ -0,0 +1,89 @@
+"""Tests for the real-time quote engine and tools."""
+
+import json
+from datetime import datetime
+from decimal import Decimal
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from shioaji_mcp.tools.quotes import get_quotes, subscribe_quotes, unsubscribe_quotes
+from shioaji_mcp.utils.auth import auth_manager
+from shioaji_mcp.utils.quote_engine import QuoteEngine, quote_engine
+
+
+def _tick(code, close):
+    return SimpleNamespace(
+        code=code, datetime=datetime(2026, 1, 5, 9, 30), open=Decimal("600"),
+        high=Decimal("605"), low=Decimal("598"), close=Decimal(str(close)),
+        volume=3, total_volume=1200, simtrade=False,
+    )
+
+
+def _bidask(code):
+    return SimpleNamespace(
+        code=code, datetime=datetime(2026, 1, 5, 9, 30),
+        bid_price=[Decimal("600"), Decimal("599.5")], bid_volume=[10, 20],
+        ask_price=[Decimal("601"), Decimal("601.5")], ask_volume=[5, 7],
+        simtrade=False,
+    )
+
+
+def test_callbacks_update_state():
+    """Test that tick and bid/ask callbacks maintain the latest state."""
+    engine = QuoteEngine()
+    updates = []
+    engine.add_listener(updates.append)
+
+    engine.on_tick("TSE", _tick("2330", "601"))
+    engine.on_tick("TSE", _tick("2330", "602.5"))
+    engine.on_bidask("TSE", _bidask("2330"))
+
+    quote = engine.get("2330")
+    assert quote["tick"]["close"] == 602.5
+    assert quote["tick"]["total_volume"] == 1200
+    assert quote["book"]["bids"] == [[600.0, 10], [599.5, 20]]
+    assert quote["book"]["asks"][0] == [601.0, 5]
+    assert updates == ["2330", "2330", "2330"]
+
+
+@pytest.mark.asyncio
+async def test_subscription_limit():
+    """Test that the per-session subscription limit is enforced."""
+    engine = QuoteEngine(max_subscriptions=1)
+    api = MagicMock()
+
+    await engine.subscribe(api, SimpleNamespace(code="2330"), ["tick"])
+    with pytest.raises(RuntimeError, match="Subscription limit"):
+        await engine.subscribe(api, SimpleNamespace(code="2317"), ["tick"])
+    # Adding a quote type to an existing subscription is still allowed
+    assert await engine.subscribe(api, SimpleNamespace(code="2330"), ["bidask"]) == ["bidask"]
+
+
+@pytest.mark.asyncio
+async def test_subscribe_get_unsubscribe_tools():
+    """Test the quote tools against a mocked API."""
+    api = MagicMock()
+    api.Contracts.Stocks = {"2330": SimpleNamespace(code="2330", name="台積電")}
+
+    with patch.object(auth_manager, "is_connected", return_value=True), \
+            patch.object(auth_manager, "get_api", return_value=api):
+        result = await subscribe_quotes({"contracts": ["2330", "0000"]})
+        assert "Subscribed to 1 contracts" in result[0]["text"]
+        assert api.quote.subscribe.call_count == 2
+        assert "not found" in json.loads(result[1]["text"])[1]["error"]
+
+        quote_engine.on_tick("TSE", _tick("2330", "610"))
+        result = await get_quotes({})
+        quotes = json.loads(result[1]["text"])
+        assert quotes[0]["code"] == "2330"
+        assert quotes[0]["tick"]["close"] == 610.0
+        assert api.snapshots.call_count == 0
+
+        result = await unsubscribe_quotes({})
+        assert "(0 active)" in result[0]["text"]
+        assert api.quote.unsubscribe.call_count == 2
+
+    result = await get_quotes({})
+    assert "No active subscriptions" in result[0]["text"]
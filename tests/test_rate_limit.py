@@ -0,0 +1,121 @@
+"""Tests for token-bucket pacing and the rate governor."""
+
+import asyncio
+
+import pytest
+
+from shioaji_mcp.utils.rate_limit import (
+    BROKER_BUDGETS,
+    DEFAULT_RATES,
+    RateGovernor,
+    RateLimitExceededError,
+    TokenBucket,
+)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_burst_then_paced():
+    """Test that the burst is free and later tokens are spaced by the rate."""
+    clock = FakeClock()
+    bucket = TokenBucket(rate=10, capacity=2, clock=clock)
+
+    delays = [bucket.reserve() for _ in range(4)]
+
+    assert delays == pytest.approx([0.0, 0.0, 0.1, 0.2])
+
+
+def test_refill_is_capped():
+    """Test that idle time refills at most ``capacity`` tokens."""
+    clock = FakeClock()
+    bucket = TokenBucket(rate=10, capacity=2, clock=clock)
+    bucket.reserve()
+    bucket.reserve()
+
+    clock.now = 100
+    assert [bucket.reserve() for _ in range(3)] == pytest.approx([0.0, 0.0, 0.1])
+
+
+@pytest.mark.asyncio
+async def test_acquire_waits_and_records():
+    """Test that acquire sleeps for the reserved slot and counts the wait."""
+    bucket = TokenBucket(rate=100, capacity=1)
+    assert await bucket.acquire() == 0
+    assert await bucket.acquire() > 0
+
+    stats = bucket.stats()
+    assert stats["acquired"] == 2
+    assert stats["waited"] == 1
+    assert stats["max_wait_ms"] > 0
+
+
+@pytest.mark.asyncio
+async def test_cancelled_acquire_refunds_its_token():
+    """Test that a caller cancelled while waiting gives its slot back."""
+    clock = FakeClock()
+    bucket = TokenBucket(rate=10, capacity=1, clock=clock)
+    assert await bucket.acquire() == 0
+
+    waiter = asyncio.create_task(bucket.acquire())
+    await asyncio.sleep(0)
+    waiter.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await waiter
+
+    assert bucket.reserve() == pytest.approx(0.1)
+    assert bucket.stats()["acquired"] == 1
+
+
+@pytest.mark.asyncio
+async def test_requests_queue_in_order():
+    """Test that concurrent callers queue instead of failing."""
+    governor = RateGovernor({"order": 20}, max_wait=5)
+    done = []
+
+    async def call(i):
+        await governor.acquire("order")
+        done.append(i)
+
+    await asyncio.gather(*(call(i) for i in range(45)))
+
+    assert done == list(range(45))
+    assert governor.stats()["order"]["capacity"] == 40
+    assert governor.stats()["order"]["waited"] == 5
+    assert governor.stats()["order"]["rejected"] == 0
+
+
+@pytest.mark.asyncio
+async def test_rejects_beyond_max_wait():
+    """Test that requests that would wait too long are rejected."""
+    governor = RateGovernor({"quote": 1}, max_wait=0.5)
+    burst = int(governor.buckets["quote"].capacity)
+    for _ in range(burst):
+        await governor.acquire("quote")
+
+    with pytest.raises(RateLimitExceededError):
+        await governor.acquire("quote")
+
+    stats = governor.stats()["quote"]
+    assert stats["rejected"] == 1
+    assert stats["acquired"] == burst
+    assert await governor.acquire("unknown") == 0
+
+
+def test_default_buckets_stay_within_broker_limits():
+    """Test that burst plus steady rate never exceeds a category's budget."""
+    governor = RateGovernor()
+    for category, rate in DEFAULT_RATES.items():
+        requests, window = BROKER_BUDGETS[category]
+        clock = FakeClock()
+        bucket = TokenBucket(rate, governor.buckets[category].capacity, clock=clock)
+        # Requests whose slot falls inside the first window
+        admitted = sum(1 for _ in range(1000) if bucket.reserve() < window)
+        assert admitted <= requests
+    combined = sum(BROKER_BUDGETS[category][0] for category in ("quote", "data"))
+    assert combined < 50
@@ -0,0 +1,115 @@
+"""Tests for the tool registry and its middleware."""
+
+import json
+
+import pytest
+
+from shioaji_mcp.server import handle_call_tool, handle_list_tools
+from shioaji_mcp.tools.middleware import ResponseCache, validate_arguments
+from shioaji_mcp.tools.registry import ToolRegistry
+
+
+def _text(result):
+    return result[0]["text"]
+
+
+@pytest.mark.asyncio
+async def test_every_tool_is_registered_once():
+    names = [tool.name for tool in await handle_list_tools()]
+    assert len(names) == 21
+    assert {"get_account_info", "place_order", "get_server_metrics"} <= set(names)
+    with pytest.raises(ValueError, match="Unknown tool: shioaji_login"):
+        await handle_call_tool("shioaji_login", {})
+
+
+@pytest.mark.asyncio
+async def test_decorator_applies_shared_checks(logged_out, monkeypatch):
+    registry = ToolRegistry()
+    calls = []
+
+    @registry.tool("trade", "Trade", {"quantity": {"type": "integer"}}, connected=True, trading=True)
+    async def trade(arguments):
+        calls.append(arguments)
+        return [{"type": "text", "text": "done"}]
+
+    @registry.tool("fail", "Always fails")
+    async def fail(arguments):
+        raise RuntimeError("boom")
+
+    monkeypatch.delenv("SHIOAJI_TRADING_ENABLED", raising=False)
+    assert "Trading operation 'trade' is not permitted" in _text(await trade({}))
+    monkeypatch.setenv("SHIOAJI_TRADING_ENABLED", "true")
+    assert _text(await trade({})).startswith("Error: Not connected")
+    assert _text(await registry.call("fail", {})) == "Error: boom"
+    assert calls == []
+    assert [tool.name for tool in registry.tools()] == ["trade", "fail"]
+
+
+@pytest.mark.asyncio
+async def test_middleware_runs_outermost_first_and_validates():
+    registry = ToolRegistry()
+    order = []
+
+    @registry.tool(
+        "echo",
+        "Echo",
+        {
+            "count": {"type": "integer", "minimum": 1},
+            "side": {"type": "string", "enum": ["Buy", "Sell"]},
+            "codes": {"type": "array", "items": {"type": "string"}},
+        },
+        ["count"],
+    )
+    async def echo(arguments):
+        order.append("tool")
+        return [{"type": "text", "text": json.dumps(arguments)}]
+
+    def tag(label):
+        async def middleware(call, call_next):
+            order.append(label)
+            return await call_next(call)
+        return middleware
+
+    registry.use(tag("outer"))
+    registry.use(validate_arguments)
+    registry.use(tag("inner"))
+
+    assert json.loads(_text(await registry.call("echo", {"count": 2, "codes": ["2330"]})))["count"] == 2
+    assert order == ["outer", "inner", "tool"]
+
+    invalid = {
+        "missing required argument count": {},
+        "count expected integer, got str": {"count": "2"},
+        "count must be at least 1": {"count": 0},
+        "side must be one of Buy, Sell": {"count": 1, "side": "Hold"},
+        "codes item 1 expected string, got int": {"count": 1, "codes": ["2330", 2317]},
+    }
+    for problem, arguments in invalid.items():
+        assert _text(await registry.call("echo", arguments)) == f"Error: Invalid arguments for echo: {problem}"
+    assert order.count("tool") == 1
+
+
+@pytest.mark.asyncio
+async def test_response_cache_reuses_successful_responses():
+    registry = ToolRegistry()
+    cache = ResponseCache()
+    registry.use(cache)
+    calls = []
+
+    @registry.tool("accounts", "Accounts", cache_ttl=60)
+    async def accounts(arguments):
+        calls.append(arguments)
+        if arguments.get("fail"):
+            return [{"type": "text", "text": "Error: down"}]
+        return [{"type": "text", "text": f"call {len(calls)}"}]
+
+    assert _text(await registry.call("accounts", {"format": "json"})) == "call 1"
+    assert _text(await registry.call("accounts", {"format": "json"})) == "call 1"
+    assert _text(await registry.call("accounts", {"format": "compact"})) == "call 2"
+    await registry.call("accounts", {"fail": True})
+    await registry.call("accounts", {"fail": True})
+    assert len(calls) == 4
+    assert cache.stats()["hits"] == 1
+
+    cache.invalidate()
+    assert _text(await registry.call("accounts", {"format": "json"})) == "call 5"
@@ -0,0 +1,91 @@
+"""Tests for K-bar resampling."""
+
+from datetime import datetime, timezone
+
+import pytest
+
+from shioaji_mcp.utils.resample import (
+    normalize_fields,
+    normalize_interval,
+    resample,
+    to_rows,
+)
+
+
+def _ts(year, month, day, hour, minute):
+    dt = datetime(year, month, day, hour, minute, tzinfo=timezone.utc)
+    return int(dt.timestamp() * 1_000_000_000)
+
+
+def _bars(timestamps):
+    n = len(timestamps)
+    return {
+        "ts": timestamps,
+        "Open": [float(i) for i in range(n)],
+        "High": [float(i) + 0.5 for i in range(n)],
+        "Low": [float(i) - 0.5 for i in range(n)],
+        "Close": [float(i) + 0.25 for i in range(n)],
+        "Volume": [1] * n,
+        "Amount": [10.0] * n,
+    }
+
+
+def test_resample_5m():
+    """Test intraday aggregation labelled by bucket end."""
+    columns = _bars([_ts(2026, 1, 5, 9, m) for m in range(1, 11)])
+
+    bars = resample(columns, "5m")
+    rows = to_rows(bars, "5m", ["open", "high", "low", "close", "volume"])
+
+    assert rows == [
+        {"date": "2026-01-05 09:05:00", "open": 0.0, "high": 4.5, "low": -0.5, "close": 4.25, "volume": 5},
+        {"date": "2026-01-05 09:10:00", "open": 5.0, "high": 9.5, "low": 4.5, "close": 9.25, "volume": 5},
+    ]
+
+
+def test_resample_daily_rolls_night_session():
+    """Test that night-session bars count toward the next trading day."""
+    columns = _bars([
+        _ts(2026, 1, 8, 13, 0),   # Thursday day session
+        _ts(2026, 1, 8, 16, 0),   # Thursday night -> Friday
+        _ts(2026, 1, 9, 10, 0),   # Friday
+        _ts(2026, 1, 10, 2, 0),   # Saturday 02:00 (Friday night) -> Monday
+    ])
+
+    rows = to_rows(resample(columns, "1D"), "1D", ["volume", "amount"])
+
+    assert rows == [
+        {"date": "2026-01-08", "volume": 1, "amount": 10.0},
+        {"date": "2026-01-09", "volume": 2, "amount": 20.0},
+        {"date": "2026-01-12", "volume": 1, "amount": 10.0},
+    ]
+
+
+def test_resample_weekly():
+    """Test weekly bars labelled with the week's Monday."""
+    columns = _bars([_ts(2026, 1, d, 10, 0) for d in (5, 7, 9, 12, 14)])
+
+    rows = to_rows(resample(columns, "1W"), "1W", ["open", "close", "volume"])
+
+    assert rows == [
+        {"date": "2026-01-05", "open": 0.0, "close": 2.25, "volume": 3},
+        {"date": "2026-01-12", "open": 3.0, "close": 4.25, "volume": 2},
+    ]
+
+
+def test_resample_empty():
+    """Test that an empty range produces no rows."""
+    assert to_rows(resample(_bars([]), "60m"), "60m", ["close"]) == []
+
+
+def test_normalize_interval_and_fields():
+    """Test parameter validation."""
+    assert normalize_interval(None) == "1m"
+    assert normalize_interval("1h") == "60m"
+    assert normalize_interval("1d") == "1D"
+    with pytest.raises(ValueError, match="Unsupported interval"):
+        normalize_interval("3m")
+
+    assert normalize_fields(None) == ["open", "high", "low", "close", "volume"]
+    with pytest.raises(ValueError, match="Unknown fields"):
+        normalize_fields(["vwap"])
@@ -19,11 +19,11 @@ async def test_list_tools():
 
     tools = await handle_list_tools()
     assert len(tools) >= 2
+    assert await handle_list_tools() is tools
 
     tool_names = [tool.name for tool in tools]
-    assert "shioaji_login" in tool_names
+    assert len(set(tool_names)) == len(tool_names)
     assert "get_account_info" in tool_names
-    assert "shioaji_logout" in tool_names
     assert "search_contracts" in tool_names
     assert "get_snapshots" in tool_names
     assert "get_kbars" in tool_names
@@ -32,3 +32,4 @@ async def test_list_tools():
     assert "list_orders" in tool_names
     assert "get_positions" in tool_names
     assert "get_account_balance" in tool_names
+    assert "get_server_metrics" in tool_names
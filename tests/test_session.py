@@ -0,0 +1,126 @@
+"""Tests for the background session manager."""
+
+import asyncio
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from shioaji_mcp.utils import auth
+from shioaji_mcp.utils.auth import READY, ShioajiSession
+
+
+class FakeShioaji:
+    """SDK session whose login fails a configurable number of times."""
+
+    instances: list["FakeShioaji"] = []
+    login_failures = 0
+
+    def __init__(self):
+        self.quote = MagicMock()
+        self.usage = MagicMock(return_value={"connections": 1})
+        self.logout = MagicMock()
+        self.logged_in = False
+        FakeShioaji.instances.append(self)
+
+    def login(self, api_key, secret_key, contracts_cb=None):
+        if FakeShioaji.login_failures:
+            FakeShioaji.login_failures -= 1
+            raise ConnectionError("Gateway unavailable")
+        self.logged_in = True
+
+    def session_event_callback(self):
+        return self.quote.set_event_callback.call_args.args[0]
+
+
+@pytest.fixture
+def sdk(monkeypatch):
+    FakeShioaji.instances = []
+    FakeShioaji.login_failures = 0
+    monkeypatch.setenv("SHIOAJI_API_KEY", "key")
+    monkeypatch.setenv("SHIOAJI_SECRET_KEY", "secret")
+    monkeypatch.setattr(auth, "RELOGIN_BACKOFF_MIN", 0.01)
+    with patch.object(auth, "get_shioaji", return_value=SimpleNamespace(Shioaji=FakeShioaji)), \
+            patch.object(auth.contract_catalog, "attach"):
+        yield FakeShioaji
+
+
+@pytest.mark.asyncio
+async def test_callers_wait_for_background_login(sdk):
+    session = ShioajiSession(ready_timeout=1)
+    sdk.login_failures = 2
+
+    results = await asyncio.gather(*(session.ensure_connected() for _ in range(5)))
+
+    assert results == [True] * 5
+    assert session.state == READY
+    assert session.logins == 1
+    assert session.get_api() is sdk.instances[-1]
+    assert len(sdk.instances) == 3
+    await session.stop()
+
+
+@pytest.mark.asyncio
+async def test_ready_timeout_returns_false(sdk):
+    session = ShioajiSession(ready_timeout=0.05)
+    sdk.login_failures = 1000
+
+    assert await session.ensure_connected() is False
+    assert session.state != READY
+    await session.stop()
+
+
+@pytest.mark.asyncio
+async def test_missing_credentials_fail_fast(sdk, monkeypatch):
+    monkeypatch.delenv("SHIOAJI_API_KEY")
+    session = ShioajiSession(ready_timeout=5)
+
+    assert await asyncio.wait_for(session.ensure_connected(), 1) is False
+    assert session.status()["state"] == "failed"
+    assert "Missing SHIOAJI_API_KEY" in session.last_error
+    with pytest.raises(RuntimeError, match="Not connected to Shioaji API"):
+        session.get_api()
+
+
+@pytest.mark.asyncio
+async def test_session_down_event_logs_in_again(sdk):
+    session = ShioajiSession(ready_timeout=1)
+    restored = []
+    session.add_listener(restored.append)
+    assert await session.ensure_connected()
+    first = session.get_api()
+
+    # Event callbacks arrive on an SDK thread
+    await asyncio.to_thread(first.session_event_callback(), 0, 1, "", "Session down")
+    await asyncio.sleep(0)
+    assert not session.is_connected()
+
+    assert await session.ensure_connected()
+    second = session.get_api()
+    assert second is not first
+    assert restored == [second]
+    assert session.status()["session_drops"] == 1
+    # The replaced session is released after callers are unblocked
+    for _ in range(100):
+        if first.logout.called:
+            break
+        await asyncio.sleep(0.01)
+    first.logout.assert_called_once()
+    await session.stop()
+
+
+@pytest.mark.asyncio
+async def test_failed_keepalive_logs_in_again(sdk):
+    session = ShioajiSession(keepalive_interval=0.01, ready_timeout=1)
+    assert await session.ensure_connected()
+    first = session.get_api()
+    first.usage.side_effect = TimeoutError("no response")
+
+    for _ in range(100):
+        if session.logins == 2:
+            break
+        await asyncio.sleep(0.01)
+
+    assert session.logins == 2
+    assert session.get_api() is not first
+    await session.stop()
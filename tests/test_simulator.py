@@ -0,0 +1,131 @@
+"""Tests for the local broker simulator backend."""
+
+import asyncio
+import json
+import time
+
+import pytest
+
+from shioaji_mcp.tools.market_data import get_snapshots
+from shioaji_mcp.tools.orders import list_orders, place_order
+from shioaji_mcp.utils import simulator as sim
+from shioaji_mcp.utils.auth import READY, ShioajiSession
+from shioaji_mcp.utils.shioaji_wrapper import get_shioaji
+
+
+def _logged_in(**options):
+    api = sim.Shioaji(stocks=20, quote_interval_ms=0, **options)
+    api.login()
+    return api
+
+
+def test_backend_selected_from_env(monkeypatch):
+    monkeypatch.setenv("SHIOAJI_BACKEND", "simulator")
+    assert get_shioaji() is sim
+    monkeypatch.setenv("SHIOAJI_BACKEND", "paper")
+    with pytest.raises(ValueError, match="Unknown SHIOAJI_BACKEND"):
+        get_shioaji()
+
+
+def test_same_seed_same_data():
+    first, second, other = _logged_in(seed=7), _logged_in(seed=7), _logged_in(seed=8)
+    codes = [c.code for group in first.Contracts.Stocks for c in group]
+    assert codes == [c.code for group in second.Contracts.Stocks for c in group]
+    assert "2330" in codes and len(codes) == len(sim.WELL_KNOWN_STOCKS) + 20
+
+    contract = first.Contracts.Stocks["2330"]
+    bars = first.kbars(contract, "2025-01-06", "2025-01-10")
+    assert len(bars.ts) == 5 * 270
+    assert bars.Close == second.kbars(contract, "2025-01-06", "2025-01-10").Close
+    assert bars.Close != other.kbars(contract, "2025-01-06", "2025-01-10").Close
+
+    snapshots = [api.snapshots([contract])[0].close for api in (first, second)]
+    assert snapshots[0] == snapshots[1]
+
+    ticks = first.ticks(
+        contract, "2025-01-06", query_type=sim.TicksQueryType.RangeTime,
+        time_start="09:00:00", time_end="09:30:00",
+    )
+    assert 0 < len(ticks.ts) < sim.DEFAULT_TICKS_PER_DAY
+    assert ticks.close == second.ticks(
+        contract, "2025-01-06", query_type=sim.TicksQueryType.RangeTime,
+        time_start="09:00:00", time_end="09:30:00",
+    ).close
+
+
+def test_rate_limits_and_latency():
+    api = _logged_in(latency_ms=20, rate_limits={"data": (3, 60.0)})
+    contract = api.Contracts.Stocks["2330"]
+
+    started = time.perf_counter()
+    for _ in range(3):
+        api.snapshots([contract])
+    assert time.perf_counter() - started >= 0.06
+
+    with pytest.raises(sim.SimulatorRateLimitError, match="3 per 60s"):
+        api.snapshots([contract])
+    assert api.stats() == {"calls": {"snapshots": 4}, "rejected": 1}
+
+
+def test_marketable_orders_fill_and_resting_orders_cancel():
+    api = _logged_in()
+    events = []
+    api.set_order_callback(lambda state, msg: events.append(state))
+    contract = api.Contracts.Stocks["2317"]
+    last = api.snapshots([contract])[0].close
+
+    filled = api.place_order(contract, api.Order(
+        price=contract.limit_up, quantity=2, action=sim.Action.Buy,
+        price_type=sim.StockPriceType.LMT, order_type=sim.OrderType.ROD,
+    ))
+    resting = api.place_order(contract, api.Order(
+        price=contract.limit_down, quantity=1, action=sim.Action.Buy,
+        price_type=sim.StockPriceType.LMT, order_type=sim.OrderType.ROD,
+    ))
+    for _ in range(100):
+        if sim.OrderState.StockDeal in events:
+            break
+        time.sleep(0.01)
+
+    assert filled.status.status == sim.Status.Filled
+    assert filled.status.deals[0].price == last
+    assert resting.status.status == sim.Status.Submitted
+    api.cancel_order(resting)
+    assert resting.status.cancel_quantity == 1
+    [position] = [p for p in api.list_positions(unit=sim.Unit.Share) if p.code == "2317"]
+    assert position.quantity == 2000
+    assert api.account_balance().acc_balance == sim.INITIAL_CASH - 2000 * last
+
+
+@pytest.mark.asyncio
+async def test_tools_run_against_simulator(simulator, monkeypatch):
+    monkeypatch.setenv("SHIOAJI_TRADING_ENABLED", "true")
+
+    result = await get_snapshots({"contracts": ["2330", "0050"]})
+    assert [row["name"] for row in json.loads(result[1]["text"])] == ["台積電", "元大台灣50"]
+
+    placed = await place_order({"contract": "2330", "action": "Buy", "quantity": 1, "price": 1100})
+    order_id = json.loads(placed[1]["text"])["order_id"]
+    for _ in range(100):
+        result = await list_orders({"status": ["Filled"]})
+        if len(result) > 1:
+            break
+        await asyncio.sleep(0.01)
+    assert [row["order_id"] for row in json.loads(result[1]["text"])] == [order_id]
+
+
+@pytest.mark.asyncio
+async def test_dropped_session_logs_in_again(monkeypatch):
+    monkeypatch.setenv("SHIOAJI_BACKEND", "simulator")
+    monkeypatch.setattr("shioaji_mcp.utils.auth.RELOGIN_BACKOFF_MIN", 0.01)
+    session = ShioajiSession("replay", ready_timeout=5)
+    assert await session.ensure_connected()
+    first = session.get_api()
+
+    await asyncio.to_thread(first.drop_session)
+    await asyncio.sleep(0)
+
+    assert await session.ensure_connected()
+    assert session.state == READY and session.get_api() is not first
+    assert session.status()["session_drops"] == 1
+    await session.stop()
@@ -0,0 +1,144 @@
+"""Tests for the snapshot TTL cache."""
+
+import asyncio
+from datetime import datetime
+
+import pytest
+
+from shioaji_mcp.utils.contract_cache import TAIPEI_TZ
+from shioaji_mcp.utils.snapshot_cache import SnapshotCache, is_market_open
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def _cache(**kwargs):
+    clock = FakeClock()
+    kwargs.setdefault("ttl", 1.0)
+    kwargs.setdefault("closed_ttl", 60.0)
+    kwargs.setdefault("max_bytes", 1 << 20)
+    kwargs.setdefault("market_open", lambda: True)
+    return SnapshotCache(clock=clock, **kwargs), clock
+
+
+def test_market_hours():
+    """Test the day and night session windows."""
+    def at(*args):
+        return datetime(*args, tzinfo=TAIPEI_TZ)
+
+    assert is_market_open(at(2026, 1, 5, 9, 0))        # Monday day session
+    assert not is_market_open(at(2026, 1, 5, 14, 0))   # between sessions
+    assert is_market_open(at(2026, 1, 5, 20, 0))       # Monday night session
+    assert is_market_open(at(2026, 1, 10, 3, 0))       # Friday night into Saturday
+    assert not is_market_open(at(2026, 1, 10, 9, 0))   # Saturday
+    assert not is_market_open(at(2026, 1, 5, 2, 0))    # Monday before any session
+
+
+@pytest.mark.asyncio
+async def test_hits_and_expiry():
+    """Test that entries are reused until the TTL runs out."""
+    cache, clock = _cache()
+    calls = []
+
+    async def fetch(codes):
+        calls.append(codes)
+        return {code: {"code": code, "close": clock.now} for code in codes}
+
+    await cache.get_many(["2330"], fetch)
+    await cache.get_many(["2330", "2317"], fetch)
+    assert calls == [["2330"], ["2317"]]
+
+    clock.now = 1.5
+    result = await cache.get_many(["2330"], fetch)
+    assert result["2330"]["close"] == 1.5
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 3
+
+
+@pytest.mark.asyncio
+async def test_closed_market_uses_longer_ttl():
+    """Test that the after-close TTL applies when no session is running."""
+    cache, clock = _cache(market_open=lambda: False)
+    cache.put("2330", {"close": 1})
+    clock.now = 30
+    assert cache.peek("2330") == {"close": 1}
+    clock.now = 61
+    assert cache.peek("2330") is None
+
+
+@pytest.mark.asyncio
+async def test_single_flight():
+    """Test that concurrent requests for the same code share one fetch."""
+    cache, _ = _cache()
+    calls = []
+    release = asyncio.Event()
+
+    async def fetch(codes):
+        calls.append(codes)
+        await release.wait()
+        return {code: {"code": code} for code in codes}
+
+    first = asyncio.create_task(cache.get_many(["2330", "2317"], fetch))
+    await asyncio.sleep(0)
+    second = asyncio.create_task(cache.get_many(["2330", "1101"], fetch))
+    await asyncio.sleep(0)
+    release.set()
+    a, b = await asyncio.gather(first, second)
+
+    assert calls == [["2330", "2317"], ["1101"]]
+    assert a["2330"] is b["2330"]
+    assert cache.stats()["coalesced"] == 1
+
+
+@pytest.mark.asyncio
+async def test_cancelled_leader_releases_followers():
+    """Test that followers get an error when the fetching request is cancelled."""
+    cache, _ = _cache()
+    started = asyncio.Event()
+
+    async def fetch(codes):
+        started.set()
+        await asyncio.sleep(10)
+        return {}
+
+    leader = asyncio.create_task(cache.get_many(["2330"], fetch))
+    await started.wait()
+    follower = asyncio.create_task(cache.get_many(["2330"], fetch))
+    await asyncio.sleep(0)
+    leader.cancel()
+
+    result = await asyncio.wait_for(follower, 1)
+    assert isinstance(result["2330"], RuntimeError)
+    assert cache.stats()["coalesced"] == 1
+    assert not cache._inflight
+
+
+@pytest.mark.asyncio
+async def test_errors_are_not_cached():
+    """Test that failed fetches are retried on the next request."""
+    cache, _ = _cache()
+
+    async def failing(codes):
+        raise TimeoutError("timeout")
+
+    result = await cache.get_many(["2330"], failing)
+    assert isinstance(result["2330"], TimeoutError)
+    assert cache.peek("2330") is None
+
+
+def test_lru_eviction_by_memory():
+    """Test that the least recently used entries go first when over budget."""
+    cache, _ = _cache(max_bytes=2000)
+    for i in range(20):
+        cache.put(str(i), {"code": str(i), "close": float(i)})
+
+    stats = cache.stats()
+    assert stats["bytes"] <= 2000
+    assert stats["evictions"] > 0
+    assert cache.peek("19") is not None
+    assert cache.peek("0") is None
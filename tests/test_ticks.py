@@ -0,0 +1,136 @@
+"""Tests for tick summarization and the get_ticks tool."""
+
+import json
+from datetime import datetime, time, timezone
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from shioaji_mcp.tools.market_data import get_ticks
+from shioaji_mcp.utils.auth import auth_manager
+from shioaji_mcp.utils.ticks import (
+    TickCache,
+    iter_rows,
+    select,
+    summarize,
+    tick_cache,
+    to_arrays,
+    volume_profile,
+)
+
+
+@pytest.fixture(autouse=True)
+def clear_tick_cache():
+    """Keep cached tick days from leaking between tests."""
+    tick_cache.invalidate()
+    yield
+    tick_cache.invalidate()
+
+
+def _ns(hour, minute, second=0):
+    dt = datetime(2026, 1, 5, hour, minute, second, tzinfo=timezone.utc)
+    return int(dt.timestamp()) * 1_000_000_000
+
+
+def _ticks():
+    """Five ticks across two minutes plus one night-session tick."""
+    return SimpleNamespace(
+        ts=[_ns(9, 0, 10), _ns(9, 0, 30), _ns(9, 1, 5), _ns(9, 1, 40), _ns(9, 1, 50), _ns(23, 0)],
+        close=[100.0, 101.0, 101.0, 102.0, 100.0, 99.0],
+        volume=[1, 3, 2, 10, 4, 5],
+        bid_price=[99.5] * 6,
+        bid_volume=[1] * 6,
+        ask_price=[100.5] * 6,
+        ask_volume=[1] * 6,
+        tick_type=[1, 1, 2, 1, 2, 0],
+    )
+
+
+def test_select_time_and_volume():
+    """Test time-of-day slicing, including ranges across midnight."""
+    columns = to_arrays(_ticks())
+
+    day = select(columns, time(9, 0), time(9, 1, 45))
+    assert len(day["ts"]) == 4
+
+    night = select(columns, time(15, 0), time(5, 0))
+    assert night["close"].tolist() == [99.0]
+
+    large = select(columns, min_volume=4)
+    assert large["volume"].tolist() == [10, 4, 5]
+    assert select(columns, min_price=101, max_price=101)["volume"].tolist() == [3, 2]
+
+
+def test_summarize_total_and_buckets():
+    """Test VWAP, volume and trade count for the day and per bucket."""
+    columns = select(to_arrays(_ticks()), time(9, 0), time(10, 0))
+
+    (total,) = summarize(columns)
+    assert total["trades"] == 5
+    assert total["volume"] == 20
+    assert total["vwap"] == pytest.approx((100 + 303 + 202 + 1020 + 400) / 20)
+    assert total["buy_volume"] == 14 and total["sell_volume"] == 6
+    assert (total["open"], total["high"], total["low"], total["close"]) == (100, 102, 100, 100)
+
+    buckets = summarize(columns, "1m")
+    assert [b["time"] for b in buckets] == ["2026-01-05 09:01:00", "2026-01-05 09:02:00"]
+    assert [b["trades"] for b in buckets] == [2, 3]
+    assert buckets[0]["vwap"] == pytest.approx(100.75)
+    assert summarize(select(columns, min_volume=100)) == []
+
+
+def test_volume_profile():
+    """Test volume per price level."""
+    profile = volume_profile(to_arrays(_ticks()))
+    by_price = {row["price"]: row for row in profile}
+    assert by_price[101.0]["volume"] == 5
+    assert by_price[101.0]["buy_volume"] == 3 and by_price[101.0]["sell_volume"] == 2
+    assert sum(row["share"] for row in profile) == pytest.approx(1)
+
+
+def test_iter_rows_slices_lazily():
+    """Test that raw rows are produced only for the requested slice."""
+    rows = list(iter_rows(to_arrays(_ticks()), offset=4, limit=10))
+    assert [row["close"] for row in rows] == [100.0, 99.0]
+    assert rows[0]["time"] == "2026-01-05 09:01:50.000000"
+
+
+@pytest.mark.asyncio
+async def test_get_ticks_raw_pages():
+    """Test raw tick paging through next_page."""
+    api = MagicMock()
+    api.Contracts.Stocks = {"2330": SimpleNamespace(code="2330", name="TSMC")}
+    api.ticks.return_value = _ticks()
+
+    with patch.object(auth_manager, "is_connected", return_value=True), \
+            patch.object(auth_manager, "get_api", return_value=api):
+        first = await get_ticks({"contract": "2330", "date": "2026-01-05", "mode": "raw", "limit": 4})
+        cursor = json.loads(first[2]["text"])["next_page"]
+        second = await get_ticks({"contract": "2330", "cursor": cursor, "limit": 4})
+        summary = await get_ticks({"contract": "2330", "date": "2026-01-05", "bucket": "5m",
+                                   "time_start": "09:00", "time_end": "13:30"})
+
+    assert "ticks 1-4 of 6" in first[0]["text"]
+    assert len(json.loads(second[1]["text"])) == 2 and len(second) == 2
+    # The second page reuses the downloaded day; the ranged summary fetches its own
+    assert api.ticks.call_count == 2
+    assert json.loads(summary[1]["text"])[0]["trades"] == 5
+    assert api.ticks.call_args.kwargs["time_start"] == "09:00:00"
+
+
+def test_tick_cache_expires_and_evicts():
+    """Test that cached tick days expire after the TTL and beyond the entry limit."""
+    now = [0.0]
+    cache = TickCache(ttl=30, max_entries=2, clock=lambda: now[0])
+    day = to_arrays(_ticks())
+
+    cache.put(("2330", "2026-01-05"), day)
+    assert cache.get(("2330", "2026-01-05")) is day
+    now[0] = 31
+    assert cache.get(("2330", "2026-01-05")) is None
+
+    for code in ("2330", "2317", "2303"):
+        cache.put((code, "2026-01-05"), day)
+    assert cache.get(("2330", "2026-01-05")) is None
+    assert cache.stats() == {"entries": 2, "hits": 1, "misses": 2}
@@ -0,0 +1,92 @@
+"""Tests for opt-in request tracing and slowest-call profiling."""
+
+import json
+
+import pytest
+
+from shioaji_mcp.server import handle_call_tool
+from shioaji_mcp.utils.rate_limit import rate_governor
+from shioaji_mcp.utils.tracing import Tracer, tracer
+
+
+@pytest.fixture
+def tracing(tmp_path):
+    """Configure the global tracer for a test and turn it off afterwards."""
+
+    def configure(**options):
+        options.setdefault("path", str(tmp_path / "trace.json"))
+        options.setdefault("profile_slowest", 0)
+        tracer.configure(**options)
+        return tmp_path / "trace.json"
+
+    yield configure
+    tracer.configure(path="", profile_slowest=0)
+
+
+def test_disabled_tracer_hands_out_noop_spans(monkeypatch):
+    monkeypatch.delenv("SHIOAJI_TRACE_FILE", raising=False)
+    monkeypatch.delenv("SHIOAJI_PROFILE_SLOWEST", raising=False)
+    idle = Tracer()
+    assert not idle.enabled
+    with idle.request("get_kbars", {}) as root, idle.span("sdk.kbars") as span:
+        assert root is None and span is None
+    assert not idle.active()
+
+
+@pytest.mark.asyncio
+async def test_chrome_trace_covers_the_hot_path(simulator, tracing):
+    path = tracing(trace_format="chrome")
+    await handle_call_tool("get_snapshots", {"contracts": ["2330", "2317"]})
+    await handle_call_tool("get_snapshots", {"contracts": []})
+    tracer.close()
+
+    events = json.loads(path.read_text())
+    spans = [event for event in events if event["ph"] == "X"]
+    by_name = {}
+    for span in spans:
+        by_name.setdefault(span["name"], []).append(span)
+
+    [root, failed] = by_name["tool.get_snapshots"]
+    assert root["args"]["status"] == "ok" and root["args"]["response_bytes"] > 0
+    assert root["args"]["arg_bytes"] == len('{"contracts":["2330","2317"]}')
+    assert failed["args"]["status"] == "error" and failed["tid"] != root["tid"]
+    assert {span["args"]["code"] for span in by_name["contract.resolve"]} == {"2330", "2317"}
+    assert "format.encode" in by_name
+
+    [broker] = by_name["broker.snapshots"]
+    [sdk] = by_name["sdk.snapshots"]
+    assert broker["tid"] == sdk["tid"] == root["tid"]
+    assert broker["ts"] <= sdk["ts"] and sdk["ts"] + sdk["dur"] <= broker["ts"] + broker["dur"]
+    assert root["ts"] <= broker["ts"] and broker["ts"] + broker["dur"] <= root["ts"] + root["dur"]
+
+
+@pytest.mark.asyncio
+async def test_otlp_export_links_spans(simulator, tracing):
+    path = tracing(trace_format="otlp")
+    await handle_call_tool("get_positions", {})
+    tracer.close()
+
+    [line] = path.read_text().splitlines()
+    [resource] = json.loads(line)["resourceSpans"]
+    spans = {span["name"]: span for span in resource["scopeSpans"][0]["spans"]}
+    root = spans["tool.get_positions"]
+    assert "parentSpanId" not in root
+    assert {span["traceId"] for span in spans.values()} == {root["traceId"]}
+    assert spans["broker.list_positions"]["parentSpanId"] == root["spanId"]
+    assert spans["sdk.list_positions"]["parentSpanId"] == spans["broker.list_positions"]["spanId"]
+    assert {"key": "tool", "value": {"stringValue": "get_positions"}} in root["attributes"]
+
+
+@pytest.mark.asyncio
+async def test_profiles_kept_for_the_slowest_calls(simulator, tracing, tmp_path, monkeypatch):
+    monkeypatch.setattr(rate_governor, "buckets", {})
+    tracing(path="", profile_slowest=1, profile_dir=str(tmp_path / "profiles"), profile_interval_ms=1)
+    simulator.latency = 0.05
+    await handle_call_tool("get_positions", {})
+    simulator.latency = 0.15
+    await handle_call_tool("get_positions", {})
+
+    [profile] = tracer.profiles()
+    assert [path.name for path in (tmp_path / "profiles").iterdir()] == [profile.name]
+    assert profile.name.startswith("000002-get_positions-")
+    assert "list_positions" in profile.read_text()
@@ -1,33 +1,31 @@
 """Tests for trading operation tools."""
 
+import json
+
 import pytest
 
 from shioaji_mcp.tools.orders import cancel_order, list_orders, place_order
 from shioaji_mcp.tools.positions import get_account_balance, get_positions
-from shioaji_mcp.utils.auth import auth_manager
+
+
+@pytest.fixture
+def trading(monkeypatch):
+    """Allow trading operations."""
+    monkeypatch.setenv("SHIOAJI_TRADING_ENABLED", "true")
 
 
 @pytest.mark.asyncio
-async def test_place_order_not_logged_in():
+async def test_place_order_not_logged_in(logged_out, trading):
     """Test place order when not logged in."""
-    await auth_manager.logout()
-
     result = await place_order({})
 
     assert len(result) == 1
-    assert "Error: Not logged in" in result[0]["text"]
+    assert "Error: Not connected" in result[0]["text"]
 
 
 @pytest.mark.asyncio
-async def test_place_order_missing_params():
+async def test_place_order_missing_params(simulator, trading):
     """Test place order with missing parameters."""
-    await auth_manager.login(
-        api_key="test_key",
-        secret_key="test_secret",
-        person_id="test_person",
-        password="test_password",
-    )
-
     result = await place_order({})
 
     assert len(result) == 1
@@ -35,17 +33,10 @@ async def test_place_order_missing_params():
 
 
 @pytest.mark.asyncio
-async def test_place_order_success():
+async def test_place_order_success(simulator, trading):
     """Test successful order placement."""
-    await auth_manager.login(
-        api_key="test_key",
-        secret_key="test_secret",
-        person_id="test_person",
-        password="test_password",
-    )
-
     result = await place_order(
-        {"contract": "2330", "action": "Buy", "quantity": 1000, "price": 500.0}
+        {"contract": "2330", "action": "Buy", "quantity": 1, "price": 1000.0}
     )
 
     assert len(result) == 2
@@ -53,15 +44,8 @@ async def test_place_order_success():
 
 
 @pytest.mark.asyncio
-async def test_cancel_order_missing_id():
+async def test_cancel_order_missing_id(simulator, trading):
     """Test cancel order with missing order ID."""
-    await auth_manager.login(
-        api_key="test_key",
-        secret_key="test_secret",
-        person_id="test_person",
-        password="test_password",
-    )
-
     result = await cancel_order({})
 
     assert len(result) == 1
@@ -69,30 +53,21 @@ async def test_cancel_order_missing_id():
 
 
 @pytest.mark.asyncio
-async def test_cancel_order_success():
+async def test_cancel_order_success(simulator, trading):
     """Test successful order cancellation."""
-    await auth_manager.login(
-        api_key="test_key",
-        secret_key="test_secret",
-        person_id="test_person",
-        password="test_password",
-    )
+    placed = await place_order({"contract": "2330", "action": "Buy", "quantity": 1, "price": 900.0})
+    order_id = json.loads(placed[1]["text"])["order_id"]
 
-    result = await cancel_order({"order_id": "ORD12345"})
+    result = await cancel_order({"order_id": order_id})
 
     assert len(result) == 2
     assert "cancelled successfully" in result[0]["text"]
 
 
 @pytest.mark.asyncio
-async def test_list_orders_success():
+async def test_list_orders_success(simulator, trading):
     """Test successful order listing."""
-    await auth_manager.login(
-        api_key="test_key",
-        secret_key="test_secret",
-        person_id="test_person",
-        password="test_password",
-    )
+    await place_order({"contract": "2330", "action": "Buy", "quantity": 1, "price": 900.0})
 
     result = await list_orders({})
 
@@ -101,15 +76,8 @@ async def test_list_orders_success():
 
 
 @pytest.mark.asyncio
-async def test_get_positions_success():
+async def test_get_positions_success(simulator, trading):
     """Test successful position retrieval."""
-    await auth_manager.login(
-        api_key="test_key",
-        secret_key="test_secret",
-        person_id="test_person",
-        password="test_password",
-    )
-
     result = await get_positions({})
 
     assert len(result) == 2
@@ -117,15 +85,8 @@ async def test_get_positions_success():
 
 
 @pytest.mark.asyncio
-async def test_get_account_balance_success():
+async def test_get_account_balance_success(simulator, trading):
     """Test successful account balance retrieval."""
-    await auth_manager.login(
-        api_key="test_key",
-        secret_key="test_secret",
-        person_id="test_person",
-        password="test_password",
-    )
-
     result = await get_account_balance({})
 
     assert len(result) == 2
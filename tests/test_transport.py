@@ -0,0 +1,87 @@
+"""Tests for the HTTP transports and per-client call limits."""
+
+import asyncio
+
+import pytest
+from starlette.testclient import TestClient
+
+from shioaji_mcp.server import server
+from shioaji_mcp.transport import auth_token_for, create_app
+from shioaji_mcp.utils.client_limits import ClientLimiter
+
+HEADERS = {"Accept": "application/json, text/event-stream", "Content-Type": "application/json"}
+
+INITIALIZE = {
+    "jsonrpc": "2.0",
+    "id": 1,
+    "method": "initialize",
+    "params": {
+        "protocolVersion": "2025-03-26",
+        "capabilities": {},
+        "clientInfo": {"name": "test", "version": "1.0"},
+    },
+}
+
+
+class FakeSession:
+    """Stand-in for an MCP server session."""
+
+
+def test_clients_share_one_process_over_streamable_http():
+    with TestClient(create_app(server)) as client:
+        sessions = set()
+        for _ in range(2):
+            response = client.post("/mcp", json=INITIALIZE, headers=HEADERS)
+            assert response.status_code == 200
+            assert '"name":"shioaji-mcp"' in response.text
+            assert '"subscribe":true' in response.text
+            sessions.add(response.headers["mcp-session-id"])
+        assert len(sessions) == 2
+
+        health = client.get("/health").json()
+        assert health["connected"] is False
+        assert "default" in health["sessions"]
+
+
+@pytest.mark.asyncio
+async def test_client_limiter_bounds_each_client_separately():
+    limiter = ClientLimiter(limit=2)
+    first, second = FakeSession(), FakeSession()
+    active = {id(first): 0, id(second): 0}
+    peak = {id(first): 0, id(second): 0}
+
+    async def call(client):
+        async with limiter.slot(client):
+            active[id(client)] += 1
+            peak[id(client)] = max(peak[id(client)], active[id(client)])
+            await asyncio.sleep(0.01)
+            active[id(client)] -= 1
+
+    await asyncio.gather(*(call(first) for _ in range(6)), *(call(second) for _ in range(2)))
+
+    assert peak == {id(first): 2, id(second): 2}
+    assert limiter.stats()["clients"] == 2
+    assert limiter.stats()["queued"] == 4
+
+
+def test_bearer_token_guards_every_endpoint():
+    with TestClient(create_app(server, token="s3cret")) as client:
+        assert client.post("/mcp", json=INITIALIZE, headers=HEADERS).status_code == 401
+        assert client.get("/health").status_code == 401
+        wrong = client.get("/health", headers={"Authorization": "Bearer nope"})
+        assert (wrong.status_code, wrong.headers["www-authenticate"]) == (401, "Bearer")
+
+        authorized = {**HEADERS, "Authorization": "Bearer s3cret"}
+        assert client.post("/mcp", json=INITIALIZE, headers=authorized).status_code == 200
+        assert client.get("/health", headers=authorized).status_code == 200
+
+
+def test_non_loopback_bind_requires_token(monkeypatch):
+    monkeypatch.delenv("SHIOAJI_MCP_AUTH_TOKEN", raising=False)
+    assert auth_token_for("127.0.0.1") is None
+    assert auth_token_for("localhost") is None
+    with pytest.raises(ValueError, match="without authentication"):
+        auth_token_for("0.0.0.0")
+
+    monkeypatch.setenv("SHIOAJI_MCP_AUTH_TOKEN", "s3cret")
+    assert auth_token_for("0.0.0.0") == "s3cret"